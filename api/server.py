@@ -0,0 +1,284 @@
+"""
+読み取り専用 HTTP API（ローカルスナップショット + レスポンスキャッシュ）
+
+第N回の発行情報・法令別の合計・告示本文といった単純な参照のたびに BigQuery を
+スキャンしていたものを、ローカルの SQLite スナップショット（api/snapshot.py）から返す。
+
+エンドポイント（GET のみ、JSON）:
+    /health                              スナップショットのバージョン・キャッシュ状況
+    /issuances?series=第150回&law=&bond_master_id=&fiscal_year=&announcement_id=&page=&per_page=
+    /announcements/<announcement_id>     告示（本文を含む）
+    /aggregates/by-law?fiscal_year=      発行根拠法令別の件数・金額
+    /aggregates/summary?fiscal_year=&category=   issuance_summary の行
+
+- ETag はスナップショットのバージョンと URL から作る。If-None-Match が一致すれば 304
+- 200 のレスポンスはプロセス内の LRU+TTL キャッシュに保持（キーにバージョンを含む）
+- /health とエラー応答はキャッシュせず、ETag も付けない（304 も返さない）
+- 一覧はページング（page は1始まり、per_page は最大 500）
+
+使用方法:
+    python -m api.server --snapshot cache/api/snapshot.sqlite3 --port 8080
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import unicodedata
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+# プロジェクトルートをパスに追加（database パッケージ用）
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from api.cache import TTLCache
+from api.snapshot import DEFAULT_SNAPSHOT_PATH, SnapshotReader
+
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 500
+
+Response = Tuple[int, Dict[str, str], bytes]
+
+
+class APIError(Exception):
+    """クライアントに返すエラー"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def normalize_series(value: str) -> str:
+    """回号の表記ゆれを吸収（150 / １５０ / 第150回 → 第150回）"""
+    value = unicodedata.normalize('NFKC', value).strip()
+    if value.isdigit():
+        return f"第{int(value)}回"
+    return value
+
+
+def _int_param(params: Dict[str, str], name: str, default: Optional[int] = None) -> Optional[int]:
+    value = params.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise APIError(400, f"{name} は整数で指定してください")
+
+
+class ReadAPI:
+    """ルーティングと応答の生成（HTTP サーバーから独立）"""
+
+    def __init__(self, snapshot: SnapshotReader, cache: Optional[TTLCache] = None):
+        self.snapshot = snapshot
+        self.cache = cache if cache is not None else TTLCache()
+
+    # ---------- 入口 ----------
+
+    def handle(self, target: str, if_none_match: Optional[str] = None) -> Response:
+        """
+        GET リクエストを処理
+
+        Args:
+            target: パスとクエリ文字列（例: /issuances?series=150）
+            if_none_match: If-None-Match ヘッダ
+
+        Returns:
+            (ステータス, ヘッダ, 本文)
+        """
+        self.snapshot.refresh()
+        url = urlsplit(target)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        # /health はキャッシュ状況そのものを返すため、毎回その場で作る
+        if url.path.rstrip('/') == '/health':
+            return 200, self._headers(None, 'BYPASS'), self._encode(self.health())
+
+        canonical = url.path + '?' + '&'.join(f"{k}={params[k]}" for k in sorted(params))
+        etag = '"{}-{}"'.format(self.snapshot.version,
+                                hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:12])
+
+        key = (self.snapshot.version, canonical)
+        body = self.cache.get(key)
+        cache_state = 'HIT'
+        if body is None:
+            cache_state = 'MISS'
+            try:
+                body = self._encode(self.route(url.path, params))
+            except APIError as e:
+                # エラーはキャッシュせず、ETag も付けない
+                return e.status, self._headers(None, cache_state), self._encode({'error': str(e)})
+            self.cache.put(key, body)
+
+        # 304 は 200 を返せる URL に限る
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(',')]:
+            return 304, {'ETag': etag}, b''
+        return 200, self._headers(etag, cache_state), body
+
+    @staticmethod
+    def _encode(payload: Any) -> bytes:
+        return json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+
+    def _headers(self, etag: Optional[str], cache_state: str) -> Dict[str, str]:
+        headers = {
+            'Content-Type': 'application/json; charset=utf-8',
+            'Cache-Control': 'no-cache' if etag else 'no-store',   # 200 は毎回 ETag で再検証させる
+            'X-Snapshot-Version': self.snapshot.version,
+            'X-Cache': cache_state,
+        }
+        if etag:
+            headers['ETag'] = etag
+        return headers
+
+    def route(self, path: str, params: Dict[str, str]) -> Any:
+        parts = [unquote(part) for part in path.strip('/').split('/') if part]
+        if parts == ['health']:
+            return self.health()
+        if parts == ['issuances']:
+            return self.issuances(params)
+        if len(parts) == 2 and parts[0] == 'announcements':
+            return self.announcement(parts[1])
+        if parts == ['aggregates', 'by-law']:
+            return self.totals_by_law(params)
+        if parts == ['aggregates', 'summary']:
+            return self.summary(params)
+        raise APIError(404, f"not found: {path}")
+
+    # ---------- エンドポイント ----------
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            'snapshot_version': self.snapshot.version,
+            'built_at': self.snapshot.built_at,
+            'cache_entries': len(self.cache),
+            'cache_hit_rate': round(self.cache.hit_rate, 3),
+        }
+
+    def _paginate(self, sql: str, where: List[str], args: List[Any],
+                  params: Dict[str, str], order_by: str) -> Dict[str, Any]:
+        page = max(_int_param(params, 'page', 1), 1)
+        per_page = min(max(_int_param(params, 'per_page', DEFAULT_PER_PAGE), 1), MAX_PER_PAGE)
+        clause = f" WHERE {' AND '.join(where)}" if where else ''
+        total = self.snapshot.scalar(f"SELECT COUNT(*) FROM ({sql}{clause})", args)
+        items = self.snapshot.query(f"{sql}{clause} ORDER BY {order_by} LIMIT ? OFFSET ?",
+                                    args + [per_page, (page - 1) * per_page])
+        return {
+            'items': items,
+            'page': page,
+            'per_page': per_page,
+            'total': total,
+            'next_page': page + 1 if page * per_page < total else None,
+        }
+
+    def issuances(self, params: Dict[str, str]) -> Dict[str, Any]:
+        where, args = [], []
+        if params.get('series'):
+            where.append("series_number = ?")
+            args.append(normalize_series(params['series']))
+        if params.get('law'):
+            where.append("(legal_basis = ? OR legal_basis_normalized = ?)")
+            args.extend([params['law'], params['law']])
+        for column in ('bond_master_id', 'announcement_id', 'category', 'mof_category'):
+            if params.get(column):
+                where.append(f"{column} = ?")
+                args.append(params[column])
+        fiscal_year = _int_param(params, 'fiscal_year')
+        if fiscal_year is not None:
+            where.append("fiscal_year = ?")
+            args.append(fiscal_year)
+        return self._paginate("SELECT * FROM issuances", where, args, params,
+                              order_by="issuance_date, announcement_id, issuance_id")
+
+    def announcement(self, announcement_id: str) -> Dict[str, Any]:
+        rows = self.snapshot.query("SELECT * FROM announcements WHERE announcement_id = ?", [announcement_id])
+        if not rows:
+            raise APIError(404, f"announcement not found: {announcement_id}")
+        result = rows[0]
+        result['issuances'] = self.snapshot.query(
+            "SELECT * FROM issuances WHERE announcement_id = ? ORDER BY issuance_id", [announcement_id])
+        return result
+
+    def totals_by_law(self, params: Dict[str, str]) -> Dict[str, Any]:
+        # 総額レコードと、訂正の告示で置き換えられた行は数えない
+        where, args = ["IFNULL(is_summary_record, 0) = 0", "superseded_by IS NULL"], []
+        fiscal_year = _int_param(params, 'fiscal_year')
+        if fiscal_year is not None:
+            where.append("fiscal_year = ?")
+            args.append(fiscal_year)
+        rows = self.snapshot.query(f"""
+            SELECT COALESCE(legal_basis_normalized, legal_basis, '') AS law,
+                   COUNT(*) AS issuance_count,
+                   SUM(IFNULL(issue_amount, 0)) AS total_amount
+            FROM issuances
+            WHERE {' AND '.join(where)}
+            GROUP BY law
+            ORDER BY total_amount DESC
+        """, args)
+        return {'fiscal_year': fiscal_year, 'items': rows}
+
+    def summary(self, params: Dict[str, str]) -> Dict[str, Any]:
+        where, args = [], []
+        fiscal_year = _int_param(params, 'fiscal_year')
+        if fiscal_year is not None:
+            where.append("fiscal_year = ?")
+            args.append(fiscal_year)
+        if params.get('category'):
+            where.append("category = ?")
+            args.append(params['category'])
+        return self._paginate("SELECT * FROM summary", where, args, params,
+                              order_by="fiscal_year, category, sub_category, mof_category, bond_master_id")
+
+
+def make_handler(api: ReadAPI):
+    """ReadAPI を呼び出す HTTP ハンドラクラスを作成"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True   # keep-alive でヘッダと本文の送信が遅延ACK待ちになるのを防ぐ
+
+        def do_GET(self):
+            status, headers, body = api.handle(self.path, self.headers.get('If-None-Match'))
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass    # アクセスログは出さない（ベンチマークの妨げになるため）
+
+    return Handler
+
+
+def make_server(api: ReadAPI, host: str = '127.0.0.1', port: int = 8080) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), make_handler(api))
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='国債データ 読み取り専用API')
+    parser.add_argument('--snapshot', default=str(DEFAULT_SNAPSHOT_PATH), help='SQLiteスナップショット')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--cache-size', type=int, default=1024, help='レスポンスキャッシュの最大件数')
+    parser.add_argument('--cache-ttl', type=float, default=300.0, help='レスポンスキャッシュの有効期限（秒）')
+    args = parser.parse_args(argv)
+
+    api = ReadAPI(SnapshotReader(Path(args.snapshot)), TTLCache(args.cache_size, args.cache_ttl))
+    server = make_server(api, args.host, args.port)
+    print(f"🚀 http://{args.host}:{args.port}/ （スナップショット {api.snapshot.version}）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
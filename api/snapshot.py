@@ -0,0 +1,204 @@
+"""
+読み取り API 用のローカルスナップショット（SQLite）
+
+BigQuery の bond_issuances / announcements / issuance_summary を1つの SQLite ファイルに書き出し、
+API はこのファイルだけを読む（問い合わせごとの課金スキャンが無くなる）。
+
+- スナップショットのバージョンは書き出した内容のハッシュ（同じ内容なら同じバージョン）
+- 一時ファイルに書き出してから置き換えるため、API は作り直し中も古いファイルを読める
+- API 側はファイルの更新を検知して開き直し、バージョンが変われば ETag・キャッシュも切り替わる
+
+使用例:
+    python scripts/04_utilities/build_api_snapshot.py --dataset 20251025
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_SNAPSHOT_PATH = PROJECT_ROOT / "cache" / "api" / "snapshot.sqlite3"
+
+# スナップショットの列（BigQuery 側に無い列は NULL）
+ISSUANCE_COLUMNS = [
+    'issuance_id', 'announcement_id', 'bond_master_id', 'bond_name', 'series_number',
+    'issuance_date', 'maturity_date', 'issue_amount', 'issue_price', 'interest_rate',
+    'legal_basis', 'legal_basis_normalized', 'category', 'sub_category', 'bond_category',
+    'mof_category', 'is_summary_record', 'superseded_by', 'fiscal_year',
+]
+ANNOUNCEMENT_COLUMNS = [
+    'announcement_id', 'kanpo_date', 'announcement_number', 'title', 'source_file', 'full_text',
+]
+SUMMARY_COLUMNS = [
+    'fiscal_year', 'category', 'sub_category', 'mof_category', 'bond_master_id',
+    'issuance_count', 'total_amount',
+]
+
+TABLE_COLUMNS = {
+    'issuances': ISSUANCE_COLUMNS,
+    'announcements': ANNOUNCEMENT_COLUMNS,
+    'summary': SUMMARY_COLUMNS,
+}
+
+INDEXES = [
+    "CREATE INDEX idx_issuances_series ON issuances(series_number)",
+    "CREATE INDEX idx_issuances_law ON issuances(legal_basis)",
+    "CREATE INDEX idx_issuances_announcement ON issuances(announcement_id)",
+    "CREATE INDEX idx_issuances_fiscal_year ON issuances(fiscal_year)",
+    "CREATE UNIQUE INDEX idx_announcements_id ON announcements(announcement_id)",
+    "CREATE INDEX idx_summary_fiscal_year ON summary(fiscal_year)",
+]
+
+
+def _sql_value(value: Any) -> Any:
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float, str)) or value is None:
+        return value
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def write_snapshot(path: Path, tables: Dict[str, Iterable[Dict[str, Any]]],
+                   source: str = '') -> str:
+    """
+    スナップショットを書き出す
+
+    Args:
+        path: 出力先
+        tables: {'issuances': 行, 'announcements': 行, 'summary': 行}
+        source: 取得元（表示用）
+
+    Returns:
+        スナップショットのバージョン
+    """
+    from database.issuance_summary import row_fiscal_year
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    digest = hashlib.sha1()
+    db = sqlite3.connect(str(tmp_path))
+    try:
+        for table, columns in TABLE_COLUMNS.items():
+            db.execute(f"CREATE TABLE {table} ({', '.join(columns)})")
+            placeholders = ', '.join('?' for _ in columns)
+            for row in tables.get(table, []):
+                if table == 'issuances' and row.get('fiscal_year') is None:
+                    row = dict(row, fiscal_year=row_fiscal_year(row))
+                values = [_sql_value(row.get(column)) for column in columns]
+                digest.update(json.dumps(values, ensure_ascii=False, default=str).encode('utf-8'))
+                db.execute(f"INSERT INTO {table} VALUES ({placeholders})", values)
+        for statement in INDEXES:
+            db.execute(statement)
+
+        version = digest.hexdigest()[:16]
+        db.execute("CREATE TABLE snapshot_meta (version TEXT, built_at TEXT, source TEXT)")
+        db.execute("INSERT INTO snapshot_meta VALUES (?, ?, ?)",
+                   (version, datetime.now(timezone.utc).isoformat(), source))
+        db.commit()
+    finally:
+        db.close()
+
+    os.replace(tmp_path, path)
+    return version
+
+
+def export_from_bigquery(client, project_id: str, dataset_id: str,
+                         path: Path = DEFAULT_SNAPSHOT_PATH) -> str:
+    """
+    BigQuery のテーブルからスナップショットを作成（tabledata.list で読むためクエリ課金なし）
+
+    announcements に full_text が無い場合は raw_announcements（v9 Layer1）から本文を補う。
+    """
+    def read(table_name: str) -> List[Dict[str, Any]]:
+        try:
+            return [dict(row.items()) for row in client.list_rows(f"{project_id}.{dataset_id}.{table_name}")]
+        except Exception as e:
+            print(f"  ⚠️  {table_name} を読めませんでした: {e}")
+            return []
+
+    issuances = read('bond_issuances')
+    announcements = read('announcements')
+    raw = {row['announcement_id']: row for row in read('raw_announcements')}
+    if raw:
+        known = {row['announcement_id'] for row in announcements}
+        for row in announcements:
+            if not row.get('full_text') and row['announcement_id'] in raw:
+                row['full_text'] = raw[row['announcement_id']].get('full_text')
+        announcements.extend(
+            {'announcement_id': key, 'kanpo_date': value.get('announcement_date'),
+             'announcement_number': value.get('announcement_number'), 'title': value.get('title'),
+             'source_file': value.get('file_name'), 'full_text': value.get('full_text')}
+            for key, value in raw.items() if key not in known
+        )
+
+    return write_snapshot(path, {
+        'issuances': issuances,
+        'announcements': announcements,
+        'summary': read('issuance_summary'),
+    }, source=f"{project_id}.{dataset_id}")
+
+
+class SnapshotReader:
+    """
+    スナップショットの読み取り（スレッドごとに読み取り専用の接続を持つ）
+
+    ファイルが置き換えられたら次の問い合わせで開き直す。
+    """
+
+    def __init__(self, path: Path = DEFAULT_SNAPSHOT_PATH):
+        self.path = Path(path)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stat = None
+        self.version = ''
+        self.built_at = ''
+        self.refresh()
+
+    def _file_stat(self):
+        stat = self.path.stat()
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def refresh(self) -> bool:
+        """ファイルが変わっていれば開き直す（変わった場合 True）"""
+        stat = self._file_stat()
+        if stat == self._stat:
+            return False
+        with self._lock:
+            if stat == self._stat:
+                return False
+            db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            try:
+                self.version, self.built_at = db.execute(
+                    "SELECT version, built_at FROM snapshot_meta").fetchone()
+            finally:
+                db.close()
+            self._stat = stat
+        return True
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'stat', None) != self._stat:
+            if conn is not None:
+                conn.close()
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+            self._local.stat = self._stat
+        return conn
+
+    def query(self, sql: str, params: Iterable[Any] = ()) -> List[Dict[str, Any]]:
+        return [dict(row) for row in self._connection().execute(sql, list(params))]
+
+    def scalar(self, sql: str, params: Iterable[Any] = ()) -> Any:
+        return self._connection().execute(sql, list(params)).fetchone()[0]
@@ -0,0 +1,67 @@
+"""
+BigQuery クライアントの遅延生成
+
+スクリプトをモジュールとして import しただけでクライアント生成や認証が走らないよう、
+クライアントは最初に必要になった時点で生成し、(プロジェクト, ロケーション) ごとに共有する。
+google-cloud-bigquery 自体の読み込みもこの時点まで遅らせる
+（パース処理だけを使うベンチマークやワーカープロセスでは読み込まれない）。
+
+使用例:
+    from database.bigquery_client import get_bigquery_client
+
+    client = get_bigquery_client(PROJECT_ID, location=LOCATION)
+
+    # クォータ制御・再試行つき（database.bigquery_quota.QuotaAwareClient）
+    client = get_bigquery_client(PROJECT_ID, location=LOCATION, quota_aware=True)
+"""
+
+import os
+from typing import Dict, Optional, Tuple
+
+CREDENTIALS_ENV = 'GOOGLE_APPLICATION_CREDENTIALS'
+
+_CLIENTS: Dict[Tuple[str, Optional[str], bool], object] = {}
+
+
+def set_credentials(credentials_path: Optional[str]) -> None:
+    """サービスアカウントキーを指定（明示指定があるときだけ環境変数を上書き）"""
+    if credentials_path:
+        os.environ[CREDENTIALS_ENV] = credentials_path
+
+
+def get_bigquery_client(project_id: str, location: Optional[str] = None,
+                        credentials_path: Optional[str] = None, quota_aware: bool = False):
+    """
+    BigQuery クライアントを取得（初回のみ生成）
+
+    Args:
+        project_id: GCPプロジェクトID
+        location: ジョブのロケーション（省略時はクライアント既定）
+        credentials_path: サービスアカウントキーのパス（省略時は ADC）
+        quota_aware: True なら QuotaAwareClient で包んで返す
+
+    Returns:
+        bigquery.Client（quota_aware=True なら QuotaAwareClient）
+    """
+    key = (project_id, location, quota_aware)
+    client = _CLIENTS.get(key)
+    if client is None and quota_aware:
+        from database.bigquery_quota import QuotaAwareClient
+
+        client = QuotaAwareClient(get_bigquery_client(project_id, location, credentials_path))
+        _CLIENTS[key] = client
+    elif client is None:
+        from google.cloud import bigquery
+
+        set_credentials(credentials_path)
+        if location:
+            client = bigquery.Client(project=project_id, location=location)
+        else:
+            client = bigquery.Client(project=project_id)
+        _CLIENTS[key] = client
+    return client
+
+
+def reset_clients() -> None:
+    """生成済みクライアントを破棄（認証情報を切り替える場合など）"""
+    _CLIENTS.clear()
@@ -0,0 +1,535 @@
+"""
+BigQuery のクォータ制御と再試行ポリシー（プロセス間で共有）
+
+これまでは再試行が各所でばらばらに実装されていた
+（v7 の exponential_backoff_sleep、IssuanceDataLoader の 503 リトライ、v9 の
+update_layer1_status は再試行なし）。また、check_bq_quota.py で確認している
+ロードジョブ・DML・ストリーミング挿入の上限を誰も調整していなかった。
+
+本モジュールは次の3つを提供する。
+
+1. クォータ区分ごとのトークンバケット / 同時実行数の制限
+   - load_jobs_per_table_per_day : テーブルごとのロードジョブ数（1日1,500件）
+   - table_metadata_updates      : テーブルごとのメタデータ更新（10秒あたり5回、ロード・DMLが該当）
+   - dml_concurrent_per_table    : テーブルごとの変更系DMLの同時実行数（2件）
+   - insertall_bytes_per_second  : insertAll のバイト数（東京リージョン 300MB/秒）
+2. エラーの分類（レート制限 / 一時的 / 致命的）
+3. ジッター付き指数バックオフ
+   - レート制限エラーを受けたプロセスは、そのクォータ区分の「クールダウン」を共有状態に書き込み、
+     他のワーカーも同じ時刻まで待つ（各ワーカーが個別に再試行して殺到するのを防ぐ）
+   - ジョブは job_id を固定して投入し、タイムアウト後の再試行は同じジョブを待ち直す
+     （サーバーで実行中の DML・MERGE を再投入して二重に適用しない。JobSubmission）
+
+状態は SQLite ファイル（既定: cache/quota/bigquery_quota.sqlite3）に置くため、
+ProcessPoolExecutor の子プロセスや並行実行中の別スクリプトとも共有される。
+
+使用例:
+    from database.bigquery_quota import QuotaAwareClient
+
+    client = QuotaAwareClient(bigquery.Client(project=PROJECT_ID))
+    client.query(sql).result()                 # DMLは同時実行数を守り、失敗は分類して再試行
+    client.load_table_from_dataframe(df, table_id).result()
+"""
+
+import json
+import os
+import random
+import re
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from database.query_accounting import caller_name, dry_run_enabled, estimate_bytes, get_query_ledger
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_STATE_PATH = PROJECT_ROOT / "cache" / "quota" / "bigquery_quota.sqlite3"
+STATE_PATH_ENV = "JGB_QUOTA_STATE"
+
+# クォータ区分
+QUOTA_LOAD_JOBS = 'load_jobs_per_table_per_day'
+QUOTA_TABLE_UPDATES = 'table_metadata_updates'
+QUOTA_DML_CONCURRENT = 'dml_concurrent_per_table'
+QUOTA_INSERTALL_BYTES = 'insertall_bytes_per_second'
+
+KIND_BUCKET = 'bucket'            # トークンバケット（レート）
+KIND_CONCURRENCY = 'concurrency'  # 同時実行数（リース）
+
+# エラー分類
+ERROR_RATE_LIMIT = 'rate_limit'
+ERROR_TRANSIENT = 'transient'
+ERROR_FATAL = 'fatal'
+
+
+class QuotaClass(NamedTuple):
+    """クォータ区分"""
+    name: str
+    kind: str
+    capacity: float                 # バケット容量 / 同時実行数
+    refill_per_second: float = 0.0  # バケットの補充速度
+    lease_seconds: float = 3600.0   # リースの有効期限（プロセス異常終了時の回収用）
+
+
+DEFAULT_QUOTAS = {
+    QUOTA_LOAD_JOBS: QuotaClass(QUOTA_LOAD_JOBS, KIND_BUCKET, 1500, 1500 / 86400),
+    QUOTA_TABLE_UPDATES: QuotaClass(QUOTA_TABLE_UPDATES, KIND_BUCKET, 5, 5 / 10),
+    QUOTA_DML_CONCURRENT: QuotaClass(QUOTA_DML_CONCURRENT, KIND_CONCURRENCY, 2),
+    QUOTA_INSERTALL_BYTES: QuotaClass(QUOTA_INSERTALL_BYTES, KIND_BUCKET,
+                                      300 * 1024 * 1024, 300 * 1024 * 1024),
+}
+
+# 1回の待機の上限（長く待つ場合も定期的に状態を見直す）
+MAX_SLEEP_SLICE = 5.0
+
+
+# ========================================
+# エラー分類
+# ========================================
+
+RATE_LIMIT_REASONS = {'rateLimitExceeded'}
+TRANSIENT_REASONS = {'backendError', 'internalError', 'jobBackendError', 'jobInternalError'}
+TRANSIENT_STATUS_CODES = {500, 502, 503, 504}
+TRANSIENT_MESSAGES = (
+    'service unavailable',
+    'timed out',
+    'timeout',
+    'connection reset',
+    'could not serialize access',          # 同一テーブルへの並行DML
+    'due to concurrent update',
+)
+
+
+def classify_error(exc: BaseException) -> str:
+    """
+    例外を分類
+
+    Returns:
+        rate_limit（共有クールダウンして再試行）/ transient（再試行）/ fatal（再試行しない）
+    """
+    reasons = set()
+    for error in getattr(exc, 'errors', None) or []:
+        if isinstance(error, dict) and error.get('reason'):
+            reasons.add(error['reason'])
+    code = getattr(exc, 'code', None)
+    message = str(exc).lower()
+
+    if reasons & RATE_LIMIT_REASONS or code == 429 or 'ratelimitexceeded' in message:
+        return ERROR_RATE_LIMIT
+    # quotaExceeded（1日あたりの上限等）は待っても解消しないため再試行しない
+    if 'quotaExceeded' in reasons:
+        return ERROR_FATAL
+    if reasons & TRANSIENT_REASONS or code in TRANSIENT_STATUS_CODES:
+        return ERROR_TRANSIENT
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return ERROR_TRANSIENT
+    if any(text in message for text in TRANSIENT_MESSAGES):
+        return ERROR_TRANSIENT
+    return ERROR_FATAL
+
+
+def backoff_delay(attempt: int, base_delay: float = 1.0, max_delay: float = 60.0) -> float:
+    """ジッター付き指数バックオフの待ち時間（上限の半分〜上限）"""
+    ceiling = min(base_delay * (2 ** attempt), max_delay)
+    return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+
+def backoff_sleep(attempt: int, base_delay: float = 1.0, max_delay: float = 60.0) -> float:
+    """ジッター付き指数バックオフでスリープ（待った秒数を返す）"""
+    delay = backoff_delay(attempt, base_delay, max_delay)
+    time.sleep(delay)
+    return delay
+
+
+# ========================================
+# 共有状態とリミッター
+# ========================================
+
+class RateLimiter:
+    """クォータ区分ごとのトークンバケット・同時実行数・クールダウン（SQLiteで共有）"""
+
+    def __init__(self, state_path: Optional[Path] = None, quotas: Optional[Dict[str, QuotaClass]] = None):
+        self.state_path = Path(state_path or DEFAULT_STATE_PATH)
+        self.quotas = dict(quotas or DEFAULT_QUOTAS)
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._transaction() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS buckets ("
+                       "quota TEXT, key TEXT, tokens REAL, updated REAL, PRIMARY KEY (quota, key))")
+            db.execute("CREATE TABLE IF NOT EXISTS leases ("
+                       "id TEXT PRIMARY KEY, quota TEXT, key TEXT, expires REAL)")
+            db.execute("CREATE TABLE IF NOT EXISTS cooldowns ("
+                       "quota TEXT, key TEXT, until REAL, PRIMARY KEY (quota, key))")
+
+    @contextmanager
+    def _transaction(self):
+        db = sqlite3.connect(str(self.state_path), timeout=30, isolation_level=None)
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+        finally:
+            db.close()
+
+    def _quota(self, quota: str) -> QuotaClass:
+        if quota not in self.quotas:
+            raise KeyError(f"未定義のクォータ区分: {quota}")
+        return self.quotas[quota]
+
+    # ---------- トークンバケット ----------
+
+    def try_acquire(self, quota: str, key: str = '', amount: float = 1) -> float:
+        """
+        トークンの取得を1回試みる
+
+        Returns:
+            0（取得できた）または取得できるまでの待ち時間（秒）
+        """
+        spec = self._quota(quota)
+        amount = min(amount, spec.capacity)   # 容量を超える要求は容量いっぱいで待つ
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute("SELECT tokens, updated FROM buckets WHERE quota = ? AND key = ?",
+                             (quota, key)).fetchone()
+            tokens = spec.capacity if row is None else min(
+                spec.capacity, row[0] + (now - row[1]) * spec.refill_per_second
+            )
+            if tokens >= amount:
+                tokens -= amount
+                wait = 0.0
+            else:
+                wait = (amount - tokens) / spec.refill_per_second if spec.refill_per_second else MAX_SLEEP_SLICE
+            db.execute("INSERT OR REPLACE INTO buckets (quota, key, tokens, updated) VALUES (?, ?, ?, ?)",
+                       (quota, key, tokens, now))
+        return wait
+
+    def acquire(self, quota: str, key: str = '', amount: float = 1,
+                timeout: Optional[float] = None) -> float:
+        """
+        トークンを取得できるまで待つ（クールダウン中はその終了も待つ）
+
+        Returns:
+            待った秒数
+        """
+        start = time.monotonic()
+        while True:
+            wait = max(self.cooldown_remaining(quota, key), 0.0)
+            if wait <= 0:
+                wait = self.try_acquire(quota, key, amount)
+                if wait <= 0:
+                    return time.monotonic() - start
+            if timeout is not None and time.monotonic() - start + wait > timeout:
+                raise TimeoutError(f"クォータ {quota}[{key}] の取得がタイムアウトしました")
+            # 同時に待っているワーカーが同時刻に殺到しないよう少しずらす
+            time.sleep(min(wait, MAX_SLEEP_SLICE) + random.uniform(0, 0.05))
+
+    # ---------- 同時実行数 ----------
+
+    @contextmanager
+    def lease(self, quota: str, key: str = '', timeout: Optional[float] = None):
+        """同時実行数の枠を確保して実行（終了時に解放）"""
+        spec = self._quota(quota)
+        lease_id = uuid.uuid4().hex
+        start = time.monotonic()
+        while True:
+            wait = self.cooldown_remaining(quota, key)
+            if wait <= 0:
+                now = time.time()
+                with self._transaction() as db:
+                    db.execute("DELETE FROM leases WHERE expires < ?", (now,))
+                    (active,) = db.execute("SELECT COUNT(*) FROM leases WHERE quota = ? AND key = ?",
+                                           (quota, key)).fetchone()
+                    if active < spec.capacity:
+                        db.execute("INSERT INTO leases (id, quota, key, expires) VALUES (?, ?, ?, ?)",
+                                   (lease_id, quota, key, now + spec.lease_seconds))
+                        break
+                wait = 0.5
+            if timeout is not None and time.monotonic() - start > timeout:
+                raise TimeoutError(f"クォータ {quota}[{key}] の枠の確保がタイムアウトしました")
+            time.sleep(min(wait, MAX_SLEEP_SLICE) + random.uniform(0, 0.05))
+        try:
+            yield
+        finally:
+            with self._transaction() as db:
+                db.execute("DELETE FROM leases WHERE id = ?", (lease_id,))
+
+    # ---------- 共有クールダウン ----------
+
+    def penalize(self, quota: str, key: str, delay: float) -> float:
+        """レート制限を受けたクォータ区分を delay 秒止める（全ワーカー共通）。終了時刻を返す"""
+        until = time.time() + delay
+        with self._transaction() as db:
+            row = db.execute("SELECT until FROM cooldowns WHERE quota = ? AND key = ?",
+                             (quota, key)).fetchone()
+            if row is None or row[0] < until:
+                db.execute("INSERT OR REPLACE INTO cooldowns (quota, key, until) VALUES (?, ?, ?)",
+                           (quota, key, until))
+            else:
+                until = row[0]
+        return until
+
+    def cooldown_remaining(self, quota: str, key: str = '') -> float:
+        db = sqlite3.connect(str(self.state_path), timeout=30)
+        try:
+            row = db.execute("SELECT until FROM cooldowns WHERE quota = ? AND key = ?",
+                             (quota, key)).fetchone()
+        finally:
+            db.close()
+        return (row[0] - time.time()) if row else 0.0
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """現在の状態（check_bq_quota.py の表示用）"""
+        now = time.time()
+        db = sqlite3.connect(str(self.state_path), timeout=30)
+        try:
+            buckets = db.execute("SELECT quota, key, tokens, updated FROM buckets").fetchall()
+            leases = db.execute("SELECT quota, key, COUNT(*) FROM leases WHERE expires >= ? "
+                                "GROUP BY quota, key", (now,)).fetchall()
+            cooldowns = dict(((q, k), u) for q, k, u in
+                             db.execute("SELECT quota, key, until FROM cooldowns").fetchall())
+        finally:
+            db.close()
+
+        result = []
+        for quota, key, tokens, updated in buckets:
+            spec = self.quotas.get(quota)
+            if spec is not None:
+                tokens = min(spec.capacity, tokens + (now - updated) * spec.refill_per_second)
+            result.append({'quota': quota, 'key': key, 'available': tokens,
+                           'cooldown': max(0.0, cooldowns.get((quota, key), 0) - now)})
+        for quota, key, active in leases:
+            result.append({'quota': quota, 'key': key, 'in_use': active,
+                           'cooldown': max(0.0, cooldowns.get((quota, key), 0) - now)})
+        return result
+
+
+class RetryPolicy:
+    """エラー分類に基づく再試行（レート制限はクールダウンを全ワーカーで共有）"""
+
+    def __init__(self, max_attempts: int = 5, base_delay: float = 1.0, max_delay: float = 60.0,
+                 limiter: Optional[RateLimiter] = None,
+                 on_retry: Optional[Callable[[int, BaseException, float], None]] = None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.limiter = limiter
+        self.on_retry = on_retry
+
+    def call(self, fn: Callable[[], Any], quota: Optional[str] = None, key: str = '',
+             on_retry: Optional[Callable[[int, BaseException, float], None]] = None) -> Any:
+        """
+        fn を実行し、再試行可能なエラーなら待って再実行
+
+        Args:
+            fn: 実行する処理
+            quota: レート制限を受けたときにクールダウンさせるクォータ区分
+            key: クォータ区分のキー（テーブルID等）
+            on_retry: 再試行前に呼ぶ関数 (試行回数, 例外, 待ち時間)。省略時はコンストラクタの指定
+        """
+        on_retry = on_retry or self.on_retry
+        for attempt in range(self.max_attempts):
+            try:
+                return fn()
+            except Exception as e:
+                kind = classify_error(e)
+                if kind == ERROR_FATAL or attempt >= self.max_attempts - 1:
+                    raise
+                delay = backoff_delay(attempt, self.base_delay, self.max_delay)
+                if on_retry:
+                    on_retry(attempt + 1, e, delay)
+                if kind == ERROR_RATE_LIMIT and self.limiter is not None and quota:
+                    # 共有クールダウン: 他のワーカーも同じ時刻まで待つ
+                    until = self.limiter.penalize(quota, key, delay)
+                    time.sleep(max(0.0, until - time.time()))
+                else:
+                    time.sleep(delay)
+
+
+# ========================================
+# クライアントラッパー
+# ========================================
+
+DML_PATTERN = re.compile(
+    r'^\s*(?:UPDATE|DELETE\s+FROM|DELETE|MERGE(?:\s+INTO)?|INSERT(?:\s+INTO)?|TRUNCATE\s+TABLE)\s+`?([\w\-.]+)`?',
+    re.IGNORECASE
+)
+
+
+def dml_target_table(sql: str) -> Optional[str]:
+    """変更系DMLの対象テーブル（DMLでなければ None）"""
+    # 先頭のコメント行は読み飛ばす
+    body = re.sub(r'^(\s*--[^\n]*\n)+', '', sql)
+    match = DML_PATTERN.match(body)
+    return match.group(1) if match else None
+
+
+def _table_key(destination) -> str:
+    return str(destination).replace(':', '.')
+
+
+JOB_ID_PREFIX = 'jgb_'
+
+
+def _already_exists(exc: BaseException) -> bool:
+    """同じ job_id のジョブが投入済み（409 Already Exists）"""
+    return getattr(exc, 'code', None) == 409 or 'already exists' in str(exc).lower()
+
+
+def _job_failed(job) -> bool:
+    """サーバーがジョブの失敗を報告済みか（状態を取り直して判定）"""
+    reload = getattr(job, 'reload', None)
+    if reload is not None:
+        reload()
+    return getattr(job, 'state', None) == 'DONE' and bool(getattr(job, 'error_result', None))
+
+
+class JobSubmission:
+    """
+    job_id を固定してジョブを投入し、完了を待つ（RetryPolicy.call に渡す）
+
+    タイムアウトや接続断で待ちが中断しても、サーバー側ではジョブが実行中のことがある。
+    そのまま再投入すると DML・MERGE・ロードが二重に適用されうるため、
+    - 投入済みのジョブは同じ job_id の状態を取り直して待ち続ける
+    - 投入の応答が届かなかった場合は同じ job_id で投入し直す（作られていれば 409 になり、そのジョブを待つ）
+    - サーバーが失敗を報告したジョブ（失敗したジョブは何も適用しない）だけ、新しい job_id で投入し直す
+    """
+
+    def __init__(self, client, submit: Callable[[str], Any], job_id: Optional[str] = None,
+                 prefix: Optional[str] = None, location: Optional[str] = None):
+        self.client = client
+        self.submit = submit
+        self.base_id = job_id or f"{prefix or JOB_ID_PREFIX}{uuid.uuid4().hex}"
+        self.job_id = self.base_id
+        self.location = location
+        self.job = None
+        self.submissions = 0   # 失敗が確定して投入し直した回数
+
+    def __call__(self):
+        if self.job is not None and _job_failed(self.job):
+            self.submissions += 1
+            self.job_id = f"{self.base_id}_retry{self.submissions}"
+            self.job = None
+        if self.job is None:
+            try:
+                self.job = self.submit(self.job_id)
+            except Exception as e:
+                if not _already_exists(e):
+                    raise
+                # 前回の投入は応答が届かなかっただけで、ジョブは作られていた
+                kwargs = {'location': self.location} if self.location else {}
+                self.job = self.client.get_job(self.job_id, **kwargs)
+        self.job.result()
+        return self.job
+
+
+class QuotaAwareClient:
+    """
+    bigquery.Client のラッパー（クォータ制御と再試行）
+
+    query / load_table_from_* は完了まで待ってからジョブを返す
+    （呼び出し側の .result() はそのまま使える）。それ以外の属性は元のクライアントに委譲する。
+    ジョブは job_id を固定して投入し、再試行は同じジョブを待ち直す（JobSubmission）。
+    複数のジョブを並行させる場合も、BigQueryJobManager にこのラッパーを渡す（スレッドで並行実行）。
+    """
+
+    def __init__(self, client, limiter: Optional[RateLimiter] = None,
+                 retry: Optional[RetryPolicy] = None):
+        self.client = client
+        self.limiter = limiter or get_rate_limiter()
+        self.retry = retry or RetryPolicy(limiter=self.limiter)
+        if self.retry.limiter is None:
+            self.retry.limiter = self.limiter
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def query(self, sql: str, job_config=None, location: Optional[str] = None, **kwargs):
+        """
+        クエリを実行して完了を待つ（変更系DMLは対象テーブルの同時実行数を守る）
+
+        スキャン量・スロット時間・所要時間は呼び出し元ごとに記録する（database.query_accounting）。
+        """
+        if location:
+            kwargs['location'] = location
+        job_id = kwargs.pop('job_id', None)
+        prefix = kwargs.pop('job_id_prefix', None)
+        caller = caller_name()
+        estimated = None
+        if dry_run_enabled() and not getattr(job_config, 'dry_run', False):
+            estimated = estimate_bytes(self.client, sql, job_config, **kwargs)
+        started = time.monotonic()
+
+        table = dml_target_table(sql)
+        if table is None:
+            job = self.retry.call(JobSubmission(
+                self.client, lambda job_id: self.client.query(sql, job_config=job_config, job_id=job_id, **kwargs),
+                job_id, prefix, location))
+        else:
+            def submit_dml(job_id):
+                self.limiter.acquire(QUOTA_TABLE_UPDATES, table)
+                return self.client.query(sql, job_config=job_config, job_id=job_id, **kwargs)
+
+            submission = JobSubmission(self.client, submit_dml, job_id, prefix, location)
+
+            def run_dml():
+                with self.limiter.lease(QUOTA_DML_CONCURRENT, table):
+                    return submission()
+            job = self.retry.call(run_dml, quota=QUOTA_DML_CONCURRENT, key=table)
+
+        get_query_ledger().record_job(job, caller, time.monotonic() - started, estimated)
+        return job
+
+    def _load(self, method: str, source, destination, **kwargs):
+        table = _table_key(destination)
+        job_id = kwargs.pop('job_id', None)
+        prefix = kwargs.pop('job_id_prefix', None)
+
+        def submit(job_id):
+            self.limiter.acquire(QUOTA_LOAD_JOBS, table)
+            self.limiter.acquire(QUOTA_TABLE_UPDATES, table)
+            return getattr(self.client, method)(source, destination, job_id=job_id, **kwargs)
+        submission = JobSubmission(self.client, submit, job_id, prefix, kwargs.get('location'))
+        return self.retry.call(submission, quota=QUOTA_TABLE_UPDATES, key=table)
+
+    def load_table_from_dataframe(self, dataframe, destination, **kwargs):
+        return self._load('load_table_from_dataframe', dataframe, destination, **kwargs)
+
+    def load_table_from_json(self, json_rows, destination, **kwargs):
+        return self._load('load_table_from_json', json_rows, destination, **kwargs)
+
+    def load_table_from_file(self, file_obj, destination, **kwargs):
+        return self._load('load_table_from_file', file_obj, destination, **kwargs)
+
+    def insert_rows_json(self, table, json_rows, row_ids=None, single_attempt: bool = False, **kwargs):
+        """
+        ストリーミング挿入（バイト数を制限し、再試行しても行が重複しないよう insertId を固定）
+
+        single_attempt=True なら RetryPolicy で再試行しない（呼び出し側が再送を持つ場合。
+        StreamingUploader は行ごとのエラーを見て自分で再送する）。
+        """
+        json_rows = list(json_rows)
+        if row_ids is None:
+            row_ids = [uuid.uuid4().hex for _ in json_rows]
+        size = len(json.dumps(json_rows, ensure_ascii=False, default=str).encode('utf-8'))
+
+        def run():
+            self.limiter.acquire(QUOTA_INSERTALL_BYTES, '', amount=size)
+            return self.client.insert_rows_json(table, json_rows, row_ids=row_ids, **kwargs)
+        if single_attempt:
+            return run()
+        return self.retry.call(run, quota=QUOTA_INSERTALL_BYTES)
+
+
+_RATE_LIMITER = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """プロセス内で共有するリミッター（状態ファイルは JGB_QUOTA_STATE で変更可）"""
+    global _RATE_LIMITER
+    if _RATE_LIMITER is None:
+        _RATE_LIMITER = RateLimiter(os.environ.get(STATE_PATH_ENV) or DEFAULT_STATE_PATH)
+    return _RATE_LIMITER
@@ -0,0 +1,101 @@
+"""
+Storage Write API のメモリ内フェイクサーバー（オフラインテスト用）
+
+database.storage_write_sink.StorageWriteSink のトランスポートとして使う。
+本物のサーバーと同じく次の規則で振る舞う。
+
+- COMMITTED ストリーム: 受理した行はすぐにテーブルから参照できる
+- PENDING ストリーム: commit() されるまで参照できない（確定後にのみコミット可能）
+- オフセット: ストリームの現在の行数より小さければ ALREADY_EXISTS、大きければ OUT_OF_RANGE
+- 確定（finalize）したストリームには追加できない
+
+障害の注入:
+    drop_ack_on: 指定した回数目の append で、行を受理したうえで応答を失わせる
+    fail_on: 指定した回数目の append で、行を受理せずに一時的なエラーを返す
+"""
+
+from itertools import count
+from typing import Any, Dict, Iterable, List, Optional
+
+from database.storage_write_sink import (
+    SINK_PENDING,
+    OffsetAlreadyExists,
+    OffsetOutOfRange,
+    TransientWriteError,
+    WriteSinkError,
+)
+
+
+class FakeWriteServer:
+    """Storage Write API のフェイク"""
+
+    def __init__(self, drop_ack_on: Iterable[int] = (), fail_on: Iterable[int] = ()):
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.streams: Dict[str, Dict[str, Any]] = {}
+        self.append_calls: List[Dict[str, Any]] = []
+        self.drop_ack_on = set(drop_ack_on)
+        self.fail_on = set(fail_on)
+        self._ids = count(1)
+
+    def rows(self, table_id: str) -> List[Dict[str, Any]]:
+        """テーブルから参照できる行"""
+        return list(self.tables.get(table_id, []))
+
+    def create_stream(self, table_id: str, mode: str) -> str:
+        name = f"{table_id}/streams/{next(self._ids)}"
+        self.streams[name] = {
+            'table_id': table_id,
+            'mode': mode,
+            'rows': [],
+            'finalized': False,
+            'committed': False,
+        }
+        self.tables.setdefault(table_id, [])
+        return name
+
+    def append(self, stream_name: str, rows: List[Dict[str, Any]], offset: int) -> None:
+        call_no = len(self.append_calls) + 1
+        self.append_calls.append({'stream': stream_name, 'offset': offset, 'rows': len(rows)})
+
+        stream = self._stream(stream_name)
+        if stream['finalized']:
+            raise WriteSinkError(f"確定済みのストリームです: {stream_name}")
+        if call_no in self.fail_on:
+            raise TransientWriteError("UNAVAILABLE (injected)")
+
+        current = len(stream['rows'])
+        if offset < current:
+            raise OffsetAlreadyExists(f"offset {offset} < {current}")
+        if offset > current:
+            raise OffsetOutOfRange(f"offset {offset} > {current}")
+
+        stream['rows'].extend(dict(row) for row in rows)
+        if stream['mode'] != SINK_PENDING:
+            self.tables[stream['table_id']].extend(dict(row) for row in rows)
+
+        if call_no in self.drop_ack_on:
+            raise TransientWriteError("DEADLINE_EXCEEDED after write (injected)")
+
+    def finalize(self, stream_name: str) -> int:
+        stream = self._stream(stream_name)
+        stream['finalized'] = True
+        return len(stream['rows'])
+
+    def commit(self, table_id: str, stream_names: List[str]) -> None:
+        streams = [self._stream(name) for name in stream_names]
+        for stream in streams:
+            if not stream['finalized']:
+                raise WriteSinkError("確定していないストリームはコミットできません")
+            if stream['table_id'] != table_id or stream['mode'] != SINK_PENDING:
+                raise WriteSinkError("コミットできないストリームです")
+        # 複数ストリームをまとめて反映（全か無か）
+        for stream in streams:
+            if not stream['committed']:
+                self.tables[table_id].extend(stream['rows'])
+                stream['committed'] = True
+
+    def _stream(self, stream_name: str) -> Dict[str, Any]:
+        stream = self.streams.get(stream_name)
+        if stream is None:
+            raise WriteSinkError(f"ストリームがありません: {stream_name}")
+        return stream
@@ -0,0 +1,236 @@
+"""
+取り込み実行（run）の識別と、run 単位の検証・ロールバック
+
+書き込む行すべてに run_id と取り込み日時を付け、実行後の検証をその run の行だけに絞る。
+これまでの検証（件数・dedupe_key の重複・サンプル）はテーブル全体を走査していたため、
+コストと所要時間が履歴の量に比例して増えていた。
+
+- run_id は「開始時刻(UTC)-乱数」の形式で、run_id から開始時刻を復元できる
+  （ロールバック時に取り込み日時のパーティションで絞り込める）
+- start_run() は環境変数 JGB_RUN_ID にも設定するため、子プロセスも同じ run_id を使う
+- ロールバックは DELETE 文1つ（run_id と取り込み日時で絞り込み）
+  発行テーブルでは集計（issuance_summary）を渡すと、同じトランザクションで
+  削除する行を集計から差し引き、この run の告示が付けた superseded_by を外して集計に戻し、
+  この run の差分の適用済み記録を消す（rollback_run_sql）
+
+注意: insertAll（ストリーミング挿入）した行はストリーミングバッファにある間
+（最大90分程度）DELETE できない。ロード・MERGE・Storage Write API の行は直後から削除できる。
+
+使用例:
+    from database.ingestion_run import start_run, tag_rows, run_scope, rollback_run
+
+    run = start_run()
+    rows = tag_rows(rows, run)
+    where, params = run_scope(run)
+    client.query(f"SELECT COUNT(*) FROM `{table_id}` WHERE {where}", job_config=QueryJobConfig(query_parameters=params))
+    rollback_run(client, table_id, run.run_id)
+"""
+
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from database.issuance_summary import (
+    SUPERSEDED_COLUMN, applied_table_id, merge_delta_sql, negated_summary_sql, summary_select_sql,
+)
+
+RUN_ID_ENV = 'JGB_RUN_ID'
+RUN_ID_COLUMN = 'run_id'
+INGESTED_AT_COLUMN = 'ingested_at'
+RUN_ID_TIME_FORMAT = '%Y%m%dT%H%M%SZ'
+
+
+class IngestionRun(NamedTuple):
+    """取り込み実行"""
+    run_id: str
+    started_at: datetime
+
+
+def new_run_id(now: Optional[datetime] = None) -> str:
+    """run_id を生成（例: 20251031T091500Z-3f9a2c1b）"""
+    now = now or datetime.now(timezone.utc)
+    return f"{now.strftime(RUN_ID_TIME_FORMAT)}-{uuid.uuid4().hex[:8]}"
+
+
+def run_started_at(run_id: str) -> Optional[datetime]:
+    """run_id から開始時刻を復元（形式が違う場合は None）"""
+    try:
+        return datetime.strptime(run_id.split('-')[0], RUN_ID_TIME_FORMAT).replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+_CURRENT_RUN: Optional[IngestionRun] = None
+
+
+def start_run(run_id: Optional[str] = None) -> IngestionRun:
+    """
+    run を開始（プロセス内で共有し、子プロセスには環境変数で引き継ぐ）
+
+    Args:
+        run_id: 既存の run_id を使う場合に指定（再実行・シャードのワーカーなど）
+    """
+    global _CURRENT_RUN
+    run_id = run_id or new_run_id()
+    started_at = run_started_at(run_id) or datetime.now(timezone.utc)
+    _CURRENT_RUN = IngestionRun(run_id, started_at)
+    os.environ[RUN_ID_ENV] = run_id
+    return _CURRENT_RUN
+
+
+def current_run() -> IngestionRun:
+    """現在の run（未開始なら JGB_RUN_ID または新しい run_id で開始）"""
+    if _CURRENT_RUN is None:
+        return start_run(os.environ.get(RUN_ID_ENV) or None)
+    return _CURRENT_RUN
+
+
+def tag_rows(rows: Iterable[Dict[str, Any]], run: Optional[IngestionRun] = None,
+             timestamp_column: str = INGESTED_AT_COLUMN,
+             ingested_at: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """
+    行に run_id と取り込み日時を付ける（元の行は変更しない）
+
+    Args:
+        rows: 行のリスト
+        run: 取り込み実行（省略時は current_run()）
+        timestamp_column: 取り込み日時を入れる列（パーティション列）
+        ingested_at: 取り込み日時（省略時は現在時刻）
+    """
+    run = run or current_run()
+    timestamp = (ingested_at or datetime.now(timezone.utc)).isoformat()
+    return [{**row, RUN_ID_COLUMN: run.run_id, timestamp_column: timestamp} for row in rows]
+
+
+def run_schema_fields(timestamp_column: Optional[str] = INGESTED_AT_COLUMN) -> list:
+    """run_id と取り込み日時の SchemaField"""
+    from google.cloud import bigquery
+
+    fields = [bigquery.SchemaField(RUN_ID_COLUMN, "STRING", mode="NULLABLE",
+                                   description="取り込み実行ID")]
+    if timestamp_column:
+        fields.append(bigquery.SchemaField(timestamp_column, "TIMESTAMP", mode="NULLABLE",
+                                           description="取り込み日時"))
+    return fields
+
+
+def ensure_run_columns(client, table_id: str, timestamp_column: Optional[str] = INGESTED_AT_COLUMN,
+                       location: Optional[str] = None) -> None:
+    """既存テーブルに run_id・取り込み日時の列を追加（既にあれば何もしない）"""
+    columns = [f"ADD COLUMN IF NOT EXISTS {RUN_ID_COLUMN} STRING"]
+    if timestamp_column:
+        columns.append(f"ADD COLUMN IF NOT EXISTS {timestamp_column} TIMESTAMP")
+    sql = f"ALTER TABLE `{table_id}`\n" + ",\n".join(columns)
+    kwargs = {'location': location} if location else {}
+    client.query(sql, **kwargs).result()
+
+
+def run_scope(run: IngestionRun, timestamp_column: Optional[str] = INGESTED_AT_COLUMN,
+              alias: str = '') -> Tuple[str, list]:
+    """
+    run の行に絞る WHERE 条件とクエリパラメータ
+
+    取り込み日時の下限（run 開始時刻）を付けるため、取り込み日時でパーティション分割した
+    テーブルでは run 以前のパーティションを読まない。
+
+    Returns:
+        (条件式, [ScalarQueryParameter, ...])
+    """
+    from google.cloud import bigquery
+
+    prefix = f"{alias}." if alias else ''
+    where = f"{prefix}{RUN_ID_COLUMN} = @run_id"
+    params = [bigquery.ScalarQueryParameter("run_id", "STRING", run.run_id)]
+    if timestamp_column:
+        where += f" AND {prefix}{timestamp_column} >= @run_started_at"
+        params.append(bigquery.ScalarQueryParameter("run_started_at", "TIMESTAMP", run.started_at))
+    return where, params
+
+
+def is_streaming_buffer_error(exc: BaseException) -> bool:
+    """ストリーミングバッファにある行を DELETE しようとして失敗したか"""
+    return 'streaming buffer' in str(exc).lower()
+
+
+def rollback_run_sql(table_id: str, where: str, run_id: str, summary_table_id: str,
+                     columns: Iterable[str]) -> str:
+    """
+    run の行を集計ごと取り消すトランザクション（最後の SELECT で削除件数を返す）
+
+    1. 削除する行を集計から差し引く
+    2. この run の告示が付けた superseded_by を外し、外した行を集計に戻す
+    3. この run の差分の適用済み記録を消す（同じ run_id で取り込み直せるように）
+    4. run の行を削除する
+
+    取り消しの差分は run_id を付けずに記録するため、3 では消えない（再実行しても二重に差し引かない）。
+
+    Args:
+        where: run の行に絞る条件（run_scope）
+        columns: 対象テーブルの列
+    """
+    columns = list(columns)
+    run_rows = f"(SELECT * FROM `{table_id}` WHERE {where})"
+    statements = [
+        "DECLARE deleted_row_count INT64 DEFAULT 0;",
+        "BEGIN TRANSACTION;",
+        merge_delta_sql(summary_table_id, negated_summary_sql(run_rows, columns), None, f"{run_id}:rollback") + ";",
+    ]
+    if SUPERSEDED_COLUMN in columns:
+        marked = (f"{SUPERSEDED_COLUMN} IN (SELECT announcement_id FROM `{table_id}` WHERE {where}) "
+                  f"AND NOT ({where})")
+        restored = (f"(SELECT * REPLACE (CAST(NULL AS STRING) AS {SUPERSEDED_COLUMN}) "
+                    f"FROM `{table_id}` WHERE {marked})")
+        statements.append(merge_delta_sql(summary_table_id, summary_select_sql(restored, columns), None,
+                                          f"{run_id}:rollback:restored") + ";")
+        statements.append(f"UPDATE `{table_id}` SET {SUPERSEDED_COLUMN} = NULL WHERE {marked};")
+    statements += [
+        f"DELETE FROM `{applied_table_id(summary_table_id)}` WHERE run_id = @run_id;",
+        f"DELETE FROM `{table_id}` WHERE {where};",
+        "SET deleted_row_count = @@row_count;",
+        "COMMIT TRANSACTION;",
+        "SELECT deleted_row_count;",
+    ]
+    return "\n\n".join(statements)
+
+
+def rollback_run(client, table_id: str, run_id: str,
+                 timestamp_column: Optional[str] = INGESTED_AT_COLUMN,
+                 dry_run: bool = False, location: Optional[str] = None,
+                 summary_table_id: Optional[str] = None) -> int:
+    """
+    run が書き込んだ行を DELETE 文1つで取り消す
+
+    Args:
+        client: bigquery.Client
+        table_id: 対象テーブル
+        run_id: 取り消す run
+        timestamp_column: 取り込み日時の列（None なら run_id だけで絞り込む）
+        dry_run: True なら件数を数えるだけ
+        summary_table_id: 集計テーブル（指定時は rollback_run_sql のトランザクションで集計も戻す）
+
+    Returns:
+        削除した（dry_run では削除対象の）行数
+    """
+    from google.cloud import bigquery
+
+    # run_id から開始時刻が分かれば、取り込み日時のパーティションで絞り込む
+    started_at = run_started_at(run_id) if timestamp_column else None
+    where, params = run_scope(IngestionRun(run_id, started_at), timestamp_column if started_at else None)
+
+    kwargs = {'job_config': bigquery.QueryJobConfig(query_parameters=params)}
+    if location:
+        kwargs['location'] = location
+
+    if dry_run:
+        rows = client.query(f"SELECT COUNT(*) AS cnt FROM `{table_id}` WHERE {where}", **kwargs).result()
+        return int(list(rows)[0].cnt)
+
+    if summary_table_id:
+        columns = [field.name for field in client.get_table(table_id).schema]
+        rows = client.query(rollback_run_sql(table_id, where, run_id, summary_table_id, columns), **kwargs).result()
+        return int(list(rows)[0].deleted_row_count or 0)
+
+    job = client.query(f"DELETE FROM `{table_id}` WHERE {where}", **kwargs)
+    job.result()
+    return int(getattr(job, 'num_dml_affected_rows', 0) or 0)
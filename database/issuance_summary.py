@@ -0,0 +1,379 @@
+"""
+発行集計テーブル（issuance_summary）の差分更新と再構築
+
+ダッシュボードや各スクリプトの発行根拠別集計は、毎回 bond_issuances 全体
+（またはメモリ上の全件）から集計し直していた。本モジュールは次のキーごとの件数・金額を
+集計テーブルに保持し、取り込みのたびに今回の行の分だけ加算する。
+
+    (fiscal_year, category, sub_category, mof_category, bond_master_id)
+
+- 年度は4月始まり（発行日、無ければ告示ID先頭の日付 YYYYMMDD から算出。不明は 0）
+- テーブルごとに列名が異なるため、キーは次の優先順で取る（無い・空なら ''）
+    category       : category → legal_basis_category → bond_category
+    sub_category   : sub_category
+    mof_category   : mof_category
+    bond_master_id : bond_master_id
+- is_summary_record = TRUE の行（総額レコード）は二重計上になるため数えない
+- 差分の反映は MERGE 1回（一致すれば加算、無ければ挿入）
+- 加算は冪等ではないため、差分ごとに delta_id を付けて適用済みの記録（issuance_summary_applied）に残し、
+  同じ差分は二度加算しない（MERGE の再試行や、同じ文の再実行でも件数・金額が二重にならない）
+- 取り込みの途中で失敗した場合などのずれは、reconcile（基データからの再構築）で解消する
+  （scripts/03_data_validation/reconcile_issuance_summary.py）
+
+Python 側の集計（summarize_rows）と SQL 側の集計（summary_select_sql）は同じ規則で実装している。
+
+使用例:
+    from database.issuance_summary import apply_summary_delta
+
+    write_rows(client, table_ref, issuances)
+    apply_summary_delta(client, f"{project}.{dataset}.issuance_summary", issuances)
+"""
+
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+SUMMARY_TABLE = 'issuance_summary'
+APPLIED_SUFFIX = '_applied'
+SUMMARY_KEYS = ('fiscal_year', 'category', 'sub_category', 'mof_category', 'bond_master_id')
+
+# キーの取得元（優先順）
+KEY_COLUMNS = {
+    'category': ('category', 'legal_basis_category', 'bond_category'),
+    'sub_category': ('sub_category',),
+    'mof_category': ('mof_category',),
+    'bond_master_id': ('bond_master_id',),
+}
+DATE_COLUMN = 'issuance_date'
+AMOUNT_COLUMN = 'issue_amount'
+SUMMARY_FLAG_COLUMN = 'is_summary_record'
+SUPERSEDED_COLUMN = 'superseded_by'     # 訂正の告示で置き換えられた行（集計に数えない）
+
+ANNOUNCEMENT_DATE_PATTERN = re.compile(r'^(\d{8})')
+
+SummaryKey = Tuple[int, str, str, str, str]
+
+
+# ========================================
+# Python 側の集計
+# ========================================
+
+def fiscal_year(value: date) -> int:
+    """年度（4月始まり）"""
+    return value.year if value.month >= 4 else value.year - 1
+
+
+def _to_date(value) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str) and value:
+        try:
+            return date.fromisoformat(value[:10])
+        except ValueError:
+            return None
+    return None
+
+
+def row_fiscal_year(row: Dict[str, Any]) -> int:
+    """行の年度（発行日 → 告示IDの日付の順、不明は 0）"""
+    day = _to_date(row.get(DATE_COLUMN))
+    if day is None:
+        match = ANNOUNCEMENT_DATE_PATTERN.match(str(row.get('announcement_id') or ''))
+        if match:
+            try:
+                day = datetime.strptime(match.group(1), '%Y%m%d').date()
+            except ValueError:
+                day = None
+    return fiscal_year(day) if day else 0
+
+
+def _first_value(row: Dict[str, Any], columns: Sequence[str]) -> str:
+    for column in columns:
+        value = row.get(column)
+        if value not in (None, ''):
+            return str(value)
+    return ''
+
+
+def summary_key(row: Dict[str, Any]) -> SummaryKey:
+    """行の集計キー"""
+    return (
+        row_fiscal_year(row),
+        _first_value(row, KEY_COLUMNS['category']),
+        _first_value(row, KEY_COLUMNS['sub_category']),
+        _first_value(row, KEY_COLUMNS['mof_category']),
+        _first_value(row, KEY_COLUMNS['bond_master_id']),
+    )
+
+
+def summarize_rows(rows: Iterable[Dict[str, Any]]) -> Dict[SummaryKey, Dict[str, int]]:
+    """
+    行をキーごとに集計（総額レコードと、訂正で置き換えられた行は数えない）
+
+    Returns:
+        {キー: {'issuance_count': 件数, 'total_amount': 金額}}
+    """
+    summary: Dict[SummaryKey, Dict[str, int]] = {}
+    for row in rows:
+        if row.get(SUMMARY_FLAG_COLUMN) or row.get(SUPERSEDED_COLUMN):
+            continue
+        total = summary.setdefault(summary_key(row), {'issuance_count': 0, 'total_amount': 0})
+        total['issuance_count'] += 1
+        total['total_amount'] += int(row.get(AMOUNT_COLUMN) or 0)
+    return summary
+
+
+def merge_summary(total: Dict[SummaryKey, Dict[str, int]],
+                  summary: Dict[SummaryKey, Dict[str, int]]) -> Dict[SummaryKey, Dict[str, int]]:
+    """集計結果を total に加算（チャンクごとの集計を積み上げる用）"""
+    for key, measures in summary.items():
+        target = total.setdefault(key, {'issuance_count': 0, 'total_amount': 0})
+        target['issuance_count'] += measures['issuance_count']
+        target['total_amount'] += measures['total_amount']
+    return total
+
+
+def totals_by(summary: Dict[SummaryKey, Dict[str, int]], key: str) -> Dict[str, Dict[str, int]]:
+    """集計結果をキーの1項目（例: 'category'）でまとめ直す"""
+    index = SUMMARY_KEYS.index(key)
+    totals: Dict[str, Dict[str, int]] = {}
+    for summary_key_, measures in summary.items():
+        total = totals.setdefault(summary_key_[index], {'issuance_count': 0, 'total_amount': 0})
+        total['issuance_count'] += measures['issuance_count']
+        total['total_amount'] += measures['total_amount']
+    return totals
+
+
+def delta_rows(summary: Dict[SummaryKey, Dict[str, int]]) -> List[Dict[str, Any]]:
+    """集計結果をステージングテーブル用の行に変換"""
+    return [dict(zip(SUMMARY_KEYS, key), **measures) for key, measures in sorted(summary.items())]
+
+
+# ========================================
+# SQL
+# ========================================
+
+def _coalesce_sql(columns: Sequence[str], available: Iterable[str], alias: str) -> str:
+    parts = [f"NULLIF(CAST({alias}.{column} AS STRING), '')" for column in columns if column in available]
+    return f"COALESCE({', '.join(parts + [repr('')])})" if parts else "''"
+
+
+def summary_select_sql(source: str, columns: Iterable[str], alias: str = 'B') -> str:
+    """
+    基データの行を集計キーと件数・金額に変換する SELECT（summarize_rows と同じ規則）
+
+    Args:
+        source: FROM 句に置くテーブル（`project.dataset.table`）またはサブクエリ
+        columns: 基データに存在する列名
+    """
+    columns = set(columns)
+    announcement_date = (f"SAFE.PARSE_DATE('%Y%m%d', REGEXP_EXTRACT({alias}.announcement_id, r'^(\\d{{8}})'))"
+                         if 'announcement_id' in columns else 'NULL')
+    issue_date = (f"COALESCE(SAFE_CAST({alias}.{DATE_COLUMN} AS DATE), {announcement_date})"
+                  if DATE_COLUMN in columns else announcement_date)
+    fiscal_year_sql = (f"IFNULL(EXTRACT(YEAR FROM {issue_date}) - IF(EXTRACT(MONTH FROM {issue_date}) < 4, 1, 0), 0)"
+                       if issue_date != 'NULL' else '0')
+    conditions = []
+    if SUMMARY_FLAG_COLUMN in columns:
+        conditions.append(f"IFNULL({alias}.{SUMMARY_FLAG_COLUMN}, FALSE) = FALSE")
+    if SUPERSEDED_COLUMN in columns:
+        conditions.append(f"{alias}.{SUPERSEDED_COLUMN} IS NULL")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    keys = ",\n      ".join(
+        f"{_coalesce_sql(KEY_COLUMNS[key], columns, alias)} AS {key}" for key in SUMMARY_KEYS[1:]
+    )
+    return f"""
+    SELECT
+      {fiscal_year_sql} AS fiscal_year,
+      {keys},
+      1 AS issuance_count,
+      IFNULL({alias}.{AMOUNT_COLUMN}, 0) AS total_amount
+    FROM {source} {alias}
+    {where}
+    """
+
+
+def negated_summary_sql(source: str, columns: Iterable[str]) -> str:
+    """行を集計から差し引く差分（件数・金額の符号を反転）"""
+    return (f"SELECT * REPLACE (-issuance_count AS issuance_count, -total_amount AS total_amount) "
+            f"FROM ({summary_select_sql(source, columns)})")
+
+
+def _grouped_sql(select_sql: str) -> str:
+    keys = ", ".join(SUMMARY_KEYS)
+    return f"""
+    SELECT {keys}, SUM(issuance_count) AS issuance_count, SUM(total_amount) AS total_amount
+    FROM ({select_sql})
+    GROUP BY {keys}
+    """
+
+
+def applied_table_id(summary_table_id: str) -> str:
+    """適用済みの差分の記録テーブル"""
+    return f"{summary_table_id}{APPLIED_SUFFIX}"
+
+
+def new_delta_id(run_id: Optional[str] = None) -> str:
+    return f"{run_id or 'manual'}:{uuid4().hex[:12]}"
+
+
+def merge_delta_sql(summary_table_id: str, delta_sql: str, run_id: Optional[str] = None,
+                    delta_id: Optional[str] = None) -> str:
+    """
+    差分（キー・件数・金額の行）を集計テーブルに加算する文（IF ... END IF）
+
+    delta_id が適用済みの記録に無い場合だけ MERGE し、同じ文の中で delta_id を記録する。
+    MERGE と記録を一緒に確定させるため、トランザクションの中で使う
+    （単独で実行する場合は merge_delta_transaction_sql）。
+
+    Args:
+        delta_id: 差分の識別子（省略時は新しく作る。同じ文を再実行しても二重に加算しない）
+    """
+    on = " AND ".join(f"T.{key} = S.{key}" for key in SUMMARY_KEYS)
+    keys = ", ".join(SUMMARY_KEYS)
+    source_keys = ", ".join(f"S.{key}" for key in SUMMARY_KEYS)
+    run = f"'{run_id}'" if run_id else 'NULL'
+    delta = f"'{delta_id or new_delta_id(run_id)}'"
+    applied = applied_table_id(summary_table_id)
+    return f"""
+    IF NOT EXISTS (SELECT 1 FROM `{applied}` WHERE delta_id = {delta}) THEN
+    MERGE `{summary_table_id}` T
+    USING ({_grouped_sql(delta_sql)}) S
+    ON {on}
+    WHEN MATCHED THEN UPDATE SET
+      issuance_count = T.issuance_count + S.issuance_count,
+      total_amount = T.total_amount + S.total_amount,
+      updated_at = CURRENT_TIMESTAMP(),
+      last_run_id = {run}
+    WHEN NOT MATCHED THEN
+      INSERT ({keys}, issuance_count, total_amount, updated_at, last_run_id)
+      VALUES ({source_keys}, S.issuance_count, S.total_amount, CURRENT_TIMESTAMP(), {run});
+    INSERT INTO `{applied}` (delta_id, run_id, applied_at) VALUES ({delta}, {run}, CURRENT_TIMESTAMP());
+    END IF
+    """
+
+
+def merge_delta_transaction_sql(summary_table_id: str, delta_sql: str, run_id: Optional[str] = None,
+                                delta_id: Optional[str] = None) -> str:
+    """merge_delta_sql を単独で実行するトランザクション"""
+    return f"""
+BEGIN TRANSACTION;
+{merge_delta_sql(summary_table_id, delta_sql, run_id, delta_id)};
+COMMIT TRANSACTION;
+"""
+
+
+def rebuild_summary_sql(summary_table_id: str, source_table_id: str, columns: Iterable[str]) -> str:
+    """基データから集計テーブルを作り直す（reconcile）"""
+    return f"""
+    CREATE OR REPLACE TABLE `{summary_table_id}`
+    CLUSTER BY fiscal_year, category
+    AS
+    SELECT *, CURRENT_TIMESTAMP() AS updated_at, CAST(NULL AS STRING) AS last_run_id
+    FROM ({_grouped_sql(summary_select_sql(f"`{source_table_id}`", columns))})
+    """
+
+
+def reconcile_diff_sql(summary_table_id: str, source_table_id: str, columns: Iterable[str]) -> str:
+    """集計テーブルと基データからの再集計が食い違うキーの一覧"""
+    on = " AND ".join(f"S.{key} = R.{key}" for key in SUMMARY_KEYS)
+    keys = ",\n      ".join(f"COALESCE(S.{key}, R.{key}) AS {key}" for key in SUMMARY_KEYS)
+    return f"""
+    WITH R AS ({_grouped_sql(summary_select_sql(f"`{source_table_id}`", columns))})
+    SELECT
+      {keys},
+      IFNULL(S.issuance_count, 0) AS summary_count,
+      IFNULL(R.issuance_count, 0) AS actual_count,
+      IFNULL(S.total_amount, 0) AS summary_amount,
+      IFNULL(R.total_amount, 0) AS actual_amount
+    FROM `{summary_table_id}` S
+    FULL OUTER JOIN R ON {on}
+    WHERE IFNULL(S.issuance_count, 0) != IFNULL(R.issuance_count, 0)
+       OR IFNULL(S.total_amount, 0) != IFNULL(R.total_amount, 0)
+    ORDER BY fiscal_year, category, sub_category, mof_category, bond_master_id
+    """
+
+
+# ========================================
+# BigQuery 操作
+# ========================================
+
+def summary_schema() -> list:
+    from google.cloud import bigquery
+
+    return [
+        bigquery.SchemaField("fiscal_year", "INT64", mode="REQUIRED", description="年度（4月始まり、不明は0）"),
+        bigquery.SchemaField("category", "STRING", mode="REQUIRED", description="発行根拠の大分類"),
+        bigquery.SchemaField("sub_category", "STRING", mode="REQUIRED", description="発行根拠の詳細分類"),
+        bigquery.SchemaField("mof_category", "STRING", mode="REQUIRED", description="財務省統計上の分類"),
+        bigquery.SchemaField("bond_master_id", "STRING", mode="REQUIRED", description="銘柄マスタID"),
+        bigquery.SchemaField("issuance_count", "INT64", mode="REQUIRED", description="発行件数"),
+        bigquery.SchemaField("total_amount", "INT64", mode="REQUIRED", description="発行額合計（円）"),
+        bigquery.SchemaField("updated_at", "TIMESTAMP", description="最終更新日時"),
+        bigquery.SchemaField("last_run_id", "STRING", description="最後に加算した取り込み実行ID"),
+    ]
+
+
+def applied_schema() -> list:
+    from google.cloud import bigquery
+
+    return [
+        bigquery.SchemaField("delta_id", "STRING", mode="REQUIRED", description="加算した差分の識別子"),
+        bigquery.SchemaField("run_id", "STRING", description="取り込み実行ID"),
+        bigquery.SchemaField("applied_at", "TIMESTAMP", description="加算した日時"),
+    ]
+
+
+def ensure_summary_table(client, summary_table_id: str) -> None:
+    """集計テーブルと適用済みの差分の記録テーブルが無ければ作成"""
+    from google.cloud import bigquery
+
+    table = bigquery.Table(summary_table_id, schema=summary_schema())
+    table.clustering_fields = ['fiscal_year', 'category']
+    client.create_table(table, exists_ok=True)
+    client.create_table(bigquery.Table(applied_table_id(summary_table_id), schema=applied_schema()),
+                        exists_ok=True)
+
+
+def apply_summary_delta(client, summary_table_id: str, rows: Iterable[Dict[str, Any]],
+                        run_id: Optional[str] = None) -> int:
+    """
+    書き込んだ行の集計を集計テーブルに加算（ステージングテーブル + MERGE 1回）
+
+    Returns:
+        加算したキーの数
+    """
+    return apply_summary(client, summary_table_id, summarize_rows(rows), run_id)
+
+
+def apply_summary(client, summary_table_id: str, summary: Dict[SummaryKey, Dict[str, int]],
+                  run_id: Optional[str] = None, delta_id: Optional[str] = None) -> int:
+    """
+    集計済みの差分（summarize_rows / merge_summary の結果）を集計テーブルに加算
+
+    delta_id を指定すると、同じ delta_id で呼び直しても二重に加算しない
+    （省略時は呼び出しごとに新しい識別子を使う）
+    """
+    from google.cloud import bigquery
+
+    deltas = delta_rows(summary)
+    if not deltas:
+        return 0
+
+    ensure_summary_table(client, summary_table_id)
+    staging_table = f"{summary_table_id}__delta_{uuid4().hex[:8]}"
+    try:
+        table = bigquery.Table(staging_table, schema=summary_schema()[:7])
+        table.expires = datetime.now(timezone.utc) + timedelta(days=1)
+        client.create_table(table, exists_ok=True)
+        load_cfg = bigquery.LoadJobConfig(schema=summary_schema()[:7],
+                                          write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE)
+        client.load_table_from_json(deltas, staging_table, job_config=load_cfg).result()
+        client.query(merge_delta_transaction_sql(summary_table_id, f"SELECT * FROM `{staging_table}`",
+                                                 run_id, delta_id or new_delta_id(run_id))).result()
+    finally:
+        client.delete_table(staging_table, not_found_ok=True)
+    return len(deltas)
@@ -0,0 +1,263 @@
+"""
+BigQuery ジョブの並行実行マネージャ
+
+これまでは client.query(...) / load_table_from_*(...) の直後に .result() で待っていたため、
+1プロセスで同時に実行されるジョブは常に1つだった。本モジュールは互いに独立した
+ロード・クエリジョブをまとめて投入し、完了をまとめてポーリングする。
+
+- 同時実行数の上限（max_in_flight）を超えた分はキューで待機
+- ジョブごとに完了時・失敗時のコールバック（コールバック内から後続ジョブも投入できる）
+- get_table などジョブを作らない API 呼び出しは submit_call() でスレッド実行し、
+  ジョブと同じ上限・コールバックで扱う
+- 失敗は JobHandle.error に記録し、他のジョブは止めない
+- QuotaAwareClient（完了まで待つクライアント）を渡した場合は、ジョブをスレッドで実行する
+  （クォータ制御・再試行・コスト記録はラッパー側で行う）
+
+使用例:
+    from database.job_manager import BigQueryJobManager
+
+    with BigQueryJobManager(client, max_in_flight=4) as jobs:
+        for table_name, df in frames.items():
+            jobs.submit_load_dataframe(df, f"{dataset}.{table_name}", job_config=cfg,
+                                       label=table_name, on_done=print_loaded)
+    # with を抜けると全ジョブの完了を待つ
+"""
+
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, List, Optional
+
+from database.bigquery_quota import QuotaAwareClient
+from database.query_accounting import caller_name, get_query_ledger
+
+DEFAULT_MAX_IN_FLIGHT = 8
+
+# ポーリング間隔（秒）: 初回は短く、完了が無い間は上限まで延ばす
+POLL_INTERVAL_MIN = 0.2
+POLL_INTERVAL_MAX = 2.0
+
+
+class JobHandle:
+    """投入したジョブ1件の状態"""
+
+    def __init__(self, label: str, start: Callable[[], Any],
+                 on_done: Optional[Callable[['JobHandle'], None]] = None,
+                 on_error: Optional[Callable[['JobHandle'], None]] = None):
+        self.label = label
+        self._start = start
+        self.on_done = on_done
+        self.on_error = on_error
+        self.job = None            # BigQuery のジョブ（または Future）
+        self.result = None         # job.result() の戻り値
+        self.error: Optional[BaseException] = None
+        self.submitted_at = time.monotonic()
+        self.caller = caller_name()    # コスト集計用の呼び出し元（database パッケージの外側）
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    @property
+    def ok(self) -> bool:
+        return self.done and self.error is None
+
+    @property
+    def elapsed(self) -> Optional[float]:
+        """開始から完了までの秒数"""
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    def __repr__(self) -> str:
+        state = 'pending' if self.started_at is None else ('done' if self.done else 'running')
+        return f"JobHandle({self.label!r}, {state})"
+
+
+class BigQueryJobManager:
+    """独立した BigQuery ジョブの並行実行"""
+
+    def __init__(self, client=None, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                 poll_interval: float = POLL_INTERVAL_MIN):
+        """
+        Args:
+            client: BigQuery クライアント（submit_query / submit_load_* で使用）
+            max_in_flight: 同時に実行するジョブ数の上限
+            poll_interval: 完了確認の初回間隔（秒）
+        """
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight は1以上を指定してください")
+        self.client = client
+        self.max_in_flight = max_in_flight
+        self.poll_interval = poll_interval
+        self.handles: List[JobHandle] = []
+        self._pending: Deque[JobHandle] = deque()
+        self._running: List[JobHandle] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.max_observed_in_flight = 0
+
+    # ---------- 投入 ----------
+
+    def submit(self, start: Callable[[], Any], label: str = '',
+               on_done: Optional[Callable[[JobHandle], None]] = None,
+               on_error: Optional[Callable[[JobHandle], None]] = None) -> JobHandle:
+        """
+        ジョブを投入（上限に空きがあれば即座に開始）
+
+        Args:
+            start: ジョブを開始して、done() / result() を持つオブジェクトを返す関数
+            label: 表示・集計用のラベル
+            on_done: 成功時のコールバック（引数は JobHandle）
+            on_error: 失敗時のコールバック（引数は JobHandle）
+        """
+        handle = JobHandle(label or f"job{len(self.handles) + 1}", start, on_done, on_error)
+        self.handles.append(handle)
+        self._pending.append(handle)
+        self._fill()
+        return handle
+
+    def _submit_job(self, start: Callable[[], Any], label: str, on_done, on_error) -> JobHandle:
+        """ジョブを投入（完了まで待つクライアントならスレッドで実行）"""
+        if isinstance(self.client, QuotaAwareClient):
+            return self.submit_call(lambda: start().result(), label, on_done, on_error)
+        return self.submit(start, label, on_done, on_error)
+
+    def submit_query(self, sql: str, job_config=None, location: Optional[str] = None,
+                     label: str = '', on_done=None, on_error=None) -> JobHandle:
+        """クエリジョブを投入（result は RowIterator）"""
+        kwargs = {'job_config': job_config}
+        if location:
+            kwargs['location'] = location
+        return self._submit_job(lambda: self.client.query(sql, **kwargs), label, on_done, on_error)
+
+    def submit_load_dataframe(self, dataframe, destination: str, job_config=None,
+                              label: str = '', on_done=None, on_error=None) -> JobHandle:
+        """DataFrame のロードジョブを投入"""
+        return self._submit_job(
+            lambda: self.client.load_table_from_dataframe(dataframe, destination, job_config=job_config),
+            label or destination, on_done, on_error
+        )
+
+    def submit_load_json(self, rows: List[dict], destination: str, job_config=None,
+                         label: str = '', on_done=None, on_error=None) -> JobHandle:
+        """JSON 行のロードジョブを投入"""
+        return self._submit_job(
+            lambda: self.client.load_table_from_json(rows, destination, job_config=job_config),
+            label or destination, on_done, on_error
+        )
+
+    def submit_call(self, fn: Callable[[], Any], label: str = '',
+                    on_done=None, on_error=None) -> JobHandle:
+        """ジョブを作らない API 呼び出し（get_table 等）をスレッドで実行"""
+        def start():
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight)
+            return self._executor.submit(fn)
+        return self.submit(start, label, on_done, on_error)
+
+    # ---------- 実行 ----------
+
+    def _fill(self) -> None:
+        """上限まで待機中のジョブを開始"""
+        while self._pending and len(self._running) < self.max_in_flight:
+            handle = self._pending.popleft()
+            handle.started_at = time.monotonic()
+            try:
+                handle.job = handle._start()
+            except Exception as e:
+                # 投入自体の失敗（認証・構文エラー等）
+                self._finish(handle, error=e)
+                continue
+            self._running.append(handle)
+            self.max_observed_in_flight = max(self.max_observed_in_flight, len(self._running))
+
+    def _finish(self, handle: JobHandle, result: Any = None,
+                error: Optional[BaseException] = None) -> None:
+        handle.result = result
+        handle.error = error
+        handle.finished_at = time.monotonic()
+        if error is None:
+            get_query_ledger().record_job(handle.job, handle.caller, handle.elapsed)
+
+        callback = handle.on_error if error is not None else handle.on_done
+        if callback is not None:
+            try:
+                callback(handle)
+            except Exception as e:
+                # コールバックの失敗もそのジョブの失敗として記録
+                if handle.error is None:
+                    handle.error = e
+
+    def poll(self) -> int:
+        """
+        実行中のジョブの完了を1回確認
+
+        Returns:
+            今回完了したジョブ数
+        """
+        finished = 0
+        for handle in list(self._running):
+            try:
+                if not handle.job.done():
+                    continue
+            except Exception as e:
+                self._running.remove(handle)
+                self._finish(handle, error=e)
+                finished += 1
+                continue
+
+            self._running.remove(handle)
+            try:
+                result = handle.job.result()
+            except Exception as e:
+                self._finish(handle, error=e)
+            else:
+                self._finish(handle, result=result)
+            finished += 1
+
+        self._fill()
+        return finished
+
+    def wait_all(self, timeout: Optional[float] = None) -> List[JobHandle]:
+        """
+        すべてのジョブ（コールバックから追加されたものを含む）の完了を待つ
+
+        Returns:
+            投入順の JobHandle のリスト
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        interval = self.poll_interval
+
+        while self._running or self._pending:
+            if self.poll():
+                interval = self.poll_interval
+                continue
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f"{len(self._running) + len(self._pending)}件のジョブが時間内に完了しませんでした"
+                )
+            time.sleep(interval)
+            interval = min(interval * 1.5, POLL_INTERVAL_MAX)
+
+        return list(self.handles)
+
+    @property
+    def failed(self) -> List[JobHandle]:
+        return [h for h in self.handles if h.error is not None]
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self) -> 'BigQueryJobManager':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            if exc_type is None:
+                self.wait_all()
+        finally:
+            self.close()
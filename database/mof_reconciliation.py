@@ -0,0 +1,303 @@
+"""
+財務省統計との照合（列指向・ベクトル演算）
+
+財務省が公表する国債発行額の統計 CSV と、パースした発行データ（bond_issuances）を
+(年度, 月, 区分, 年限) ごとに集計して突き合わせ、許容差つきの差分表を作る。
+食い違った行には、こちら側の金額を構成する announcement_id を添える（ドリルダウン用）。
+
+処理はすべて pandas の列演算（groupby / merge）で行い、行ごとの Python ループは使わない。
+1年度分（数千行）の照合は1秒未満で終わる。
+
+区分・年限の表記は両側で正規化してから突き合わせる。
+    区分: mof_category → category → legal_basis_category → bond_category の順に採用し、
+          CATEGORY_ALIASES で財務省の区分名に寄せる（例: 4条国債 → 建設国債）
+    年限: 財務省側は「10年」「6ヶ月」などの表記、こちらは発行日〜償還日の日数
+          （無ければ銘柄マスタの年限）から年数に直す。銘柄マスタはローダーと同じ
+          get_bond_master_resolver() を使い、体系に無い bond_id（旧 BOND_001 など）の行は
+          銘柄名から bond_id を解決し直してから年限を引く
+
+使用例:
+    from database.mof_reconciliation import load_mof_csv, reconcile
+
+    mof = load_mof_csv('data/mof/issuance_2023.csv', unit='億円')
+    report = reconcile(issuances_df, mof, abs_tolerance=1e8)
+"""
+
+import json
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from database.issuance_summary import SUPERSEDED_COLUMN
+from parsers.bond_master_resolver import DAYS_PER_YEAR, MATURITY_SHORTFALL_DAYS, get_bond_master_resolver
+
+JOIN_KEYS = ['fiscal_year', 'month', 'category', 'maturity']
+REQUIRED_MOF_COLUMNS = ['fiscal_year', 'category', 'amount']
+
+# 財務省 CSV の見出し → 列名
+MOF_COLUMN_ALIASES = {
+    '年度': 'fiscal_year', '会計年度': 'fiscal_year',
+    '月': 'month', '発行月': 'month',
+    '区分': 'category', '種別': 'category', '国債種別': 'category', '発行根拠': 'category',
+    '年限': 'maturity', '償還年限': 'maturity', '期間': 'maturity', '銘柄': 'maturity',
+    '発行額': 'amount', '金額': 'amount', '発行額合計': 'amount',
+}
+
+# 金額の単位（円に換算する倍率）
+UNIT_MULTIPLIERS = {'円': 1, '百万円': 10 ** 6, '億円': 10 ** 8, '兆円': 10 ** 12}
+
+# 区分名の正規化（こちら側・財務省側とも NFKC 後にこの表で置き換える）
+CATEGORY_ALIASES = {
+    '4条国債': '建設国債', '4条債': '建設国債', '財政法第4条': '建設国債',
+    '赤字国債': '特例国債', '特例債': '特例国債', '年金特例債': '特例国債', '特例公債': '特例国債',
+    '借換国債': '借換債',
+    '財投債': '財投債', '財政投融資特別会計国債': '財投債',
+    '復興債': '復興債', '復興特別会計国債': '復興債',
+    'GX経済移行債': 'GX債', 'クライメート・トランジション利付国債': 'GX債',
+    '前倒債': '借換債',
+}
+
+# 区分の候補列（先にあるものを優先）
+CATEGORY_COLUMNS = ['mof_category', 'category', 'legal_basis_category', 'bond_category']
+
+DATE_COLUMNS = ['issuance_date', 'issue_date']
+
+BOND_ID_COLUMNS = ['bond_master_id', 'bond_id']
+BOND_NAME_COLUMNS = ['bond_type', 'bond_name']
+
+STATUS_MATCH = 'match'
+STATUS_MISMATCH = 'mismatch'
+STATUS_MISSING_OURS = 'missing_ours'     # 財務省統計にだけある
+STATUS_MISSING_MOF = 'missing_mof'       # こちらにだけある
+
+_MATURITY_PATTERN = r'(?P<num>[0-9]+(?:\.[0-9]+)?)\s*(?P<unit>年|ヶ月|か月|カ月|ケ月|月)'
+
+
+def join_keys(frame) -> list:
+    """照合に使うキー（JOIN_KEYS のうち frame にある列）"""
+    return [key for key in JOIN_KEYS if key in frame.columns]
+
+
+def _normalize_text(series):
+    return series.fillna('').astype(str).str.normalize('NFKC').str.strip()
+
+
+def normalize_category(series, aliases: Optional[Dict[str, str]] = None):
+    """区分名を正規化（NFKC → 別名の置き換え）"""
+    mapping = dict(CATEGORY_ALIASES)
+    mapping.update(aliases or {})
+    return _normalize_text(series).replace(mapping)
+
+
+def maturity_from_label(series):
+    """「10年」「6ヶ月」などの表記を年数（0.5, 10.0 …）に変換（不明は NaN）"""
+    import pandas as pd
+
+    parts = _normalize_text(series).str.extract(_MATURITY_PATTERN)
+    number = pd.to_numeric(parts['num'], errors='coerce')
+    return (number / parts['unit'].ne('年').map({True: 12, False: 1})).round(2)
+
+
+def maturity_from_dates(issue_dates, maturity_dates):
+    """
+    発行日〜償還日から年数を求める
+
+    短期は 3ヶ月単位に丸め、それ以外は bond_master_resolver.maturity_years_from_days と同じ
+    日数の閾値で整数年にする（名目より MATURITY_SHORTFALL_DAYS 日以内の不足は切り上げ、他は切り捨て）。
+    """
+    import numpy as np
+    import pandas as pd
+
+    days = (pd.to_datetime(maturity_dates, errors='coerce')
+            - pd.to_datetime(issue_dates, errors='coerce')).dt.days
+    years = days / DAYS_PER_YEAR
+    whole_years = (days + MATURITY_SHORTFALL_DAYS) // DAYS_PER_YEAR
+    rounded = np.where(years < 0.9, (years * 4).round() / 4, whole_years)
+    return pd.Series(rounded, index=years.index).where(years.notna())
+
+
+def _fiscal_year_and_month(dates):
+    import pandas as pd
+
+    dates = pd.to_datetime(dates, errors='coerce')
+    return (dates.dt.year - (dates.dt.month < 4)).astype('Int64'), dates.dt.month.astype('Int64')
+
+
+def load_mof_csv(path: Path, unit: str = '億円', column_map: Optional[Dict[str, str]] = None,
+                 category_aliases: Optional[Dict[str, str]] = None):
+    """
+    財務省統計の CSV を読み込み、照合用の列（JOIN_KEYS + mof_amount）に揃える
+
+    月・年限の列が無い統計（年度×区分の合計のみ等）は、その粒度で照合する。
+
+    Args:
+        path: CSV（UTF-8 / Shift_JIS）
+        unit: 金額の単位（UNIT_MULTIPLIERS のキー）
+        column_map: 見出しの追加の対応（見出し → 列名）
+        category_aliases: 区分名の追加の対応
+
+    Returns:
+        pandas.DataFrame（同じキーの行は合算済み）
+    """
+    import pandas as pd
+
+    if unit not in UNIT_MULTIPLIERS:
+        raise ValueError(f"不明な単位: {unit}（{', '.join(UNIT_MULTIPLIERS)}）")
+
+    for encoding in ('utf-8-sig', 'cp932'):
+        try:
+            df = pd.read_csv(path, encoding=encoding, dtype=str)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        raise ValueError(f"CSV の文字コードを判別できません: {path}")
+
+    mapping = dict(MOF_COLUMN_ALIASES)
+    mapping.update(column_map or {})
+    df = df.rename(columns=lambda name: mapping.get(unicodedata.normalize('NFKC', str(name)).strip(), name))
+    missing = [column for column in REQUIRED_MOF_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"CSV に必要な列がありません: {missing}（見出し: {list(df.columns)}）")
+
+    digits = lambda s: pd.to_numeric(_normalize_text(s).str.replace(r'[^0-9.\-]', '', regex=True),
+                                     errors='coerce')
+    mof = pd.DataFrame({
+        'fiscal_year': digits(df['fiscal_year']).astype('Int64'),
+        'category': normalize_category(df['category'], category_aliases),
+        'mof_amount': digits(df['amount']) * UNIT_MULTIPLIERS[unit],
+    })
+    if 'month' in df.columns:
+        mof['month'] = digits(df['month']).astype('Int64')
+    if 'maturity' in df.columns:
+        mof['maturity'] = maturity_from_label(df['maturity'])
+    return mof.groupby(join_keys(mof), dropna=False, as_index=False)['mof_amount'].sum()
+
+
+def _map_unique(values, func):
+    """値ごとに func を1回だけ呼んで対応付ける（行ごとに Python 関数を呼ばない。欠損は NaN のまま）"""
+    return values.map({value: func(value) for value in values.dropna().unique()})
+
+
+def master_maturity_years(df):
+    """
+    銘柄マスタの年限（ローダーと同じ bond_id の体系で引く）
+
+    体系に無い bond_id（旧 BOND_001 など）や bond_id の無い行は、銘柄名（bond_type / bond_name）
+    から bond_id を解決し直す。どちらでも決まらない行は NaN。
+    """
+    import pandas as pd
+
+    resolver = get_bond_master_resolver()
+    years = pd.Series(float('nan'), index=df.index)
+    bond_column = next((c for c in BOND_ID_COLUMNS if c in df.columns), None)
+    if bond_column:
+        years = _map_unique(df[bond_column], resolver.maturity_years).astype(float)
+    for column in [c for c in BOND_NAME_COLUMNS if c in df.columns]:
+        unresolved = years.isna() & df[column].notna()
+        if not unresolved.any():
+            break
+        resolved = _map_unique(df.loc[unresolved, column].astype(str), resolver.resolve)
+        years = years.fillna(_map_unique(resolved, resolver.maturity_years).astype(float))
+    return years
+
+
+def prepare_issuances(df, category_aliases: Optional[Dict[str, str]] = None):
+    """
+    発行データ（bond_issuances の行）を照合用の列に揃える
+
+    総額レコード（is_summary_record）と、訂正の告示で置き換えられた行（superseded_by）は除く。
+    """
+    import pandas as pd
+
+    if 'is_summary_record' in df.columns:
+        df = df[~df['is_summary_record'].fillna(False).astype(bool)]
+    if SUPERSEDED_COLUMN in df.columns:
+        df = df[df[SUPERSEDED_COLUMN].isna()]
+
+    date_column = next((c for c in DATE_COLUMNS if c in df.columns), None)
+    dates = df[date_column] if date_column else pd.Series(pd.NaT, index=df.index)
+    fiscal_year, month = _fiscal_year_and_month(dates)
+
+    category = pd.Series('', index=df.index)
+    for column in reversed([c for c in CATEGORY_COLUMNS if c in df.columns]):
+        value = _normalize_text(df[column])
+        category = value.where(value != '', category)
+
+    maturity = (maturity_from_dates(dates, df['maturity_date']) if 'maturity_date' in df.columns
+                else pd.Series(float('nan'), index=df.index))
+    maturity = maturity.fillna(master_maturity_years(df))
+
+    return pd.DataFrame({
+        'fiscal_year': fiscal_year,
+        'month': month,
+        'category': normalize_category(category, category_aliases),
+        'maturity': maturity.round(2),
+        'amount': pd.to_numeric(df['issue_amount'], errors='coerce').fillna(0),
+        'announcement_id': df['announcement_id'].astype(str),
+    })
+
+
+def reconcile(issuances, mof, abs_tolerance: float = 0.0, rel_tolerance: float = 0.0,
+              fiscal_years: Optional[Iterable[int]] = None):
+    """
+    発行データと財務省統計を突き合わせる
+
+    Args:
+        issuances: prepare_issuances の結果
+        mof: load_mof_csv の結果
+        abs_tolerance: 許容する差額（円）
+        rel_tolerance: 許容する差の比率（財務省側の金額に対して）
+        fiscal_years: 対象年度（省略時は両側にある全年度）
+
+    Returns:
+        pandas.DataFrame（照合キー, our_amount, mof_amount, diff, status, issuance_count, announcement_ids）
+        差の絶対値の大きい順
+    """
+    import numpy as np
+
+    if fiscal_years is not None:
+        years = list(fiscal_years)
+        issuances = issuances[issuances['fiscal_year'].isin(years)]
+        mof = mof[mof['fiscal_year'].isin(years)]
+
+    keys = join_keys(mof)
+    ours = issuances.groupby(keys, dropna=False, as_index=False).agg(
+        our_amount=('amount', 'sum'),
+        issuance_count=('amount', 'size'),
+        announcement_ids=('announcement_id', 'unique'),
+    )
+    merged = ours.merge(mof, on=keys, how='outer', indicator=True)
+    merged['our_amount'] = merged['our_amount'].fillna(0)
+    merged['mof_amount'] = merged['mof_amount'].fillna(0)
+    merged['issuance_count'] = merged['issuance_count'].fillna(0).astype(int)
+    merged['diff'] = merged['our_amount'] - merged['mof_amount']
+
+    tolerance = np.maximum(abs_tolerance, merged['mof_amount'].abs() * rel_tolerance)
+    merged['status'] = np.select(
+        [merged['_merge'] == 'right_only', merged['_merge'] == 'left_only',
+         merged['diff'].abs() <= tolerance],
+        [STATUS_MISSING_OURS, STATUS_MISSING_MOF, STATUS_MATCH],
+        default=STATUS_MISMATCH,
+    )
+    merged['announcement_ids'] = merged['announcement_ids'].map(
+        lambda ids: [] if not hasattr(ids, '__iter__') or isinstance(ids, str) else sorted(ids))
+
+    merged = merged.drop(columns='_merge')
+    order = merged['diff'].abs().sort_values(ascending=False, kind='stable').index
+    return merged.loc[order].reset_index(drop=True)
+
+
+def summarize(report) -> Dict[str, Dict[str, float]]:
+    """状態ごとの件数・金額"""
+    grouped = report.groupby('status').agg(
+        keys=('status', 'size'), our_amount=('our_amount', 'sum'), mof_amount=('mof_amount', 'sum'))
+    return {status: {k: float(v) for k, v in row.items()} for status, row in grouped.iterrows()}
+
+
+def load_category_aliases(path: Optional[Path]) -> Dict[str, str]:
+    """区分名の対応表（JSON: {"こちらの区分": "財務省の区分"}）"""
+    if not path:
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
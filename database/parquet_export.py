@@ -0,0 +1,518 @@
+"""
+BigQuery データセットのローカル Parquet エクスポート（年度パーティション）
+
+分析・検証ツールはこれまで毎回 BigQuery を読んでいた。本モジュールは告示・発行・発行根拠と
+マスタ類を BigQuery Storage Read API で並列に読み出し、年度ごとに分けた Parquet に書き出す。
+以後のツールはローカルディスクの速度でオフラインに読める。
+
+出力:
+    <root>/<dataset>/
+        _manifest.json                       テーブルごとのウォーターマーク・行数
+        announcements/fiscal_year=2023/part-0.parquet
+        bond_issuances/fiscal_year=2023/part-0.parquet
+        issuance_legal_basis/fiscal_year=2023/part-0.parquet
+        laws_master/part-0.parquet           マスタは年度で分けない
+
+年度の決め方:
+    fiscal_year 列 → 日付列（発行日・官報日）→ 告示IDの日付 → 発行IDから引いた発行の年度 → 0
+
+差分更新:
+    前回取り込んだ updated_at（無ければ ingested_at、run_id）の最大値をマニフェストに記録し、
+    次回はそれより WATERMARK_OVERLAP だけ遡った時点以降の行を Storage Read API の
+    row_restriction で読む（コミットが遅れて後から見えた行を取りこぼさないための重なり）。
+    重なって読んだ行・ストリーム間で重複した行は主キーごとに最新の1行に絞る。
+    読んだ行は主キーで既存パーティションに上書きマージし、年度が変わった行は元の年度の
+    パーティションから取り除く（BigQuery 側の削除は反映されないため、必要なら --full で
+    作り直す）。マスタは小さいので毎回全件を読み直す。
+
+    読んだデータは Arrow のテーブルのまま分割・マージし、Python の値にするのは
+    年度・主キー・ウォーターマークの判定に使う列だけ。
+
+依存:
+    google-cloud-bigquery-storage と pyarrow（読み込み時にのみ import）
+
+使用例:
+    from database.parquet_export import export_dataset, read_local_table
+
+    export_dataset(client, 'jgb2023', '20251031')
+    table = read_local_table('20251031', 'bond_issuances', fiscal_years=[2023])
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set
+
+from database.ingestion_run import RUN_ID_TIME_FORMAT, run_started_at
+from database.issuance_summary import _to_date, fiscal_year, row_fiscal_year
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_EXPORT_ROOT = PROJECT_ROOT / "cache" / "parquet"
+
+MANIFEST_NAME = '_manifest.json'
+PARTITION_COLUMN = 'fiscal_year'
+PART_FILE = 'part-0.parquet'
+
+# 差分更新に使う列（先にあるものを優先）
+WATERMARK_COLUMNS = ('updated_at', 'ingested_at', 'run_id')
+
+# 差分更新で前回のウォーターマークから遡って読み直す幅
+WATERMARK_OVERLAP = timedelta(hours=1)
+
+# 年度を決める日付列（先にあるものを優先）
+DATE_COLUMNS = ('issuance_date', 'issue_date', 'kanpo_date', 'announcement_date')
+
+DEFAULT_MAX_STREAMS = 4
+
+
+class ExportTable(NamedTuple):
+    """エクスポート対象のテーブル"""
+    name: str
+    key: str                # 主キー（差分マージ用）
+    partitioned: bool       # 年度で分けるか
+
+
+# bond_issuances は issuance_legal_basis の年度解決に使うため、先に読む
+EXPORT_TABLES = [
+    ExportTable('announcements', 'announcement_id', True),
+    ExportTable('bond_issuances', 'issuance_id', True),
+    ExportTable('issuance_legal_basis', 'basis_id', True),
+    ExportTable('laws_master', 'law_id', False),
+    ExportTable('law_articles_master', 'article_id', False),
+    ExportTable('bonds_master', 'bond_id', False),
+]
+
+
+# ========================================
+# 年度・差分の判定
+# ========================================
+
+def partition_fiscal_year(row: Dict[str, Any],
+                          issuance_years: Optional[Dict[str, int]] = None) -> int:
+    """行の年度パーティション（不明は 0）"""
+    value = row.get(PARTITION_COLUMN)
+    if isinstance(value, int) and value > 0:
+        return value
+    for column in DATE_COLUMNS:
+        day = _to_date(row.get(column))
+        if day is not None:
+            return fiscal_year(day)
+    year = row_fiscal_year(row)
+    if not year and issuance_years and row.get('issuance_id'):
+        year = issuance_years.get(row['issuance_id'], 0)
+    return year
+
+
+def watermark_column(columns: Iterable[str]) -> Optional[str]:
+    """差分更新に使う列（無ければ None = 毎回全件）"""
+    available = set(columns)
+    for column in WATERMARK_COLUMNS:
+        if column in available:
+            return column
+    return None
+
+
+def _watermark_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc).isoformat()
+    return value
+
+
+def _literal(value: str) -> str:
+    return value.replace('\\', '\\\\').replace("'", "\\'")
+
+
+def row_restriction(column: Optional[str], watermark: Optional[str],
+                    overlap: timedelta = WATERMARK_OVERLAP) -> str:
+    """
+    Storage Read API の row_restriction（前回のウォーターマークから overlap だけ遡った時点以降の行）
+
+    境界の行も読み直すため >= で比べる。時刻として読めないウォーターマークは遡らない。
+    """
+    if not column or watermark in (None, ''):
+        return ''
+    if column == 'run_id':
+        # run_id は時刻で始まるため文字列順 = 時刻順
+        started = run_started_at(str(watermark))
+        bound = (started - overlap).strftime(RUN_ID_TIME_FORMAT) if started else str(watermark)
+        return f"{column} >= '{_literal(bound)}'"
+    try:
+        bound = _watermark_value(datetime.fromisoformat(str(watermark)) - overlap)
+    except ValueError:
+        bound = str(watermark)
+    return f"{column} >= TIMESTAMP '{_literal(bound)}'"
+
+
+def max_watermark(rows: Iterable[Dict[str, Any]], column: Optional[str],
+                  current: Optional[str] = None) -> Optional[str]:
+    """読んだ行と前回値のうち最大のウォーターマーク"""
+    if not column:
+        return current
+    best = current
+    for row in rows:
+        value = _watermark_value(row.get(column))
+        if value is not None and (best is None or str(value) > str(best)):
+            best = value
+    return best
+
+
+def fiscal_years(rows: Iterable[Dict[str, Any]],
+                 issuance_years: Optional[Dict[str, int]] = None) -> List[int]:
+    """行ごとの年度パーティション（入力と同じ順序）"""
+    return [partition_fiscal_year(row, issuance_years) for row in rows]
+
+
+def latest_indices(keys: Sequence[Any], marks: Optional[Sequence[Any]] = None) -> List[int]:
+    """
+    主キーごとに残す行の位置（重なって読んだ行・ストリーム間の重複を除く）
+
+    同じキーの行はウォーターマークの最も新しい行（同じなら後の行）を残す。
+    主キーが空の行はすべて残す。返す位置は昇順。
+    """
+    chosen: Dict[Any, int] = {}
+    kept: List[int] = []
+    for index, key in enumerate(keys):
+        if key is None:
+            kept.append(index)
+            continue
+        best = chosen.get(key)
+        if best is None or marks is None or str(_watermark_value(marks[index]) or '') >= \
+                str(_watermark_value(marks[best]) or ''):
+            chosen[key] = index
+    return sorted(kept + list(chosen.values()))
+
+
+def stale_keys(existing_keys: Dict[int, Iterable[Any]], updated_keys: Set[Any]) -> Dict[int, Set[Any]]:
+    """
+    既存の年度パーティションから取り除く主キー
+
+    差分の行は新しい年度のパーティションに書くため、既存のどの年度にあっても取り除く
+    （同じ年度なら上書き、年度が変わった行は元の年度から消える）。
+
+    Args:
+        existing_keys: 年度 → 既存パーティションの主キー
+        updated_keys: 差分の主キー
+    """
+    stale = {}
+    for year, keys in existing_keys.items():
+        found = {key for key in keys if key in updated_keys}
+        if found:
+            stale[year] = found
+    return stale
+
+
+# ========================================
+# マニフェスト
+# ========================================
+
+class ExportManifest:
+    """エクスポート先の状態（ウォーターマーク・行数・発行IDの年度）"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.data: Dict[str, Any] = {'tables': {}, 'issuance_fiscal_years': {}}
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+
+    def table(self, name: str) -> Dict[str, Any]:
+        return self.data['tables'].setdefault(name, {})
+
+    @property
+    def issuance_years(self) -> Dict[str, int]:
+        return self.data.setdefault('issuance_fiscal_years', {})
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp_path, self.path)
+
+
+# ========================================
+# Storage Read API
+# ========================================
+
+class StorageReadSource:
+    """BigQuery Storage Read API からの並列読み出し（Arrow のテーブルのまま返す）"""
+
+    def __init__(self, client, read_client=None, max_streams: int = DEFAULT_MAX_STREAMS):
+        """
+        Args:
+            client: bigquery.Client（スキーマ取得用）
+            read_client: bigquery_storage_v1.BigQueryReadClient（省略時は生成）
+            max_streams: 1テーブルあたりの最大ストリーム数（= 並列度）
+        """
+        from google.cloud import bigquery_storage_v1
+
+        self.client = client
+        self.read_client = read_client or bigquery_storage_v1.BigQueryReadClient()
+        self.max_streams = max_streams
+
+    def columns(self, table_id: str) -> List[str]:
+        return [field.name for field in self.client.get_table(table_id).schema]
+
+    def read(self, table_id: str, restriction: str = ''):
+        """
+        テーブルを読み出す
+
+        Returns:
+            pyarrow.Table（ストリームごとの結果を連結）
+        """
+        import pyarrow as pa
+        from google.cloud.bigquery_storage_v1 import types
+
+        project, dataset, table = table_id.split('.')
+        requested = types.ReadSession(
+            table=f"projects/{project}/datasets/{dataset}/tables/{table}",
+            data_format=types.DataFormat.ARROW,
+            read_options=types.ReadSession.TableReadOptions(row_restriction=restriction),
+        )
+        session = self.read_client.create_read_session(
+            parent=f"projects/{project}", read_session=requested, max_stream_count=self.max_streams,
+        )
+        schema = pa.ipc.read_schema(pa.py_buffer(session.arrow_schema.serialized_schema))
+        if not session.streams:
+            return schema.empty_table()      # 該当行なし
+
+        def read_stream(stream):
+            return self.read_client.read_rows(stream.name).to_arrow(session)
+
+        with ThreadPoolExecutor(max_workers=len(session.streams)) as pool:
+            tables = list(pool.map(read_stream, session.streams))
+        return pa.concat_tables(tables)
+
+
+# ========================================
+# Parquet の読み書き
+# ========================================
+
+def _column_values(table, column: Optional[str]) -> List[Any]:
+    """判定に使う1列だけを Python の値にする（列が無ければ None の並び）"""
+    if column and column in table.column_names:
+        return table.column(column).to_pylist()
+    return [None] * table.num_rows
+
+
+def _with_partition_column(table, years: List[int]):
+    import pyarrow as pa
+
+    values = pa.array(years, pa.int64())
+    index = table.schema.get_field_index(PARTITION_COLUMN)
+    if index >= 0:
+        return table.set_column(index, PARTITION_COLUMN, values)
+    return table.append_column(PARTITION_COLUMN, values)
+
+
+def _drop_keys(table, key: str, keys: Iterable[Any]):
+    """主キーが keys に含まれる行を除く（主キーが空の行は残す）"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if key not in table.column_names:
+        return table
+    value_set = pa.array(list(keys), table.schema.field(key).type)
+    return table.filter(pc.fill_null(pc.invert(pc.is_in(table[key], value_set=value_set)), True))
+
+
+def merge_partition(existing, updates, key: str, updated_keys: Optional[Set[Any]] = None):
+    """
+    既存のパーティションに差分を主キーで上書きマージ（差分の行は末尾に足す）
+
+    updated_keys には差分全体の主キーを渡す（他の年度に移った行も既存側から取り除く）。
+    省略時は updates の主キー。
+    """
+    import pyarrow as pa
+
+    if existing is None:
+        return updates
+    if updated_keys is None:
+        updated_keys = {k for k in _column_values(updates, key) if k is not None}
+    return pa.concat_tables([_drop_keys(existing, key, updated_keys), updates], promote_options='default')
+
+
+def read_parquet_table(path: Path, columns: Optional[List[str]] = None):
+    """Parquet を pyarrow.Table として読む（ファイルが無ければ None）"""
+    import pyarrow.parquet as pq
+
+    if not Path(path).exists():
+        return None
+    return pq.read_table(str(path), columns=columns)
+
+
+def write_parquet_table(path: Path, table) -> None:
+    """pyarrow.Table を Parquet に書き出す（一時ファイル → 置き換え）"""
+    import pyarrow.parquet as pq
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    pq.write_table(table, str(tmp_path), compression='zstd')
+    os.replace(tmp_path, path)
+
+
+def partition_path(root: Path, table: str, year: Optional[int] = None) -> Path:
+    if year is None:
+        return Path(root) / table / PART_FILE
+    return Path(root) / table / f"{PARTITION_COLUMN}={year}" / PART_FILE
+
+
+def existing_partitions(root: Path, table: str) -> Dict[int, Path]:
+    """書き出し済みの年度パーティション（年度 → パス）"""
+    return {int(path.parent.name.split('=', 1)[1]): path
+            for path in (Path(root) / table).glob(f"{PARTITION_COLUMN}=*/{PART_FILE}")}
+
+
+def _partitioning():
+    """hive 形式の年度ディレクトリ（書き出し時と同じ int64 で読む）"""
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    return ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.int64())]), flavor='hive')
+
+
+def read_local_table(dataset_id: str, table: str, fiscal_years: Optional[Iterable[int]] = None,
+                     root: Path = DEFAULT_EXPORT_ROOT):
+    """
+    エクスポート済みのテーブルを pyarrow.Table として読む
+
+    Args:
+        dataset_id: データセット
+        table: テーブル名
+        fiscal_years: 読む年度（省略時は全年度）
+    """
+    import pyarrow.dataset as ds
+
+    source = Path(root) / dataset_id / table
+    dataset = ds.dataset(str(source), format='parquet', partitioning=_partitioning())
+    if fiscal_years is None:
+        return dataset.to_table()
+    return dataset.to_table(filter=ds.field(PARTITION_COLUMN).isin(list(fiscal_years)))
+
+
+# ========================================
+# エクスポート
+# ========================================
+
+def export_table(source, root: Path, table_id: str, spec: ExportTable, manifest: ExportManifest,
+                 full: bool = False, overlap: timedelta = WATERMARK_OVERLAP) -> Dict[str, Any]:
+    """
+    1テーブルをエクスポート
+
+    Returns:
+        {'rows': 読んだ行数（重複を除いた後）, 'partitions': 書き換えた年度, 'watermark': 新しいウォーターマーク}
+    """
+    import pyarrow.compute as pc
+
+    state = manifest.table(spec.name)
+    column = watermark_column(source.columns(table_id)) if spec.partitioned else None
+    incremental = bool(column) and not full and bool(state.get('watermark'))
+    restriction = row_restriction(column, state.get('watermark'), overlap) if incremental else ''
+
+    table = source.read(table_id, restriction)
+    marks = _column_values(table, column) if column else None
+    if spec.key in table.column_names:
+        indices = latest_indices(_column_values(table, spec.key), marks)
+        if len(indices) < table.num_rows:
+            table = table.take(indices)
+            marks = [marks[index] for index in indices] if marks is not None else None
+
+    touched: List[Optional[int]] = []
+    if spec.partitioned:
+        # 年度の判定に使う列だけを Python の値にする
+        judge = [c for c in (PARTITION_COLUMN, *DATE_COLUMNS, 'announcement_id', 'issuance_id')
+                 if c in table.column_names]
+        judge_rows = table.select(judge).to_pylist()
+        if spec.name == 'bond_issuances':
+            for row in judge_rows:
+                if row.get('issuance_id'):
+                    manifest.issuance_years[row['issuance_id']] = partition_fiscal_year(row)
+        years = fiscal_years(judge_rows, manifest.issuance_years)
+        table = _with_partition_column(table, years)
+        new_years = sorted(set(years))
+
+        existing = existing_partitions(root, spec.name)
+        updated = {key for key in _column_values(table, spec.key) if key is not None}
+        if not incremental:
+            for year, path in existing.items():
+                if year not in new_years:
+                    path.unlink()
+            state['partitions'] = {}
+        else:
+            # 年度が変わった行を元の年度から取り除く（書き出す年度は下のマージで取り除く）
+            existing_keys = {year: _column_values(read_parquet_table(path, [spec.key]), spec.key)
+                             for year, path in existing.items() if year not in new_years}
+            for year, keys in sorted(stale_keys(existing_keys, updated).items()):
+                path = existing[year]
+                kept = _drop_keys(read_parquet_table(path), spec.key, keys)
+                if kept.num_rows:
+                    write_parquet_table(path, kept)
+                    state.setdefault('partitions', {})[str(year)] = kept.num_rows
+                else:
+                    path.unlink()
+                    state.setdefault('partitions', {}).pop(str(year), None)
+                touched.append(year)
+
+        for year in new_years:
+            part = table.filter(pc.equal(table[PARTITION_COLUMN], year))
+            path = partition_path(root, spec.name, year)
+            if incremental:
+                part = merge_partition(read_parquet_table(path), part, spec.key, updated)
+            # 年度はディレクトリ名で表すため、ファイルには列として持たない
+            part = part.drop_columns([PARTITION_COLUMN])
+            write_parquet_table(path, part)
+            state.setdefault('partitions', {})[str(year)] = part.num_rows
+            touched.append(year)
+    else:
+        write_parquet_table(partition_path(root, spec.name), table)
+        state['partitions'] = {}
+        touched.append(None)
+
+    state['watermark_column'] = column
+    state['watermark'] = max_watermark(({column: mark} for mark in marks or []), column,
+                                       state.get('watermark') if incremental else None)
+    state['rows'] = sum(state['partitions'].values()) if spec.partitioned else table.num_rows
+    state['exported_at'] = datetime.now(timezone.utc).isoformat()
+    return {'rows': table.num_rows, 'partitions': sorted(touched, key=lambda year: year or 0),
+            'watermark': state['watermark'], 'incremental': incremental}
+
+
+def export_dataset(client, project_id: str, dataset_id: str, root: Path = DEFAULT_EXPORT_ROOT,
+                   tables: Optional[Sequence[str]] = None, full: bool = False,
+                   max_streams: int = DEFAULT_MAX_STREAMS, source=None) -> Dict[str, Dict[str, Any]]:
+    """
+    データセットをエクスポート
+
+    Args:
+        client: bigquery.Client
+        project_id, dataset_id: 読み出し元
+        root: 出力先のルート（<root>/<dataset_id>/ に書く）
+        tables: 対象テーブル（省略時は EXPORT_TABLES 全部）
+        full: 差分ではなく全件を読み直す
+        max_streams: 1テーブルあたりの並列ストリーム数
+        source: 読み出し元（省略時は StorageReadSource）
+
+    Returns:
+        テーブル名 → export_table の結果
+    """
+    source = source or StorageReadSource(client, max_streams=max_streams)
+    out = Path(root) / dataset_id
+    manifest = ExportManifest(out / MANIFEST_NAME)
+    manifest.data['dataset'] = f"{project_id}.{dataset_id}"
+
+    results = {}
+    for spec in EXPORT_TABLES:
+        if tables and spec.name not in tables:
+            continue
+        table_id = f"{project_id}.{dataset_id}.{spec.name}"
+        try:
+            results[spec.name] = export_table(source, out, table_id, spec, manifest, full=full)
+        except Exception as e:
+            results[spec.name] = {'error': str(e)}
+        manifest.save()
+    return results
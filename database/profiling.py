@@ -0,0 +1,476 @@
+"""
+バッチ処理のプロファイル（--profile）
+
+遅い実行の原因を print を足して探していたため、各バッチ処理に --profile を用意し、
+次をまとめて記録する。出力（投入するデータ・ログ）は変えない。
+
+- 段階（読み込み・パース・投入など）ごとの cProfile（<段階>.pstats、全体は all.pstats）
+- フレームグラフ用の collapsed stack（<段階>.collapsed。flamegraph.pl / speedscope で表示）
+- パース時間の長いファイルの順位
+- 正規表現（パターンごと）の累積マッチ時間の順位
+
+使用例:
+    from database.profiling import start_profiling, profile_stage, profile_file, finish_profiling
+
+    start_profiling(label='v7_fixed7')          # --profile のときだけ呼ぶ
+    with profile_file(path.name), profile_stage('parse'):
+        ...
+    finish_profiling()                           # 書き出しと順位の表示
+
+start_profiling を呼んでいなければ profile_stage / profile_file は何もしない。
+
+正規表現の時間は、プロファイル中だけ re のモジュール関数（re.search など）と
+プロジェクト内モジュールのグローバルにあるコンパイル済みパターンを計時用のラッパーに
+差し替えて測る（finish_profiling で元に戻す）。re.compile は差し替えない
+（呼び出し側の isinstance(x, re.Pattern) や flags を変えないため。関数内でその場で
+コンパイルしたパターンのメソッド呼び出しは計時の対象外）。ラッパーの分だけ全体は遅くなる。
+cProfile / pstats はプロファイル開始時に読み込む（--profile なしの import を軽く保つ）。
+"""
+
+import io
+import json
+import os
+import re
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_PROFILE_DIR = PROJECT_ROOT / 'logs' / 'profile'
+
+REGEX_FUNCTIONS = ('search', 'match', 'fullmatch', 'findall', 'finditer', 'sub', 'subn', 'split')
+PATTERN_METHODS = REGEX_FUNCTIONS
+
+MAX_STACK_DEPTH = 64
+
+
+# ========================================
+# 正規表現の計時
+# ========================================
+
+def _pattern_key(pattern: Any, flags: int = 0) -> Tuple[str, int]:
+    if type(pattern) is TimedPattern:
+        pattern = pattern.wrapped
+    if isinstance(pattern, re.Pattern):
+        return pattern.pattern if isinstance(pattern.pattern, str) else repr(pattern.pattern), pattern.flags
+    return str(pattern), flags
+
+
+class TimedPattern:
+    """
+    コンパイル済みパターンの計時ラッパー（属性は元のパターンに委ねる）
+
+    __class__ を re.Pattern として返すため、差し替え中も isinstance(x, re.Pattern) は真のまま。
+    """
+
+    def __init__(self, wrapped: 're.Pattern', timer: 'RegexTimer'):
+        self.wrapped = wrapped
+        self._timer = timer
+        self._key = _pattern_key(wrapped)
+
+    @property
+    def __class__(self):
+        return re.Pattern
+
+    def __getattr__(self, name):
+        return getattr(self.wrapped, name)
+
+    def __repr__(self):
+        return repr(self.wrapped)
+
+    def _call(self, method: str, *args, **kwargs):
+        self._timer.enter(self._key)
+        start = time.perf_counter()
+        try:
+            return getattr(self.wrapped, method)(*args, **kwargs)
+        finally:
+            self._timer.add(self._key, time.perf_counter() - start)
+
+    def search(self, *args, **kwargs):
+        return self._call('search', *args, **kwargs)
+
+    def match(self, *args, **kwargs):
+        return self._call('match', *args, **kwargs)
+
+    def fullmatch(self, *args, **kwargs):
+        return self._call('fullmatch', *args, **kwargs)
+
+    def findall(self, *args, **kwargs):
+        return self._call('findall', *args, **kwargs)
+
+    def sub(self, *args, **kwargs):
+        return self._call('sub', *args, **kwargs)
+
+    def subn(self, *args, **kwargs):
+        return self._call('subn', *args, **kwargs)
+
+    def split(self, *args, **kwargs):
+        return self._call('split', *args, **kwargs)
+
+    def finditer(self, *args, **kwargs):
+        return self._timer.timed_iter(self._key, self.wrapped.finditer(*args, **kwargs))
+
+
+def _caller_label(depth: int = 2) -> str:
+    """正規表現を呼んだ関数（モジュール:関数）"""
+    frame = sys._getframe(depth)
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class RegexTimer:
+    """
+    パターンごとの呼び出し回数・累積時間
+
+    names にはパターンの出どころ（モジュールのグローバル名、または呼び出し元の関数）を記録する。
+    enter / add を上書きすると、実行中のパターンを監視できる（parsers/regex_watchdog.py）。
+    """
+
+    def __init__(self):
+        self.stats: Dict[Tuple[str, int], List[float]] = {}
+        self.names: Dict[Tuple[str, int], str] = {}
+        self._restore: List[Tuple[Any, Any, Any]] = []
+
+    def enter(self, key: Tuple[str, int]) -> None:
+        """パターンの実行直前に呼ばれる"""
+
+    def add(self, key: Tuple[str, int], seconds: float, calls: int = 1) -> None:
+        entry = self.stats.setdefault(key, [0, 0.0])
+        entry[0] += calls
+        entry[1] += seconds
+
+    def timed_iter(self, key: Tuple[str, int], iterator: Iterator) -> Iterator:
+        """finditer の各マッチを探す時間を合計する"""
+        self.add(key, 0.0)
+        while True:
+            self.enter(key)
+            start = time.perf_counter()
+            try:
+                match = next(iterator)
+            except StopIteration:
+                self.add(key, time.perf_counter() - start, calls=0)
+                return
+            self.add(key, time.perf_counter() - start, calls=0)
+            yield match
+
+    def _wrap_function(self, name: str, original: Callable) -> Callable:
+        def wrapper(pattern, *args, **kwargs):
+            flags = kwargs.get('flags', 0)
+            key = _pattern_key(pattern, flags if isinstance(flags, int) else 0)
+            if key not in self.names:
+                self.names[key] = _caller_label()
+            if type(pattern) is TimedPattern:
+                pattern = pattern.wrapped
+            if name == 'finditer':
+                return self.timed_iter(key, original(pattern, *args, **kwargs))
+            self.enter(key)
+            start = time.perf_counter()
+            try:
+                return original(pattern, *args, **kwargs)
+            finally:
+                self.add(key, time.perf_counter() - start)
+        wrapper.__wrapped__ = original
+        return wrapper
+
+    def _replace(self, container: Any, key: Any, value: Any) -> None:
+        original = container[key] if not isinstance(container, type(sys)) else getattr(container, key)
+        self._restore.append((container, key, original))
+        if isinstance(container, type(sys)):
+            setattr(container, key, value)
+        else:
+            container[key] = value
+
+    def _wrap_value(self, value: Any, label: str) -> Optional[Any]:
+        """差し替えるべき値なら差し替え後の値（パターン・パターンを含むタプル）"""
+        if type(value) is re.Pattern:
+            self.names.setdefault(_pattern_key(value), label)
+            return TimedPattern(value, self)
+        if isinstance(value, tuple) and any(type(v) is re.Pattern for v in value):
+            # (パターン, モード, 名前, 優先度) のような表は文字列の要素も名前に含める
+            words = '/'.join(v for v in value if isinstance(v, str))
+            for v in value:
+                if type(v) is re.Pattern:
+                    self.names.setdefault(_pattern_key(v), f"{label} {words}".strip())
+            return tuple(TimedPattern(v, self) if type(v) is re.Pattern else v for v in value)
+        return None
+
+    def install(self) -> None:
+        """re の関数とプロジェクト内モジュールのグローバルのパターンを差し替える（re.compile はそのまま）"""
+        for name in REGEX_FUNCTIONS:
+            self._replace(re, name, self._wrap_function(name, getattr(re, name)))
+
+        root = str(PROJECT_ROOT)
+        for module in list(sys.modules.values()):
+            path = getattr(module, '__file__', None) or ''
+            if not path.startswith(root) or module.__name__ == __name__:
+                continue
+            for name, value in list(vars(module).items()):
+                label = f"{module.__name__}.{name}"
+                wrapped = self._wrap_value(value, label)
+                if wrapped is not None:
+                    self._replace(module, name, wrapped)
+                elif isinstance(value, list):
+                    for index, item in enumerate(value):
+                        wrapped = self._wrap_value(item, f"{label}[{index}]")
+                        if wrapped is not None:
+                            self._replace(value, index, wrapped)
+                elif isinstance(value, dict):
+                    for key, item in list(value.items()):
+                        wrapped = self._wrap_value(item, f"{label}[{key!r}]")
+                        if wrapped is not None:
+                            self._replace(value, key, wrapped)
+
+    def uninstall(self) -> None:
+        for container, key, original in reversed(self._restore):
+            if isinstance(container, type(sys)):
+                setattr(container, key, original)
+            else:
+                container[key] = original
+        self._restore = []
+
+    def top(self, n: int = 15) -> List[Dict[str, Any]]:
+        ranked = sorted(self.stats.items(), key=lambda item: -item[1][1])[:n]
+        return [{'pattern': pattern, 'flags': flags, 'name': self.names.get((pattern, flags), ''),
+                 'calls': int(calls), 'seconds': seconds}
+                for (pattern, flags), (calls, seconds) in ranked]
+
+
+# ========================================
+# collapsed stack（フレームグラフ）
+# ========================================
+
+def _frame_label(func: Tuple[str, int, str]) -> str:
+    filename, line, name = func
+    if filename == '~':
+        label = name
+    else:
+        label = f"{name} ({Path(filename).name}:{line})"
+    return label.replace(';', ':')
+
+
+def collapsed_stacks(stats: 'pstats.Stats') -> List[str]:
+    """
+    cProfile の呼び出しグラフから collapsed stack（"f1;f2;f3 マイクロ秒"）を作る
+
+    cProfile は呼び出し元→呼び出し先の辺ごとの時間しか持たないため、
+    各関数の自己時間を呼び出し元の経路に時間の比で按分した近似になる。
+    """
+    entries = stats.stats
+    children: Dict[Any, List[Tuple[Any, float]]] = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            children.setdefault(caller, []).append((func, edge[3]))
+    roots = [func for func, entry in entries.items() if not entry[4]]
+
+    lines: Dict[str, float] = {}
+
+    def walk(func, stack: List[str], budget: float) -> None:
+        _, _, tt, ct, _ = entries[func]
+        if ct <= 0 or budget <= 0:
+            return
+        share = min(1.0, budget / ct)
+        path = stack + [_frame_label(func)]
+        key = ';'.join(path)
+        lines[key] = lines.get(key, 0.0) + tt * share
+        if len(path) >= MAX_STACK_DEPTH:
+            return
+        for child, edge_ct in children.get(func, []):
+            if _frame_label(child) in path:     # 再帰は1段で打ち切る
+                continue
+            walk(child, path, edge_ct * share)
+
+    for root in roots:
+        walk(root, [], entries[root][3])
+    return [f"{key} {int(seconds * 1_000_000)}" for key, seconds in sorted(lines.items())
+            if int(seconds * 1_000_000) > 0]
+
+
+# ========================================
+# 実行全体のプロファイラ
+# ========================================
+
+class RunProfiler:
+    """段階ごとの cProfile・ファイルごとの時間・正規表現ごとの時間"""
+
+    def __init__(self, output_dir: Path, regex: bool = True):
+        self.output_dir = Path(output_dir)
+        self.profiles: Dict[str, 'cProfile.Profile'] = {}
+        self.stage_seconds: Dict[str, float] = {}
+        self.file_seconds: Dict[str, float] = {}
+        self.regex = RegexTimer() if regex else None
+        self._stack: List[str] = []
+        self._started = time.perf_counter()
+
+    def start(self) -> None:
+        if self.regex:
+            self.regex.install()
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        """段階ごとに別の cProfile で記録（入れ子は内側の段階に記録する）"""
+        import cProfile
+
+        if self._stack:
+            self.profiles[self._stack[-1]].disable()
+        if name not in self.profiles:
+            self.profiles[name] = cProfile.Profile()
+        profile = self.profiles[name]
+        self._stack.append(name)
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + time.perf_counter() - start
+            self._stack.pop()
+            if self._stack:
+                self.profiles[self._stack[-1]].enable()
+
+    @contextmanager
+    def file(self, label: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.file_seconds[label] = self.file_seconds.get(label, 0.0) + time.perf_counter() - start
+
+    def finish(self, top: int = 15) -> Dict[str, Any]:
+        """書き出して概要（summary.json と同じ内容）を返す"""
+        import pstats
+
+        if self.regex:
+            self.regex.uninstall()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        stage_files = []
+        for name, profile in self.profiles.items():
+            path = self.output_dir / f"{name}.pstats"
+            profile.dump_stats(str(path))
+            stage_files.append(str(path))
+            stats = pstats.Stats(profile)
+            (self.output_dir / f"{name}.collapsed").write_text(
+                '\n'.join(collapsed_stacks(stats)) + '\n', encoding='utf-8')
+
+        top_functions = []
+        if stage_files:
+            combined = pstats.Stats(*stage_files)
+            combined.dump_stats(str(self.output_dir / 'all.pstats'))
+            top_functions = _top_functions(combined, top)
+
+        summary = {
+            'elapsed_seconds': time.perf_counter() - self._started,
+            'stages': {name: round(seconds, 6) for name, seconds in
+                       sorted(self.stage_seconds.items(), key=lambda item: -item[1])},
+            'top_files': [{'file': label, 'seconds': seconds} for label, seconds in
+                          sorted(self.file_seconds.items(), key=lambda item: -item[1])[:top]],
+            'top_regexes': self.regex.top(top) if self.regex else [],
+            'top_functions': top_functions,
+            'output_dir': str(self.output_dir),
+        }
+        with open(self.output_dir / 'summary.json', 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        return summary
+
+
+def _top_functions(stats: 'pstats.Stats', top: int) -> List[Dict[str, Any]]:
+    ranked = sorted(stats.stats.items(), key=lambda item: -item[1][3])[:top]
+    return [{'function': _frame_label(func), 'calls': nc, 'tottime': tt, 'cumtime': ct}
+            for func, (_, nc, tt, ct, _) in ranked]
+
+
+def format_summary(summary: Dict[str, Any], top: int = 10) -> str:
+    """概要を表示用の文字列に"""
+    out = io.StringIO()
+    out.write(f"⏱️  プロファイル（{summary['elapsed_seconds']:.1f}秒）: {summary['output_dir']}\n")
+    out.write("  段階:\n")
+    for name, seconds in summary['stages'].items():
+        out.write(f"    {name:<20} {seconds:>9.3f}秒\n")
+    if summary['top_files']:
+        out.write("  時間の長いファイル:\n")
+        for entry in summary['top_files'][:top]:
+            out.write(f"    {entry['seconds'] * 1000:>9.1f}ms  {entry['file']}\n")
+    if summary['top_regexes']:
+        out.write("  時間の長い正規表現:\n")
+        for entry in summary['top_regexes'][:top]:
+            pattern = entry['pattern'] if len(entry['pattern']) <= 60 else entry['pattern'][:57] + '...'
+            out.write(f"    {entry['seconds'] * 1000:>9.1f}ms {entry['calls']:>8,}回  {pattern}\n")
+    if summary['top_functions']:
+        out.write("  累積時間の長い関数:\n")
+        for entry in summary['top_functions'][:top]:
+            out.write(f"    {entry['cumtime']:>9.3f}秒 {entry['calls']:>8,}回  {entry['function']}\n")
+    return out.getvalue()
+
+
+# ========================================
+# プロセス内で共有するプロファイラ
+# ========================================
+
+_PROFILER: Optional[RunProfiler] = None
+
+
+def start_profiling(output_dir: Optional[Path] = None, label: str = 'run', regex: bool = True) -> RunProfiler:
+    """プロファイルを開始（出力先の既定は logs/profile/<label>_<日時>/）"""
+    global _PROFILER
+    if output_dir is None:
+        output_dir = DEFAULT_PROFILE_DIR / f"{label}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+    _PROFILER = RunProfiler(Path(output_dir), regex=regex)
+    _PROFILER.start()
+    return _PROFILER
+
+
+def current_profiler() -> Optional[RunProfiler]:
+    return _PROFILER
+
+
+@contextmanager
+def profile_stage(name: str):
+    """プロファイル中なら段階として記録（そうでなければ何もしない）"""
+    if _PROFILER is None:
+        yield
+        return
+    with _PROFILER.stage(name):
+        yield
+
+
+@contextmanager
+def profile_file(label: str):
+    """プロファイル中ならファイルごとの時間を記録（そうでなければ何もしない）"""
+    if _PROFILER is None:
+        yield
+        return
+    with _PROFILER.file(label):
+        yield
+
+
+@contextmanager
+def profiling(enabled: bool, output_dir: Optional[Path] = None, label: str = 'run',
+              printer: Callable[[str], None] = print):
+    """
+    enabled のときだけプロファイルする（batch_process(profile=True) などの実装用）
+
+    既に start_profiling 済みなら呼び出し元の記録に含め、開始・終了はしない。
+    """
+    if not enabled or _PROFILER is not None:
+        yield _PROFILER
+        return
+    profiler = start_profiling(output_dir, label=label)
+    try:
+        yield profiler
+    finally:
+        finish_profiling(printer=printer)
+
+
+def finish_profiling(top: int = 15, printer: Callable[[str], None] = print) -> Optional[Dict[str, Any]]:
+    """プロファイルを終了して書き出し、概要を表示"""
+    global _PROFILER
+    if _PROFILER is None:
+        return None
+    profiler, _PROFILER = _PROFILER, None
+    summary = profiler.finish(top)
+    printer(format_summary(summary))
+    return summary
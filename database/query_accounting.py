@@ -0,0 +1,212 @@
+"""
+クエリのコスト・所要時間の記録
+
+プロジェクトが発行するクエリ（修正スクリプトの MERGE、検証クエリ、スキーマ更新の DDL など）が
+どれだけスキャンしているのかが見えなかった。本モジュールはクエリごとに次を記録し、
+呼び出し元のスクリプト・関数ごとに集計して、プロセス終了時に多い順のレポートを表示する。
+
+- 推定スキャン量（事前の dry-run。JGB_QUERY_DRY_RUN=1 のときのみ）
+- 実際の処理バイト数・課金バイト数
+- スロット時間（slot-ms）
+- キャッシュヒット
+- 所要時間
+
+QuotaAwareClient.query と BigQueryJobManager のクエリジョブは自動で記録される。
+レポートを表示しない場合は JGB_QUERY_ACCOUNTING=0 を指定する。
+
+使用例:
+    from database.query_accounting import get_query_ledger
+
+    print(get_query_ledger().report())
+"""
+
+import atexit
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+ACCOUNTING_ENV = 'JGB_QUERY_ACCOUNTING'
+DRY_RUN_ENV = 'JGB_QUERY_DRY_RUN'
+
+# オンデマンド料金（USD / TiB、東京リージョン）。レポートの概算にのみ使用
+ON_DEMAND_USD_PER_TIB = float(os.environ.get('JGB_USD_PER_TIB', '7.5'))
+TIB = 1024 ** 4
+
+# 呼び出し元の特定で読み飛ばすモジュール（ラッパー自身と標準ライブラリ）
+_SKIP_DIRS = (str(Path(__file__).parent),)
+_SKIP_FILES = ('threading.py', 'thread.py', 'contextlib.py')
+
+
+class QueryRecord(NamedTuple):
+    """クエリ1件の記録"""
+    caller: str                       # スクリプト:関数
+    statement: str                    # SQL の先頭（1行）
+    job_id: Optional[str]
+    statement_type: Optional[str]
+    estimated_bytes: Optional[int]    # dry-run の推定スキャン量
+    bytes_processed: int
+    bytes_billed: int
+    slot_ms: int
+    cache_hit: bool
+    elapsed: float                    # 秒
+
+
+def accounting_enabled() -> bool:
+    return os.environ.get(ACCOUNTING_ENV, '1') != '0'
+
+
+def dry_run_enabled() -> bool:
+    return os.environ.get(DRY_RUN_ENV, '0') == '1'
+
+
+def caller_name(depth: int = 1) -> str:
+    """database パッケージの外側で最初に見つかった呼び出し元（例: fix_bond_master_ids.py:apply_updates）"""
+    frame = sys._getframe(depth)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not filename.startswith(_SKIP_DIRS) and not filename.endswith(_SKIP_FILES):
+            return f"{Path(filename).name}:{frame.f_code.co_name}"
+        frame = frame.f_back
+    return '<unknown>'
+
+
+def statement_head(sql: str, width: int = 80) -> str:
+    """SQL の最初の意味のある1行"""
+    for line in sql.splitlines():
+        line = line.strip()
+        if line and not line.startswith('--'):
+            return line[:width]
+    return ''
+
+
+def estimate_bytes(client, sql: str, job_config=None, **kwargs) -> Optional[int]:
+    """dry-run で推定スキャン量を取得（失敗した場合は None）"""
+    from google.cloud import bigquery
+
+    config = (bigquery.QueryJobConfig.from_api_repr(job_config.to_api_repr())
+              if job_config is not None else bigquery.QueryJobConfig())
+    config.dry_run = True
+    config.use_query_cache = False
+    try:
+        return int(client.query(sql, job_config=config, **kwargs).total_bytes_processed or 0)
+    except Exception:
+        return None
+
+
+class QueryLedger:
+    """クエリの記録と集計（プロセス内で共有）"""
+
+    def __init__(self):
+        self.records: List[QueryRecord] = []
+        self._lock = threading.Lock()
+        self._report_registered = False
+
+    def record_job(self, job, caller: str, elapsed: float,
+                   estimated_bytes: Optional[int] = None) -> Optional[QueryRecord]:
+        """
+        完了したクエリジョブを記録（QueryJob 以外・dry-run のジョブは記録しない）
+        """
+        if getattr(job, 'job_type', None) != 'query' or getattr(job, 'dry_run', False):
+            return None
+        record = QueryRecord(
+            caller=caller,
+            statement=statement_head(getattr(job, 'query', '') or ''),
+            job_id=getattr(job, 'job_id', None),
+            statement_type=getattr(job, 'statement_type', None),
+            estimated_bytes=estimated_bytes,
+            bytes_processed=int(getattr(job, 'total_bytes_processed', 0) or 0),
+            bytes_billed=int(getattr(job, 'total_bytes_billed', 0) or 0),
+            slot_ms=int(getattr(job, 'slot_millis', 0) or 0),
+            cache_hit=bool(getattr(job, 'cache_hit', False)),
+            elapsed=elapsed,
+        )
+        self.add(record)
+        return record
+
+    def add(self, record: QueryRecord) -> None:
+        with self._lock:
+            self.records.append(record)
+            if not self._report_registered and accounting_enabled():
+                atexit.register(self.print_report)
+                self._report_registered = True
+
+    def summarize(self) -> List[Dict[str, Any]]:
+        """呼び出し元ごとの集計（課金バイト数・スロット時間の多い順）"""
+        totals: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            records = list(self.records)
+        for record in records:
+            total = totals.setdefault(record.caller, {
+                'caller': record.caller, 'queries': 0, 'estimated_bytes': 0,
+                'bytes_processed': 0, 'bytes_billed': 0, 'slot_ms': 0,
+                'cache_hits': 0, 'elapsed': 0.0, 'top_statement': '', '_top_billed': -1,
+            })
+            total['queries'] += 1
+            total['estimated_bytes'] += record.estimated_bytes or 0
+            total['bytes_processed'] += record.bytes_processed
+            total['bytes_billed'] += record.bytes_billed
+            total['slot_ms'] += record.slot_ms
+            total['cache_hits'] += int(record.cache_hit)
+            total['elapsed'] += record.elapsed
+            if record.bytes_billed > total['_top_billed']:
+                total['_top_billed'] = record.bytes_billed
+                total['top_statement'] = record.statement
+        for total in totals.values():
+            del total['_top_billed']
+        return sorted(totals.values(), key=lambda t: (t['bytes_billed'], t['slot_ms'], t['elapsed']),
+                      reverse=True)
+
+    def report(self, top: int = 20) -> str:
+        """コストレポート（テキスト）"""
+        summary = self.summarize()
+        if not summary:
+            return ''
+        lines = [
+            "=" * 100,
+            "💰 クエリコストレポート（課金バイト数の多い順）",
+            "=" * 100,
+            f"{'呼び出し元':<45}{'件数':>6}{'推定':>10}{'処理':>10}{'課金':>10}{'slot秒':>10}{'cache':>7}{'秒':>8}",
+        ]
+        for total in summary[:top]:
+            lines.append(
+                f"{total['caller'][:45]:<45}{total['queries']:>6}"
+                f"{_format_bytes(total['estimated_bytes']):>10}{_format_bytes(total['bytes_processed']):>10}"
+                f"{_format_bytes(total['bytes_billed']):>10}{total['slot_ms'] / 1000:>10.1f}"
+                f"{total['cache_hits']:>7}{total['elapsed']:>8.1f}"
+            )
+            if total['top_statement']:
+                lines.append(f"    └ {total['top_statement']}")
+        billed = sum(t['bytes_billed'] for t in summary)
+        lines.append("-" * 100)
+        lines.append(f"合計: {sum(t['queries'] for t in summary)}件 / 課金 {_format_bytes(billed)}"
+                     f"（概算 ${billed / TIB * ON_DEMAND_USD_PER_TIB:.4f}）")
+        return "\n".join(lines)
+
+    def print_report(self) -> None:
+        text = self.report()
+        if text:
+            print("\n" + text)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.records.clear()
+
+
+def _format_bytes(value: int) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB', 'TB'):
+        if value < 1024 or unit == 'TB':
+            return f"{value:.0f}{unit}" if unit == 'B' else f"{value:.1f}{unit}"
+        value /= 1024
+
+
+_QUERY_LEDGER: Optional[QueryLedger] = None
+
+
+def get_query_ledger() -> QueryLedger:
+    """プロセス内で共有する記録"""
+    global _QUERY_LEDGER
+    if _QUERY_LEDGER is None:
+        _QUERY_LEDGER = QueryLedger()
+    return _QUERY_LEDGER
@@ -0,0 +1,245 @@
+"""
+年度シャードによる一括取り込み（バックフィル）の計画・状態管理
+
+1年度（179ファイル）前提の実行を数十年分に広げるため、コーパスを年度ごと
+（ファイルの多い年度は月ごと）のシャードに分け、シャードごとに別プロセスで取り込む。
+
+シャードの流れ:
+    pending → running → parsed → committed
+                      ↘ failed（再実行すると同じ run_id でやり直す）
+
+- 各シャードは専用の作業ディレクトリ（ファイル一覧・ログ・進捗・マニフェスト）を持つ
+- 取り込みはシャード専用のステージングテーブル（bond_issuances__shard_<id>）に行う
+- シャードの取り込みが終わったら、1つのトランザクションで本テーブルへ MERGE し、
+  issuance_summary に差分を加算する（シャードごとに1回のコミット）
+
+ファイル名は告示ID（YYYYMMDD で始まる）を前提に年度・月を決める。日付が読めないファイルは
+「unknown」シャードにまとめる。
+"""
+
+import json
+import os
+import re
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from database.issuance_summary import fiscal_year, merge_delta_sql, summary_select_sql
+
+DEFAULT_MAX_FILES_PER_SHARD = 200
+
+STATUS_PENDING = 'pending'
+STATUS_RUNNING = 'running'
+STATUS_PARSED = 'parsed'
+STATUS_COMMITTED = 'committed'
+STATUS_FAILED = 'failed'
+
+MANIFEST_NAME = 'manifest.json'
+FILES_NAME = 'files.txt'
+PROGRESS_NAME = 'progress.json'
+LOG_NAME = 'run.log'
+CONSOLE_LOG_NAME = 'console.log'
+
+STAGING_SUFFIX = '__shard_'
+
+_FILE_DATE_PATTERN = re.compile(r'^(\d{4})(\d{2})(\d{2})')
+
+
+class Shard(NamedTuple):
+    """取り込みの単位"""
+    shard_id: str               # fy2023 / fy2023_m05 / unknown
+    fiscal_year: int            # 不明は 0
+    month: Optional[int]        # 月ごとに分けた場合の暦月
+    files: Tuple[str, ...]
+
+
+def file_period(path: Path) -> Tuple[int, Optional[int]]:
+    """ファイル名の日付から (年度, 暦月)（読めなければ (0, None)）"""
+    match = _FILE_DATE_PATTERN.match(Path(path).stem)
+    if not match:
+        return 0, None
+    try:
+        day = datetime(int(match.group(1)), int(match.group(2)), int(match.group(3))).date()
+    except ValueError:
+        return 0, None
+    return fiscal_year(day), day.month
+
+
+def plan_shards(files: Iterable[Path],
+                max_files_per_shard: int = DEFAULT_MAX_FILES_PER_SHARD) -> List[Shard]:
+    """
+    ファイルを年度ごとのシャードに分ける（max_files_per_shard を超える年度は月ごと）
+
+    シャードは年度順（月ごとの場合は年度内の4月→3月の順）に並ぶ。
+    """
+    by_year: Dict[int, List[Tuple[Optional[int], str]]] = defaultdict(list)
+    for path in sorted(str(p) for p in files):
+        year, month = file_period(Path(path))
+        by_year[year].append((month, path))
+
+    shards = []
+    for year in sorted(by_year, key=lambda y: (y == 0, y)):
+        entries = by_year[year]
+        if year == 0:
+            shards.append(Shard('unknown', 0, None, tuple(path for _, path in entries)))
+        elif len(entries) <= max_files_per_shard:
+            shards.append(Shard(f"fy{year}", year, None, tuple(path for _, path in entries)))
+        else:
+            by_month: Dict[int, List[str]] = defaultdict(list)
+            for month, path in entries:
+                by_month[month].append(path)
+            for month in sorted(by_month, key=lambda m: (m - 4) % 12):
+                shards.append(Shard(f"fy{year}_m{month:02d}", year, month, tuple(by_month[month])))
+    return shards
+
+
+def staging_table_id(target_table_id: str, shard: Shard) -> str:
+    return f"{target_table_id}{STAGING_SUFFIX}{shard.shard_id}"
+
+
+# ========================================
+# シャードの作業ディレクトリ
+# ========================================
+
+class ShardWorkspace:
+    """シャードの作業ディレクトリ（ファイル一覧・ログ・進捗・マニフェスト）"""
+
+    def __init__(self, root: Path, shard: Shard):
+        self.shard = shard
+        self.dir = Path(root) / shard.shard_id
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.files_path = self.dir / FILES_NAME
+        self.progress_path = self.dir / PROGRESS_NAME
+        self.log_path = self.dir / LOG_NAME
+        self.console_path = self.dir / CONSOLE_LOG_NAME
+        self.manifest_path = self.dir / MANIFEST_NAME
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        if self.manifest_path.exists():
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {'shard_id': self.shard.shard_id, 'fiscal_year': self.shard.fiscal_year,
+                'month': self.shard.month, 'status': STATUS_PENDING, 'run_id': None,
+                'files': len(self.shard.files), 'attempts': 0}
+
+    @property
+    def status(self) -> str:
+        return self.manifest['status']
+
+    def write_files(self) -> None:
+        with open(self.files_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(self.shard.files) + '\n')
+
+    def update(self, **fields) -> None:
+        """マニフェストを更新（一時ファイル → 置き換え）"""
+        self.manifest.update(fields)
+        self.manifest['updated_at'] = datetime.now(timezone.utc).isoformat()
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp_path, self.manifest_path)
+
+    def progress(self) -> Dict[str, Any]:
+        """取り込みプロセスが書く進捗（まだ無ければ空）"""
+        try:
+            with open(self.progress_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+
+def write_progress(path: Path, **fields) -> None:
+    """進捗ファイルを書き出す（取り込みプロセス側から呼ぶ）"""
+    path = Path(path)
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(dict(fields, updated_at=datetime.now(timezone.utc).isoformat()), f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+# ========================================
+# 進捗・ETA
+# ========================================
+
+def format_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return '--:--:--'
+    seconds = int(max(seconds, 0))
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def estimate_eta(done_files: int, total_files: int, elapsed: float) -> Optional[float]:
+    """これまでの処理速度から残り時間（秒）を推定（未着手なら None）"""
+    if done_files <= 0 or elapsed <= 0:
+        return None
+    return (total_files - done_files) * elapsed / done_files
+
+
+def files_done(workspaces: Sequence[ShardWorkspace]) -> int:
+    """取り込み済みのファイル数（取り込み中のシャードは進捗ファイルから）"""
+    done = 0
+    for ws in workspaces:
+        if ws.status in (STATUS_PARSED, STATUS_COMMITTED):
+            done += len(ws.shard.files)
+        elif ws.status == STATUS_RUNNING:
+            done += int(ws.progress().get('done', 0))
+    return done
+
+
+def progress_line(workspaces: Sequence[ShardWorkspace], elapsed: float, baseline: int = 0) -> str:
+    """
+    全体の進捗を1行で
+
+    Args:
+        baseline: 今回の実行を始めた時点で取り込み済みだったファイル数（ETA の速度計算から除く）
+    """
+    total = sum(len(ws.shard.files) for ws in workspaces)
+    done = files_done(workspaces)
+    counts: Dict[str, int] = defaultdict(int)
+    for ws in workspaces:
+        counts[ws.status] += 1
+    percent = done / total * 100 if total else 100.0
+    eta = estimate_eta(done - baseline, total - baseline, elapsed)
+    return (f"[{format_duration(elapsed)}] ファイル {done:,}/{total:,} ({percent:.1f}%) | "
+            f"シャード 完了{counts[STATUS_COMMITTED]} 実行中{counts[STATUS_RUNNING]} "
+            f"待機{counts[STATUS_PENDING] + counts[STATUS_PARSED]} 失敗{counts[STATUS_FAILED]} | "
+            f"ETA {format_duration(eta)}")
+
+
+# ========================================
+# シャードのコミット
+# ========================================
+
+def shard_commit_sql(target_table_id: str, staging_table: str, summary_table_id: str,
+                     columns: Sequence[str], run_id: str) -> str:
+    """
+    シャードのステージングテーブルを本テーブルへ反映するトランザクション
+
+    1. 本テーブルに無い dedupe_key の行だけを issuance_summary に加算
+    2. 同じ行を本テーブルへ MERGE
+
+    集計の加算を MERGE より先に行うため、コミット済みのシャードを再実行しても
+    二重に加算されない（挿入される行が無い）。
+    """
+    column_list = ', '.join(columns)
+    source_list = ', '.join(f"S.{column}" for column in columns)
+    new_rows = f"""(
+        SELECT STG.*
+        FROM `{staging_table}` STG
+        WHERE NOT EXISTS (SELECT 1 FROM `{target_table_id}` L2 WHERE L2.dedupe_key = STG.dedupe_key)
+    )"""
+    return f"""
+BEGIN TRANSACTION;
+
+{merge_delta_sql(summary_table_id, summary_select_sql(new_rows, columns), run_id)};
+
+MERGE `{target_table_id}` T
+USING `{staging_table}` S
+ON T.dedupe_key = S.dedupe_key
+WHEN NOT MATCHED THEN
+  INSERT ({column_list}) VALUES ({source_list});
+
+COMMIT TRANSACTION;
+"""
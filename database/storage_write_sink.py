@@ -0,0 +1,479 @@
+"""
+BigQuery Storage Write API による書き込みシンク
+
+これまでの insert_rows_json（ストリーミング挿入、insertAll）には次の問題があった。
+- 挿入した行はストリーミングバッファに最大約90分留まり、その間は DELETE / UPDATE / MERGE が
+  失敗するため、同じ告示の再実行（削除→再投入）ができない
+- 取り込み方法の中で最も高価
+
+本モジュールは Storage Write API の書き込みストリームを使うシンクを提供する。
+
+モード:
+    insert_all : 従来の insert_rows_json（互換用）
+    committed  : 追加した行はすぐに参照可能（COMMITTED ストリーム）
+    pending    : close() 時にストリームをまとめてコミットするまで不可視（PENDING ストリーム）
+                 途中で失敗した場合は1行も反映されない
+
+書き込み:
+- 行はバッファし、batch_rows 行または batch_bytes バイトごとに1回の AppendRows で送る
+- 各 AppendRows にはストリーム内のオフセット（送信済み行数）を付ける。応答が失われて
+  再送した場合、サーバーは ALREADY_EXISTS を返すので、それを成功とみなす（行は重複しない）
+
+送信先は「トランスポート」として差し替えられる。
+- BigQueryWriteTransport : google-cloud-bigquery-storage を使う本番用
+- database.fake_write_server.FakeWriteServer : オフラインテスト用のメモリ内サーバー
+
+使用例:
+    from database.storage_write_sink import write_rows
+
+    errors = write_rows(client, table_id, rows, sink='pending')
+    if errors:
+        ...
+
+シンクの既定値は環境変数 JGB_WRITE_SINK（未設定時は insert_all）。各ランナーは --sink で上書きできる。
+"""
+
+import json
+import os
+import random
+import time
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+SINK_INSERT_ALL = 'insert_all'
+SINK_COMMITTED = 'committed'
+SINK_PENDING = 'pending'
+SINK_CHOICES = (SINK_INSERT_ALL, SINK_COMMITTED, SINK_PENDING)
+
+SINK_ENV = 'JGB_WRITE_SINK'
+
+# 1回の AppendRows の上限（API の上限 10MB に余裕を持たせる）
+DEFAULT_BATCH_ROWS = 500
+DEFAULT_BATCH_BYTES = 5 * 1024 * 1024
+
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_RETRY_DELAY = 0.5
+
+_EPOCH_DATE = date(1970, 1, 1)
+
+
+class WriteSinkError(Exception):
+    """書き込みシンクのエラー"""
+
+
+class OffsetAlreadyExists(WriteSinkError):
+    """指定オフセットの行は書き込み済み（再送時は成功とみなす）"""
+
+
+class OffsetOutOfRange(WriteSinkError):
+    """指定オフセットがストリームの末尾より先（送信漏れ）"""
+
+
+class TransientWriteError(WriteSinkError):
+    """再試行してよい一時的なエラー"""
+
+
+def default_sink() -> str:
+    """環境変数で指定されたシンク（未指定時は insert_all）"""
+    sink = os.environ.get(SINK_ENV, SINK_INSERT_ALL).strip().lower()
+    return sink if sink in SINK_CHOICES else SINK_INSERT_ALL
+
+
+def estimate_row_bytes(row: Dict[str, Any]) -> int:
+    """行のおおよそのサイズ（バッチ分割用）"""
+    return len(json.dumps(row, ensure_ascii=False, default=str).encode('utf-8'))
+
+
+# ========================================
+# 値の変換（BigQuery 型 → Storage Write API の proto 型）
+# ========================================
+
+def to_storage_value(field_type: str, value: Any) -> Any:
+    """
+    JSON 行の値を Storage Write API で送れる値に変換
+
+    DATE は1970-01-01からの日数、TIMESTAMP はエポックからのマイクロ秒（date は UTC の 0 時）、
+    NUMERIC / BIGNUMERIC は文字列で送る。
+    """
+    if value is None:
+        return None
+
+    field_type = field_type.upper()
+    if field_type in ('INTEGER', 'INT64'):
+        return int(value)
+    if field_type in ('FLOAT', 'FLOAT64'):
+        return float(value)
+    if field_type in ('BOOLEAN', 'BOOL'):
+        if isinstance(value, str):
+            return value.strip().lower() in ('true', '1')
+        return bool(value)
+    if field_type == 'DATE':
+        if isinstance(value, datetime):
+            value = value.date()
+        elif isinstance(value, str):
+            value = date.fromisoformat(value[:10])
+        return (value - _EPOCH_DATE).days
+    if field_type == 'TIMESTAMP':
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        elif not isinstance(value, datetime):
+            # date のみの値は UTC の 0 時として扱う
+            value = datetime(value.year, value.month, value.day)
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        delta = value - datetime(1970, 1, 1, tzinfo=timezone.utc)
+        return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+    if field_type == 'JSON' and not isinstance(value, str):
+        return json.dumps(value, ensure_ascii=False)
+    # STRING / NUMERIC / BIGNUMERIC / DATETIME / TIME / GEOGRAPHY は文字列
+    return str(value)
+
+
+# ========================================
+# シンク
+# ========================================
+
+class InsertAllSink:
+    """従来のストリーミング挿入（insert_rows_json）"""
+
+    mode = SINK_INSERT_ALL
+
+    def __init__(self, client, table_id: str, batch_rows: int = DEFAULT_BATCH_ROWS):
+        self.client = client
+        self.table_id = table_id
+        self.batch_rows = batch_rows
+        self.errors: List[Any] = []
+        self.rows_written = 0
+
+    def write(self, rows: Iterable[Dict[str, Any]]) -> None:
+        rows = list(rows)
+        for start in range(0, len(rows), self.batch_rows):
+            batch = rows[start:start + self.batch_rows]
+            errors = self.client.insert_rows_json(self.table_id, batch)
+            if errors:
+                self.errors.extend(errors)
+            else:
+                self.rows_written += len(batch)
+
+    def close(self) -> List[Any]:
+        return self.errors
+
+    def abort(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class StorageWriteSink:
+    """Storage Write API の書き込みストリームへのシンク（committed / pending）"""
+
+    def __init__(self, transport, table_id: str, mode: str = SINK_COMMITTED,
+                 batch_rows: int = DEFAULT_BATCH_ROWS, batch_bytes: int = DEFAULT_BATCH_BYTES,
+                 max_retries: int = DEFAULT_MAX_RETRIES, retry_delay: float = DEFAULT_RETRY_DELAY):
+        """
+        Args:
+            transport: create_stream / append / finalize / commit を持つ送信先
+            table_id: project.dataset.table
+            mode: committed または pending
+            batch_rows: 1回の AppendRows の最大行数
+            batch_bytes: 1回の AppendRows の最大バイト数（目安）
+            max_retries: 一時的なエラーの再試行回数
+            retry_delay: 再試行の初回待ち時間（秒）
+        """
+        if mode not in (SINK_COMMITTED, SINK_PENDING):
+            raise ValueError(f"未対応のモード: {mode}")
+        self.transport = transport
+        self.table_id = table_id
+        self.mode = mode
+        self.batch_rows = batch_rows
+        self.batch_bytes = batch_bytes
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+        self.stream_name: Optional[str] = None
+        self.offset = 0                  # サーバーが受理した行数（次の AppendRows のオフセット）
+        self.append_count = 0
+        self.errors: List[Any] = []
+        self._buffer: List[Dict[str, Any]] = []
+        self._buffer_bytes = 0
+        self._closed = False
+
+    @property
+    def rows_written(self) -> int:
+        return self.offset
+
+    # ---------- 書き込み ----------
+
+    def write(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """行をバッファに追加（上限に達したら送信）"""
+        if self._closed:
+            raise WriteSinkError("close 済みのシンクには書き込めません")
+        for row in rows:
+            size = estimate_row_bytes(row)
+            if self._buffer and self._buffer_bytes + size > self.batch_bytes:
+                self.flush()
+            self._buffer.append(row)
+            self._buffer_bytes += size
+            if len(self._buffer) >= self.batch_rows:
+                self.flush()
+
+    def flush(self) -> None:
+        """バッファの行を1回の AppendRows で送信"""
+        if not self._buffer:
+            return
+        batch, self._buffer, self._buffer_bytes = self._buffer, [], 0
+        self._append(batch)
+
+    def _append(self, batch: List[Dict[str, Any]]) -> None:
+        if self.stream_name is None:
+            self.stream_name = self.transport.create_stream(self.table_id, self.mode)
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.transport.append(self.stream_name, batch, self.offset)
+                break
+            except OffsetAlreadyExists:
+                # 前回の送信は届いていた（応答だけが失われた）
+                break
+            except TransientWriteError:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.retry_delay * (2 ** attempt)
+                time.sleep(delay + random.uniform(0, delay * 0.1))
+
+        self.offset += len(batch)
+        self.append_count += 1
+
+    # ---------- 終了 ----------
+
+    def close(self) -> List[Any]:
+        """
+        残りを送信してストリームを確定（pending はここでコミット）
+
+        Returns:
+            エラーのリスト（insert_rows_json と同じく、成功時は空）
+        """
+        if self._closed:
+            return self.errors
+        try:
+            self.flush()
+            if self.stream_name is not None:
+                self.transport.finalize(self.stream_name)
+                if self.mode == SINK_PENDING:
+                    self.transport.commit(self.table_id, [self.stream_name])
+        except WriteSinkError as e:
+            self.errors.append({'stream': self.stream_name, 'offset': self.offset, 'message': str(e)})
+        finally:
+            self._closed = True
+        return self.errors
+
+    def abort(self) -> None:
+        """
+        書き込みを中止
+
+        pending はコミットせずに確定するため、書き込んだ行は1行も反映されない。
+        committed は送信済みの行がそのまま残る。
+        """
+        if self._closed:
+            return
+        self._buffer, self._buffer_bytes = [], 0
+        if self.stream_name is not None:
+            try:
+                self.transport.finalize(self.stream_name)
+            except WriteSinkError:
+                pass
+        self._closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+# ========================================
+# 本番用トランスポート（google-cloud-bigquery-storage）
+# ========================================
+
+_PROTO_TYPES = {
+    'STRING': 'TYPE_STRING',
+    'INTEGER': 'TYPE_INT64', 'INT64': 'TYPE_INT64',
+    'FLOAT': 'TYPE_DOUBLE', 'FLOAT64': 'TYPE_DOUBLE',
+    'BOOLEAN': 'TYPE_BOOL', 'BOOL': 'TYPE_BOOL',
+    'DATE': 'TYPE_INT32',
+    'TIMESTAMP': 'TYPE_INT64',
+}
+
+
+class BigQueryWriteTransport:
+    """Storage Write API（google-cloud-bigquery-storage）への送信"""
+
+    def __init__(self, client, write_client=None):
+        """
+        Args:
+            client: bigquery.Client（テーブルのスキーマ取得用）
+            write_client: bigquery_storage_v1.BigQueryWriteClient（省略時は生成）
+        """
+        from google.cloud import bigquery_storage_v1
+
+        self.client = client
+        self.write_client = write_client or bigquery_storage_v1.BigQueryWriteClient()
+        self._streams: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def table_path(table_id: str) -> str:
+        project, dataset, table = table_id.split('.')
+        return f"projects/{project}/datasets/{dataset}/tables/{table}"
+
+    @staticmethod
+    def _build_message_class(schema):
+        """テーブルスキーマから proto2 のメッセージクラスを作成"""
+        from google.protobuf import descriptor_pb2, descriptor_pool, message_factory
+
+        row_proto = descriptor_pb2.DescriptorProto(name='Row')
+        for number, field in enumerate(schema, 1):
+            type_name = _PROTO_TYPES.get(field.field_type.upper(), 'TYPE_STRING')
+            label = ('LABEL_REPEATED' if field.mode == 'REPEATED' else 'LABEL_OPTIONAL')
+            row_proto.field.add(
+                name=field.name, number=number,
+                type=descriptor_pb2.FieldDescriptorProto.Type.Value(type_name),
+                label=descriptor_pb2.FieldDescriptorProto.Label.Value(label),
+            )
+
+        file_proto = descriptor_pb2.FileDescriptorProto(
+            name='jgb_storage_write_row.proto', package='jgb', syntax='proto2'
+        )
+        file_proto.message_type.add().CopyFrom(row_proto)
+        pool = descriptor_pool.DescriptorPool()
+        pool.Add(file_proto)
+        descriptor = pool.FindMessageTypeByName('jgb.Row')
+        if hasattr(message_factory, 'GetMessageClass'):
+            return row_proto, message_factory.GetMessageClass(descriptor)
+        return row_proto, message_factory.MessageFactory(pool).GetPrototype(descriptor)
+
+    def create_stream(self, table_id: str, mode: str) -> str:
+        from google.cloud.bigquery_storage_v1 import types, writer
+
+        stream = types.WriteStream()
+        stream.type_ = (types.WriteStream.Type.PENDING if mode == SINK_PENDING
+                        else types.WriteStream.Type.COMMITTED)
+        stream = self.write_client.create_write_stream(
+            parent=self.table_path(table_id), write_stream=stream
+        )
+
+        schema = self.client.get_table(table_id).schema
+        row_proto, message_class = self._build_message_class(schema)
+
+        template = types.AppendRowsRequest()
+        template.write_stream = stream.name
+        proto_data = types.AppendRowsRequest.ProtoData()
+        proto_schema = types.ProtoSchema()
+        proto_schema.proto_descriptor = row_proto
+        proto_data.writer_schema = proto_schema
+        template.proto_rows = proto_data
+
+        self._streams[stream.name] = {
+            'schema': {field.name: field for field in schema},
+            'message_class': message_class,
+            'connection': writer.AppendRowsStream(self.write_client, template),
+        }
+        return stream.name
+
+    def _serialize(self, stream_name: str, row: Dict[str, Any]) -> bytes:
+        state = self._streams[stream_name]
+        message = state['message_class']()
+        for name, value in row.items():
+            field = state['schema'].get(name)
+            if field is None or value is None:
+                continue
+            if field.mode == 'REPEATED':
+                getattr(message, name).extend(to_storage_value(field.field_type, v) for v in value)
+            else:
+                setattr(message, name, to_storage_value(field.field_type, value))
+        return message.SerializeToString()
+
+    def append(self, stream_name: str, rows: List[Dict[str, Any]], offset: int) -> None:
+        from google.api_core import exceptions
+        from google.cloud.bigquery_storage_v1 import types
+
+        proto_rows = types.ProtoRows()
+        for row in rows:
+            proto_rows.serialized_rows.append(self._serialize(stream_name, row))
+
+        request = types.AppendRowsRequest()
+        request.offset = offset
+        proto_data = types.AppendRowsRequest.ProtoData()
+        proto_data.rows = proto_rows
+        request.proto_rows = proto_data
+
+        try:
+            self._streams[stream_name]['connection'].send(request).result()
+        except exceptions.AlreadyExists as e:
+            raise OffsetAlreadyExists(str(e)) from e
+        except exceptions.OutOfRange as e:
+            raise OffsetOutOfRange(str(e)) from e
+        except (exceptions.ServiceUnavailable, exceptions.DeadlineExceeded,
+                exceptions.InternalServerError, exceptions.Aborted) as e:
+            raise TransientWriteError(str(e)) from e
+
+    def finalize(self, stream_name: str) -> None:
+        state = self._streams.pop(stream_name, None)
+        if state is not None:
+            state['connection'].close()
+        self.write_client.finalize_write_stream(name=stream_name)
+
+    def commit(self, table_id: str, stream_names: List[str]) -> None:
+        from google.cloud.bigquery_storage_v1 import types
+
+        request = types.BatchCommitWriteStreamsRequest()
+        request.parent = self.table_path(table_id)
+        request.write_streams = list(stream_names)
+        response = self.write_client.batch_commit_write_streams(request)
+        if response.stream_errors:
+            raise WriteSinkError(f"コミット失敗: {list(response.stream_errors)}")
+
+
+# ========================================
+# ランナー向けの入口
+# ========================================
+
+def open_sink(client, table_id: str, sink: Optional[str] = None, transport=None, **kwargs):
+    """
+    シンクを作成
+
+    Args:
+        client: bigquery.Client
+        table_id: project.dataset.table
+        sink: insert_all / committed / pending（省略時は JGB_WRITE_SINK）
+        transport: Storage Write API の送信先（省略時は BigQueryWriteTransport）
+    """
+    sink = sink or default_sink()
+    if sink not in SINK_CHOICES:
+        raise ValueError(f"未対応のシンク: {sink}（{', '.join(SINK_CHOICES)}）")
+    if sink == SINK_INSERT_ALL:
+        return InsertAllSink(client, table_id, **{k: v for k, v in kwargs.items() if k == 'batch_rows'})
+    return StorageWriteSink(transport or BigQueryWriteTransport(client), table_id, mode=sink, **kwargs)
+
+
+def write_rows(client, table_id: str, rows: List[Dict[str, Any]], sink: Optional[str] = None,
+               transport=None, **kwargs) -> List[Any]:
+    """
+    行をまとめて書き込む（insert_rows_json の置き換え）
+
+    Returns:
+        エラーのリスト（成功時は空）
+    """
+    target = open_sink(client, table_id, sink, transport, **kwargs)
+    try:
+        target.write(rows)
+    except Exception as e:
+        target.abort()
+        return [{'message': str(e)}]
+    return target.close()
@@ -0,0 +1,264 @@
+"""
+サイズを見て分割するストリーミング投入
+
+アップローダー（upload_issues_to_* / integrated_uploader_*）は全ファイルの結果を data_list に溜め、
+最後に announcements・bond_issuances をそれぞれ1回の書き込みで送っていた。
+コーパスが増えるとリクエストのサイズ・行数の上限に達し、全件をメモリに持つことにもなる。
+
+StreamingUploader は行を受け取るたびにバッファし、
+
+- flush_rows 行または flush_bytes バイト（JSON にしたサイズ）のどちらかに達したら1チャンクとして送信
+- insert_all はチャンクを最大 max_in_flight 個まで並行に送信（超えたら add() が待つため、
+  メモリに持つのは高々 (max_in_flight + 1) チャンク分）
+- チャンク内の一部の行だけが失敗した場合は、その行だけを再送
+    - 行ごとのエラーが stopped（他の行の失敗の巻き添え）・一時的なエラーなら再送
+    - invalid など行そのものの誤りは再送せず、失敗行として記録
+    - リクエストが大きすぎる場合はチャンクを半分に分けて送り直す（1行だけで大きすぎる場合は
+      再送せずにその行を失敗として記録する）
+  insertId（row_ids）は行ごとに固定するため、再送しても行は重複しない
+- 再送はこのクラスだけが行う。insert_rows_json は1回だけ呼ぶ
+  （google の再試行は retry=None で止め、QuotaAwareClient は single_attempt=True で
+  レート制限だけを使う。再試行を二重に重ねると1チャンクの送信回数が掛け算で増える）
+- committed / pending（Storage Write API）は書き込みストリームのオフセット順に送る必要があるため、
+  1本のストリームへ順に送る（並行にはしない。再送と重複防止は storage_write_sink が行う）
+
+使用例:
+    from database.streaming_uploader import StreamingUploader
+
+    with StreamingUploader(client, table_id, sink='insert_all', flush_rows=500) as uploader:
+        for result in results:
+            uploader.add_rows(result['issuances'])
+    print(uploader.rows_written, uploader.errors)
+"""
+
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from database.bigquery_quota import ERROR_FATAL, QuotaAwareClient, backoff_delay, classify_error
+from database.storage_write_sink import SINK_INSERT_ALL, SINK_PENDING, default_sink, open_sink
+
+# insertAll の推奨（1リクエスト500行）と上限（10MB）に余裕を持たせる
+DEFAULT_FLUSH_ROWS = 500
+DEFAULT_FLUSH_BYTES = 4 * 1024 * 1024
+DEFAULT_MAX_IN_FLIGHT = 4
+
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_RETRY_DELAY = 0.5
+
+# 行ごとのエラーのうち、再送してよいもの
+RETRYABLE_ROW_REASONS = {'stopped', 'backendError', 'internalError', 'timeout', 'rateLimitExceeded'}
+TOO_LARGE_MESSAGES = ('request payload size exceeds', 'request size', 'too large', 'entity too large')
+
+
+def row_bytes(row: Dict[str, Any]) -> int:
+    """JSON にした行のバイト数（チャンク分割用）"""
+    return len(json.dumps(row, ensure_ascii=False, default=str).encode('utf-8')) + 1
+
+
+def is_too_large(exc: BaseException) -> bool:
+    """リクエストが大きすぎるエラーか（チャンクを分ければ送れる）"""
+    message = str(exc).lower()
+    return getattr(exc, 'code', None) == 413 or any(text in message for text in TOO_LARGE_MESSAGES)
+
+
+class StreamingUploader:
+    """行を一定の行数・バイト数ごとに分けて送る"""
+
+    def __init__(self, client, table_id: str, sink: Optional[str] = None,
+                 flush_rows: int = DEFAULT_FLUSH_ROWS, flush_bytes: int = DEFAULT_FLUSH_BYTES,
+                 max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                 max_retries: int = DEFAULT_MAX_RETRIES, retry_delay: float = DEFAULT_RETRY_DELAY,
+                 on_written: Optional[Callable[[List[Dict[str, Any]]], None]] = None, transport=None):
+        """
+        Args:
+            client: bigquery.Client（QuotaAwareClient でもよい）
+            table_id: project.dataset.table
+            sink: insert_all / committed / pending（省略時は JGB_WRITE_SINK）
+            flush_rows: 1チャンクの最大行数
+            flush_bytes: 1チャンクの最大バイト数（JSON にしたサイズ）
+            max_in_flight: 同時に送信するチャンク数（insert_all のみ）
+            max_retries: チャンクごとの再送回数
+            retry_delay: 再送の初回待ち時間（秒）
+            on_written: 書き込めた行を受け取る関数（集計の更新用。送信スレッドから順に呼ぶ）
+            transport: Storage Write API の送信先（テスト用）
+        """
+        self.client = client
+        self.table_id = table_id
+        self.mode = sink or default_sink()
+        self.flush_rows = flush_rows
+        self.flush_bytes = flush_bytes
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.on_written = on_written
+        # 再送はこのクラスが行うため、クライアント側の再試行は止める
+        self._insert_options = {'retry': None}
+        if isinstance(client, QuotaAwareClient):
+            self._insert_options['single_attempt'] = True
+
+        self.rows_written = 0
+        self.chunks_sent = 0
+        self.retries = 0
+        self.failed_rows: List[Dict[str, Any]] = []   # {'row', 'errors'}
+        self.errors: List[Any] = []
+
+        self._buffer: List[Dict[str, Any]] = []
+        self._buffer_bytes = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        if self.mode == SINK_INSERT_ALL:
+            self._slots = threading.BoundedSemaphore(self.max_in_flight)
+            self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight,
+                                                thread_name_prefix='streaming-upload')
+            self._futures = []
+            self._sink = None
+        else:
+            self._sink = open_sink(client, table_id, self.mode, transport,
+                                   batch_rows=flush_rows, batch_bytes=flush_bytes)
+            self._executor = None
+
+    @property
+    def all_or_nothing(self) -> bool:
+        """close() でエラーが返ったら1行も反映されていない（pending）"""
+        return self.mode == SINK_PENDING
+
+    # ---------- 受け取り ----------
+
+    def add(self, row: Dict[str, Any]) -> None:
+        self.add_rows([row])
+
+    def add_rows(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """行をバッファに追加（行数・バイト数のどちらかが上限に達したら送信）"""
+        if self._closed:
+            raise RuntimeError("close 済みのアップローダーには追加できません")
+        for row in rows:
+            size = row_bytes(row)
+            if self._buffer and self._buffer_bytes + size > self.flush_bytes:
+                self.flush()
+            self._buffer.append(row)
+            self._buffer_bytes += size
+            if len(self._buffer) >= self.flush_rows:
+                self.flush()
+
+    def flush(self) -> None:
+        """バッファを1チャンクとして送信（insert_all は空きができるまで待つ）"""
+        if not self._buffer:
+            return
+        chunk, self._buffer, self._buffer_bytes = self._buffer, [], 0
+        self.chunks_sent += 1
+        if self._sink is not None:
+            self._write_stream(chunk)
+            return
+        self._slots.acquire()
+        future = self._executor.submit(self._send_chunk, chunk, [uuid.uuid4().hex for _ in chunk])
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures = [f for f in self._futures if not f.done()] + [future]
+
+    # ---------- 送信 ----------
+
+    def _written(self, rows: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self.rows_written += len(rows)
+            if self.on_written is not None:
+                self.on_written(rows)
+
+    def _write_stream(self, chunk: List[Dict[str, Any]]) -> None:
+        try:
+            self._sink.write(chunk)
+            self._sink.flush()
+        except Exception as e:
+            self._record_failures(chunk, {i: [{'message': str(e)}] for i in range(len(chunk))})
+            return
+        self._written(chunk)
+
+    def _send_chunk(self, rows: List[Dict[str, Any]], row_ids: List[str]) -> None:
+        """1チャンクを送信し、失敗した行だけを再送"""
+        pending = list(range(len(rows)))
+        failures: Dict[int, Any] = {}   # 行番号 → 最後に受け取ったエラー
+        for attempt in range(self.max_retries + 1):
+            if not pending:
+                break
+            if attempt:
+                with self._lock:
+                    self.retries += 1
+                time.sleep(backoff_delay(attempt - 1, self.retry_delay))
+            try:
+                row_errors = self.client.insert_rows_json(self.table_id, [rows[i] for i in pending],
+                                                          row_ids=[row_ids[i] for i in pending],
+                                                          **self._insert_options)
+            except Exception as e:
+                if is_too_large(e) and len(pending) > 1:
+                    # 半分に分けて送り直す（それぞれが再送回数を持つ）
+                    self._record_failures(rows, {i: errors for i, errors in failures.items() if i not in pending})
+                    middle = len(pending) // 2
+                    for part in (pending[:middle], pending[middle:]):
+                        self._send_chunk([rows[i] for i in part], [row_ids[i] for i in part])
+                    return
+                failures.update({i: [{'message': str(e)}] for i in pending})
+                if classify_error(e) == ERROR_FATAL or is_too_large(e):
+                    break       # 1行だけで大きすぎる行は何度送っても通らない
+                continue
+
+            failed = {pending[error['index']]: error.get('errors', []) for error in row_errors or []}
+            self._written([rows[i] for i in pending if i not in failed])
+            retry = []
+            for index in pending:
+                if index not in failed:
+                    failures.pop(index, None)
+                    continue
+                failures[index] = failed[index]
+                reasons = {e.get('reason') for e in failed[index] if isinstance(e, dict)}
+                if reasons and reasons <= RETRYABLE_ROW_REASONS:
+                    retry.append(index)
+            pending = retry
+        self._record_failures(rows, failures)
+
+    def _record_failures(self, rows: List[Dict[str, Any]], failures: Dict[int, Any]) -> None:
+        if not failures:
+            return
+        with self._lock:
+            for index in sorted(failures):
+                self.failed_rows.append({'row': rows[index], 'errors': failures[index]})
+
+    # ---------- 終了 ----------
+
+    def close(self) -> List[Any]:
+        """
+        残りを送信して完了を待つ
+
+        Returns:
+            エラーのリスト（成功時は空。insert_rows_json の戻り値と同じく行ごとの
+            {'index', 'errors'} で、index は失敗行の通し番号）
+        """
+        if self._closed:
+            return self.errors
+        self.flush()
+        self._closed = True
+        if self._sink is not None:
+            stream_errors = self._sink.close()
+            if stream_errors:
+                self.errors.extend(stream_errors)
+        else:
+            for future in self._futures:
+                future.result()
+            self._executor.shutdown(wait=True)
+        self.errors.extend({'index': index, 'errors': failed['errors']}
+                           for index, failed in enumerate(self.failed_rows))
+        return self.errors
+
+    def __enter__(self) -> 'StreamingUploader':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        elif self._sink is not None:
+            self._sink.abort()
+            self._closed = True
+        else:
+            self._closed = True
+            self._executor.shutdown(wait=True)
@@ -0,0 +1,365 @@
+"""
+発行データの一括検証（宣言的なチェック + 結果テーブル）
+
+TableParserV4._validate_totals は1件の告示について「項目6の総額と別表の合計」を比べ、
+食い違えば警告を表示するだけだった。どの告示がどの不変条件に反しているかは残らない。
+
+本モジュールでは不変条件を CHECKS に1回だけ宣言し、パース済みの全行に対して
+pandas の列演算でまとめて評価する。違反は validation_results テーブルに1行ずつ記録し、
+チェックごとの結果（passed / failed / skipped と違反件数）は validation_status テーブルに
+実行ごと・チェックごとに1行記録する（違反の無い実行も run_id で確認できる）。
+
+チェックの宣言:
+    @register('check_name', '説明', severity='error', requires={'issuances': ['issue_amount']})
+    def check_xxx(frames, options):
+        ...
+        return 違反行の DataFrame（announcement_id, issuance_id, expected, actual, detail の一部）
+
+    frames は {'issuances': DataFrame, 'legal_basis': DataFrame（任意）}。
+    訂正の告示で置き換えられた発行（superseded_by の付いた行）は run_checks が除いてから渡す。
+    requires の表・列が無い場合、そのチェックは skipped として記録する。
+
+使用例:
+    from database.validation import run_checks
+
+    results, statuses = run_checks({'issuances': df}, run_id='20251031T...')
+    write_results(client, f"{project}.{dataset}.{RESULTS_TABLE}", results)
+    write_statuses(client, f"{project}.{dataset}.{STATUS_TABLE}", statuses)
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from database.issuance_summary import SUPERSEDED_COLUMN
+
+# 明細として扱う最小の発行額（1億円）。batch_direct_processing_v7_fixed7.py もここから import する
+MIN_AMOUNT = 100_000_000
+
+RESULTS_TABLE = 'validation_results'
+STATUS_TABLE = 'validation_status'
+
+SEVERITY_ERROR = 'error'
+SEVERITY_WARNING = 'warning'
+
+STATUS_PASSED = 'passed'
+STATUS_FAILED = 'failed'
+STATUS_SKIPPED = 'skipped'
+
+RESULT_COLUMNS = ['announcement_id', 'issuance_id', 'expected', 'actual', 'detail']
+
+# 和暦の元年 - 1
+ERA_OFFSETS = {'令和': 2018, '平成': 1988, '昭和': 1925}
+
+_ERA_DATE_PATTERN = r'(?P<era>令和|平成|昭和)(?P<year>元|\d+)年(?P<month>\d+)月(?P<day>\d+)日'
+
+
+class Check(NamedTuple):
+    """宣言されたチェック"""
+    name: str
+    description: str
+    severity: str
+    requires: Dict[str, Sequence[str]]
+    fn: Callable
+
+
+CHECKS: List[Check] = []
+
+
+def register(name: str, description: str, severity: str = SEVERITY_ERROR,
+             requires: Optional[Dict[str, Sequence[str]]] = None):
+    """チェックを CHECKS に登録するデコレータ"""
+    def decorator(fn):
+        CHECKS.append(Check(name, description, severity, requires or {'issuances': []}, fn))
+        return fn
+    return decorator
+
+
+# ========================================
+# 列の準備（ベクトル演算）
+# ========================================
+
+def era_to_datetime(series):
+    """「令和5年6月20日」形式の列を datetime に変換（変換できない値は NaT）"""
+    import pandas as pd
+
+    parts = series.fillna('').astype(str).str.extract(_ERA_DATE_PATTERN)
+    year = pd.to_numeric(parts['year'].replace('元', '1'), errors='coerce') + parts['era'].map(ERA_OFFSETS)
+    return pd.to_datetime(
+        pd.DataFrame({'year': year, 'month': pd.to_numeric(parts['month'], errors='coerce'),
+                      'day': pd.to_numeric(parts['day'], errors='coerce')}),
+        errors='coerce',
+    )
+
+
+def _column(df, names: Sequence[str]):
+    """候補のうち最初にある列（無ければ None）"""
+    return next((df[name] for name in names if name in df.columns), None)
+
+
+def issue_dates(df):
+    """発行日（発行日の列 → 告示IDの日付）"""
+    import pandas as pd
+
+    dates = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+    column = _column(df, ['issuance_date', 'issue_date'])
+    if column is not None:
+        dates = pd.to_datetime(column, errors='coerce')
+    if 'announcement_id' in df.columns:
+        from_id = pd.to_datetime(df['announcement_id'].astype(str).str[:8], format='%Y%m%d', errors='coerce')
+        dates = dates.fillna(from_id)
+    return dates
+
+
+def maturity_dates(df):
+    """償還日（日付の列 → 和暦テキストの列）"""
+    import pandas as pd
+
+    dates = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+    if 'maturity_date' in df.columns:
+        dates = pd.to_datetime(df['maturity_date'], errors='coerce')
+    if 'maturity_date_text' in df.columns:
+        dates = dates.fillna(era_to_datetime(df['maturity_date_text']))
+    return dates
+
+
+def _flag(df, column: str):
+    import pandas as pd
+
+    if column not in df.columns:
+        return pd.Series(False, index=df.index)
+    return df[column].fillna(False).astype(bool)
+
+
+def _violations(df, **columns):
+    """違反行を RESULT_COLUMNS の形にそろえる"""
+    import pandas as pd
+
+    out = pd.DataFrame(index=df.index)
+    for name in RESULT_COLUMNS:
+        value = columns.get(name)
+        if value is None and name in df.columns:
+            value = df[name]
+        out[name] = value
+    return out.reset_index(drop=True)
+
+
+# ========================================
+# チェック
+# ========================================
+
+@register('summary_matches_details',
+          '総額レコード（項目6）の金額と明細（別表）の合計が一致する',
+          requires={'issuances': ['announcement_id', 'issue_amount', 'is_summary_record']})
+def check_summary_matches_details(frames, options):
+    import pandas as pd
+
+    df = frames['issuances']
+    summary = _flag(df, 'is_summary_record')
+    amount = pd.to_numeric(df['issue_amount'], errors='coerce').fillna(0)
+    totals = pd.DataFrame({
+        'announcement_id': df['announcement_id'],
+        'summary_amount': amount.where(summary, 0),
+        'detail_amount': amount.where(~summary, 0),
+        'has_summary': summary,
+    }).groupby('announcement_id', as_index=False).agg(
+        summary_amount=('summary_amount', 'sum'), detail_amount=('detail_amount', 'sum'),
+        has_summary=('has_summary', 'any'))
+    bad = totals[totals['has_summary'] & (totals['detail_amount'] > 0)
+                 & (totals['summary_amount'] != totals['detail_amount'])]
+    return _violations(bad, expected=bad['summary_amount'], actual=bad['detail_amount'],
+                       detail='項目6の総額と別表の合計が不一致')
+
+
+@register('legal_basis_allocations_sum_to_total',
+          '発行根拠ごとの配分額の合計が発行額と一致する',
+          requires={'issuances': ['issuance_id', 'issue_amount'],
+                    'legal_basis': ['issuance_id', 'allocation_amount']})
+def check_allocations_sum_to_total(frames, options):
+    import pandas as pd
+
+    issuances = frames['issuances']
+    allocations = frames['legal_basis'].assign(
+        allocation_amount=lambda d: pd.to_numeric(d['allocation_amount'], errors='coerce').fillna(0)
+    ).groupby('issuance_id', as_index=False)['allocation_amount'].sum()
+    columns = ['issuance_id', 'issue_amount'] + (['announcement_id'] if 'announcement_id' in issuances.columns else [])
+    merged = issuances[columns].merge(allocations, on='issuance_id', how='inner')
+    amount = pd.to_numeric(merged['issue_amount'], errors='coerce').fillna(0)
+    tolerance = options.get('allocation_tolerance', 0)
+    bad = merged[(amount - merged['allocation_amount']).abs() > tolerance]
+    return _violations(bad, expected=pd.to_numeric(bad['issue_amount'], errors='coerce'),
+                       actual=bad['allocation_amount'], detail='配分額の合計が発行額と不一致')
+
+
+@register('maturity_after_issue',
+          '償還日が発行日より後である',
+          requires={'issuances': ['announcement_id']})
+def check_maturity_after_issue(frames, options):
+    df = frames['issuances']
+    issued, matures = issue_dates(df), maturity_dates(df)
+    bad_mask = issued.notna() & matures.notna() & (matures <= issued)
+    bad = df[bad_mask]
+    return _violations(bad, expected=issued[bad_mask].dt.strftime('> %Y-%m-%d'),
+                       actual=matures[bad_mask].dt.strftime('%Y-%m-%d'),
+                       detail='償還日が発行日以前')
+
+
+@register('amount_at_least_minimum',
+          '明細の発行額が最小金額（MIN_AMOUNT）以上である',
+          requires={'issuances': ['issue_amount']})
+def check_amount_at_least_minimum(frames, options):
+    import pandas as pd
+
+    df = frames['issuances']
+    minimum = options.get('min_amount', MIN_AMOUNT)
+    amount = pd.to_numeric(df['issue_amount'], errors='coerce')
+    bad_mask = ~_flag(df, 'is_summary_record') & (amount.isna() | (amount < minimum))
+    bad = df[bad_mask]
+    return _violations(bad, expected=f">= {minimum}", actual=amount[bad_mask],
+                       detail='発行額が最小金額未満または欠損')
+
+
+# ========================================
+# 実行
+# ========================================
+
+def _missing_requirements(check: Check, frames: Dict[str, Any]) -> List[str]:
+    missing = []
+    for table, columns in check.requires.items():
+        frame = frames.get(table)
+        if frame is None:
+            missing.append(table)
+            continue
+        missing.extend(f"{table}.{column}" for column in columns if column not in frame.columns)
+    return missing
+
+
+def run_checks(frames: Dict[str, Any], run_id: str, checks: Optional[Sequence[Check]] = None,
+               source_run_id: Optional[str] = None, **options) -> Tuple[Any, List[Dict[str, Any]]]:
+    """
+    チェックを一括実行
+
+    Args:
+        frames: {'issuances': DataFrame, 'legal_basis': DataFrame（任意）}
+        run_id: 検証の実行ID（結果テーブルの絞り込み用）
+        checks: 実行するチェック（省略時は CHECKS 全部）
+        source_run_id: 検証対象を取り込んだ実行ID（記録用）
+        **options: チェックへの設定（min_amount, allocation_tolerance）
+
+    Returns:
+        (違反の DataFrame, チェックごとの状態
+         [{run_id, source_run_id, check_name, severity, status, violations, detail, checked_at}])
+    """
+    import pandas as pd
+
+    frames = dict(frames)
+    issuances = frames.get('issuances')
+    if issuances is not None and SUPERSEDED_COLUMN in issuances.columns:
+        frames['issuances'] = issuances[issuances[SUPERSEDED_COLUMN].isna()]
+
+    checked_at = datetime.now(timezone.utc)
+    results, statuses = [], []
+    for check in (checks if checks is not None else CHECKS):
+        status = {'run_id': run_id, 'source_run_id': source_run_id, 'check_name': check.name,
+                  'severity': check.severity, 'checked_at': checked_at}
+        missing = _missing_requirements(check, frames)
+        if missing:
+            statuses.append(dict(status, status=STATUS_SKIPPED, violations=0,
+                                 detail=f"必要な列がありません: {', '.join(missing)}"))
+            continue
+        violations = check.fn(frames, options)
+        statuses.append(dict(status, status=STATUS_FAILED if len(violations) else STATUS_PASSED,
+                             violations=len(violations), detail=check.description))
+        if len(violations):
+            results.append(violations.assign(check_name=check.name, severity=check.severity))
+
+    columns = ['check_name', 'severity'] + RESULT_COLUMNS
+    report = pd.concat(results, ignore_index=True)[columns] if results else pd.DataFrame(columns=columns)
+    for column in ('expected', 'actual'):
+        report[column] = report[column].map(lambda value: None if pd.isna(value) else str(value))
+    return report.assign(run_id=run_id, source_run_id=source_run_id, checked_at=checked_at), statuses
+
+
+# ========================================
+# 結果テーブル
+# ========================================
+
+def results_schema() -> list:
+    """validation_results のスキーマ"""
+    from google.cloud import bigquery
+
+    return [
+        bigquery.SchemaField("run_id", "STRING", mode="REQUIRED", description="検証の実行ID"),
+        bigquery.SchemaField("source_run_id", "STRING", mode="NULLABLE", description="検証対象の取り込み実行ID"),
+        bigquery.SchemaField("check_name", "STRING", mode="REQUIRED"),
+        bigquery.SchemaField("severity", "STRING", mode="REQUIRED"),
+        bigquery.SchemaField("announcement_id", "STRING", mode="NULLABLE"),
+        bigquery.SchemaField("issuance_id", "STRING", mode="NULLABLE"),
+        bigquery.SchemaField("expected", "STRING", mode="NULLABLE"),
+        bigquery.SchemaField("actual", "STRING", mode="NULLABLE"),
+        bigquery.SchemaField("detail", "STRING", mode="NULLABLE"),
+        bigquery.SchemaField("checked_at", "TIMESTAMP", mode="REQUIRED"),
+    ]
+
+
+def status_schema() -> list:
+    """validation_status のスキーマ（実行ごと・チェックごとに1行）"""
+    from google.cloud import bigquery
+
+    return [
+        bigquery.SchemaField("run_id", "STRING", mode="REQUIRED", description="検証の実行ID"),
+        bigquery.SchemaField("source_run_id", "STRING", mode="NULLABLE", description="検証対象の取り込み実行ID"),
+        bigquery.SchemaField("check_name", "STRING", mode="REQUIRED"),
+        bigquery.SchemaField("severity", "STRING", mode="REQUIRED"),
+        bigquery.SchemaField("status", "STRING", mode="REQUIRED", description="passed / failed / skipped"),
+        bigquery.SchemaField("violations", "INT64", mode="REQUIRED", description="違反の件数"),
+        bigquery.SchemaField("detail", "STRING", mode="NULLABLE"),
+        bigquery.SchemaField("checked_at", "TIMESTAMP", mode="REQUIRED"),
+    ]
+
+
+def ensure_results_table(client, table_id: str) -> None:
+    """validation_results を作成（検証日で分割、run_id・チェック名でクラスタ）"""
+    from google.cloud import bigquery
+
+    table = bigquery.Table(table_id, schema=results_schema())
+    table.time_partitioning = bigquery.TimePartitioning(
+        type_=bigquery.TimePartitioningType.DAY, field="checked_at")
+    table.clustering_fields = ['run_id', 'check_name']
+    client.create_table(table, exists_ok=True)
+
+
+def write_results(client, table_id: str, report) -> int:
+    """違反を結果テーブルに追記（ロードジョブ、課金なし）"""
+    from google.cloud import bigquery
+
+    if not len(report):
+        return 0
+    ensure_results_table(client, table_id)
+    rows = report.assign(checked_at=report['checked_at'].map(lambda t: t.isoformat()))
+    rows = rows.astype(object).where(rows.notna(), None).to_dict('records')
+    job_config = bigquery.LoadJobConfig(
+        schema=results_schema(),
+        write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+    )
+    client.load_table_from_json(rows, table_id, job_config=job_config).result()
+    return len(rows)
+
+
+def write_statuses(client, table_id: str, statuses: List[Dict[str, Any]]) -> int:
+    """チェックごとの結果を状態テーブルに追記（違反の無い実行も1チェック1行を残す）"""
+    from google.cloud import bigquery
+
+    if not statuses:
+        return 0
+    table = bigquery.Table(table_id, schema=status_schema())
+    table.time_partitioning = bigquery.TimePartitioning(
+        type_=bigquery.TimePartitioningType.DAY, field="checked_at")
+    table.clustering_fields = ['run_id', 'check_name']
+    client.create_table(table, exists_ok=True)
+    rows = [dict(status, checked_at=status['checked_at'].isoformat()) for status in statuses]
+    job_config = bigquery.LoadJobConfig(
+        schema=status_schema(),
+        write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+    )
+    client.load_table_from_json(rows, table_id, job_config=job_config).result()
+    return len(rows)
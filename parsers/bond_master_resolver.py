@@ -0,0 +1,323 @@
+"""
+bond_master_id リゾルバ
+
+銘柄名（または債券種類）と償還期間から bonds_master の bond_id を決定する。
+
+これまでは各スクリプトが順序付き辞書の部分文字列判定を持っており、
+'10年' が '変動・10年' より先に判定されるなど、順序依存の誤判定があった。
+本モジュールは bonds_master の行から1つのリゾルバを構築する。
+
+アプローチ:
+1. 銘柄名を最長一致優先の結合済み正規表現で1回だけトークン化
+   - CLIMATE : クライメート・トランジション / GX
+   - TANKI   : 国庫短期証券 / 短期証券 / 短期
+   - BUKKA   : 物価連動
+   - RATE    : 固定 / 変動
+   - YEARS   : X年（全角数字可）
+2. トークンから特徴 (種別, 年限, 金利区分) を求める
+3. bonds_master の各行も同じ方法で特徴に変換し、辞書を構築
+   - (種別, 年限, 金利区分) の完全一致
+   - (種別, None, 金利区分) / (種別, None, None) は該当行が1つの場合のみ登録
+4. 国庫短期証券は償還日数で判定（270日以上は1年物、それ以外は6ヶ月物）
+5. 銘柄名に年限が無い場合は償還日数から整数年を推定（maturity_years_from_days）
+
+参照は辞書引きのみで、銘柄名ごとのトークン化結果はキャッシュする。
+
+bond_id の体系は DEFAULT_BOND_ROWS（BOND_KENSETSU_10Y 等）の1つだけで、アップローダー・ローダー・
+修正スクリプトはすべて get_bond_master_resolver() を使う。bonds_master.csv がある場合も同じ体系で
+なければならず、既定の行と異なる bond_id に解決される場合や、同じ特徴を持つ行がある場合は
+BondMasterError を送出する（ファイルの有無で書き込まれる bond_id が変わらないようにする）。
+"""
+
+import csv
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# マスタディレクトリ（config/settings.py の DATA_PATHS["masters_dir"] と同じ既定値）
+DEFAULT_MASTERS_DIR = Path(__file__).parent.parent / "data" / "masters"
+
+# 種別
+KIND_CLIMATE = 'climate'   # クライメート・トランジション利付国債（GX）
+KIND_TANKI = 'tanki'       # 国庫短期証券
+KIND_BUKKA = 'bukka'       # 物価連動国債
+KIND_KOJIN = 'kojin'       # 個人向け国債（固定・変動）
+KIND_REGULAR = 'regular'   # 利付国債
+
+# 国庫短期証券: この日数以上は1年物
+TANKI_ONE_YEAR_THRESHOLD_DAYS = 270
+
+# 年限の推定に使う1年の日数
+DAYS_PER_YEAR = 365
+
+# 償還日は利払日（3・6・9・12月の20日）に揃うため、名目の年限より数ヶ月早いことがある。
+# 不足がこの日数以内なら満期の年限とみなし、それ以外は切り捨てる
+# （round(日数 / 365.25) では x.5 年付近で年限が1年ずれる）
+MATURITY_SHORTFALL_DAYS = 100
+
+# 銘柄名トークン（同じグループ内は長い表記を先に並べる）
+BOND_TOKEN_PATTERN = re.compile(
+    r'(?P<CLIMATE>クライメート・トランジション|クライメート|トランジション|GX)'
+    r'|(?P<TANKI>国庫短期証券|短期証券|短期|TANKI)'
+    r'|(?P<BUKKA>物価連動)'
+    r'|(?P<RATE>固定|変動)'
+    r'|(?P<YEARS>[0-9０-９]+)年'
+)
+
+_ZENKAKU_DIGITS = str.maketrans('０１２３４５６７８９', '0123456789')
+
+
+# 銘柄マスタ（bonds_master の bond_id 体系。bonds_master.csv・upload_issues_to_bigquery.py と共通）
+DEFAULT_BOND_ROWS = [
+    {'bond_id': 'BOND_KENSETSU_2Y', 'bond_name': '利付国庫債券（2年）', 'maturity_years': 2},
+    {'bond_id': 'BOND_KENSETSU_5Y', 'bond_name': '利付国庫債券（5年）', 'maturity_years': 5},
+    {'bond_id': 'BOND_KENSETSU_10Y', 'bond_name': '利付国庫債券（10年）', 'maturity_years': 10},
+    {'bond_id': 'BOND_KENSETSU_20Y', 'bond_name': '利付国庫債券（20年）', 'maturity_years': 20},
+    {'bond_id': 'BOND_KENSETSU_30Y', 'bond_name': '利付国庫債券（30年）', 'maturity_years': 30},
+    {'bond_id': 'BOND_KENSETSU_40Y', 'bond_name': '利付国庫債券（40年）', 'maturity_years': 40},
+    {'bond_id': 'BOND_KOJIN_FIXED_3Y', 'bond_name': '個人向け利付国庫債券（固定・3年）', 'maturity_years': 3},
+    {'bond_id': 'BOND_KOJIN_FIXED_5Y', 'bond_name': '個人向け利付国庫債券（固定・5年）', 'maturity_years': 5},
+    {'bond_id': 'BOND_KOJIN_VARIABLE_10Y', 'bond_name': '個人向け利付国庫債券（変動・10年）', 'maturity_years': 10},
+    {'bond_id': 'BOND_BUKKA_10Y', 'bond_name': '利付国庫債券（物価連動・10年）', 'maturity_years': 10},
+    {'bond_id': 'BOND_GX_5Y', 'bond_name': 'クライメート・トランジション利付国債（5年）', 'maturity_years': 5},
+    {'bond_id': 'BOND_GX_10Y', 'bond_name': 'クライメート・トランジション利付国債（10年）', 'maturity_years': 10},
+    {'bond_id': 'BOND_TANKI_6M', 'bond_name': '国庫短期証券（6ヶ月）', 'maturity_years': 0.5},
+    {'bond_id': 'BOND_TANKI_1Y', 'bond_name': '国庫短期証券（1年）', 'maturity_years': 1},
+]
+
+
+def maturity_years_from_days(maturity_days: int) -> int:
+    """償還日数から年限（整数年）を推定（名目より MATURITY_SHORTFALL_DAYS 日以内の不足は切り上げる）"""
+    return int((maturity_days + MATURITY_SHORTFALL_DAYS) // DAYS_PER_YEAR)
+
+
+class BondMasterError(ValueError):
+    """bonds_master の行が同じ特徴を持つ、または bond_id の体系が既定と食い違う"""
+
+
+class BondFeatures(NamedTuple):
+    """銘柄の特徴 (種別, 年限, 金利区分)"""
+    kind: str
+    years: Optional[int]
+    rate: Optional[str]
+
+
+def tokenize_bond_name(text: str) -> Tuple[Optional[str], Optional[int], Optional[str]]:
+    """
+    銘柄名を1回だけ走査して (種別, 年限, 金利区分) を返す
+
+    種別の優先順位: CLIMATE > TANKI > BUKKA > KOJIN（固定・変動）> REGULAR
+    """
+    kinds = set()
+    years = None
+    rate = None
+
+    for match in BOND_TOKEN_PATTERN.finditer(text or ''):
+        group = match.lastgroup
+        if group == 'YEARS':
+            if years is None:
+                years = int(match.group('YEARS').translate(_ZENKAKU_DIGITS))
+        elif group == 'RATE':
+            rate = rate or match.group('RATE')
+        else:
+            kinds.add(group)
+
+    if 'CLIMATE' in kinds:
+        kind = KIND_CLIMATE
+    elif 'TANKI' in kinds:
+        kind = KIND_TANKI
+    elif 'BUKKA' in kinds:
+        kind = KIND_BUKKA
+    elif rate:
+        kind = KIND_KOJIN
+    else:
+        kind = KIND_REGULAR
+
+    return kind, years, rate
+
+
+class BondMasterResolver:
+    """bonds_master の行から構築した bond_master_id リゾルバ"""
+
+    def __init__(self, rows: Iterable[Dict]):
+        """
+        Args:
+            rows: bonds_master の行（bond_id, bond_name, bond_type, maturity_type, maturity_years）
+        """
+        self._exact: Dict[BondFeatures, str] = {}
+        self._fallback: Dict[BondFeatures, str] = {}
+        self._tanki_short: Optional[str] = None
+        self._tanki_long: Optional[str] = None
+        self._maturity_years: Dict[str, float] = {}
+        self._cache: Dict[str, Tuple[Optional[str], Optional[int], Optional[str]]] = {}
+
+        self._compile([dict(row) for row in rows])
+
+    # ---------- 構築 ----------
+
+    def _compile(self, rows: List[Dict]) -> None:
+        """
+        Raises:
+            BondMasterError: 有効な行のうち2つ以上が同じ特徴（種別, 年限, 金利区分）を持つ場合
+        """
+        by_partial: Dict[BondFeatures, List[str]] = {}
+        tanki: List[Tuple[float, str]] = []
+
+        for row in rows:
+            bond_id = row.get('bond_id')
+            if not bond_id or str(row.get('is_active', True)).strip().lower() in ('false', '0'):
+                continue
+
+            text = ' '.join(str(row.get(col) or '') for col in ('maturity_type', 'bond_name', 'bond_type'))
+            kind, years, rate = tokenize_bond_name(text)
+
+            maturity_years = row.get('maturity_years')
+            maturity_years = float(maturity_years) if maturity_years not in (None, '') else None
+            if maturity_years is not None:
+                self._maturity_years[bond_id] = maturity_years
+
+            if kind == KIND_TANKI:
+                tanki.append((maturity_years if maturity_years is not None else 0.0, bond_id))
+                continue
+
+            if maturity_years is not None and maturity_years >= 1:
+                years = int(maturity_years)
+
+            features = BondFeatures(kind, years, rate)
+            if features in self._exact and self._exact[features] != bond_id:
+                raise BondMasterError(f"同じ特徴 {tuple(features)} を持つ行があります: "
+                                      f"{self._exact[features]}, {bond_id}")
+            self._exact[features] = bond_id
+
+            for partial in (BondFeatures(kind, None, rate), BondFeatures(kind, None, None)):
+                ids = by_partial.setdefault(partial, [])
+                if bond_id not in ids:
+                    ids.append(bond_id)
+
+        # 年限・金利区分を省略した参照は、該当行が1つの場合のみ解決する
+        for partial, ids in by_partial.items():
+            if len(ids) == 1:
+                self._fallback[partial] = ids[0]
+
+        if tanki:
+            tanki.sort()
+            if len({years for years, _ in tanki}) < len({bond_id for _, bond_id in tanki}):
+                raise BondMasterError(f"国庫短期証券の行の償還年数が重複しています: {sorted(tanki)}")
+            self._tanki_short = tanki[0][1]
+            self._tanki_long = tanki[-1][1]
+
+    # ---------- 参照 ----------
+
+    def features(self, bond_name: str) -> Tuple[Optional[str], Optional[int], Optional[str]]:
+        """銘柄名のトークン化結果（キャッシュ付き）"""
+        cached = self._cache.get(bond_name)
+        if cached is None:
+            cached = tokenize_bond_name(bond_name)
+            self._cache[bond_name] = cached
+        return cached
+
+    def resolve(self, bond_name: str, maturity_days: Optional[int] = None) -> Optional[str]:
+        """
+        銘柄名と償還日数から bond_master_id を決定
+
+        Args:
+            bond_name: 銘柄名または債券種類（例: 利付国庫債券（10年）、変動・10年、短期証券）
+            maturity_days: 発行日から償還日までの日数（不明の場合は None）
+
+        Returns:
+            bond_id（決定できない場合は None）
+        """
+        if not bond_name:
+            return None
+
+        kind, years, rate = self.features(bond_name)
+
+        if kind == KIND_TANKI:
+            if maturity_days and maturity_days >= TANKI_ONE_YEAR_THRESHOLD_DAYS:
+                return self._tanki_long
+            return self._tanki_short
+
+        # 銘柄名に年限が無い場合は償還日数から推定
+        if years is None and maturity_days:
+            years = maturity_years_from_days(maturity_days)
+
+        features = BondFeatures(kind, years, rate)
+        return (self._exact.get(features)
+                or self._fallback.get(BondFeatures(kind, None, rate))
+                or self._fallback.get(BondFeatures(kind, None, None)))
+
+    def maturity_years(self, bond_id: str) -> Optional[float]:
+        """bond_id の償還年数（この resolver の体系に無い bond_id・年数の無い行は None）"""
+        return self._maturity_years.get(bond_id)
+
+    def resolve_many(self, issuances: Iterable[Tuple[str, Optional[int]]]) -> List[Optional[str]]:
+        """
+        複数の発行情報をまとめて解決
+
+        Args:
+            issuances: (銘柄名, 償還日数) のリスト
+
+        Returns:
+            bond_id のリスト（入力と同じ順序）
+        """
+        return [self.resolve(bond_name, maturity_days) for bond_name, maturity_days in issuances]
+
+    # ---------- 読み込み元 ----------
+
+    def scheme_mismatches(self, rows: Iterable[Dict] = DEFAULT_BOND_ROWS) -> List[Tuple[str, Optional[str]]]:
+        """
+        既定の行（bond_id の体系）と異なる bond_id に解決される銘柄
+
+        Returns:
+            [(既定の bond_id, この resolver の bond_id), ...]
+        """
+        mismatches = []
+        for row in rows:
+            days = int(round(float(row['maturity_years']) * DAYS_PER_YEAR))
+            resolved = self.resolve(row['bond_name'], days)
+            if resolved != row['bond_id']:
+                mismatches.append((row['bond_id'], resolved))
+        return mismatches
+
+    @classmethod
+    def from_master_csv(cls, masters_dir: Optional[Path] = None) -> Optional['BondMasterResolver']:
+        """data/masters/bonds_master.csv から構築（ファイルが無い場合は None）"""
+        csv_file = Path(masters_dir or DEFAULT_MASTERS_DIR) / "bonds_master.csv"
+        if not csv_file.exists():
+            return None
+        with open(csv_file, 'r', encoding='utf-8-sig', newline='') as f:
+            return cls(csv.DictReader(f))
+
+    @classmethod
+    def from_bigquery(cls, client, project_id: str, dataset_id: str) -> 'BondMasterResolver':
+        """BigQuery の bonds_master から構築"""
+        query = f"SELECT * FROM `{project_id}.{dataset_id}.bonds_master`"
+        return cls(dict(row.items()) for row in client.query(query).result())
+
+
+_DEFAULT_RESOLVER = None
+
+
+def load_bond_master_resolver(masters_dir: Optional[Path] = None) -> BondMasterResolver:
+    """
+    bonds_master.csv（無ければ DEFAULT_BOND_ROWS）からリゾルバを構築
+
+    Raises:
+        BondMasterError: bonds_master.csv の bond_id の体系が DEFAULT_BOND_ROWS と異なる場合
+    """
+    resolver = BondMasterResolver.from_master_csv(masters_dir)
+    if resolver is None:
+        return BondMasterResolver(DEFAULT_BOND_ROWS)
+    mismatches = resolver.scheme_mismatches()
+    if mismatches:
+        details = ', '.join(f"{expected} → {actual}" for expected, actual in mismatches)
+        raise BondMasterError(f"bonds_master.csv の bond_id が既定の体系と異なります: {details}")
+    return resolver
+
+
+def get_bond_master_resolver() -> BondMasterResolver:
+    """プロセス内で共有するリゾルバ（すべての取り込み・修正スクリプトで同じ bond_id の体系）"""
+    global _DEFAULT_RESOLVER
+    if _DEFAULT_RESOLVER is None:
+        _DEFAULT_RESOLVER = load_bond_master_resolver()
+    return _DEFAULT_RESOLVER
@@ -0,0 +1,327 @@
+"""
+パーサーの出力・処理時間の回帰検知（ゴールデン出力）
+
+tests/ の既存スクリプトは G:\\ 上の実ファイルを読んで結果を表示するだけで、ほとんど検証しない。
+本モジュールはリポジトリに置いたフィクスチャ（tests/golden/fixtures/*.txt）を各段階
+（STAGES）のパーサーに通し、
+
+- 期待出力（tests/golden/expected/<フィクスチャ>.json）と1段階ずつ比べる
+- 段階ごとの処理時間の中央値を、記録済みの基準（tests/golden/budgets.json）と比べる
+
+ことで、パーサーの高速化などの変更が出力を変えていないこと・遅くしていないことを確かめる。
+
+期待出力・基準時間の更新（出力の変更が意図どおりの場合）:
+    python scripts/04_utilities/update_golden_outputs.py --write
+    python scripts/04_utilities/update_golden_outputs.py --write --budgets-only
+
+時間の比較は「基準 × (1 + tolerance) を超え、かつ差が min_regression_ms 以上」で回帰とする。
+基準はマシンの速さの目安（calibrate）と一緒に記録し、実行中のマシンとの比で補正してから比べる。
+共有の CI など時間が安定しない環境では JGB_GOLDEN_TIMING=off で時間の比較を止められる。
+"""
+
+import difflib
+import importlib
+import json
+import logging
+import os
+import re
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+PROJECT_ROOT = Path(__file__).parent.parent
+GOLDEN_DIR = PROJECT_ROOT / 'tests' / 'golden'
+FIXTURES_DIR = GOLDEN_DIR / 'fixtures'
+EXPECTED_DIR = GOLDEN_DIR / 'expected'
+BUDGETS_PATH = GOLDEN_DIR / 'budgets.json'
+
+DEFAULT_REPEAT = 7
+DEFAULT_INNER = 20                # 1標本でフィクスチャを何巡するか（1巡は1ミリ秒前後と短いため）
+DEFAULT_TOLERANCE = 1.0           # 基準の 2 倍まで許容（共有マシンの揺れを吸収）
+DEFAULT_MIN_REGRESSION_MS = 0.2   # これ未満の差は計測の揺れとみなす
+
+TIMING_ENV = 'JGB_GOLDEN_TIMING'        # off / 0 / false で時間の比較を止める
+TOLERANCE_ENV = 'JGB_GOLDEN_TOLERANCE'  # 許容倍率の上書き（例: 1.0 = 2倍まで）
+
+
+class Fixture(NamedTuple):
+    fixture_id: str     # ファイル名（拡張子なし）
+    text: str
+
+
+class Stage(NamedTuple):
+    name: str
+    description: str
+    run: Callable[[Fixture], Any]
+
+
+STAGES: List[Stage] = []
+
+
+def stage(name: str, description: str):
+    """段階を STAGES に登録するデコレータ"""
+    def decorator(fn):
+        STAGES.append(Stage(name, description, fn))
+        return fn
+    return decorator
+
+
+# ========================================
+# 段階（各パーサーの入口）
+# ========================================
+
+@stage('announcement_info', '告示番号・日付・別表の位置（KanpoParser）')
+def _announcement_info(fixture: Fixture) -> Any:
+    from parsers.kanpo_parser import KanpoParser
+
+    parser = KanpoParser()
+    return {'info': parser.extract_announcement_info(fixture.text),
+            'tables': parser.extract_tables(fixture.text)}
+
+
+@stage('numbered_list', '番号付きリスト形式（NumberedListParser）')
+def _numbered_list(fixture: Fixture) -> Any:
+    from parsers.numbered_list_parser import NumberedListParser
+
+    return NumberedListParser(fixture.text).parse()
+
+
+@stage('table_horizontal', '横並び別表形式（TableParserV4）')
+def _table_horizontal(fixture: Fixture) -> Any:
+    from parsers.table_parser import TableParserV4
+
+    parser = TableParserV4()
+    return parser.extract(fixture.text) if parser.can_parse(fixture.text) else None
+
+
+@stage('vertical_table', '縦並び別表形式（VerticalTableParser）')
+def _vertical_table(fixture: Fixture) -> Any:
+    from parsers.vertical_table_parser import VerticalTableParser
+
+    return VerticalTableParser(fixture.text).parse()
+
+
+@stage('legal_basis', '発行根拠法令（単一パス・トークナイザ）')
+def _legal_basis(fixture: Fixture) -> Any:
+    from parsers.law_reference_tokenizer import extract_legal_bases_tokenized
+
+    return extract_legal_bases_tokenized(fixture.text)
+
+
+@stage('simple_parse', '簡易パーサー（batch_direct_processing_v7_fixed7.simple_parse）')
+def _simple_parse(fixture: Fixture) -> Any:
+    runner = _import_ingestion_module('batch_direct_processing_v7_fixed7')
+    text = runner.normalize_text(fixture.text)
+    return {'pattern': runner.identify_pattern_simple(text)[0],
+            'items': runner.simple_parse(text, fixture.fixture_id)}
+
+
+def _import_ingestion_module(name: str):
+    ingestion_dir = str(PROJECT_ROOT / 'scripts' / '01_data_ingestion')
+    if ingestion_dir not in sys.path:
+        sys.path.insert(0, ingestion_dir)
+    return importlib.import_module(name)
+
+
+# ========================================
+# フィクスチャ・期待出力
+# ========================================
+
+def load_fixtures(fixtures_dir: Path = FIXTURES_DIR) -> List[Fixture]:
+    return [Fixture(path.stem, path.read_text(encoding='utf-8'))
+            for path in sorted(Path(fixtures_dir).glob('*.txt'))]
+
+
+def canonical(value: Any) -> Any:
+    """JSON で保存・比較できる形に（dict のキーは文字列、日付などは str）"""
+    return json.loads(json.dumps(value, ensure_ascii=False, sort_keys=True, default=str))
+
+
+def _dump(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, indent=2)
+
+
+def run_outputs(fixtures: Sequence[Fixture], stages: Sequence[Stage] = None) -> Dict[str, Dict[str, Any]]:
+    """{フィクスチャ: {段階: 出力}}（例外は出力として記録する）"""
+    outputs: Dict[str, Dict[str, Any]] = {}
+    with _quiet_logging():
+        for fixture in fixtures:
+            outputs[fixture.fixture_id] = {}
+            for st in stages or STAGES:
+                try:
+                    value = canonical(st.run(fixture))
+                except Exception as e:
+                    value = {'error': f"{type(e).__name__}: {e}"}
+                outputs[fixture.fixture_id][st.name] = value
+    return outputs
+
+
+def expected_path(fixture_id: str, expected_dir: Path = EXPECTED_DIR) -> Path:
+    return Path(expected_dir) / f"{fixture_id}.json"
+
+
+def load_expected(fixture_ids: Sequence[str], expected_dir: Path = EXPECTED_DIR) -> Dict[str, Optional[Dict[str, Any]]]:
+    expected = {}
+    for fixture_id in fixture_ids:
+        path = expected_path(fixture_id, expected_dir)
+        expected[fixture_id] = json.loads(path.read_text(encoding='utf-8')) if path.exists() else None
+    return expected
+
+
+def write_expected(outputs: Dict[str, Dict[str, Any]], expected_dir: Path = EXPECTED_DIR) -> List[Path]:
+    Path(expected_dir).mkdir(parents=True, exist_ok=True)
+    paths = []
+    for fixture_id, stages in outputs.items():
+        path = expected_path(fixture_id, expected_dir)
+        path.write_text(_dump(stages) + '\n', encoding='utf-8')
+        paths.append(path)
+    return paths
+
+
+def compare_outputs(expected: Dict[str, Optional[Dict[str, Any]]],
+                    actual: Dict[str, Dict[str, Any]]) -> List[Tuple[str, str, str]]:
+    """期待出力と異なる (フィクスチャ, 段階, 差分) の一覧"""
+    mismatches = []
+    for fixture_id, stages in actual.items():
+        stored = expected.get(fixture_id)
+        if stored is None:
+            mismatches.append((fixture_id, '*', '期待出力がありません（update_golden_outputs.py で作成）'))
+            continue
+        for name in sorted(set(stages) | set(stored)):
+            if name not in stored:
+                mismatches.append((fixture_id, name, '期待出力に無い段階です'))
+            elif name not in stages:
+                mismatches.append((fixture_id, name, '段階が実行されていません'))
+            elif stages[name] != stored[name]:
+                diff = difflib.unified_diff(_dump(stored[name]).splitlines(), _dump(stages[name]).splitlines(),
+                                            'expected', 'actual', lineterm='', n=2)
+                mismatches.append((fixture_id, name, '\n'.join(list(diff)[:40])))
+    return mismatches
+
+
+# ========================================
+# 処理時間
+# ========================================
+
+def time_stages(fixtures: Sequence[Fixture], stages: Sequence[Stage] = None,
+                repeat: int = DEFAULT_REPEAT, inner: int = DEFAULT_INNER) -> Dict[str, float]:
+    """
+    段階ごとの処理時間（全フィクスチャを1巡するミリ秒の中央値）
+
+    1標本は全フィクスチャを inner 巡した時間（1巡あたりに換算）で、repeat 標本の中央値をとる。
+    """
+    timings = {}
+    with _quiet_logging():
+        for st in stages or STAGES:
+            for fixture in fixtures:    # 1回目（import・正規表現のコンパイル）は計測しない
+                _run_quietly(st, fixture)
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                for _ in range(inner):
+                    for fixture in fixtures:
+                        _run_quietly(st, fixture)
+                samples.append((time.perf_counter() - start) * 1000 / inner)
+            timings[st.name] = statistics.median(samples)
+    return timings
+
+
+def calibrate(repeat: int = DEFAULT_REPEAT) -> float:
+    """
+    マシンの速さの目安（固定の処理のミリ秒の中央値）
+
+    基準を記録したマシンと実行中のマシンの速さの比で基準時間を補正するために使う。
+    """
+    pattern = re.compile(r'(\d+)\s*(兆|億|円)')
+    text = '額面金額で2兆6,000億円及び522,100,000,000円　' * 200
+
+    def workload() -> None:
+        counts: Dict[str, int] = {}
+        for _ in range(20):
+            for match in pattern.finditer(text):
+                counts[match.group(2)] = counts.get(match.group(2), 0) + len(match.group(1))
+
+    workload()      # 1回目は計測しない
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        workload()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def _run_quietly(st: Stage, fixture: Fixture) -> None:
+    try:
+        st.run(fixture)
+    except Exception:
+        pass
+
+
+@contextmanager
+def _quiet_logging():
+    """パーサーの INFO ログを止める（出力・時間に混ざらないように）"""
+    previous = logging.root.manager.disable
+    logging.disable(logging.INFO)
+    try:
+        yield
+    finally:
+        logging.disable(previous)
+
+
+def timing_enabled() -> bool:
+    return os.environ.get(TIMING_ENV, '').lower() not in ('off', '0', 'false')
+
+
+def load_budgets(path: Path = BUDGETS_PATH) -> Dict[str, Any]:
+    path = Path(path)
+    if not path.exists():
+        return {'tolerance': DEFAULT_TOLERANCE, 'min_regression_ms': DEFAULT_MIN_REGRESSION_MS,
+                'repeat': DEFAULT_REPEAT, 'inner': DEFAULT_INNER, 'calibration_ms': None, 'stages': {}}
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def write_budgets(timings: Dict[str, float], calibration_ms: float, path: Path = BUDGETS_PATH,
+                  previous: Optional[Dict[str, Any]] = None) -> Path:
+    """基準時間を書き出す（許容倍率などの設定は前回の値を引き継ぐ）"""
+    previous = previous or load_budgets(path)
+    budgets = {
+        'tolerance': previous.get('tolerance', DEFAULT_TOLERANCE),
+        'min_regression_ms': previous.get('min_regression_ms', DEFAULT_MIN_REGRESSION_MS),
+        'repeat': previous.get('repeat', DEFAULT_REPEAT),
+        'inner': previous.get('inner', DEFAULT_INNER),
+        'calibration_ms': round(calibration_ms, 3),
+        'recorded_with': f"Python {sys.version.split()[0]} / {sys.platform}",
+        'stages': {name: {'median_ms': round(ms, 4)} for name, ms in timings.items()},
+    }
+    Path(path).write_text(_dump(budgets) + '\n', encoding='utf-8')
+    return Path(path)
+
+
+def compare_timings(budgets: Dict[str, Any], timings: Dict[str, float],
+                    calibration_ms: Optional[float] = None,
+                    tolerance: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    基準より遅くなった段階の一覧
+
+    calibration_ms を渡すと、記録時との速さの比で基準時間を補正してから比べる。
+    """
+    if tolerance is None:
+        tolerance = float(os.environ.get(TOLERANCE_ENV, budgets.get('tolerance', DEFAULT_TOLERANCE)))
+    min_regression_ms = budgets.get('min_regression_ms', DEFAULT_MIN_REGRESSION_MS)
+    scale = 1.0
+    if calibration_ms and budgets.get('calibration_ms'):
+        scale = calibration_ms / budgets['calibration_ms']
+
+    regressions = []
+    for name, current_ms in timings.items():
+        baseline = budgets.get('stages', {}).get(name)
+        if not baseline:
+            continue
+        baseline_ms = baseline['median_ms'] * scale
+        if current_ms > baseline_ms * (1 + tolerance) and current_ms - baseline_ms >= min_regression_ms:
+            regressions.append({'stage': name, 'baseline_ms': baseline_ms, 'current_ms': current_ms,
+                                'ratio': current_ms / baseline_ms if baseline_ms else float('inf')})
+    return regressions
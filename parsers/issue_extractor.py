@@ -17,12 +17,14 @@ try:
     from .table_parser import TableParser
     from .vertical_table_parser import VerticalTableParser
     from .numbered_list_parser import NumberedListParser
+    from .parse_cache import cached_parse_file
 except ImportError:
     import sys
     sys.path.insert(0, str(Path(__file__).parent.parent))
     from parsers.table_parser import TableParser
     from parsers.vertical_table_parser import VerticalTableParser
     from parsers.numbered_list_parser import NumberedListParser
+    from parsers.parse_cache import cached_parse_file
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +39,9 @@ class IssueExtractor:
     3. 縦並び形式で試行
     """
     
+    # パース結果キャッシュのバージョン（抽出ロジックを変えたら上げる）
+    PARSER_VERSION = '2'
+    
     def __init__(self, notice_text: str):
         """
         Args:
@@ -140,11 +145,13 @@ class IssueExtractor:
             logger.error(f"ファイルが見つかりません: {filepath}")
             return []
         
-        with open(filepath, 'r', encoding='utf-8') as f:
-            notice_text = f.read()
-        
-        extractor = IssueExtractor(notice_text)
-        return extractor.extract_issues()
+        # パース結果キャッシュ経由（内容が同じファイルは再パースしない）
+        return cached_parse_file(
+            filepath,
+            'IssueExtractor',
+            IssueExtractor.PARSER_VERSION,
+            lambda data: IssueExtractor(data.decode('utf-8')).extract_issues()
+        )
 
 
 # テスト用コード
@@ -11,6 +11,14 @@ from typing import Dict, List, Optional
 from datetime import datetime
 import logging
 
+# 相対インポートと絶対インポートの切り替え
+try:
+    from .parse_cache import cached_parse_file
+except ImportError:
+    import sys
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from parsers.parse_cache import cached_parse_file
+
 # ロギング設定
 logging.basicConfig(
     level=logging.INFO,
@@ -31,6 +39,9 @@ class KanpoParser:
     5. 構造化データとして返却
     """
     
+    # パース結果キャッシュのバージョン（抽出ロジックを変えたら上げる）
+    PARSER_VERSION = '1'
+    
     # 正規表現パターン
     PATTERNS = {
         'kanpo_number': r'(?:号外)?第\d+号',
@@ -123,50 +134,63 @@ class KanpoParser:
                 logger.error(f"ファイルが見つかりません: {filepath}")
                 return None
             
-            # ファイル読み込み
-            with open(filepath, 'r', encoding=self.encoding) as f:
-                text = f.read()
-            
-            logger.info(f"ファイル読み込み完了: {filepath.name}")
-            
-            # ファイル名から情報を抽出
-            filename_info = self.parse_filename(filepath.name)
-            
-            # 告示情報の抽出
-            announcement_info = self.extract_announcement_info(text)
+            # ファイル読み込み・解析（パース結果キャッシュ経由）
+            # ファイル名からも情報を抽出するため、ファイル名とエンコーディングもキーに含める
+            result = cached_parse_file(
+                filepath,
+                'KanpoParser',
+                self.PARSER_VERSION,
+                lambda data: self._parse_text(filepath.name, data.decode(self.encoding)),
+                variant=(filepath.name, self.encoding)
+            )
             
-            # ファイル名と本文の情報をマージ（ファイル名を優先）
-            announcement_number = filename_info['announcement_number'] or announcement_info['announcement_number']
-            announcement_date = filename_info['announce_date'] or announcement_info['kanpo_date']
+            # キャッシュヒット時も解析日時は今回の呼び出し時刻にする
+            result['parsed_at'] = datetime.now().isoformat()
             
-            # 別表の抽出
-            tables = self.extract_tables(text)
+            logger.info(f"ファイル読み込み完了: {filepath.name}")
             
             # 統計更新
             self.stats['files_processed'] += 1
-            if announcement_number:
+            if result['announcement_number']:
                 self.stats['announcements_found'] += 1
-            self.stats['tables_extracted'] += len(tables)
+            self.stats['tables_extracted'] += len(result['tables'])
             
-            # フラットな構造で返却
-            return {
-                'source_file': filepath.name,
-                'issue_date': filename_info['issue_date'],
-                'announcement_number': announcement_number,
-                'announcement_date': announcement_date,
-                'ministry': announcement_info['ministry'],
-                'title': announcement_info.get('title'),
-                'kanpo_number': announcement_info.get('kanpo_number'),
-                'content': text,
-                'tables': tables,
-                'parsed_at': datetime.now().isoformat()
-            }
+            return result
             
         except Exception as e:
             logger.error(f"ファイル解析エラー: {filepath} - {str(e)}")
             self.stats['errors'] += 1
             return None
     
+    def _parse_text(self, filename: str, text: str) -> Dict:
+        """告示本文とファイル名から構造化データを作成"""
+        # ファイル名から情報を抽出
+        filename_info = self.parse_filename(filename)
+        
+        # 告示情報の抽出
+        announcement_info = self.extract_announcement_info(text)
+        
+        # ファイル名と本文の情報をマージ（ファイル名を優先）
+        announcement_number = filename_info['announcement_number'] or announcement_info['announcement_number']
+        announcement_date = filename_info['announce_date'] or announcement_info['kanpo_date']
+        
+        # 別表の抽出
+        tables = self.extract_tables(text)
+        
+        # フラットな構造で返却
+        return {
+            'source_file': filename,
+            'issue_date': filename_info['issue_date'],
+            'announcement_number': announcement_number,
+            'announcement_date': announcement_date,
+            'ministry': announcement_info['ministry'],
+            'title': announcement_info.get('title'),
+            'kanpo_number': announcement_info.get('kanpo_number'),
+            'content': text,
+            'tables': tables,
+            'parsed_at': datetime.now().isoformat()
+        }
+    
     def extract_announcement_info(self, text: str) -> Dict:
         """告示情報を抽出"""
         info = {
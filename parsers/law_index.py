@@ -0,0 +1,539 @@
+"""
+法令分類インデックス
+
+(法令名, 条, 項) → law_id / article_id / category / mof_category を O(1) で引く。
+
+これまで法令 → 国債種別の対応は
+- universal_announcement_parser の BOND_TYPE_MAPPING（normalize_law_key + classify_bond_type の分岐）
+- IssuanceDataLoader._parse_legal_basis（law_id / article_id の if 連鎖）
+に重複して記述されていた。本モジュールは laws_master / law_articles_master の行から
+1つの辞書を構築し、プロセス内で1回だけ読み込んで共有する。
+
+読み込み順（get_law_index）:
+1. ローカルスナップショット（data/snapshots/law_index_<version>.json の最新版）
+   - 保存時のマスタCSVのハッシュ（source_hash）が現在のCSVと一致する場合のみ使う
+   - 一致しなければ 2 / 3 から作り直し、新しいスナップショットを保存する
+2. data/masters/laws_master.csv, law_articles_master.csv
+3. 組み込みの既定行（DEFAULT_LAW_ROWS / DEFAULT_ARTICLE_ROWS）
+
+スナップショットの作成:
+    python parsers/law_index.py --from-csv
+    python parsers/law_index.py --from-bigquery
+"""
+
+import csv
+import hashlib
+import json
+import re
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+# 相対インポートと絶対インポートの切り替え
+try:
+    from .legal_basis_extractor_v3 import LegalArticleParser
+    from .law_name_automaton import LawNameAutomaton
+except ImportError:
+    import sys
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from parsers.legal_basis_extractor_v3 import LegalArticleParser
+    from parsers.law_name_automaton import LawNameAutomaton
+
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_MASTERS_DIR = PROJECT_ROOT / "data" / "masters"
+DEFAULT_SNAPSHOT_DIR = PROJECT_ROOT / "data" / "snapshots"
+
+# スナップショット形式のバージョン（形式を変えたら上げる）
+LAW_INDEX_SCHEMA_VERSION = 1
+
+# 照合レベル
+MATCH_EXACT = 'exact'        # (法令名, 条, 項) が一致
+MATCH_ARTICLE = 'article'    # (法令名, 条) が一致（項は最小のもの）
+MATCH_LAW = 'law'            # 法令名のみ一致（法令内の分類が一意な場合のみ）
+
+
+# ========================================
+# 組み込みの既定行（マスタが無い環境用）
+# ========================================
+
+DEFAULT_LAW_ROWS = [
+    {'law_id': 'LAW_ZAISEI', 'law_name': '財政法', 'law_number': '昭和22年法律第34号'},
+    {'law_id': 'LAW_ZAISEI_YUSHI', 'law_name': '財政融資資金法', 'law_number': '昭和26年法律第100号'},
+    {'law_id': 'LAW_TOKUBETSU', 'law_name': '特別会計に関する法律', 'law_number': '平成19年法律第23号'},
+    {'law_id': 'LAW_TOKUREIKOUSAI_H24',
+     'law_name': '財政運営に必要な財源の確保を図るための公債の発行の特例に関する法律',
+     'law_number': '平成24年法律第101号'},
+    {'law_id': 'LAW_GX', 'law_name': '脱炭素成長型経済構造への円滑な移行の推進に関する法律',
+     'law_number': '令和5年法律第32号'},
+    {'law_id': 'LAW_FUKKO',
+     'law_name': '東日本大震災からの復興のための施策を実施するために必要な財源の確保に関する特別措置法',
+     'law_number': '平成23年法律第117号'},
+    {'law_id': 'LAW_JOHO', 'law_name': '情報処理の促進に関する法律', 'law_number': ''},
+    {'law_id': 'LAW_KODOMO', 'law_name': '子ども・子育て支援法', 'law_number': ''},
+]
+
+DEFAULT_ARTICLE_ROWS = [
+    # 財政法
+    {'article_id': 'ART_ZAISEI_4_1', 'law_id': 'LAW_ZAISEI', 'article_number': '第4条', 'paragraph_number': '第1項',
+     'category': '建設国債', 'mof_category': '4条国債', 'description': '公共事業費、出資金及び貸付金の財源'},
+    {'article_id': 'ART_ZAISEI_4_5', 'law_id': 'LAW_ZAISEI', 'article_number': '第4条', 'paragraph_number': '第5項',
+     'category': '借換債', 'mof_category': '借換債', 'description': '国債の償還のための起債'},
+    {'article_id': 'ART_ZAISEI_5', 'law_id': 'LAW_ZAISEI', 'article_number': '第5条', 'paragraph_number': '',
+     'category': '特例国債（赤字国債）', 'mof_category': '特例国債', 'description': '特例法による公債（歳入補填）'},
+    {'article_id': 'ART_ZAISEI_7_1', 'law_id': 'LAW_ZAISEI', 'article_number': '第7条', 'paragraph_number': '第1項',
+     'category': '政府短期証券（財務省証券）', 'mof_category': '政府短期証券', 'description': '財務省証券'},
+    # 財政融資資金法
+    {'article_id': 'ART_ZAISEI_YUSHI_9_1', 'law_id': 'LAW_ZAISEI_YUSHI', 'article_number': '第9条', 'paragraph_number': '第1項',
+     'category': '政府短期証券（財政融資資金証券）', 'mof_category': '政府短期証券', 'description': '財政融資資金証券'},
+    # 特別会計に関する法律
+    {'article_id': 'ART_TOKUBETSU_46_1', 'law_id': 'LAW_TOKUBETSU', 'article_number': '第46条', 'paragraph_number': '第1項',
+     'category': '財投債', 'mof_category': '財投債', 'description': '財政投融資特別会計の国債'},
+    {'article_id': 'ART_TOKUBETSU_47_1', 'law_id': 'LAW_TOKUBETSU', 'article_number': '第47条', 'paragraph_number': '第1項',
+     'category': '前倒債', 'mof_category': '財投債', 'description': '財政投融資特別会計の前倒債'},
+    {'article_id': 'ART_TOKUBETSU_62_1', 'law_id': 'LAW_TOKUBETSU', 'article_number': '第62条', 'paragraph_number': '第1項',
+     'category': '財投債', 'mof_category': '財投債', 'description': '財政投融資特別会計の国債'},
+    {'article_id': 'ART_TOKUBETSU_83_1', 'law_id': 'LAW_TOKUBETSU', 'article_number': '第83条', 'paragraph_number': '第1項',
+     'category': '政府短期証券（外国為替資金証券）', 'mof_category': '政府短期証券', 'description': '外国為替資金証券'},
+    {'article_id': 'ART_TOKUBETSU_94_2', 'law_id': 'LAW_TOKUBETSU', 'article_number': '第94条', 'paragraph_number': '第2項',
+     'category': '政府短期証券（石油証券）', 'mof_category': '政府短期証券', 'description': '石油証券'},
+    {'article_id': 'ART_TOKUBETSU_94_4', 'law_id': 'LAW_TOKUBETSU', 'article_number': '第94条', 'paragraph_number': '第4項',
+     'category': '政府短期証券（原子力損害賠償支援証券）', 'mof_category': '政府短期証券', 'description': '原子力損害賠償支援証券'},
+    {'article_id': 'ART_TOKUBETSU_95_1', 'law_id': 'LAW_TOKUBETSU', 'article_number': '第95条', 'paragraph_number': '第1項',
+     'category': '政府短期証券（石油証券・原子力損害賠償支援証券）', 'mof_category': '政府短期証券',
+     'description': '石油証券・原子力損害賠償支援証券'},
+    {'article_id': 'ART_TOKUBETSU_136_1', 'law_id': 'LAW_TOKUBETSU', 'article_number': '第136条', 'paragraph_number': '第1項',
+     'category': '政府短期証券（食糧証券）', 'mof_category': '政府短期証券', 'description': '食糧証券'},
+    {'article_id': 'ART_TOKUBETSU_137_1', 'law_id': 'LAW_TOKUBETSU', 'article_number': '第137条', 'paragraph_number': '第1項',
+     'category': '政府短期証券（食糧証券）', 'mof_category': '政府短期証券', 'description': '食糧証券'},
+    # 特例公債法
+    {'article_id': 'ART_TOKUREIKOUSAI_H24_2_1', 'law_id': 'LAW_TOKUREIKOUSAI_H24', 'article_number': '第2条', 'paragraph_number': '第1項',
+     'category': '特例国債（赤字国債）', 'mof_category': '特例国債', 'description': '特例法による公債（歳入補填）'},
+    # GX推進法
+    {'article_id': 'ART_GX_7_1', 'law_id': 'LAW_GX', 'article_number': '第7条', 'paragraph_number': '第1項',
+     'category': 'GX経済移行債', 'mof_category': 'GX経済移行債', 'description': '脱炭素成長型経済構造移行債'},
+    # 復興財源確保法
+    {'article_id': 'ART_FUKKO_7', 'law_id': 'LAW_FUKKO', 'article_number': '第7条', 'paragraph_number': '',
+     'category': '復興債', 'mof_category': '復興債', 'description': '東日本大震災復興財源'},
+    # その他
+    {'article_id': 'ART_JOHO_69_1', 'law_id': 'LAW_JOHO', 'article_number': '第69条', 'paragraph_number': '第1項'},
+    {'article_id': 'ART_KODOMO_71_26_1', 'law_id': 'LAW_KODOMO', 'article_number': '第71条の26', 'paragraph_number': '第1項'},
+]
+
+
+# ========================================
+# 値の変換
+# ========================================
+
+_ARTICLE_RE = re.compile(r'第?([0-9０-９一二三四五六七八九十百千]+)条?(?:の([0-9０-９一二三四五六七八九十百千]+))?')
+_PARAGRAPH_RE = re.compile(r'第?([0-9０-９一二三四五六七八九十百千]+)項?')
+
+ArticleKey = Union[int, str]
+
+
+def parse_article_number(value: Any) -> Optional[ArticleKey]:
+    """
+    条番号を正規化（"第4条" → 4、"第71条の26" → "71の26"）
+
+    枝番号付きの条は "本条の枝番" の文字列、それ以外は int で返す
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, int):
+        return value
+    match = _ARTICLE_RE.fullmatch(str(value).strip())
+    if not match:
+        return None
+    article = LegalArticleParser.normalize_number(match.group(1))
+    if match.group(2):
+        return f"{article}の{LegalArticleParser.normalize_number(match.group(2))}"
+    return article
+
+
+def parse_paragraph_number(value: Any) -> Optional[int]:
+    """項番号を正規化（"第1項" → 1、空 → None）"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, int):
+        return value
+    match = _PARAGRAPH_RE.fullmatch(str(value).strip())
+    if not match:
+        return None
+    return LegalArticleParser.normalize_number(match.group(1))
+
+
+def _parse_date(value: Any) -> Optional[date]:
+    """DATE列の値（date / 'YYYY-MM-DD' / 空）を date に変換"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def _is_active(row: Dict) -> bool:
+    """is_active 列の判定（未設定は有効）"""
+    value = row.get('is_active')
+    if value is None or value == '':
+        return True
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() not in ('false', '0')
+
+
+def _serializable(value: Any) -> Any:
+    """スナップショット保存用に日付を文字列化"""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+# ========================================
+# インデックス本体
+# ========================================
+
+class LawIndexEntry(NamedTuple):
+    """インデックスの1エントリ"""
+    law_id: str
+    article_id: str
+    law_name: str
+    article: Optional[ArticleKey]
+    paragraph: Optional[int]
+    category: Optional[str]
+    mof_category: Optional[str]
+    description: Optional[str]
+    effective_from: Optional[date]
+    effective_to: Optional[date]
+
+    def is_effective(self, as_of: Optional[date]) -> bool:
+        """基準日が有効期間内か（基準日なしは常に有効）"""
+        if as_of is None:
+            return True
+        if self.effective_from and as_of < self.effective_from:
+            return False
+        if self.effective_to and as_of > self.effective_to:
+            return False
+        return True
+
+
+class LawIndex:
+    """(法令名, 条, 項) をキーとする法令分類インデックス"""
+
+    def __init__(self, law_rows: Iterable[Dict], article_rows: Iterable[Dict], source: str = 'rows'):
+        """
+        Args:
+            law_rows: laws_master の行
+            article_rows: law_articles_master の行
+                category / mof_category / description 列が無い場合は既定行から補完する
+            source: 読み込み元（スナップショットに記録）
+        """
+        self.law_rows = [dict(row) for row in law_rows]
+        self.article_rows = [dict(row) for row in article_rows]
+        self.source = source
+        self.version = self._compute_version()
+
+        self._by_key: Dict[Tuple[str, Optional[ArticleKey], Optional[int]], List[LawIndexEntry]] = {}
+        self._by_article: Dict[Tuple[str, Optional[ArticleKey]], List[LawIndexEntry]] = {}
+        self._by_law: Dict[str, List[LawIndexEntry]] = {}
+        self.law_names: Dict[str, str] = {}   # 表記（法令名・法令番号） → 法令名
+        self._law_automaton = None
+        self._build()
+
+    # ---------- 構築 ----------
+
+    def _compute_version(self) -> str:
+        """行内容のハッシュ（スナップショットのバージョン）"""
+        payload = json.dumps(
+            {'laws': self.law_rows, 'articles': self.article_rows},
+            ensure_ascii=False, sort_keys=True, default=_serializable
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:12]
+
+    def _build(self) -> None:
+        defaults = _default_classification()
+
+        laws = {}
+        for row in self.law_rows:
+            if not _is_active(row) or not row.get('law_id') or not row.get('law_name'):
+                continue
+            laws[row['law_id']] = row
+            self.law_names[row['law_name']] = row['law_name']
+            if row.get('law_number'):
+                self.law_names.setdefault(row['law_number'], row['law_name'])
+
+        for row in self.article_rows:
+            law = laws.get(row.get('law_id'))
+            if law is None or not _is_active(row):
+                continue
+
+            law_name = law['law_name']
+            article = parse_article_number(row.get('article_number'))
+            paragraph = parse_paragraph_number(row.get('paragraph_number'))
+            fallback = defaults.get((law_name, article, paragraph), {})
+
+            # 法令と条項の有効期間の重なりを採用
+            froms = [d for d in (_parse_date(law.get('effective_from')), _parse_date(row.get('effective_from'))) if d]
+            tos = [d for d in (_parse_date(law.get('effective_to')), _parse_date(row.get('effective_to'))) if d]
+
+            entry = LawIndexEntry(
+                law_id=law['law_id'],
+                article_id=row.get('article_id'),
+                law_name=law_name,
+                article=article,
+                paragraph=paragraph,
+                category=row.get('category') or row.get('bond_type') or fallback.get('category'),
+                mof_category=row.get('mof_category') or fallback.get('mof_category'),
+                description=row.get('description') or fallback.get('description') or row.get('purpose'),
+                effective_from=max(froms) if froms else None,
+                effective_to=min(tos) if tos else None,
+            )
+            self._by_key.setdefault((law_name, article, paragraph), []).append(entry)
+            self._by_article.setdefault((law_name, article), []).append(entry)
+            self._by_law.setdefault(law_name, []).append(entry)
+
+        # 同一キー内は有効期間開始の新しい順、条内は項の小さい順
+        for entries in self._by_key.values():
+            entries.sort(key=lambda e: e.effective_from or date.min, reverse=True)
+        for entries in self._by_article.values():
+            entries.sort(key=lambda e: (e.paragraph or 0, -(e.effective_from or date.min).toordinal()))
+
+    # ---------- 参照 ----------
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._by_key.values())
+
+    @staticmethod
+    def _first_effective(entries: List[LawIndexEntry], as_of: Optional[date]) -> Optional[LawIndexEntry]:
+        for entry in entries:
+            if entry.is_effective(as_of):
+                return entry
+        return None
+
+    def lookup(self, law_name: str, article: Optional[ArticleKey], paragraph: Optional[int],
+               as_of: Union[date, str, None] = None) -> Optional[LawIndexEntry]:
+        """
+        (法令名, 条, 項) の完全一致で参照
+
+        Args:
+            law_name: 法令名（法令番号も可）
+            article: 条（int、枝番号付きは "71の26"）
+            paragraph: 項（項の無い条項は None）
+            as_of: 基準日（有効期間の判定に使用、省略時は判定しない）
+        """
+        law_name = self.law_names.get(law_name, law_name)
+        entries = self._by_key.get((law_name, article, paragraph))
+        if not entries:
+            return None
+        return self._first_effective(entries, _parse_date(as_of))
+
+    def resolve(self, law_name: str, article: Optional[ArticleKey], paragraph: Optional[int],
+                as_of: Union[date, str, None] = None) -> Tuple[Optional[LawIndexEntry], Optional[str]]:
+        """
+        段階的に参照（完全一致 → 同じ条 → 同じ法令）
+
+        同じ法令へのフォールバックは、その法令内の mof_category が1種類の場合のみ行う。
+
+        Returns:
+            (エントリ, 照合レベル)  見つからない場合は (None, None)
+        """
+        as_of = _parse_date(as_of)
+        law_name = self.law_names.get(law_name, law_name)
+
+        entry = self._first_effective(self._by_key.get((law_name, article, paragraph), []), as_of)
+        if entry:
+            return entry, MATCH_EXACT
+
+        entry = self._first_effective(self._by_article.get((law_name, article), []), as_of)
+        if entry:
+            return entry, MATCH_ARTICLE
+
+        law_entries = [e for e in self._by_law.get(law_name, []) if e.is_effective(as_of)]
+        if law_entries and len({e.mof_category for e in law_entries}) == 1:
+            return law_entries[0], MATCH_LAW
+
+        return None, None
+
+    def find_law_name(self, text: str) -> Optional[str]:
+        """テキスト中で最後に現れる法令名（法令番号）を正式名称で返す"""
+        if self._law_automaton is None:
+            self._law_automaton = LawNameAutomaton(self.law_names)
+        hits = self._law_automaton.find_all(text)
+        return hits[-1].law if hits else None
+
+    # ---------- スナップショット ----------
+
+    def save_snapshot(self, snapshot_dir: Optional[Path] = None,
+                      masters_dir: Optional[Path] = None) -> Path:
+        """ローカルスナップショットを保存（ファイル名にバージョンを含む）
+
+        保存時点のマスタCSVのハッシュを source_hash として記録する。
+        BigQuery から作ったスナップショットも、CSVが更新されるまでは有効。
+        """
+        snapshot_dir = Path(snapshot_dir or DEFAULT_SNAPSHOT_DIR)
+        snapshot_dir.mkdir(parents=True, exist_ok=True)
+        path = snapshot_dir / f"law_index_{self.version}.json"
+
+        payload = {
+            'schema_version': LAW_INDEX_SCHEMA_VERSION,
+            'version': self.version,
+            'source': self.source,
+            'source_hash': master_source_hash(masters_dir),
+            'built_at': datetime.now(timezone.utc).isoformat(),
+            'laws': self.law_rows,
+            'articles': self.article_rows,
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2, default=_serializable)
+        return path
+
+    @classmethod
+    def load_snapshot(cls, path: Path, source_hash: Optional[str] = None) -> 'LawIndex':
+        """スナップショットから読み込み（source_hash 指定時は保存時のマスタCSVと照合）"""
+        with open(path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        if payload.get('schema_version') != LAW_INDEX_SCHEMA_VERSION:
+            raise ValueError(f"スナップショット形式が異なります: {path}")
+        if source_hash is not None and payload.get('source_hash') != source_hash:
+            raise ValueError(f"マスタCSVがスナップショット作成後に更新されています: {path}")
+        return cls(payload['laws'], payload['articles'], source=f"snapshot:{payload.get('source')}")
+
+    # ---------- 読み込み元 ----------
+
+    @classmethod
+    def from_defaults(cls) -> 'LawIndex':
+        """組み込みの既定行から構築"""
+        return cls(DEFAULT_LAW_ROWS, DEFAULT_ARTICLE_ROWS, source='default')
+
+    @classmethod
+    def from_master_csv(cls, masters_dir: Optional[Path] = None) -> Optional['LawIndex']:
+        """data/masters の CSV から構築（ファイルが無い場合は None）"""
+        masters_dir = Path(masters_dir or DEFAULT_MASTERS_DIR)
+        laws_csv = masters_dir / "laws_master.csv"
+        articles_csv = masters_dir / "law_articles_master.csv"
+        if not laws_csv.exists() or not articles_csv.exists():
+            return None
+
+        def read_rows(path):
+            with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+                return list(csv.DictReader(f))
+
+        return cls(read_rows(laws_csv), read_rows(articles_csv), source='csv')
+
+    @classmethod
+    def from_bigquery(cls, client, project_id: str, dataset_id: str) -> 'LawIndex':
+        """BigQuery の laws_master / law_articles_master から構築"""
+        def fetch(table_name):
+            query = f"SELECT * FROM `{project_id}.{dataset_id}.{table_name}`"
+            return [dict(row.items()) for row in client.query(query).result()]
+
+        return cls(fetch('laws_master'), fetch('law_articles_master'), source='bigquery')
+
+
+# ========================================
+# プロセス共有インスタンス
+# ========================================
+
+_DEFAULT_CLASSIFICATION = None
+_LAW_INDEX = None
+
+
+def _default_classification() -> Dict[Tuple, Dict]:
+    """既定行の分類（マスタ行に category / mof_category が無い場合の補完用）"""
+    global _DEFAULT_CLASSIFICATION
+    if _DEFAULT_CLASSIFICATION is None:
+        law_names = {row['law_id']: row['law_name'] for row in DEFAULT_LAW_ROWS}
+        _DEFAULT_CLASSIFICATION = {
+            (law_names[row['law_id']],
+             parse_article_number(row['article_number']),
+             parse_paragraph_number(row['paragraph_number'])): row
+            for row in DEFAULT_ARTICLE_ROWS
+        }
+    return _DEFAULT_CLASSIFICATION
+
+
+def master_source_hash(masters_dir: Optional[Path] = None) -> str:
+    """マスタCSVの内容のハッシュ（CSVが無い場合は既定行のハッシュ）"""
+    masters_dir = Path(masters_dir or DEFAULT_MASTERS_DIR)
+    digest = hashlib.sha256()
+    csv_paths = [masters_dir / "laws_master.csv", masters_dir / "law_articles_master.csv"]
+    if all(path.exists() for path in csv_paths):
+        for path in csv_paths:
+            digest.update(path.name.encode('utf-8'))
+            digest.update(path.read_bytes())
+    else:
+        digest.update(json.dumps(
+            {'laws': DEFAULT_LAW_ROWS, 'articles': DEFAULT_ARTICLE_ROWS},
+            ensure_ascii=False, sort_keys=True, default=_serializable
+        ).encode('utf-8'))
+    return f"sha256:{digest.hexdigest()}"
+
+
+def latest_snapshot(snapshot_dir: Optional[Path] = None) -> Optional[Path]:
+    """最新のスナップショット（更新日時が最も新しいもの）"""
+    snapshot_dir = Path(snapshot_dir or DEFAULT_SNAPSHOT_DIR)
+    if not snapshot_dir.exists():
+        return None
+    snapshots = sorted(snapshot_dir.glob("law_index_*.json"), key=lambda p: p.stat().st_mtime)
+    return snapshots[-1] if snapshots else None
+
+
+def get_law_index(reload: bool = False, snapshot_dir: Optional[Path] = None,
+                  masters_dir: Optional[Path] = None) -> LawIndex:
+    """プロセス内で共有する法令インデックスを取得（初回のみ構築）"""
+    global _LAW_INDEX
+    if _LAW_INDEX is not None and not reload:
+        return _LAW_INDEX
+
+    index = None
+    source_hash = master_source_hash(masters_dir)
+    snapshot = latest_snapshot(snapshot_dir)
+    if snapshot:
+        try:
+            index = LawIndex.load_snapshot(snapshot, source_hash=source_hash)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️  法令インデックスのスナップショットを読み込めません: {snapshot} ({e})")
+
+    if index is None:
+        index = LawIndex.from_master_csv(masters_dir)
+        if index is None:
+            index = LawIndex.from_defaults()
+        if snapshot:
+            # 古いスナップショットを作り直し、次回以降は新しい方を読む
+            try:
+                index.save_snapshot(snapshot_dir, masters_dir)
+            except OSError as e:
+                print(f"⚠️  法令インデックスのスナップショットを保存できません: {e}")
+
+    _LAW_INDEX = index
+    return _LAW_INDEX
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='法令インデックスのスナップショットを作成')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--from-csv', action='store_true', help='data/masters の CSV から作成')
+    source.add_argument('--from-bigquery', action='store_true', help='BigQuery のマスタから作成')
+    parser.add_argument('--project-id', default='jgb2023')
+    parser.add_argument('--dataset-id', default='20251019')
+    args = parser.parse_args()
+
+    if args.from_bigquery:
+        from google.cloud import bigquery
+        index = LawIndex.from_bigquery(bigquery.Client(project=args.project_id), args.project_id, args.dataset_id)
+    elif args.from_csv:
+        index = LawIndex.from_master_csv()
+        if index is None:
+            raise SystemExit(f"❌ マスタCSVが見つかりません: {DEFAULT_MASTERS_DIR}")
+    else:
+        index = LawIndex.from_defaults()
+
+    path = index.save_snapshot()
+    print(f"✅ 法令インデックス: {len(index)} エントリ (source={index.source}, version={index.version})")
+    print(f"   {path}")
@@ -0,0 +1,179 @@
+"""
+法律名の多パターン照合（Aho–Corasick）
+
+LegalArticleParser.parse_articles は、法律名ごとに他の全法律名を str.find して
+セクション境界を求めていた（法律数の2乗回の走査）。
+本モジュールは全法律名を1つのオートマトンにまとめ、
+「発行の根拠法律及びその条項」セクションを1回走査するだけで
+全ての法律名の出現位置を求める。
+
+アプローチ:
+1. 法律名（表記 → 正式名称）からトライ木と失敗リンクを構築
+2. テキストを1文字ずつ遷移し、出現位置を全て列挙
+3. 重なった出現は左端優先・最長一致で1つに絞る
+4. 出現位置の昇順に、次の法律名の直前までをその法律のセクションとする
+
+法律名の一覧は laws_master（data/masters/laws_master.csv）から読み込める。
+法律を追加してもオートマトンの状態が増えるだけで、走査はテキスト長に比例する。
+"""
+
+import csv
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+# マスタディレクトリ（config/settings.py の DATA_PATHS["masters_dir"] と同じ既定値）
+DEFAULT_MASTERS_DIR = Path(__file__).parent.parent / "data" / "masters"
+
+
+class LawNameHit(NamedTuple):
+    """法律名の出現 (開始位置, 終了位置, 表記, 正式名称)"""
+    start: int
+    end: int
+    alias: str
+    law: str
+
+
+class LawNameAutomaton:
+    """法律名の Aho–Corasick オートマトン"""
+
+    def __init__(self, aliases: Union[Dict[str, str], Iterable[str]]):
+        """
+        Args:
+            aliases: {表記: 正式名称} または表記のリスト（表記 = 正式名称）
+        """
+        if not isinstance(aliases, dict):
+            aliases = {alias: alias for alias in aliases}
+        self.aliases = dict(aliases)
+
+        # 状態0がルート。goto[状態][文字] → 次の状態
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # 各状態で終了する表記（失敗リンク先の出力も含む）
+        self._output: List[List[str]] = [[]]
+
+        for alias in self.aliases:
+            if alias:
+                self._add(alias)
+        self._build_failure_links()
+
+    def __len__(self) -> int:
+        return len(self.aliases)
+
+    def _add(self, alias: str) -> None:
+        """トライ木に表記を追加"""
+        state = 0
+        for char in alias:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(alias)
+
+    def _build_failure_links(self) -> None:
+        """幅優先で失敗リンクを構築"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state].extend(self._output[self._fail[next_state]])
+
+    def iter_matches(self, text: str):
+        """全ての出現（重なりを含む）を (開始位置, 終了位置, 表記) で列挙"""
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for alias in output[state]:
+                yield index + 1 - len(alias), index + 1, alias
+
+    def find_all(self, text: str) -> List[LawNameHit]:
+        """
+        法律名の出現を位置順に返す（重なりは左端優先・最長一致で除外）
+
+        Returns:
+            List of LawNameHit（start の昇順）
+        """
+        matches = sorted(self.iter_matches(text), key=lambda m: (m[0], -m[1]))
+
+        hits = []
+        last_end = 0
+        for start, end, alias in matches:
+            if start < last_end:
+                continue
+            hits.append(LawNameHit(start, end, alias, self.aliases[alias]))
+            last_end = end
+        return hits
+
+    def segment(self, text: str) -> List[Tuple[str, str]]:
+        """
+        テキストを法律名の出現位置で分割
+
+        Returns:
+            List of (正式名称, セクション文字列)
+            セクションは法律名の開始位置から次の法律名の直前まで
+        """
+        hits = self.find_all(text)
+        sections = []
+        for i, hit in enumerate(hits):
+            next_start = hits[i + 1].start if i + 1 < len(hits) else len(text)
+            sections.append((hit.law, text[hit.start:next_start]))
+        return sections
+
+
+# ========================================
+# laws_master からの読み込み
+# ========================================
+
+def _zenkaku_digits(text: str) -> str:
+    """半角数字を全角数字に変換（法律番号の全角表記用）"""
+    return text.translate(str.maketrans('0123456789', '０１２３４５６７８９'))
+
+
+def load_law_aliases(masters_dir: Optional[Path] = None) -> Dict[str, str]:
+    """
+    laws_master.csv から {表記: 法令名} を読み込む
+
+    法令名（law_name）と法令番号（law_number、全角数字表記を含む）を表記として登録する。
+    is_active が false の法令は除外する。
+
+    Args:
+        masters_dir: マスタディレクトリ（省略時は data/masters）
+
+    Returns:
+        {表記: 法令名}（ファイルが存在しない場合は空の辞書）
+    """
+    csv_file = Path(masters_dir or DEFAULT_MASTERS_DIR) / "laws_master.csv"
+    if not csv_file.exists():
+        return {}
+
+    aliases = {}
+    with open(csv_file, 'r', encoding='utf-8-sig', newline='') as f:
+        for row in csv.DictReader(f):
+            law_name = (row.get('law_name') or '').strip()
+            if not law_name:
+                continue
+            if (row.get('is_active') or 'true').strip().lower() in ('false', '0'):
+                continue
+
+            aliases[law_name] = law_name
+            law_number = (row.get('law_number') or '').strip()
+            if law_number:
+                aliases.setdefault(law_number, law_name)
+                aliases.setdefault(_zenkaku_digits(law_number), law_name)
+
+    return aliases
@@ -0,0 +1,249 @@
+"""
+発行根拠法令の単一パス・トークナイザ
+
+LEGAL_BASIS_PATTERNS 方式（根拠ごとに `法律名.*?第X条第Y項` を全文に
+re.search する方式）を置き換える。
+
+アプローチ:
+1. 告示文を1つの結合済み正規表現で1回だけ走査し、トークン列を得る
+   - LAW     : 法律の正式名称・略称・法律番号（例: 平成24年法律第101号）
+   - SAME    : 「同法」（直前の法律を引き継ぐ）
+   - ARTICLE : 第X条(第Y項)
+   - STOP    : 「。」（文の区切り。法律の文脈をリセット）
+2. 直前の法律に条項を紐付け、(法律名, 条, 項, span) のタプルを出力
+3. 分類は ARTICLE_TO_LEGAL_BASIS の辞書引きのみ
+
+`.*?` と違い、文（「。」）をまたいだ紐付けや、法律名から遠く離れた
+条項への紐付けは行わない。処理時間はテキスト長に比例する。
+"""
+
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# 相対インポートと絶対インポートの切り替え
+try:
+    from .legal_basis_extractor_v3 import ARTICLE_TO_LEGAL_BASIS, LegalArticleParser
+except ImportError:
+    import sys
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from parsers.legal_basis_extractor_v3 import ARTICLE_TO_LEGAL_BASIS, LegalArticleParser
+
+
+# ========================================
+# 法律名・法律番号 → 正式名称
+# ========================================
+
+TOKUBETSU_KAIKEI = "特別会計に関する法律"
+ZAISEI = "財政法"
+ZAISEI_YUSHI = "財政融資資金法"
+TOKUREI_KOUSAI = "財政運営に必要な財源の確保を図るための公債の発行の特例に関する法律"
+GX_SUISHIN = "脱炭素成長型経済構造への円滑な移行の推進に関する法律"
+FUKKO_ZAIGEN = "東日本大震災からの復興のための施策を実施するために必要な財源の確保に関する特別措置法"
+
+# 表記（半角数字で記述）→ 正式名称
+# 全角数字の表記は LAW_TOKEN_PATTERN の構築時に吸収する
+LAW_ALIASES = {
+    TOKUBETSU_KAIKEI: TOKUBETSU_KAIKEI,
+    "特別会計法": TOKUBETSU_KAIKEI,
+    "平成19年法律第23号": TOKUBETSU_KAIKEI,
+    ZAISEI: ZAISEI,
+    "昭和22年法律第34号": ZAISEI,
+    ZAISEI_YUSHI: ZAISEI_YUSHI,
+    TOKUREI_KOUSAI: TOKUREI_KOUSAI,
+    "特例公債法": TOKUREI_KOUSAI,
+    "平成24年法律第101号": TOKUREI_KOUSAI,
+    GX_SUISHIN: GX_SUISHIN,
+    "GX推進法": GX_SUISHIN,
+    "令和5年法律第32号": GX_SUISHIN,
+    FUKKO_ZAIGEN: FUKKO_ZAIGEN,
+    "復興財源確保法": FUKKO_ZAIGEN,
+}
+
+# 政府短期証券（FB）の発行根拠条項（除外判定用）
+# 項が None の場合は条のみで判定
+SEIFU_TANKI_ARTICLES = {
+    (ZAISEI, 7, 1),
+    (ZAISEI_YUSHI, 9, 1),
+    (TOKUBETSU_KAIKEI, 83, None),
+    (TOKUBETSU_KAIKEI, 94, None),
+    (TOKUBETSU_KAIKEI, 95, None),
+    (TOKUBETSU_KAIKEI, 136, None),
+    (TOKUBETSU_KAIKEI, 137, None),
+}
+
+# 法律名（またはその直前の条項）から条項までに許容する最大文字数
+# 「（平成19年法律第23号）」のような括弧書きを挟めるだけの幅を取る
+MAX_REFERENCE_GAP = 40
+
+
+# ========================================
+# トークン定義
+# ========================================
+
+_ZENKAKU_DIGITS = str.maketrans('０１２３４５６７８９', '0123456789')
+_NUMBER = r'[0-9０-９一二三四五六七八九十百千]+'
+
+
+def _alias_pattern(alias: str) -> str:
+    """半角数字を全角・半角の両方にマッチする文字クラスへ展開"""
+    parts = []
+    for char in alias:
+        if char.isdigit():
+            parts.append(f'[{char}{chr(ord(char) + 0xFEE0)}]')
+        else:
+            parts.append(re.escape(char))
+    return ''.join(parts)
+
+
+def _build_token_pattern(aliases: Iterable[str]) -> 're.Pattern':
+    """全トークンを1つの正規表現に結合（法律名は最長一致のため長い順）"""
+    law_alternatives = '|'.join(
+        _alias_pattern(alias) for alias in sorted(aliases, key=len, reverse=True)
+    )
+    return re.compile(
+        rf'(?P<LAW>{law_alternatives})'
+        r'|(?P<SAME>同法)'
+        rf'|(?P<ARTICLE>第(?P<article>{_NUMBER})条(?:第(?P<paragraph>{_NUMBER})項)?)'
+        r'|(?P<STOP>。)'
+    )
+
+
+LAW_TOKEN_PATTERN = _build_token_pattern(LAW_ALIASES)
+
+
+class LawReference(NamedTuple):
+    """法令参照 (法律正式名称, 条, 項, span)"""
+    law: str
+    article: int
+    paragraph: Optional[int]
+    span: Tuple[int, int]
+
+
+# ========================================
+# トークナイザ
+# ========================================
+
+def tokenize_law_references(text: str) -> Iterator[LawReference]:
+    """
+    告示文を1回だけ走査して法令参照を出力
+
+    Args:
+        text: 告示文（正規化前後どちらでも可）
+
+    Yields:
+        LawReference(law, article, paragraph, span)
+        span は (法律名の開始位置, 条項の終了位置)
+    """
+    current_law = None
+    law_start = 0
+    last_end = 0
+
+    for match in LAW_TOKEN_PATTERN.finditer(text):
+        kind = match.lastgroup
+
+        if kind == 'LAW':
+            alias = match.group('LAW').translate(_ZENKAKU_DIGITS)
+            law = LAW_ALIASES[alias]
+            # 「特別会計に関する法律（平成19年法律第23号）」は同一法律として扱う
+            if law != current_law or match.start() - last_end > MAX_REFERENCE_GAP:
+                law_start = match.start()
+            current_law = law
+            last_end = match.end()
+
+        elif kind == 'SAME':
+            if current_law:
+                law_start = match.start()
+                last_end = match.end()
+
+        elif kind == 'STOP':
+            current_law = None
+
+        elif kind == 'ARTICLE':
+            if current_law is None:
+                continue
+            if match.start() - last_end > MAX_REFERENCE_GAP:
+                # 法律名から離れすぎた条項は別の文脈とみなす
+                current_law = None
+                continue
+
+            article = LegalArticleParser.normalize_number(match.group('article'))
+            paragraph_str = match.group('paragraph')
+            paragraph = LegalArticleParser.normalize_number(paragraph_str) if paragraph_str else None
+            last_end = match.end()
+
+            if article > 0:
+                yield LawReference(current_law, article, paragraph, (law_start, match.end()))
+
+
+# ========================================
+# 分類（辞書引き）
+# ========================================
+
+def classify_law_references(text: str, references: Iterable[LawReference]) -> List[Dict]:
+    """
+    法令参照を ARTICLE_TO_LEGAL_BASIS で分類（同一根拠は最初の1件のみ）
+
+    Returns:
+        List of {
+            'basis': str,           # 発行根拠（借換債、特例債など）
+            'category': str,        # 大分類
+            'sub_category': str,    # 詳細分類
+            'full': str,            # 告示文中の該当箇所（法律名〜条項）
+            'article': tuple,       # (法律名, 条, 項)
+            'span': tuple           # 告示文中の位置
+        }
+    """
+    results = []
+    seen_bases = set()
+
+    for ref in references:
+        legal_info = ARTICLE_TO_LEGAL_BASIS.get((ref.law, ref.article, ref.paragraph))
+        if not legal_info or legal_info['basis'] in seen_bases:
+            continue
+
+        seen_bases.add(legal_info['basis'])
+        start, end = ref.span
+        results.append({
+            'basis': legal_info['basis'],
+            'category': legal_info['category'],
+            'sub_category': legal_info['sub_category'],
+            'full': text[start:end],
+            'article': (ref.law, ref.article, ref.paragraph),
+            'span': ref.span,
+        })
+
+    return results
+
+
+def sort_by_basis_priority(bases: List[Dict], priority: Iterable[str]) -> List[Dict]:
+    """
+    抽出した発行根拠を旧LEGAL_BASIS_PATTERNSの優先順に並べ替える
+
+    classify_law_references は告示文中の出現順で返すため、先頭要素を代表根拠に
+    使う呼び出し側はこの関数で旧来の優先順位を復元する（priority にない根拠は末尾）
+    """
+    rank = {basis: i for i, basis in enumerate(priority)}
+    return sorted(bases, key=lambda lb: rank.get(lb['basis'], len(rank)))
+
+
+def is_seifu_tanki_reference(ref: LawReference) -> bool:
+    """政府短期証券（FB）の発行根拠条項か判定"""
+    return ((ref.law, ref.article, ref.paragraph) in SEIFU_TANKI_ARTICLES
+            or (ref.law, ref.article, None) in SEIFU_TANKI_ARTICLES)
+
+
+def extract_legal_bases_tokenized(text: str) -> List[Dict]:
+    """単一パス・トークナイザ方式で発行根拠法令を抽出"""
+    return classify_law_references(text, tokenize_law_references(text))
+
+
+if __name__ == "__main__":
+    test = """
+    発行の根拠法律及びその条項
+    財政運営に必要な財源の確保を図るための公債の発行の特例に関する法律（平成24年法律第101号）第３条第１項並びに脱炭素成長型経済構造への円滑な移行の推進に関する法律（令和５年法律第32号）第７条第１項及び特別会計に関する法律（平成19年法律第23号）第46条第１項
+    """
+    for ref in tokenize_law_references(test):
+        print(ref)
+    for lb in extract_legal_bases_tokenized(test):
+        print(f"  - {lb['basis']} ({lb['category']})")
@@ -8,7 +8,17 @@
 """
 
 import re
-from typing import List, Tuple, Optional
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Tuple, Optional
+
+# 相対インポートと絶対インポートの切り替え
+try:
+    from .law_name_automaton import LawNameAutomaton
+except ImportError:
+    import sys
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from parsers.law_name_automaton import LawNameAutomaton
 
 # ========================================
 # Step 1: 条項マッピングテーブル（宣言的）
@@ -65,22 +75,27 @@ LAW_NAME_NORMALIZATION = {
 class LegalArticleParser:
     """法律条項を構造化データに変換するパーサー"""
     
-    # 法律名パターン
-    LAW_PATTERNS = [
-        r'特別会計に関する法律[（\(][^）\)]*[）\)]?',
-        r'特別会計法',
-        r'平成19年法律第23号',
-        r'財政法',
-        r'財政運営に必要な財源の確保を図るための公債の発行の特例に関する法律',
-        r'平成24年法律第101号',
-        r'脱炭素成長型経済構造への円滑な移行の推進に関する法律',
-        r'令和[5５]年法律第32号',
-        r'東日本大震災からの復興のための施策を実施するために必要な財源の確保に関する特別措置法',
-    ]
-    
     # 条項パターン
     ARTICLE_PATTERN = r'第([0-9０-９一二三四五六七八九十百千]+)条第([0-9０-９一二三四五六七八九十]+)項'
     
+    # LAW_NAME_NORMALIZATION から構築した既定のオートマトン（初回利用時に構築）
+    _default_automaton = None
+    
+    def __init__(self, law_aliases: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            law_aliases: {表記: 法律名}（省略時は LAW_NAME_NORMALIZATION の表記）
+        """
+        # 表記は NFKC で正規化して登録（令和５年法律第３２号 のような全角数字も一致させる）
+        if law_aliases is None:
+            if LegalArticleParser._default_automaton is None:
+                LegalArticleParser._default_automaton = LawNameAutomaton(
+                    {unicodedata.normalize('NFKC', alias): alias for alias in LAW_NAME_NORMALIZATION})
+            self.law_automaton = LegalArticleParser._default_automaton
+        else:
+            self.law_automaton = LawNameAutomaton(
+                {unicodedata.normalize('NFKC', alias): law for alias, law in law_aliases.items()})
+    
     @staticmethod
     def normalize_number(num_str: str) -> int:
         """漢数字・全角数字を半角数字に変換"""
@@ -131,19 +146,13 @@ class LegalArticleParser:
         
         legal_section = legal_section_match.group(1)
         
-        # 法律名を抽出
+        # 法律名を抽出（1回の走査で全出現を求め、LAW_NAME_NORMALIZATION の順で優先）
         current_law = None
-        for law_pattern in self.LAW_PATTERNS:
-            match = re.search(law_pattern, legal_section)
-            if match:
-                law_name = match.group(0)
-                # 正規化
-                for full_name, short_name in LAW_NAME_NORMALIZATION.items():
-                    if full_name in law_name or law_name in full_name:
-                        current_law = short_name
-                        break
-                if current_law:
-                    break
+        hits = self.law_automaton.find_all(unicodedata.normalize('NFKC', legal_section))
+        if hits:
+            priority = {alias: i for i, alias in enumerate(LAW_NAME_NORMALIZATION)}
+            hit = min(hits, key=lambda h: priority.get(h.law, len(priority)))
+            current_law = LAW_NAME_NORMALIZATION.get(hit.law, hit.law)
         
         if not current_law:
             return articles
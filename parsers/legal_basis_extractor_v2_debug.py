@@ -5,7 +5,16 @@
 """
 
 import re
-from typing import List, Tuple, Optional
+from pathlib import Path
+from typing import Dict, List, Tuple, Optional
+
+# 相対インポートと絶対インポートの切り替え
+try:
+    from .law_name_automaton import LawNameAutomaton
+except ImportError:
+    import sys
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from parsers.law_name_automaton import LawNameAutomaton
 
 # ========================================
 # Step 1: 条項マッピングテーブル（宣言的）
@@ -79,6 +88,21 @@ class LegalArticleParser:
     
     ARTICLE_PATTERN = r'第([0-9０-９一二三四五六七八九十百千]+)条第([0-9０-９一二三四五六七八九十]+)項'
     
+    # LAW_NAME_NORMALIZATION から構築した既定のオートマトン（初回利用時に構築）
+    _default_automaton = None
+    
+    def __init__(self, law_aliases: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            law_aliases: {表記: 法律名}（省略時は LAW_NAME_NORMALIZATION の表記）
+        """
+        if law_aliases is None:
+            if LegalArticleParser._default_automaton is None:
+                LegalArticleParser._default_automaton = LawNameAutomaton(list(LAW_NAME_NORMALIZATION))
+            self.law_automaton = LegalArticleParser._default_automaton
+        else:
+            self.law_automaton = LawNameAutomaton(law_aliases)
+    
     @staticmethod
     def normalize_number(num_str: str) -> int:
         """漢数字・全角数字を半角数字に変換"""
@@ -143,18 +167,15 @@ class LegalArticleParser:
         # Step 2: 法律名抽出
         print("\n[Step 2] 法律名抽出")
         current_law = None
-        for i, law_pattern in enumerate(self.LAW_PATTERNS):
-            print(f"  パターン{i+1}: {law_pattern}")
-            match = re.search(law_pattern, legal_section)
-            if match:
-                law_name = match.group(0)
-                print(f"    ✅ マッチ: '{law_name}'")
-                if law_name in LAW_NAME_NORMALIZATION:
-                    current_law = LAW_NAME_NORMALIZATION[law_name]
-                    print(f"    ✅ 正規化後: '{current_law}'")
-                    break
-            else:
-                print(f"    ❌ マッチせず")
+        hits = self.law_automaton.find_all(legal_section)
+        for hit in hits:
+            print(f"  ✅ マッチ: '{hit.alias}' (位置 {hit.start}-{hit.end})")
+        if hits:
+            # LAW_PATTERNS の順で優先
+            priority = {law: i for i, law in enumerate(self.LAW_PATTERNS)}
+            hit = min(hits, key=lambda h: priority.get(h.law, len(priority)))
+            current_law = LAW_NAME_NORMALIZATION.get(hit.law, hit.law)
+            print(f"  ✅ 正規化後: '{current_law}'")
         
         if not current_law:
             print("  ❌ 法律名が見つかりませんでした")
@@ -14,7 +14,16 @@
 """
 
 import re
-from typing import List, Tuple, Optional
+from pathlib import Path
+from typing import Dict, List, Tuple, Optional
+
+# 相対インポートと絶対インポートの切り替え
+try:
+    from .law_name_automaton import LawNameAutomaton, load_law_aliases
+except ImportError:
+    import sys
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from parsers.law_name_automaton import LawNameAutomaton, load_law_aliases
 
 # ========================================
 # Step 1: 条項マッピングテーブル（宣言的）
@@ -100,6 +109,27 @@ class LegalArticleParser:
     # 条項パターン
     ARTICLE_PATTERN = r'第([0-9０-９一二三四五六七八九十百千]+)条第([0-9０-９一二三四五六七八九十]+)項'
     
+    # LAW_PATTERNS から構築した既定のオートマトン（初回利用時に構築）
+    _default_automaton = None
+    
+    def __init__(self, law_aliases: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            law_aliases: {表記: 法律名}（省略時は LAW_PATTERNS）
+        """
+        if law_aliases is None:
+            if LegalArticleParser._default_automaton is None:
+                LegalArticleParser._default_automaton = LawNameAutomaton(self.LAW_PATTERNS)
+            self.law_automaton = LegalArticleParser._default_automaton
+        else:
+            self.law_automaton = LawNameAutomaton(law_aliases)
+    
+    @classmethod
+    def from_laws_master(cls, masters_dir: Optional[Path] = None) -> 'LegalArticleParser':
+        """laws_master.csv の法令一覧でパーサーを作成（読み込めない場合は LAW_PATTERNS）"""
+        aliases = load_law_aliases(masters_dir)
+        return cls(aliases or None)
+    
     @staticmethod
     def normalize_number(num_str: str) -> int:
         """漢数字・全角数字を半角数字に変換"""
@@ -151,33 +181,13 @@ class LegalArticleParser:
         
         legal_section = legal_section_match.group(1)
         
-        # 各法律名について、その後に続く条項を抽出
-        for i, law_name in enumerate(self.LAW_PATTERNS):
+        # 法律名の出現位置を1回の走査で求め、次の法律名の直前までをその法律のセクションとする
+        for law_name, law_section in self.law_automaton.segment(legal_section):
             # 法律名の正規化
             normalized_law = LAW_NAME_NORMALIZATION.get(law_name, law_name)
             
-            # 法律名が存在するか確認
-            if law_name not in legal_section:
-                continue
-            
-            # この法律名から次の法律名までのセクションを抽出
-            law_start = legal_section.find(law_name)
-            
-            # 次の法律名を探す
-            next_law_start = len(legal_section)
-            for j, next_law_name in enumerate(self.LAW_PATTERNS):
-                if i != j:  # 自分自身は除外
-                    next_pos = legal_section.find(next_law_name, law_start + len(law_name))
-                    if next_pos != -1 and next_pos < next_law_start:
-                        next_law_start = next_pos
-            
-            # この法律名のセクションを抽出
-            law_section = legal_section[law_start:next_law_start]
-            
             # このセクション内のすべての「第X条第Y項」を抽出
-            article_matches = list(re.finditer(self.ARTICLE_PATTERN, law_section))
-            
-            for match in article_matches:
+            for match in re.finditer(self.ARTICLE_PATTERN, law_section):
                 article_num_str = match.group(1)
                 clause_num_str = match.group(2)
                 
@@ -0,0 +1,289 @@
+"""
+ほぼ同一の告示の検出（MinHash + LSH）と差分箇所の特定
+
+再掲・訂正の告示は元の告示と数文字しか違わないことが多いが、これまでは毎回全文をパースし、
+別の行として投入したうえで dedupe_key による重複除去に頼っていた
+（dedupe_key は announcement_id を含むため、別ファイルの再掲は重複とみなされない）。
+
+- 正規化済みテキストの文字 n-gram（空白除去）から MinHash 署名を作る（実行をまたいで同じ値）
+- 署名は文書マニフェスト（JSONL。1行1件、追記のみ）に保存し、LSH（署名を帯に分けたバケット）で
+  類似候補を引く。候補は推定 Jaccard 係数が閾値以上のものだけを採る
+- ほぼ同一の文書は正本（canonical。自身はほかの文書に紐づかない文書）に紐づけ、
+  行単位の差分（TextDiff）で変わった箇所だけをパースし直す
+  （差分箇所の前後 context 文字を含めた窓をパースし、変わった行に掛かる抽出だけを採る）
+
+使用例:
+    from parsers.near_duplicate import DocumentManifest, minhash_signature
+
+    manifest = DocumentManifest(PROJECT_ROOT / 'cache' / 'near_duplicate' / 'v7_fixed7.jsonl')
+    signature = minhash_signature(text)
+    match = manifest.find_canonical(announcement_id, signature, threshold=0.9)
+    if match:
+        canonical_id, similarity = match
+"""
+
+import bisect
+import difflib
+import hashlib
+import json
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_MANIFEST_DIR = PROJECT_ROOT / 'cache' / 'near_duplicate'
+
+SHINGLE_SIZE = 5
+NUM_PERM = 64
+LSH_BANDS = 16              # 16帯 × 4行: 類似度 0.5 前後から候補になる
+DEFAULT_THRESHOLD = 0.9     # 推定 Jaccard 係数がこれ以上ならほぼ同一
+
+_EMPTY_BIN = 1 << 64    # n-gram が1つも入らなかった区画
+_WHITESPACE = re.compile(r'\s+')
+
+
+# ========================================
+# MinHash 署名
+# ========================================
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    """空白を除いた文字 n-gram（改行位置や字下げの違いは無視する）"""
+    compact = _WHITESPACE.sub('', text)
+    if len(compact) <= size:
+        return {compact} if compact else set()
+    return {compact[i:i + size] for i in range(len(compact) - size + 1)}
+
+
+def minhash_signature(text: str, num_perm: int = NUM_PERM) -> List[int]:
+    """
+    MinHash 署名（長さ num_perm の整数リスト）
+
+    n-gram ごとにハッシュを1回だけ計算し、num_perm 個の区画に振り分けて区画ごとの最小値を取る
+    （one permutation hashing）。並べ替えを num_perm 回計算するより速く、推定の性質は同じ。
+    """
+    signature = [_EMPTY_BIN] * num_perm
+    for shingle in shingles(text):
+        h = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        index, value = h % num_perm, h // num_perm
+        if value < signature[index]:
+            signature[index] = value
+    return signature
+
+
+def estimated_similarity(left: Sequence[int], right: Sequence[int]) -> float:
+    """2つの署名から推定した Jaccard 係数"""
+    if not left or len(left) != len(right):
+        return 0.0
+    return sum(1 for a, b in zip(left, right) if a == b) / len(left)
+
+
+class LSHIndex:
+    """署名を帯に分け、どれかの帯が一致する文書を候補とする"""
+
+    def __init__(self, bands: int = LSH_BANDS, num_perm: int = NUM_PERM):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) は bands ({bands}) で割り切れる必要があります")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], Set[str]] = {}
+
+    def _keys(self, signature: Sequence[int]):
+        for band in range(self.bands):
+            yield band, tuple(signature[band * self.rows:(band + 1) * self.rows])
+
+    def add(self, doc_id: str, signature: Sequence[int]) -> None:
+        for key in self._keys(signature):
+            self._buckets.setdefault(key, set()).add(doc_id)
+
+    def candidates(self, signature: Sequence[int]) -> Set[str]:
+        found: Set[str] = set()
+        for key in self._keys(signature):
+            found |= self._buckets.get(key, set())
+        return found
+
+
+# ========================================
+# 文書マニフェスト
+# ========================================
+
+class DocumentManifest:
+    """
+    文書ごとの署名・正本への紐づけ・抽出結果の要約（JSONL。文書ごとに最新の記録を使う）
+
+    記録の項目:
+        id, file, path, content_hash, signature,
+        canonical（正本の id。正本自身は None）, similarity, items（抽出位置などの要約）
+    """
+
+    def __init__(self, path: Path, bands: int = LSH_BANDS):
+        self.path = Path(path)
+        self.bands = bands
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._index: Optional[LSHIndex] = None
+
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        """文書 id ごとの最新の記録"""
+        if self._entries is None:
+            entries: Dict[str, Dict[str, Any]] = {}
+            if self.path.exists():
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            entry = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue  # 書き込み途中で中断した行
+                        entries[entry['id']] = entry
+            self._entries = entries
+        return self._entries
+
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        return self.entries().get(doc_id)
+
+    def _lsh(self) -> LSHIndex:
+        # 正本だけを索引に入れる（紐づけ先は常に正本になり、連鎖しない）
+        if self._index is None:
+            self._index = LSHIndex(self.bands)
+            for doc_id, entry in self.entries().items():
+                if entry.get('canonical') is None and entry.get('signature'):
+                    self._index.add(doc_id, entry['signature'])
+        return self._index
+
+    def find_canonical(self, doc_id: str, signature: Sequence[int],
+                       threshold: float = DEFAULT_THRESHOLD) -> Optional[Tuple[str, float]]:
+        """
+        ほぼ同一の正本を探す
+
+        Returns:
+            (正本の id, 推定類似度)。見つからなければ None（最も類似度の高いものを返す）
+        """
+        best = None
+        for candidate in self._lsh().candidates(signature):
+            if candidate == doc_id:
+                continue
+            similarity = estimated_similarity(signature, self.entries()[candidate]['signature'])
+            if similarity >= threshold and (best is None or (similarity, candidate) > (best[1], best[0])):
+                best = (candidate, similarity)
+        return best
+
+    def add(self, doc_id: str, file_path: Path, content_hash: str, signature: Sequence[int],
+            canonical: Optional[str] = None, similarity: Optional[float] = None,
+            items: Sequence[Any] = (), **extra) -> Dict[str, Any]:
+        """記録を追記（同じ id の以前の記録は読み込み時に上書きされる）"""
+        entry = {
+            'id': doc_id,
+            'file': Path(file_path).name,
+            'path': str(file_path),
+            'content_hash': content_hash,
+            'signature': list(signature),
+            'canonical': canonical,
+            'similarity': None if similarity is None else round(similarity, 4),
+            'items': [list(item) for item in items],
+            'recorded_at': datetime.now(timezone.utc).isoformat(),
+        }
+        entry.update(extra)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+        entries = self.entries()
+        previous = entries.get(doc_id)
+        entries[doc_id] = entry
+        if previous is not None and previous.get('canonical') is None:
+            self._index = None  # 正本の署名が変わった・正本でなくなった場合は作り直す
+        elif self._index is not None and canonical is None:
+            self._index.add(doc_id, entry['signature'])
+        return entry
+
+    def duplicates_of(self, canonical_id: str) -> List[str]:
+        """正本に紐づいた文書の id"""
+        return sorted(doc_id for doc_id, entry in self.entries().items() if entry.get('canonical') == canonical_id)
+
+
+# ========================================
+# 差分箇所
+# ========================================
+
+class Region(NamedTuple):
+    """新しいテキスト上のパースし直す範囲（start〜end）と、そのうち変わった部分（core）"""
+    start: int
+    end: int
+    core_start: int
+    core_end: int
+
+
+def _line_offsets(lines: List[str]) -> List[int]:
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line))
+    return offsets
+
+
+class TextDiff:
+    """
+    正本と新しいテキストの行単位の差分
+
+    文字単位の SequenceMatcher は長い文書で遅いため、行単位で比較し、
+    変わった行のまとまりを文字位置に直して扱う。
+    """
+
+    def __init__(self, old: str, new: str):
+        self.old = old
+        self.new = new
+        old_lines = old.splitlines(keepends=True)
+        new_lines = new.splitlines(keepends=True)
+        self._old_offsets = _line_offsets(old_lines)
+        self._new_offsets = _line_offsets(new_lines)
+        matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+        # (tag, 旧 start, 旧 end, 新 start, 新 end)（文字位置）
+        self.opcodes = [(tag, self._old_offsets[i1], self._old_offsets[i2],
+                         self._new_offsets[j1], self._new_offsets[j2])
+                        for tag, i1, i2, j1, j2 in matcher.get_opcodes()]
+        self._equal = [op for op in self.opcodes if op[0] == 'equal']
+        self._equal_starts = [op[1] for op in self._equal]
+
+    @property
+    def changed(self) -> List[Tuple[int, int, int, int]]:
+        """変わった範囲 (旧 start, 旧 end, 新 start, 新 end)"""
+        return [op[1:] for op in self.opcodes if op[0] != 'equal']
+
+    def changed_ratio(self) -> float:
+        """新しいテキストのうち変わった文字の割合"""
+        if not self.new:
+            return 0.0 if not self.old else 1.0
+        return sum(j2 - j1 for _, _, j1, j2 in self.changed) / len(self.new)
+
+    def map_position(self, old_pos: int) -> Optional[int]:
+        """正本の文字位置を新しいテキストの位置に対応させる（変わった行の中なら None）"""
+        index = bisect.bisect_right(self._equal_starts, old_pos) - 1
+        if index < 0:
+            return None
+        _, i1, i2, j1, _ = self._equal[index]
+        if old_pos >= i2:
+            return None
+        return j1 + (old_pos - i1)
+
+    def regions(self, context: int) -> List[Region]:
+        """変わった範囲の前後 context 文字を含めた窓（重なるものはまとめる）"""
+        regions: List[Region] = []
+        for _, _, j1, j2 in self.changed:
+            start = max(0, j1 - context)
+            end = min(len(self.new), j2 + context)
+            if regions and start <= regions[-1].end:
+                last = regions[-1]
+                regions[-1] = Region(last.start, max(last.end, end), last.core_start, max(last.core_end, j2))
+            else:
+                regions.append(Region(start, end, j1, j2))
+        return regions
+
+
+def content_hash(text: str) -> str:
+    """正規化済みテキストのハッシュ（完全一致の判定用）"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def default_manifest_path(runner: str) -> Path:
+    return DEFAULT_MANIFEST_DIR / f'{runner}.jsonl'
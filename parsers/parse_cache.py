@@ -0,0 +1,248 @@
+"""
+パース結果のディスクキャッシュ（内容アドレス方式）
+
+同じ官報ファイルを、取り込み・修正・検証の各スクリプトが何度も読み直して
+パースしていたため、パース結果を (ファイル内容のハッシュ, パーサー名, パーサーバージョン)
+をキーとしてディスクに保存し、各パーサーの入口から透過的に参照する。
+
+形式:
+    <cache_dir>/<hash先頭2文字>/<キー>.bin
+    先頭 MAGIC（8バイト） + zlib圧縮した pickle
+
+- ファイル名・パスではなく内容で引くため、ファイルを移動・改名しても再利用できる
+- パーサーのロジックを変えたら各パーサーの PARSER_VERSION を上げる（旧エントリは参照されず、
+  やがて追い出される）
+- 容量上限を超えたら、最終アクセスの古いエントリから削除（LRU）
+- 破損したエントリは削除してキャッシュミスとして扱う
+
+無効化:
+    環境変数 JGB_PARSE_CACHE=off、またはスクリプトの --no-cache（disable_parse_cache()）
+    ※ 環境変数で渡すため、ProcessPoolExecutor の子プロセスにも反映される
+
+注意: pickle を使うため、キャッシュディレクトリは信頼できるローカルディスクに置くこと。
+"""
+
+import hashlib
+import os
+import pickle
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional, Tuple
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_CACHE_DIR = PROJECT_ROOT / "cache" / "parse"
+
+# 容量上限（既定 512MB）。超えたら LOW_WATER_RATIO まで削減する
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+LOW_WATER_RATIO = 0.8
+
+CACHE_ENV = "JGB_PARSE_CACHE"            # off / 0 / false で無効化
+CACHE_DIR_ENV = "JGB_PARSE_CACHE_DIR"    # キャッシュディレクトリの上書き
+
+MAGIC = b"JGBPC\x00\x01\x00"
+ENTRY_SUFFIX = ".bin"
+
+
+def content_hash(data: bytes) -> str:
+    """ファイル内容のハッシュ（SHA-256）"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _variant_hash(variant: Iterable[Any]) -> str:
+    """パース結果に影響する追加パラメータ（ファイル名、エンコーディング等）のハッシュ"""
+    return hashlib.sha256(repr(tuple(variant)).encode('utf-8')).hexdigest()[:12]
+
+
+class ParseCache:
+    """パース結果のディスクキャッシュ"""
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                 enabled: bool = True):
+        """
+        Args:
+            cache_dir: キャッシュディレクトリ（省略時は cache/parse）
+            max_bytes: 容量上限（バイト）
+            enabled: False の場合は常にパーサーを実行する
+        """
+        self.cache_dir = Path(cache_dir or DEFAULT_CACHE_DIR)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0, 'errors': 0}
+        self._total_bytes = None   # 初回書き込み時に走査して求める
+
+    # ---------- キー ----------
+
+    def entry_path(self, digest: str, parser_name: str, parser_version: str,
+                   variant: Iterable[Any] = ()) -> Path:
+        """キャッシュエントリのパス"""
+        name = f"{digest}_{parser_name}_{parser_version}_{_variant_hash(variant)}{ENTRY_SUFFIX}"
+        return self.cache_dir / digest[:2] / name
+
+    # ---------- 読み書き ----------
+
+    def get(self, path: Path) -> Tuple[bool, Any]:
+        """エントリを読み込む。Returns: (ヒットしたか, 値)"""
+        try:
+            with open(path, 'rb') as f:
+                blob = f.read()
+        except FileNotFoundError:
+            return False, None
+        except OSError:
+            self.stats['errors'] += 1
+            return False, None
+
+        try:
+            if not blob.startswith(MAGIC):
+                raise ValueError("invalid magic")
+            value = pickle.loads(zlib.decompress(blob[len(MAGIC):]))
+        except Exception:
+            # 破損エントリは削除してミス扱い
+            self.stats['errors'] += 1
+            self._remove(path)
+            return False, None
+
+        # LRU のため最終アクセス時刻を更新
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return True, value
+
+    def put(self, path: Path, value: Any) -> None:
+        """エントリを書き込む（一時ファイル経由で置き換え）"""
+        blob = MAGIC + zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), 6)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, 'wb') as f:
+                f.write(blob)
+            os.replace(tmp_path, path)
+        except OSError:
+            self.stats['errors'] += 1
+            return
+
+        self.stats['writes'] += 1
+        if self._total_bytes is not None:
+            self._total_bytes += len(blob)
+        self._evict_if_needed()
+
+    def read_through(self, data: bytes, parser_name: str, parser_version: str,
+                     compute: Callable[[], Any], variant: Iterable[Any] = ()) -> Any:
+        """
+        キャッシュを経由してパース結果を取得
+
+        Args:
+            data: ファイル内容（バイト列）
+            parser_name: パーサー名
+            parser_version: パーサーバージョン
+            compute: キャッシュミス時に実行するパース処理
+            variant: 結果に影響する追加パラメータ
+
+        Returns:
+            パース結果（None は失敗とみなしてキャッシュしない）
+        """
+        if not self.enabled or not cache_enabled():
+            return compute()
+
+        path = self.entry_path(content_hash(data), parser_name, parser_version, variant)
+        hit, value = self.get(path)
+        if hit:
+            self.stats['hits'] += 1
+            return value
+
+        self.stats['misses'] += 1
+        value = compute()
+        if value is not None:
+            self.put(path, value)
+        return value
+
+    # ---------- 追い出し ----------
+
+    def _entries(self):
+        return self.cache_dir.glob(f"*/*{ENTRY_SUFFIX}")
+
+    def _remove(self, path: Path) -> int:
+        try:
+            size = path.stat().st_size
+            path.unlink()
+            return size
+        except OSError:
+            return 0
+
+    def _evict_if_needed(self) -> None:
+        if self._total_bytes is None:
+            self._total_bytes = sum(p.stat().st_size for p in self._entries())
+        if self._total_bytes > self.max_bytes:
+            self.evict(int(self.max_bytes * LOW_WATER_RATIO))
+
+    def evict(self, target_bytes: int = 0) -> int:
+        """
+        最終アクセスの古いエントリから削除して target_bytes 以下にする
+
+        Returns:
+            削除したエントリ数
+        """
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= target_bytes:
+                break
+            total -= self._remove(path) or size
+            removed += 1
+
+        self._total_bytes = total
+        self.stats['evictions'] += removed
+        return removed
+
+    def clear(self) -> int:
+        """全エントリを削除"""
+        return self.evict(0)
+
+
+# ========================================
+# プロセス共有インスタンス
+# ========================================
+
+_PARSE_CACHE = None
+
+
+def cache_enabled() -> bool:
+    """環境変数でキャッシュが無効化されていないか"""
+    return os.environ.get(CACHE_ENV, '').strip().lower() not in ('off', '0', 'false', 'no')
+
+
+def disable_parse_cache() -> None:
+    """キャッシュを無効化（--no-cache 用。子プロセスにも環境変数で伝える）"""
+    os.environ[CACHE_ENV] = 'off'
+
+
+def get_parse_cache() -> ParseCache:
+    """プロセス内で共有するキャッシュ"""
+    global _PARSE_CACHE
+    if _PARSE_CACHE is None:
+        _PARSE_CACHE = ParseCache(os.environ.get(CACHE_DIR_ENV) or DEFAULT_CACHE_DIR)
+    return _PARSE_CACHE
+
+
+def cached_parse_file(filepath: Path, parser_name: str, parser_version: str,
+                      parse: Callable[[bytes], Any], variant: Iterable[Any] = ()) -> Any:
+    """
+    ファイルを読み込み、キャッシュ経由でパース
+
+    Args:
+        filepath: 対象ファイル
+        parse: ファイル内容（バイト列）を受け取るパース処理
+    """
+    with open(filepath, 'rb') as f:
+        data = f.read()
+    return get_parse_cache().read_through(
+        data, parser_name, parser_version, lambda: parse(data), variant
+    )
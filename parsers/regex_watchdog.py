@@ -0,0 +1,291 @@
+"""
+正規表現の時間予算（ウォッチドッグ）と異常入力の隔離
+
+OCR の崩れたテキストでは、[^0-9]{0,50} や DOTALL の先読み・(.*?) を含むパターンが
+激しくバックトラックし、1ファイルで実行全体が止まることがある。
+re のマッチは C の中で走り、シグナルでもスレッドでも中断できないため、
+パースを常駐の子プロセス（ワーカー）で実行し、予算を超えたらワーカーごと止める。
+
+- ファイルごとの予算: 1回の呼び出しの経過時間
+- パターンごとの予算: 実行中の1回の正規表現（search / finditer の1マッチなど）の経過時間
+  （ワーカー内で re を計時ラッパーに差し替え、実行中のパターンを共有メモリに書く）
+
+予算を超えたファイルは、原因のパターン名とともに隔離リスト（JSONL）に記録し、
+以降の実行では飛ばす。ワーカーは次の呼び出しで作り直すため、残りのファイルは
+通常どおりの速度で処理を続ける。
+
+使用例:
+    from parsers.regex_watchdog import GuardedWorker, QuarantineLog
+
+    quarantine = QuarantineLog(PROJECT_ROOT / 'logs' / 'quarantine' / 'v7_fixed7.jsonl')
+    with GuardedWorker(parse_path, file_budget=30, pattern_budget=10) as worker:
+        result = worker.call(str(path))
+        if result.status == STATUS_TIMEOUT:
+            quarantine.add(path, result)
+
+func・initializer は子プロセスから import できるモジュールの関数であること（spawn で起動する）。
+"""
+
+import json
+import multiprocessing
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, NamedTuple, Optional, Sequence, Set, Tuple
+
+DEFAULT_FILE_BUDGET = 30.0     # 秒
+DEFAULT_PATTERN_BUDGET = 10.0  # 秒
+POLL_INTERVAL = 0.05
+
+STATUS_OK = 'ok'
+STATUS_ERROR = 'error'
+STATUS_TIMEOUT = 'timeout'
+
+REASON_FILE_BUDGET = 'file_budget'
+REASON_PATTERN_BUDGET = 'pattern_budget'
+
+LABEL_BYTES = 1024
+STARTUP_TIMEOUT = 120.0        # ワーカーの起動（import・initializer）の上限
+
+
+class GuardResult(NamedTuple):
+    """ワーカーでの1回の呼び出しの結果"""
+    status: str                      # ok / error / timeout
+    value: Any = None
+    error: Optional[str] = None
+    seconds: float = 0.0
+    reason: Optional[str] = None     # timeout のとき file_budget / pattern_budget
+    pattern: Optional[str] = None    # timeout のとき実行中だったパターン（出どころ パターン）
+    slowest_pattern: Optional[str] = None
+    slowest_seconds: float = 0.0
+
+
+# ========================================
+# ワーカー側: 実行中のパターンを共有メモリに書く
+# ========================================
+
+def _tracker_class():
+    # profiling は cProfile を必要時まで読み込まないが、ワーカーでだけ使うため遅延 import
+    from database.profiling import RegexTimer
+
+    class PatternTracker(RegexTimer):
+        """実行中のパターンと開始時刻を共有メモリに書き、最も遅かったパターンを覚える"""
+
+        def __init__(self, label, started):
+            super().__init__()
+            self._label = label
+            self._started = started
+            self._current = None
+            self.slowest: Tuple[Optional[str], float] = (None, 0.0)
+
+        def describe(self, key) -> str:
+            name = self.names.get(key, '')
+            return f"{name} {key[0]}".strip()
+
+        def enter(self, key) -> None:
+            if key != self._current:
+                self._label.value = self.describe(key).encode('utf-8')[:LABEL_BYTES - 1]
+                self._current = key
+            self._started.value = time.monotonic()
+
+        def add(self, key, seconds: float, calls: int = 1) -> None:
+            self._started.value = 0.0
+            if seconds > self.slowest[1]:
+                self.slowest = (self.describe(key), seconds)
+
+    return PatternTracker
+
+
+def _worker_main(conn, default_func, label, started, initializer, initargs, track_patterns: bool) -> None:
+    # default_func を引数で受け取ることで、そのモジュールのパターンも差し替えの対象になる
+    if initializer is not None:
+        initializer(*initargs)
+    tracker = None
+    if track_patterns:
+        tracker = _tracker_class()(label, started)
+        tracker.install()
+    conn.send('ready')
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        func, args, kwargs = message
+        func = func or default_func
+        if tracker is not None:
+            tracker.slowest = (None, 0.0)
+        try:
+            reply = (STATUS_OK, func(*args, **kwargs), None)
+        except Exception as e:
+            reply = (STATUS_ERROR, None, f"{type(e).__name__}: {e}")
+        slowest = tracker.slowest if tracker is not None else (None, 0.0)
+        conn.send(reply + slowest)
+
+
+# ========================================
+# 親側: 予算を見張るワーカー
+# ========================================
+
+class GuardedWorker:
+    """
+    func を常駐の子プロセスで実行し、予算を超えたら子プロセスを止める
+
+    Args:
+        func: 既定で呼ぶ関数（call(*args) で func(*args) を実行）
+        file_budget: 1回の呼び出しの上限（秒）
+        pattern_budget: 1回の正規表現の上限（秒）。None でパターンを監視しない
+        initializer / initargs: ワーカー起動時に呼ぶ（CLI の設定を子プロセスに渡す）
+    """
+
+    def __init__(self, func: Callable, file_budget: float = DEFAULT_FILE_BUDGET,
+                 pattern_budget: Optional[float] = DEFAULT_PATTERN_BUDGET,
+                 initializer: Optional[Callable] = None, initargs: Sequence = ()):
+        self.func = func
+        self.file_budget = file_budget
+        self.pattern_budget = pattern_budget
+        self.initializer = initializer
+        self.initargs = tuple(initargs)
+        self.restarts = 0
+        self._context = multiprocessing.get_context('spawn')
+        self._process = None
+        self._conn = None
+        self._label = None
+        self._started = None
+
+    def __enter__(self) -> 'GuardedWorker':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _start(self) -> None:
+        self._label = self._context.RawArray('c', LABEL_BYTES)
+        self._started = self._context.RawValue('d', 0.0)
+        parent_conn, child_conn = self._context.Pipe()
+        self._process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self.func, self._label, self._started, self.initializer, self.initargs,
+                  self.pattern_budget is not None),
+            daemon=True)
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+        if not parent_conn.poll(STARTUP_TIMEOUT) or parent_conn.recv() != 'ready':
+            self._kill()
+            raise RuntimeError('ワーカーを起動できませんでした')
+
+    def _kill(self) -> None:
+        if self._process is not None:
+            self._process.kill()
+            self._process.join()
+        if self._conn is not None:
+            self._conn.close()
+        self._process = None
+        self._conn = None
+        self.restarts += 1
+
+    def close(self) -> None:
+        """ワーカーを終了"""
+        if self._process is None:
+            return
+        try:
+            self._conn.send(None)
+            self._process.join(timeout=5)
+        except (OSError, EOFError):
+            pass
+        if self._process.is_alive():
+            self._process.kill()
+            self._process.join()
+        self._conn.close()
+        self._process = None
+        self._conn = None
+
+    def _current_pattern(self) -> Optional[str]:
+        value = self._label.value.decode('utf-8', errors='replace')
+        return value or None
+
+    def call(self, *args, func: Optional[Callable] = None, **kwargs) -> GuardResult:
+        """予算内で func(*args, **kwargs) を実行（ワーカーの起動時間は予算に含めない）"""
+        if self._process is None or not self._process.is_alive():
+            if self._process is not None:
+                self._kill()
+            self._start()
+
+        self._started.value = 0.0
+        start = time.monotonic()
+        self._conn.send((func, args, kwargs))
+        while True:
+            now = time.monotonic()
+            if self._conn.poll(max(0.0, min(POLL_INTERVAL, start + self.file_budget - now))):
+                try:
+                    status, value, error, slowest, slowest_seconds = self._conn.recv()
+                except EOFError:
+                    self._kill()
+                    return GuardResult(STATUS_ERROR, error='ワーカーが異常終了しました',
+                                       seconds=time.monotonic() - start)
+                return GuardResult(status, value, error, time.monotonic() - start,
+                                   slowest_pattern=slowest, slowest_seconds=slowest_seconds)
+
+            now = time.monotonic()
+            pattern_started = self._started.value
+            reason = None
+            if self.pattern_budget is not None and pattern_started and now - pattern_started > self.pattern_budget:
+                reason = REASON_PATTERN_BUDGET
+            elif now - start > self.file_budget:
+                reason = REASON_FILE_BUDGET
+            elif not self._process.is_alive():
+                self._kill()
+                return GuardResult(STATUS_ERROR, error='ワーカーが異常終了しました', seconds=now - start)
+            if reason:
+                pattern = self._current_pattern() if pattern_started else None
+                self._kill()
+                return GuardResult(STATUS_TIMEOUT, seconds=now - start, reason=reason, pattern=pattern,
+                                   error=f"時間予算超過（{reason}）")
+
+
+# ========================================
+# 隔離リスト
+# ========================================
+
+class QuarantineLog:
+    """予算を超えたファイルの記録（JSONL。1行1件、追記のみ）"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        """ファイル名ごとの最新の記録"""
+        entries: Dict[str, Dict[str, Any]] = {}
+        if not self.path.exists():
+            return entries
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # 書き込み途中で中断した行
+                entries[entry['file']] = entry
+        return entries
+
+    def names(self) -> Set[str]:
+        return set(self.entries())
+
+    def add(self, file_path: Path, result: GuardResult, **extra) -> Dict[str, Any]:
+        entry = {
+            'file': Path(file_path).name,
+            'path': str(file_path),
+            'reason': result.reason,
+            'pattern': result.pattern,
+            'seconds': round(result.seconds, 3),
+            'quarantined_at': datetime.now(timezone.utc).isoformat(),
+        }
+        entry.update(extra)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        return entry
@@ -0,0 +1,216 @@
+"""
+抽出ルールの来歴（provenance）と、ルール変更時の再パース対象の選定
+
+AMOUNT_PATTERNS の正規表現を1つ変えただけでも、これまでは --reset で全ファイルを
+再実行するしかなかった。
+
+- 各ルール（正規表現・設定値・パース関数のソース）に内容から求めた指紋を付ける（RuleSet）
+- 書き込む行には「パーサー:ルール@指紋」を付け（parse_provenance 列）、
+  ファイルごとに、抽出・分類が依存したルールと実行時点の全ルールの指紋を記録する
+  （ProvenanceLog。JSONL、1行1件、追記のみ、ファイル名ごとに最新の記録を使う）
+- plan_reparse() は現在のルールと記録を比べ、結果が変わり得るファイルだけを選ぶ
+    - depends: 変わったルールに抽出・分類が依存していた
+    - matches: 依存していなかったが、変わったルールの現在の正規表現がそのファイルに一致する
+      （新しく抽出される可能性がある）
+    - canonical: ほぼ同一の告示の正本が再パースの対象になった
+
+使用例:
+    from parsers.rule_provenance import ProvenanceLog, plan_reparse
+
+    plan = plan_reparse(ProvenanceLog(path).entries(), v7.rule_set())
+    for name, entry in plan.items():
+        print(entry['path'], entry['reasons'])
+"""
+
+import hashlib
+import inspect
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_PROVENANCE_DIR = PROJECT_ROOT / 'logs' / 'provenance'
+
+FINGERPRINT_LENGTH = 12
+
+REASON_DEPENDS = 'depends'
+REASON_MATCHES = 'matches'
+REASON_CANONICAL = 'canonical'
+
+
+def fingerprint(*parts: Any) -> str:
+    """ルールの内容の指紋（実行をまたいで同じ値）"""
+    return hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()[:FINGERPRINT_LENGTH]
+
+
+def format_provenance(parser: str, rule_id: str, rule_fingerprint: str) -> str:
+    """行に付ける来歴（パーサー:ルール@指紋）"""
+    return f"{parser}:{rule_id}@{rule_fingerprint}"
+
+
+def split_provenance(value: str) -> Optional[Dict[str, str]]:
+    """format_provenance の逆（形式が違えば None）"""
+    parser, sep, rest = value.partition(':')
+    rule_id, sep2, rule_fingerprint = rest.rpartition('@')
+    if not (sep and sep2 and parser and rule_id):
+        return None
+    return {'parser': parser, 'rule': rule_id, 'fingerprint': rule_fingerprint}
+
+
+class RuleSet:
+    """
+    パーサーのルールと指紋
+
+    Args:
+        parser: パーサー名（行の来歴に使う）
+        normalize: 再パース対象の判定で正規表現を当てる前のテキストの正規化
+    """
+
+    def __init__(self, parser: str, normalize: Optional[Callable[[str], str]] = None):
+        self.parser = parser
+        self.normalize = normalize
+        self.fingerprints: Dict[str, str] = {}
+        self.matchers: Dict[str, Any] = {}   # ルール → 正規表現（一致するかで新しい抽出を判定）
+
+    def add_pattern(self, rule_id: str, pattern, *params: Any) -> str:
+        """正規表現のルール（params は優先度・単位の扱いなど結果に影響する値）"""
+        self.matchers[rule_id] = pattern
+        return self.add_value(rule_id, pattern.pattern, pattern.flags, *params)
+
+    def add_value(self, rule_id: str, *values: Any) -> str:
+        """設定値のルール"""
+        self.fingerprints[rule_id] = fingerprint(*values)
+        return self.fingerprints[rule_id]
+
+    def add_source(self, rule_id: str, func: Callable) -> str:
+        """関数のソースをルールとみなす（本体を変えると、依存するファイルがすべて対象になる）"""
+        return self.add_value(rule_id, inspect.getsource(func))
+
+    def provenance(self, rule_id: str) -> str:
+        return format_provenance(self.parser, rule_id, self.fingerprints[rule_id])
+
+    def stale(self, recorded: Dict[str, str]) -> Set[str]:
+        """記録時点から指紋が変わった・追加・削除されたルール"""
+        return {rule_id for rule_id in set(recorded) | set(self.fingerprints)
+                if recorded.get(rule_id) != self.fingerprints.get(rule_id)}
+
+
+# ========================================
+# ファイルごとの記録
+# ========================================
+
+class ProvenanceLog:
+    """ファイルごとの依存ルールの記録（JSONL。1行1件、追記のみ）"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        """ファイル名ごとの最新の記録"""
+        entries: Dict[str, Dict[str, Any]] = {}
+        if not self.path.exists():
+            return entries
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # 書き込み途中で中断した行
+                entries[entry['file']] = entry
+        return entries
+
+    def add(self, file_path: Path, rule_set: RuleSet, depends: Iterable[str], **extra) -> Dict[str, Any]:
+        """
+        1ファイルの記録を追記
+
+        Args:
+            depends: 抽出・分類が依存したルール
+            extra: pattern（分類）・rows（行数）・run_id など
+        """
+        entry = {
+            'file': Path(file_path).name,
+            'path': str(file_path),
+            'parser': rule_set.parser,
+            'depends': sorted(set(depends)),
+            'rules': dict(rule_set.fingerprints),
+            'recorded_at': datetime.now(timezone.utc).isoformat(),
+        }
+        entry.update(extra)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        return entry
+
+
+# ========================================
+# 再パース対象の選定
+# ========================================
+
+def _read_normalized(path: str, normalize: Optional[Callable[[str], str]]) -> Optional[str]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+    except OSError:
+        return None
+    return normalize(text) if normalize else text
+
+
+def plan_reparse(entries: Dict[str, Dict[str, Any]], rule_set: RuleSet,
+                 rules: Optional[Iterable[str]] = None, scan: bool = True) -> Dict[str, Dict[str, Any]]:
+    """
+    再パースが必要なファイルを選ぶ
+
+    Args:
+        entries: ProvenanceLog.entries()
+        rule_set: 現在のルール
+        rules: 変わったとみなすルール（省略時は記録時点の指紋と比べて求める）
+        scan: 依存していなかったファイルにも、変わった正規表現が一致するかを調べる
+
+    Returns:
+        {ファイル名: {'path', 'reasons': ['depends:ルール', 'matches:ルール', 'canonical:正本', ...]}}
+        （ファイル名順）
+    """
+    forced = set(rules) if rules is not None else None
+    plan: Dict[str, Dict[str, Any]] = {}
+    for name in sorted(entries):
+        entry = entries[name]
+        if entry.get('parser') != rule_set.parser:
+            continue
+        stale = forced if forced is not None else rule_set.stale(entry.get('rules') or {})
+        if not stale:
+            continue
+        depends = set(entry.get('depends') or [])
+        reasons = [f'{REASON_DEPENDS}:{rule_id}' for rule_id in sorted(stale & depends)]
+        candidates = sorted(rule_id for rule_id in stale - depends if rule_id in rule_set.matchers)
+        if scan and candidates:
+            text = _read_normalized(entry['path'], rule_set.normalize)
+            if text is not None:
+                reasons += [f'{REASON_MATCHES}:{rule_id}' for rule_id in candidates
+                            if rule_set.matchers[rule_id].search(text)]
+        if reasons:
+            plan[name] = {'path': entry['path'], 'reasons': reasons}
+
+    # ほぼ同一の告示は、正本を再パースするなら一緒に再パースする
+    selected = {Path(name).stem for name in plan}
+    for name in sorted(entries):
+        canonical = entries[name].get('canonical')
+        if name not in plan and canonical in selected and entries[name].get('parser') == rule_set.parser:
+            plan[name] = {'path': entries[name]['path'], 'reasons': [f'{REASON_CANONICAL}:{canonical}']}
+    return dict(sorted(plan.items()))
+
+
+def reason_counts(plan: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+    """理由ごとのファイル数（ルール単位）"""
+    counts: Dict[str, int] = {}
+    for entry in plan.values():
+        for reason in entry['reasons']:
+            counts[reason] = counts.get(reason, 0) + 1
+    return dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+
+
+def default_provenance_path(runner: str) -> Path:
+    return DEFAULT_PROVENANCE_DIR / f'{runner}.jsonl'
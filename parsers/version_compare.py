@@ -0,0 +1,302 @@
+"""
+パーサーのバージョン間比較（A/B 差分・速度）
+
+リポジトリには universal_announcement_parser の各版（v5 / v7_complete / v8_improved /
+v9_revised / v9_final / rev2〜rev4）と batch_direct_processing_v7_fixed7 の simple_parse が
+並存している。同じコーパスを各版でパースし、
+
+- ファイルごとの抽出行の差分（bond_name, amount, legal_basis, category）
+- 版ごとの処理速度（ファイル/秒）とファイル単位のレイテンシ（p50 / p95 / p99）
+
+を並べて、どの版を残すかをデータで判断できるようにする。
+
+各版は別プロセスで実行する（scripts/04_utilities/compare_parser_versions.py）。
+出力の形が版によって異なるため、ここで共通の行（ROW_FIELDS）に揃えてから比べる。
+
+- 旧形式（base / v5 / v7_complete / v8_improved）: parse(text) → 告示の項目番号ごとの items。
+  項目6（発行額）の根拠法律別の金額を1行ずつにする（法律別が無ければ総額1行）
+- v9 系: parse_announcement(path, raw_record) → 発行ごとの行
+- simple_parse: 金額ごとの行（bond_name は位置から作る仮の名前）
+
+BigQuery への接続は作らない（パースだけを比べる）。パースキャッシュは無効にして、
+毎回実際にパースした時間を測る。
+"""
+
+import importlib
+import math
+import os
+import statistics
+import sys
+import time
+import types
+import unicodedata
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+PROJECT_ROOT = Path(__file__).parent.parent
+INGESTION_DIR = PROJECT_ROOT / 'scripts' / '01_data_ingestion'
+
+ROW_FIELDS = ('bond_name', 'amount', 'legal_basis', 'category')
+
+KIND_LEGACY = 'legacy'
+KIND_V9 = 'v9'
+KIND_SIMPLE = 'simple'
+
+# ファイルごとの比較結果
+DIFF_IDENTICAL = 'identical'        # 行が完全に一致
+DIFF_SAME_AMOUNTS = 'same_amounts'  # 金額の組は一致（名称・法令・分類が異なる）
+DIFF_DIFFERENT = 'different'
+DIFF_ERROR = 'error'                # どちらかがエラー
+
+
+class ParserVersion(NamedTuple):
+    name: str
+    module: str     # scripts/01_data_ingestion 内のモジュール名
+    kind: str
+
+
+PARSER_VERSIONS: Dict[str, ParserVersion] = {v.name: v for v in (
+    ParserVersion('base', 'universal_announcement_parser', KIND_LEGACY),
+    ParserVersion('v5', 'universal_announcement_parser_v5', KIND_LEGACY),
+    ParserVersion('v7_complete', 'universal_announcement_parser_v7_complete', KIND_LEGACY),
+    ParserVersion('v7_simple', 'batch_direct_processing_v7_fixed7', KIND_SIMPLE),
+    ParserVersion('v8_improved', 'universal_announcement_parser_v8_improved', KIND_LEGACY),
+    ParserVersion('v9_revised', 'universal_announcement_parser_v9_revised', KIND_V9),
+    ParserVersion('v9_final', 'universal_announcement_parser_v9_final', KIND_V9),
+    ParserVersion('v9_final_rev2', 'universal_announcement_parser_v9_final_rev2', KIND_V9),
+    ParserVersion('v9_final_rev3', 'universal_announcement_parser_v9_final_rev3', KIND_V9),
+    ParserVersion('v9_final_rev4', 'universal_announcement_parser_v9_final_rev4', KIND_V9),
+)}
+
+
+# ========================================
+# 共通の行への変換
+# ========================================
+
+def _text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    value = unicodedata.normalize('NFKC', str(value)).strip()
+    return value or None
+
+
+def _amount(value: Any) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def make_row(bond_name: Any, amount: Any, legal_basis: Any, category: Any) -> Tuple:
+    """比較用の行（ROW_FIELDS の順のタプル）"""
+    return (_text(bond_name), _amount(amount), _text(legal_basis), _text(category))
+
+
+def issuance_rows(issuances: Iterable[Dict[str, Any]]) -> List[Tuple]:
+    """v9 系・simple_parse の発行行を比較用の行に"""
+    return [make_row(row.get('bond_name'),
+                     row.get('issue_amount'),
+                     row.get('legal_basis_normalized') or row.get('legal_basis'),
+                     row.get('bond_category'))
+            for row in issuances]
+
+
+def _amount_by_law(structured: Dict[str, Any]) -> Tuple[Dict[str, int], int]:
+    """項目6の structured_data から (根拠法律別の金額, 総額)"""
+    by_law: Dict[str, int] = {}
+    sections = [structured] + [v for v in structured.values() if isinstance(v, dict)]
+    for section in sections:
+        for law, amount in (section.get('by_law') or {}).items():
+            by_law[law] = by_law.get(law, 0) + (_amount(amount) or 0)
+    return by_law, _amount(structured.get('total_amount')) or 0
+
+
+def legacy_rows(result: Dict[str, Any]) -> List[Tuple]:
+    """旧形式の parse() 結果（項目番号ごとの items）を比較用の行に"""
+    items = result.get('items') or {}
+    name_item = items.get(1) or {}
+    structured_name = name_item.get('structured_data') or {}
+    bond_name = structured_name.get('bond_name') or name_item.get('value')
+
+    rows = []
+    for key, item in items.items():
+        # 発行額の本項目だけを見る（6_1 などのサブ項目は本項目の内訳）
+        if isinstance(key, str) or '発行額' not in (item.get('title') or ''):
+            continue
+        by_law, total = _amount_by_law(item.get('structured_data') or {})
+        if by_law:
+            rows.extend(make_row(bond_name, amount, law, None) for law, amount in by_law.items())
+        elif total:
+            rows.append(make_row(bond_name, total, None, None))
+    return rows
+
+
+# ========================================
+# 各版の実行
+# ========================================
+
+@contextmanager
+def _without_bigquery_client(module: types.ModuleType):
+    """コンストラクタが BigQuery クライアントを作らないようにする（パースには使わない）"""
+    original = getattr(module, 'bigquery', None)
+    module.bigquery = types.SimpleNamespace(Client=lambda *args, **kwargs: None)
+    try:
+        yield
+    finally:
+        if original is None:
+            del module.bigquery
+        else:
+            module.bigquery = original
+
+
+def load_parse_function(version: ParserVersion) -> Callable[[Path], Tuple[List[Tuple], str]]:
+    """版に応じた parse(path) -> (比較用の行, パターン名) を作る"""
+    for path in (str(PROJECT_ROOT), str(INGESTION_DIR)):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    module = importlib.import_module(version.module)
+
+    if version.kind == KIND_SIMPLE:
+        def parse(path: Path) -> Tuple[List[Tuple], str]:
+            text = module.normalize_text(Path(path).read_text(encoding='utf-8'))
+            pattern, _ = module.identify_pattern_simple(text)
+            return issuance_rows(module.simple_parse(text, Path(path).stem)), pattern
+        return parse
+
+    with _without_bigquery_client(module):
+        if version.kind == KIND_V9:
+            # v9_revised は credentials_path が必須（環境変数に設定されるだけで接続はしない）
+            parser = module.UniversalAnnouncementParser(
+                project_id='', dataset_id='',
+                credentials_path=os.environ.get('GOOGLE_APPLICATION_CREDENTIALS', ''))
+        else:
+            parser = module.UniversalAnnouncementParser()
+
+    if version.kind == KIND_V9:
+        def parse(path: Path) -> Tuple[List[Tuple], str]:
+            issuances, pattern = parser.parse_announcement(
+                str(path), {'announcement_id': Path(path).stem, 'by_law': ''})
+            return issuance_rows(issuances), pattern
+        return parse
+
+    def parse(path: Path) -> Tuple[List[Tuple], str]:
+        result = parser.parse(Path(path).read_text(encoding='utf-8'), Path(path))
+        # 信頼度不足（UNKNOWN）は抽出0行として比べ、例外（ERROR）だけをエラーにする
+        if result.get('pattern') == 'ERROR':
+            raise ValueError(result.get('error'))
+        return legacy_rows(result), result.get('pattern')
+    return parse
+
+
+def run_version(name: str, files: Sequence[str]) -> Dict[str, Any]:
+    """
+    1つの版でコーパス全体をパース（別プロセスから呼ぶ）
+
+    Returns:
+        {'version', 'import_seconds', 'error', 'files': {path: {'rows', 'pattern', 'seconds', 'error'}}}
+    """
+    from parsers.parse_cache import disable_parse_cache
+    disable_parse_cache()
+
+    start = time.perf_counter()
+    outcome: Dict[str, Any] = {'version': name, 'import_seconds': 0.0, 'error': None, 'files': {}}
+    try:
+        parse = load_parse_function(PARSER_VERSIONS[name])
+    except Exception as e:
+        outcome['error'] = f"{type(e).__name__}: {e}"
+        return outcome
+    outcome['import_seconds'] = time.perf_counter() - start
+
+    for path in files:
+        start = time.perf_counter()
+        try:
+            rows, pattern = parse(Path(path))
+            record = {'rows': rows, 'pattern': pattern, 'error': None}
+        except Exception as e:
+            record = {'rows': [], 'pattern': None, 'error': f"{type(e).__name__}: {e}"}
+        record['seconds'] = time.perf_counter() - start
+        outcome['files'][str(path)] = record
+    return outcome
+
+
+# ========================================
+# 差分・速度の集計
+# ========================================
+
+def diff_rows(baseline: Sequence[Tuple], candidate: Sequence[Tuple]) -> Tuple[str, List[Tuple], List[Tuple]]:
+    """2つの版の行を比べて (状態, 基準だけの行, 比較対象だけの行)"""
+    base_count, cand_count = Counter(baseline), Counter(candidate)
+    only_baseline = sorted((base_count - cand_count).elements(), key=repr)
+    only_candidate = sorted((cand_count - base_count).elements(), key=repr)
+    if not only_baseline and not only_candidate:
+        return DIFF_IDENTICAL, [], []
+    if Counter(row[1] for row in baseline) == Counter(row[1] for row in candidate):
+        return DIFF_SAME_AMOUNTS, only_baseline, only_candidate
+    return DIFF_DIFFERENT, only_baseline, only_candidate
+
+
+def diff_versions(outcomes: Dict[str, Dict[str, Any]], baseline: str) -> List[Dict[str, Any]]:
+    """基準の版とほかの各版をファイルごとに比べる"""
+    base_files = outcomes[baseline]['files']
+    records = []
+    for name, outcome in outcomes.items():
+        if name == baseline or outcome['error']:
+            continue
+        for path in sorted(set(base_files) | set(outcome['files'])):
+            base = base_files.get(path) or {'rows': [], 'error': 'not run'}
+            cand = outcome['files'].get(path) or {'rows': [], 'error': 'not run'}
+            if base['error'] or cand['error']:
+                status, only_base, only_cand = DIFF_ERROR, [], []
+            else:
+                status, only_base, only_cand = diff_rows(base['rows'], cand['rows'])
+            records.append({
+                'file': Path(path).name, 'baseline': baseline, 'version': name, 'status': status,
+                'baseline_rows': len(base['rows']), 'version_rows': len(cand['rows']),
+                'only_baseline': [dict(zip(ROW_FIELDS, row)) for row in only_base],
+                'only_version': [dict(zip(ROW_FIELDS, row)) for row in only_cand],
+                'error': base['error'] or cand['error'],
+            })
+    return records
+
+
+def _percentile(values: Sequence[float], percent: float) -> float:
+    """最近順位法のパーセンタイル（ceil(p/100*n) 番目の値）"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, math.ceil(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def throughput_table(outcomes: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """版ごとの処理速度・レイテンシ（ミリ秒）"""
+    table = []
+    for name, outcome in outcomes.items():
+        records = list(outcome['files'].values())
+        seconds = [r['seconds'] for r in records]
+        total = sum(seconds)
+        table.append({
+            'version': name,
+            'files': len(records),
+            'errors': sum(1 for r in records if r['error']) if records else (1 if outcome['error'] else 0),
+            'rows': sum(len(r['rows']) for r in records),
+            'files_per_sec': len(records) / total if total else 0.0,
+            'mean_ms': statistics.fmean(seconds) * 1000 if seconds else 0.0,
+            'p50_ms': _percentile(seconds, 50) * 1000,
+            'p95_ms': _percentile(seconds, 95) * 1000,
+            'p99_ms': _percentile(seconds, 99) * 1000,
+            'max_ms': max(seconds) * 1000 if seconds else 0.0,
+            'import_ms': outcome['import_seconds'] * 1000,
+            'error': outcome['error'],
+        })
+    return table
+
+
+def diff_matrix(records: Iterable[Dict[str, Any]]) -> Dict[str, Counter]:
+    """版ごとの状態別ファイル数"""
+    matrix: Dict[str, Counter] = {}
+    for record in records:
+        matrix.setdefault(record['version'], Counter())[record['status']] += 1
+    return matrix
@@ -11,13 +11,21 @@ r"""
 実行: python batch_direct_processing_v7_fixed7.py --limit 10  # テスト
      python batch_direct_processing_v7_fixed7.py --reset --limit 10  # リセット
      python batch_direct_processing_v7_fixed7.py --limit 0    # 全件
+     python batch_direct_processing_v7_fixed7.py --limit 100 --profile  # 段階ごとのプロファイル（logs/profile/）
+     python batch_direct_processing_v7_fixed7.py --limit 0 --near-duplicates  # 再掲・訂正は差分箇所だけパース
+     python batch_direct_processing_v7_fixed7.py --files-from logs/provenance/reparse.txt --limit 0 --replace
+         # ルール変更の影響を受けるファイルだけを再パース（scripts/04_utilities/plan_reparse.py で一覧を作成）
+
+ライブラリとしての利用:
+    import 時には引数解析・ログ設定・BigQuery 接続・テーブル準備を行わない
+    （すべて main() から実行）。simple_parse() などのパース関数は
+    ネットワーク接続なしで import して使える。BigQuery クライアントは
+    get_client() で初回利用時に生成する。
 """
 
 import os
 import sys
 from pathlib import Path
-from google.cloud import bigquery
-from google.cloud.bigquery import LoadJobConfig, WriteDisposition
 from datetime import datetime, timezone, timedelta
 from uuid import uuid4
 import hashlib
@@ -25,54 +33,59 @@ import re
 import argparse
 import logging
 import unicodedata
-import time
-import random
-from typing import List, Dict, Tuple
-
-# ===========================
-# CLI引数の設定
-# ===========================
-parser = argparse.ArgumentParser(description='国債データベース バッチ処理スクリプト v7_fixed7')
-parser.add_argument('--project', default=os.getenv('BQ_PROJECT', 'jgb2023'))
-parser.add_argument('--dataset', default=os.getenv('BQ_DATASET', '20251031'))
-parser.add_argument('--location', default=os.getenv('BQ_LOCATION', 'asia-northeast1'))
-parser.add_argument('--data-dir', default=os.getenv('DATA_DIR', r'G:\マイドライブ\JGBデータ\2023'))
-# 認証情報: デフォルトは環境変数（ADC）に寄せる
-parser.add_argument('--credentials', default=os.getenv('GOOGLE_APPLICATION_CREDENTIALS'))
-parser.add_argument('--limit', type=int, default=10, help='処理件数 (0=全件)')
-parser.add_argument('--log-file', default='batch_processing_v7_fixed7.log')
-parser.add_argument('--verbose', action='store_true', help='詳細ログ出力')
-parser.add_argument('--min-amount', type=int, default=100000000, help='最小金額（円）デフォルト=1億円')
-parser.add_argument('--reset', action='store_true', help='既存データを削除して再投入')
+from typing import List, Dict, Tuple, Optional
 
-args = parser.parse_args()
+# プロジェクトルートをパスに追加（database パッケージ用）
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 
-# 明示指定があるときだけ環境変数を上書き
-if args.credentials:
-    os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = args.credentials
-
-# ===========================
-# ロギングの設定
-# ===========================
-log_level = logging.DEBUG if args.verbose else logging.INFO
-logging.basicConfig(
-    level=log_level,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    handlers=[
-        logging.FileHandler(args.log_file, encoding='utf-8'),
-        logging.StreamHandler()
-    ]
+from database.bigquery_client import get_bigquery_client, set_credentials
+from database.ingestion_run import (
+    INGESTED_AT_COLUMN, current_run, ensure_run_columns, run_schema_fields, run_scope, start_run, tag_rows,
+)
+from database.issuance_summary import (
+    SUMMARY_TABLE, SUPERSEDED_COLUMN, ensure_summary_table, merge_delta_sql, negated_summary_sql,
+    summary_select_sql,
+)
+from database.job_manager import BigQueryJobManager
+from database.profiling import finish_profiling, profile_file, profile_stage, start_profiling
+from database.sharding import write_progress
+from database.validation import MIN_AMOUNT  # 既定値（main() で --min-amount から上書き）
+from parsers.near_duplicate import (
+    DEFAULT_THRESHOLD as NEAR_DUP_THRESHOLD, DocumentManifest, TextDiff, content_hash, default_manifest_path,
+    minhash_signature,
 )
+from parsers.rule_provenance import ProvenanceLog, RuleSet, default_provenance_path
+from parsers.regex_watchdog import (
+    DEFAULT_FILE_BUDGET, DEFAULT_PATTERN_BUDGET, STATUS_ERROR, STATUS_TIMEOUT, GuardedWorker, QuarantineLog,
+)
+
 logger = logging.getLogger(__name__)
 
 # ===========================
-# 設定
+# 設定（既定値。main() で CLI 引数から上書き）
 # ===========================
-PROJECT_ID = args.project
-DATASET_ID = args.dataset
-LOCATION = args.location
-DATA_DIR = args.data_dir
-MIN_AMOUNT = args.min_amount
+PROJECT_ID = os.getenv('BQ_PROJECT', 'jgb2023')
+DATASET_ID = os.getenv('BQ_DATASET', '20251031')
+LOCATION = os.getenv('BQ_LOCATION', 'asia-northeast1')
+DATA_DIR = os.getenv('DATA_DIR', r'G:\マイドライブ\JGBデータ\2023')
+RESET = False
+LAYER2_TABLE = 'bond_issuances'
+PROGRESS_FILE = None  # シャード実行時の進捗ファイル（run_sharded_backfill.py が読む）
+QUARANTINE_FILE = str(Path(__file__).resolve().parents[2] / 'logs' / 'quarantine' / 'v7_fixed7.jsonl')
+WATCHDOG = None    # パースを時間予算つきで実行するワーカー（main() で起動）
+QUARANTINE = None  # 予算を超えたファイルの記録
+NEAR_DUPLICATES = None  # 文書マニフェスト（--near-duplicates 時。ほぼ同一の告示を正本に紐づける）
+PROVENANCE = None  # ファイルごとの依存ルールの記録（ルール変更時の再パース対象の選定に使う）
+REPLACE = False    # --replace: 再パースしたファイルの既存行を新しい行で置き換える（1トランザクション）
+
+# 行の来歴（parse_provenance 列）に使うパーサー名
+PARSER_NAME = 'simple_parse_v7_fixed7'
+
+# ほぼ同一の告示の差分パース
+NEAR_DUP_CONTEXT = 160    # 変わった行の前後にパースし直す文字数（パターンの到達範囲 + snippet の文脈）
+NEAR_DUP_REACH = 80       # 変わった行より前から始まる抽出でも、この範囲なら変わった行に掛かり得る
+NEAR_DUP_MAX_CHANGE = 0.5  # 変わった文字の割合がこれを超えたら全文をパース
+CANONICAL_COLUMN = 'canonical_announcement_id'  # ほぼ同一の告示の行に付ける正本の告示ID
 
 # 許可単位リスト（v7_fixed7: 新規追加）
 ALLOWED_UNITS = {'兆', '億', '円'}
@@ -80,19 +93,113 @@ ALLOWED_UNITS = {'兆', '億', '円'}
 # 位置バケットサイズ（v7_fixed7: 新規追加）
 POSITION_BUCKET_SIZE = 20  # 20文字以内の近接位置は同一視
 
-logger.info("=" * 80)
-logger.info("直接パース方式バッチ処理 v7_fixed7 (真・最終完全版)")
-logger.info("=" * 80)
-logger.info(f"プロジェクトID: {PROJECT_ID}")
-logger.info(f"データセットID: {DATASET_ID}")
-logger.info(f"データディレクトリ: {DATA_DIR}")
-logger.info(f"処理制限: {args.limit}件 (0=全件)")
-logger.info(f"最小金額: {MIN_AMOUNT:,}円 ({MIN_AMOUNT/100000000:.0f}億円)")
-logger.info(f"許可単位: {', '.join(ALLOWED_UNITS)}")
-logger.info(f"位置バケットサイズ: {POSITION_BUCKET_SIZE}文字")
-if args.reset:
-    logger.warning(f"⚠ リセットモード: 既存データを削除して再投入します")
-logger.info("=" * 80)
+# テーブルID
+table_id_layer2 = f"{PROJECT_ID}.{DATASET_ID}.bond_issuances"
+table_id_parse_log = f"{PROJECT_ID}.{DATASET_ID}.parse_log"
+table_id_summary = f"{PROJECT_ID}.{DATASET_ID}.{SUMMARY_TABLE}"
+
+# ===========================
+# CLI引数の設定
+# ===========================
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """CLI引数を解析"""
+    parser = argparse.ArgumentParser(description='国債データベース バッチ処理スクリプト v7_fixed7')
+    parser.add_argument('--project', default=PROJECT_ID)
+    parser.add_argument('--dataset', default=DATASET_ID)
+    parser.add_argument('--location', default=LOCATION)
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    # 認証情報: デフォルトは環境変数（ADC）に寄せる
+    parser.add_argument('--credentials', default=os.getenv('GOOGLE_APPLICATION_CREDENTIALS'))
+    parser.add_argument('--limit', type=int, default=10, help='処理件数 (0=全件)')
+    parser.add_argument('--log-file', default='batch_processing_v7_fixed7.log')
+    parser.add_argument('--verbose', action='store_true', help='詳細ログ出力')
+    parser.add_argument('--min-amount', type=int, default=MIN_AMOUNT, help='最小金額（円）デフォルト=1億円')
+    parser.add_argument('--reset', action='store_true', help='既存データを削除して再投入')
+    parser.add_argument('--run-id', default=None, help='取り込み実行ID（省略時は新規発行。再実行時に同じIDを指定）')
+    # シャード実行用（run_sharded_backfill.py から指定）
+    parser.add_argument('--files-from', default=None, help='処理するファイルの一覧（1行1パス）。指定時は --data-dir を走査しない')
+    parser.add_argument('--layer2-table', default=LAYER2_TABLE,
+                        help='投入先テーブル名（シャードのステージングテーブル。既定以外では集計を更新しない）')
+    parser.add_argument('--progress-file', default=None, help='処理済み件数を書き出すファイル')
+    # 正規表現の時間予算（予算を超えたファイルは隔離して次回以降は飛ばす）
+    parser.add_argument('--file-budget', type=float, default=DEFAULT_FILE_BUDGET, help='1ファイルのパースの上限（秒）')
+    parser.add_argument('--pattern-budget', type=float, default=DEFAULT_PATTERN_BUDGET,
+                        help='1回の正規表現マッチの上限（秒）')
+    parser.add_argument('--no-watchdog', action='store_true', help='パースを同じプロセスで実行（予算なし）')
+    parser.add_argument('--quarantine-file', default=QUARANTINE_FILE, help='隔離リスト（JSONL）')
+    parser.add_argument('--retry-quarantined', action='store_true', help='隔離済みのファイルも処理する')
+    # ほぼ同一の告示（再掲・訂正）は正本に紐づけ、変わった箇所だけをパース
+    parser.add_argument('--near-duplicates', action='store_true',
+                        help='MinHash で再掲・訂正の告示を検出し、差分箇所だけをパースして NEAR_DUPLICATE として記録')
+    parser.add_argument('--near-dup-threshold', type=float, default=NEAR_DUP_THRESHOLD,
+                        help='ほぼ同一とみなす推定類似度（Jaccard 係数）')
+    parser.add_argument('--near-dup-manifest', default=str(default_manifest_path('v7_fixed7')),
+                        help='文書マニフェスト（JSONL。署名・正本への紐づけ）')
+    # ルールの来歴（ルール変更時は plan_reparse.py で対象を選び --files-from と --replace で再実行）
+    parser.add_argument('--provenance-file', default=str(default_provenance_path('v7_fixed7')),
+                        help='ファイルごとの依存ルールの記録（JSONL）')
+    parser.add_argument('--replace', action='store_true',
+                        help='再パースしたファイルの既存行を新しい行で置き換える（削除・集計の差し引き・投入を1トランザクションで）')
+    parser.add_argument('--profile', action='store_true',
+                        help='段階ごとの cProfile・collapsed stack・遅いファイル/正規表現の順位を書き出す')
+    parser.add_argument('--profile-dir', default=None, help='プロファイルの出力先（既定: logs/profile/v7_fixed7_<日時>）')
+    return parser.parse_args(argv)
+
+def configure(args: argparse.Namespace) -> None:
+    """CLI引数をモジュール設定に反映"""
+    global PROJECT_ID, DATASET_ID, LOCATION, DATA_DIR, MIN_AMOUNT, RESET, LAYER2_TABLE, PROGRESS_FILE, REPLACE
+    global table_id_layer2, table_id_parse_log, table_id_summary
+    
+    PROJECT_ID = args.project
+    DATASET_ID = args.dataset
+    LOCATION = args.location
+    DATA_DIR = args.data_dir
+    MIN_AMOUNT = args.min_amount
+    RESET = args.reset
+    REPLACE = args.replace
+    LAYER2_TABLE = args.layer2_table
+    PROGRESS_FILE = args.progress_file
+    table_id_layer2 = f"{PROJECT_ID}.{DATASET_ID}.{LAYER2_TABLE}"
+    table_id_parse_log = f"{PROJECT_ID}.{DATASET_ID}.parse_log"
+    table_id_summary = f"{PROJECT_ID}.{DATASET_ID}.{SUMMARY_TABLE}"
+    
+    # 明示指定があるときだけ環境変数を上書き
+    set_credentials(args.credentials)
+    
+    # 書き込む行に付ける取り込み実行ID
+    start_run(args.run_id)
+
+# ===========================
+# ロギングの設定
+# ===========================
+def setup_logging(log_file: str, verbose: bool = False) -> None:
+    """ファイルとコンソールへのログ出力を設定"""
+    log_level = logging.DEBUG if verbose else logging.INFO
+    logging.basicConfig(
+        level=log_level,
+        format='%(asctime)s [%(levelname)s] %(message)s',
+        handlers=[
+            logging.FileHandler(log_file, encoding='utf-8'),
+            logging.StreamHandler()
+        ]
+    )
+
+def log_settings(limit: int) -> None:
+    """設定内容をログ出力"""
+    logger.info("=" * 80)
+    logger.info("直接パース方式バッチ処理 v7_fixed7 (真・最終完全版)")
+    logger.info("=" * 80)
+    logger.info(f"プロジェクトID: {PROJECT_ID}")
+    logger.info(f"データセットID: {DATASET_ID}")
+    logger.info(f"データディレクトリ: {DATA_DIR}")
+    logger.info(f"実行ID: {current_run().run_id}")
+    logger.info(f"処理制限: {limit}件 (0=全件)")
+    logger.info(f"最小金額: {MIN_AMOUNT:,}円 ({MIN_AMOUNT/100000000:.0f}億円)")
+    logger.info(f"許可単位: {', '.join(ALLOWED_UNITS)}")
+    logger.info(f"位置バケットサイズ: {POSITION_BUCKET_SIZE}文字")
+    if RESET:
+        logger.warning(f"⚠ リセットモード: 既存データを削除して再投入します")
+    logger.info("=" * 80)
 
 # ===========================
 # ユーティリティ関数
@@ -126,69 +233,61 @@ def generate_dedupe_key(announcement_id: str, issue_amount: int,
     basis = f"{announcement_id}|{issue_amount}|{normalized}|{fingerprint}"
     return hashlib.sha1(basis.encode('utf-8')).hexdigest()
 
-def exponential_backoff_sleep(attempt: int, base_delay: float = 1.0, max_delay: float = 60.0):
-    """
-    指数バックオフでスリープ（v7_fixed7: 新規追加）
-    
-    ノード混雑時にリトライが集中しないよう、ランダム性を持たせたスリープ
-    """
-    delay = min(base_delay * (2 ** attempt), max_delay)
-    jitter = random.uniform(0, delay * 0.1)  # 最大10%のジッター
-    sleep_time = delay + jitter
-    logger.debug(f"  指数バックオフ: {sleep_time:.2f}秒スリープ（試行{attempt+1}回目）")
-    time.sleep(sleep_time)
-
 # ===========================
-# BigQueryクライアント
+# BigQueryクライアント（初回利用時に生成）
 # ===========================
-try:
-    client = bigquery.Client(project=PROJECT_ID, location=LOCATION)
-    logger.info("✓ BigQueryクライアント初期化完了")
-except Exception as e:
-    logger.exception(f"✗ BigQueryクライアント初期化エラー")
-    sys.exit(1)
+def get_client():
+    """BigQueryクライアントを取得（クォータ制御・再試行つき）"""
+    return get_bigquery_client(PROJECT_ID, location=LOCATION, quota_aware=True)
 
 # ===========================
 # データセットの作成
 # ===========================
 def ensure_dataset():
     """データセットが存在しない場合は作成"""
+    from google.cloud import bigquery
+    
     dataset_ref = f"{PROJECT_ID}.{DATASET_ID}"
     try:
         dataset = bigquery.Dataset(dataset_ref)
         dataset.location = LOCATION
-        client.create_dataset(dataset, exists_ok=True)
+        get_client().create_dataset(dataset, exists_ok=True)
         logger.info(f"✓ データセット準備完了: {dataset_ref}")
     except Exception as e:
         logger.exception(f"✗ データセット作成エラー")
         sys.exit(1)
 
-ensure_dataset()
-
 # ===========================
 # データディレクトリの確認
 # ===========================
-data_path = Path(DATA_DIR)
-if not data_path.exists():
-    logger.error(f"✗ データディレクトリが見つかりません: {DATA_DIR}")
-    sys.exit(1)
-
-txt_files = sorted(list(data_path.glob("*.txt")))
-logger.info(f"✓ .txtファイル: {len(txt_files)}件")
+def select_files(data_dir: str, limit: int) -> List[Path]:
+    """処理対象の.txtファイルを選択（limit=0 は全件）"""
+    data_path = Path(data_dir)
+    if not data_path.exists():
+        logger.error(f"✗ データディレクトリが見つかりません: {data_dir}")
+        sys.exit(1)
+    
+    txt_files = sorted(list(data_path.glob("*.txt")))
+    logger.info(f"✓ .txtファイル: {len(txt_files)}件")
+    
+    return limit_files(txt_files, limit)
 
-# 処理対象の選択
-if args.limit == 0:
-    test_files = txt_files
-    logger.info(f"全件モード: {len(test_files)}件を処理します")
-else:
-    test_files = txt_files[:args.limit]
-    logger.info(f"制限モード: {len(test_files)}件を処理します")
+def read_file_list(list_file: str, limit: int) -> List[Path]:
+    """ファイル一覧（1行1パス）から処理対象を読む（シャード実行用）"""
+    with open(list_file, 'r', encoding='utf-8') as f:
+        files = [Path(line.strip()) for line in f if line.strip()]
+    logger.info(f"✓ ファイル一覧: {list_file}（{len(files)}件）")
+    return limit_files(files, limit)
 
-# ===========================
-# テーブルID
-# ===========================
-table_id_layer2 = f"{PROJECT_ID}.{DATASET_ID}.bond_issuances"
-table_id_parse_log = f"{PROJECT_ID}.{DATASET_ID}.parse_log"
+def limit_files(txt_files: List[Path], limit: int) -> List[Path]:
+    """処理対象の選択（limit=0 は全件）"""
+    if limit == 0:
+        test_files = txt_files
+        logger.info(f"全件モード: {len(test_files)}件を処理します")
+    else:
+        test_files = txt_files[:limit]
+        logger.info(f"制限モード: {len(test_files)}件を処理します")
+    return test_files
 
 # ===========================
 # bond_issuancesテーブルの作成（v7_fixed7版）
@@ -200,6 +299,9 @@ def ensure_bond_issuances_table():
     改善点:
     - --reset時はテーブルを削除→再作成でREQUIREDを保証
     """
+    from google.cloud import bigquery
+    
+    client = get_client()
     schema = [
         bigquery.SchemaField("announcement_id", "STRING", mode="REQUIRED"),
         bigquery.SchemaField("bond_name", "STRING", mode="REQUIRED"),
@@ -213,15 +315,23 @@ def ensure_bond_issuances_table():
         bigquery.SchemaField("is_summary_record", "BOOLEAN", mode="NULLABLE"),
         bigquery.SchemaField("is_detail_record", "BOOLEAN", mode="NULLABLE"),
         bigquery.SchemaField("dedupe_key", "STRING", mode="REQUIRED"),  # REQUIREDで定義
-    ]
+        bigquery.SchemaField("parse_provenance", "STRING", mode="NULLABLE"),  # パーサー:ルール@指紋
+        bigquery.SchemaField(CANONICAL_COLUMN, "STRING", mode="NULLABLE"),  # ほぼ同一の告示の正本
+        bigquery.SchemaField(SUPERSEDED_COLUMN, "STRING", mode="NULLABLE"),  # この行を訂正した告示
+    ] + run_schema_fields()
     
     try:
         table = bigquery.Table(table_id_layer2, schema=schema)
         # クラスタリングフィールドの最適化: dedupe_keyを先頭に
         table.clustering_fields = ['dedupe_key', 'announcement_id', 'issue_amount']
+        # 取り込み日時で分割（run 単位の検証・ロールバックはその run のパーティションだけを読む）
+        table.time_partitioning = bigquery.TimePartitioning(
+            type_=bigquery.TimePartitioningType.DAY,
+            field=INGESTED_AT_COLUMN
+        )
         
         # --reset時はテーブルを削除→再作成
-        if args.reset:
+        if RESET:
             logger.info("⚠ リセットモード: テーブルを削除して再作成します...")
             client.delete_table(table_id_layer2, not_found_ok=True)
             logger.info("✓ 既存テーブルを削除しました")
@@ -230,7 +340,7 @@ def ensure_bond_issuances_table():
         logger.info(f"✓ bond_issuancesテーブル準備完了: {table_id_layer2}")
         
         # PRIMARY KEY制約の追加（--reset時は新規テーブルなので追加）
-        if args.reset:
+        if RESET:
             try:
                 pk_sql = f"""
                 ALTER TABLE `{table_id_layer2}`
@@ -245,8 +355,6 @@ def ensure_bond_issuances_table():
         logger.exception(f"✗ bond_issuancesテーブル作成エラー")
         sys.exit(1)
 
-ensure_bond_issuances_table()
-
 # ===========================
 # dedupe_key列の処理（v7_fixed7版）
 # ===========================
@@ -258,11 +366,12 @@ def ensure_dedupe_key_column():
     - --reset時はテーブル再作成済みなのでスキップ
     - 非reset時のみバックフィルとPRIMARY KEY追加
     """
-    if args.reset:
+    if RESET:
         # --reset時はテーブル再作成済みなので何もしない
         logger.info("✓ dedupe_key列の準備完了（テーブル再作成済み）")
         return
     
+    client = get_client()
     try:
         logger.info("dedupe_key列の確認中（非リセットモード）...")
         
@@ -315,13 +424,13 @@ def ensure_dedupe_key_column():
         logger.exception(f"✗ dedupe_key列の処理エラー")
         sys.exit(1)
 
-ensure_dedupe_key_column()
-
 # ===========================
 # parse_logテーブルの作成
 # ===========================
 def ensure_parse_log_table():
     """parse_logテーブルが存在しない場合は作成"""
+    from google.cloud import bigquery
+    
     schema = [
         bigquery.SchemaField("announcement_id", "STRING", mode="REQUIRED"),
         bigquery.SchemaField("file_name", "STRING", mode="NULLABLE"),
@@ -331,7 +440,7 @@ def ensure_parse_log_table():
         bigquery.SchemaField("total_amount", "INTEGER", mode="NULLABLE"),
         bigquery.SchemaField("pattern_detected", "STRING", mode="NULLABLE"),
         bigquery.SchemaField("processed_at", "TIMESTAMP", mode="REQUIRED"),
-    ]
+    ] + run_schema_fields(timestamp_column=None)
     
     try:
         table = bigquery.Table(table_id_parse_log, schema=schema)
@@ -339,12 +448,80 @@ def ensure_parse_log_table():
             type_=bigquery.TimePartitioningType.DAY,
             field="processed_at"
         )
-        client.create_table(table, exists_ok=True)
+        get_client().create_table(table, exists_ok=True)
         logger.info(f"✓ parse_logテーブル準備完了: {table_id_parse_log}")
     except Exception as e:
         logger.exception(f"✗ parse_logテーブル作成エラー")
 
-ensure_parse_log_table()
+# ===========================
+# 発行集計テーブルの作成
+# ===========================
+def ensure_issuance_summary_table():
+    """issuance_summaryテーブルが存在しない場合は作成（既存行がある場合は reconcile で初期化）"""
+    try:
+        ensure_summary_table(get_client(), table_id_summary)
+        logger.info(f"✓ issuance_summaryテーブル準備完了: {table_id_summary}")
+    except Exception as e:
+        logger.exception(f"✗ issuance_summaryテーブル作成エラー")
+
+# ===========================
+# 取り込み実行ID列の追加（既存テーブル向け）
+# ===========================
+def ensure_run_id_columns():
+    """
+    既存テーブルに run_id・ingested_at 列を追加
+    
+    --reset で作り直したテーブルは作成時のスキーマに含まれるため何もしない。
+    既存テーブルは列を追加するだけでパーティション分割はされない
+    （run_id での絞り込みは効くが、パーティションの刈り込みは --reset 後から）。
+    """
+    if RESET:
+        return
+    
+    client = get_client()
+    try:
+        ensure_run_columns(client, table_id_layer2, location=LOCATION)
+        ensure_run_columns(client, table_id_parse_log, timestamp_column=None, location=LOCATION)
+        logger.info("✓ run_id列の準備完了")
+    except Exception as e:
+        logger.exception(f"✗ run_id列の追加エラー")
+        sys.exit(1)
+
+# ===========================
+# 来歴列の追加（既存テーブル向け）
+# ===========================
+def ensure_provenance_column():
+    """既存テーブルに parse_provenance 列を追加（--reset で作り直したテーブルは作成時のスキーマに含まれる）"""
+    if RESET:
+        return
+    
+    try:
+        get_client().query(f"ALTER TABLE `{table_id_layer2}` ADD COLUMN IF NOT EXISTS parse_provenance STRING",
+                           location=LOCATION).result()
+        logger.info("✓ parse_provenance列の準備完了")
+    except Exception as e:
+        logger.exception(f"✗ parse_provenance列の追加エラー")
+        sys.exit(1)
+
+def ensure_near_duplicate_columns():
+    """
+    既存テーブルに正本・訂正の列を追加（--reset で作り直したテーブルは作成時のスキーマに含まれる）
+    
+    canonical_announcement_id: ほぼ同一の告示の行が紐づく正本
+    superseded_by: 訂正の告示で置き換えられた正本の行に付ける、訂正した告示のID
+    """
+    if RESET:
+        return
+    
+    try:
+        get_client().query(f"ALTER TABLE `{table_id_layer2}`\n"
+                           f"ADD COLUMN IF NOT EXISTS {CANONICAL_COLUMN} STRING,\n"
+                           f"ADD COLUMN IF NOT EXISTS {SUPERSEDED_COLUMN} STRING",
+                           location=LOCATION).result()
+        logger.info("✓ 正本・訂正の列の準備完了")
+    except Exception as e:
+        logger.exception(f"✗ 正本・訂正の列の追加エラー")
+        sys.exit(1)
 
 # ===========================
 # 正規表現の事前コンパイル
@@ -354,6 +531,10 @@ PATTERN_TABLE = re.compile(r'別表[\s\S]*?銘柄', re.IGNORECASE)
 PATTERN_RETAIL = re.compile(r'個人向け[\s\S]*?変動', re.IGNORECASE)
 PATTERN_TB = re.compile(r'政府短期証券|国庫短期証券|TB|FB')
 
+# identify_pattern_simple が判定に使うパターン（判定する順）と、その判定結果
+CLASSIFICATION_RULES = ('PATTERN_NUMBERED_LIST', 'PATTERN_TABLE', 'PATTERN_RETAIL', 'PATTERN_TB')
+CLASSIFICATION_RESULTS = ('NUMBERED_LIST', 'TABLE_HORIZONTAL', 'RETAIL_BOND', 'TB_SHORT_TERM')
+
 # ===========================
 # 金額抽出用パターン（v7_fixed7版）
 # ===========================
@@ -424,19 +605,23 @@ def identify_pattern_simple(text: str) -> Tuple[str, float]:
 # ===========================
 # 簡易パース関数（v7_fixed7版）
 # ===========================
-def simple_parse(text: str, announcement_id: str) -> List[Dict]:
+def simple_parse(text: str, announcement_id: str, offset: int = 0, is_tb: Optional[bool] = None) -> List[Dict]:
     """
     最低限の情報を抽出する簡易パーサー（v7_fixed7版）
     
     改善点:
     - 位置バケット方式で同額・近接位置を同一視（重複防止）
     - ALLOWED_UNITSで未知単位をスキップ
+    
+    text が文書の一部（差分箇所の窓）のときは、offset に窓の開始位置、
+    is_tb に文書全体での政府短期証券の判定を渡す（位置は文書全体での位置になる）
     """
     items = []
     selected = {}
     
     # 政府短期証券の判定
-    is_tb = bool(PATTERN_TB.search(text))
+    if is_tb is None:
+        is_tb = bool(PATTERN_TB.search(text))
     
     for pattern, mode, pattern_name, priority in AMOUNT_PATTERNS:
         matches = pattern.finditer(text)
@@ -497,7 +682,7 @@ def simple_parse(text: str, announcement_id: str) -> List[Dict]:
                 
                 # 位置バケット方式で重複防止（v7_fixed7: 改善）
                 # 同額で位置が近い（±20文字）ものは同一視
-                start = match.start()
+                start = match.start() + offset
                 bucket = start // POSITION_BUCKET_SIZE
                 key = (bucket, amount)
                 
@@ -511,7 +696,7 @@ def simple_parse(text: str, announcement_id: str) -> List[Dict]:
                         logger.debug(f"  上書き: 高優先度 (既存={existing_priority}, 現在={priority})")
                 
                 # 一意な bond_name
-                unique_bond_name = f'簡易抽出_{announcement_id}_{pattern_name}_{match.start()}'
+                unique_bond_name = f'簡易抽出_{announcement_id}_{pattern_name}_{start}'
                 
                 # カテゴリと正規化
                 bond_category = '政府短期証券' if is_tb else '未分類'
@@ -557,6 +742,52 @@ def simple_parse(text: str, announcement_id: str) -> List[Dict]:
     
     return items
 
+# ===========================
+# ルールの来歴
+# ===========================
+_RULE_SET = None
+
+def rule_set(refresh: bool = False) -> RuleSet:
+    """
+    simple_parse・identify_pattern_simple のルールと指紋
+    
+    ルールを変えたら（AMOUNT_PATTERNS の正規表現・優先度、判定パターン、金額の下限など）
+    指紋が変わり、plan_reparse.py がそのルールに依存したファイルを再パースの対象に選ぶ。
+    関数の本体を変えた場合は、すべてのファイルが対象になる。
+    """
+    global _RULE_SET
+    if _RULE_SET is None or refresh:
+        rules = RuleSet(PARSER_NAME, normalize=normalize_text)
+        for pattern, mode, pattern_name, priority in AMOUNT_PATTERNS:
+            rules.add_pattern(f'AMOUNT_PATTERNS/{pattern_name}', pattern, mode, priority)
+        for name in CLASSIFICATION_RULES:
+            rules.add_pattern(name, globals()[name])
+        rules.add_value('SETTINGS', MIN_AMOUNT, sorted(ALLOWED_UNITS), POSITION_BUCKET_SIZE)
+        rules.add_source('simple_parse', simple_parse)
+        rules.add_source('identify_pattern_simple', identify_pattern_simple)
+        _RULE_SET = rules
+    return _RULE_SET
+
+def item_provenance(item: Dict) -> Optional[str]:
+    """行の来歴（simple_parse_v7_fixed7:AMOUNT_PATTERNS/<パターン名>@<指紋>）"""
+    rule_id = f"AMOUNT_PATTERNS/{item_key(item)[1]}"
+    rules = rule_set()
+    return rules.provenance(rule_id) if rule_id in rules.fingerprints else None
+
+def parse_dependencies(pattern: str, items: List[Dict]) -> List[str]:
+    """
+    1ファイルの結果が依存したルール
+    
+    分類は、判定が決まったパターンまでに評価したものすべて（UNKNOWN なら全部）に依存する。
+    政府短期証券の判定（PATTERN_TB）は全行の分類に、設定値と関数本体は全体に効く。
+    """
+    decided = (CLASSIFICATION_RESULTS.index(pattern) + 1 if pattern in CLASSIFICATION_RESULTS
+               else len(CLASSIFICATION_RULES))
+    depends = set(CLASSIFICATION_RULES[:decided])
+    depends |= {'PATTERN_TB', 'SETTINGS', 'simple_parse', 'identify_pattern_simple'}
+    depends |= {f"AMOUNT_PATTERNS/{item_key(item)[1]}" for item in items}
+    return sorted(depends)
+
 # ===========================
 # parse_logへの記録
 # ===========================
@@ -574,22 +805,78 @@ def log_parse_result(announcement_id: str, file_name: str, status: str, error_me
             'total_amount': total_amount,
             'pattern_detected': pattern_detected,
             'processed_at': now_rfc3339(),
+            'run_id': current_run().run_id,
         }
-        client.insert_rows_json(table_id_parse_log, [log_entry])
+        get_client().insert_rows_json(table_id_parse_log, [log_entry])
     except Exception as e:
         logger.exception(f"  ⚠ parse_log記録エラー")
 
+# ===========================
+# 発行集計への差分加算
+# ===========================
+def inserted_rows_sql(staging_table: str) -> str:
+    """
+    ステージングテーブルの行のうち、今回のMERGEで実際に挿入された行
+    
+    重複で挿入されなかった行は、Layer2 側の run_id・ingested_at が今回の値と一致しないため除外される。
+    """
+    return f"""(
+        SELECT S.*
+        FROM `{staging_table}` S
+        JOIN `{table_id_layer2}` T
+          ON T.dedupe_key = S.dedupe_key
+         AND T.run_id = S.run_id
+         AND T.ingested_at = S.ingested_at
+        WHERE T.ingested_at >= TIMESTAMP('{current_run().started_at.isoformat()}')
+    )"""
+
 # ===========================
 # MERGE文による投入（v7_fixed7版）
 # ===========================
-def merge_to_layer2(items: List[Dict]) -> Tuple[bool, str]:
+def merge_rows_sql(staging_table: str, columns: List[str]) -> str:
+    """ステージングテーブルの行のうち、Layer2 に無い dedupe_key の行を挿入（列を明示: 既存テーブルは後から列を追加しており列順が異なる）"""
+    column_list = ", ".join(columns)
+    source_list = ", ".join(f"S.{column}" for column in columns)
+    return f"""
+            MERGE `{table_id_layer2}` T
+            USING `{staging_table}` S
+            ON T.dedupe_key = S.dedupe_key
+            WHEN NOT MATCHED THEN
+              INSERT ({column_list}) VALUES ({source_list})
+            """
+
+def merge_rows_transaction_sql(staging_table: str, columns: List[str]) -> str:
+    """
+    ステージングテーブルの行の MERGE と issuance_summary への差分加算を1つのトランザクションで
+    
+    どちらかが失敗すれば両方とも取り消される（Layer2 と集計がずれない）。
+    最後の SELECT で今回挿入した件数（inserted_row_count）を返す。
+    シャードのステージングテーブルへの投入では集計を更新しない（本テーブルへのコミット時に加算）。
+    """
+    run_id = current_run().run_id
+    statements = [
+        "DECLARE inserted_row_count INT64 DEFAULT 0;",
+        "BEGIN TRANSACTION;",
+        merge_rows_sql(staging_table, columns).strip() + ";",
+        "SET inserted_row_count = @@row_count;",
+    ]
+    if LAYER2_TABLE == 'bond_issuances':
+        inserted = summary_select_sql(inserted_rows_sql(staging_table), columns)
+        statements.append(merge_delta_sql(table_id_summary, inserted, run_id, f"{run_id}:{staging_table}") + ";")
+    statements.append("COMMIT TRANSACTION;")
+    statements.append("SELECT inserted_row_count;")
+    return "\n\n".join(statements)
+
+def merge_to_layer2(items: List[Dict], replace_announcement: Optional[str] = None) -> Tuple[bool, str]:
     """
     ステージングテーブル経由のMERGE実装（v7_fixed7版）
     
     改善点:
-    - dmlStats.insertedRowCountから挿入件数を取得（並行実行対応）
-    - フォールバック処理を追加（将来変更対応）
-    - リトライ時に指数バックオフを使用
+    - MERGE と issuance_summary への差分加算を1つのトランザクションで実行し、挿入件数はその結果から取得
+    - 再試行は QuotaAwareClient（database.bigquery_quota）に任せる
+    
+    Args:
+        replace_announcement: --replace の場合の告示ID（既存行の削除と新しい行の投入を1つのトランザクションで行う）
     
     Returns:
         (success: bool, status: str)
@@ -598,186 +885,330 @@ def merge_to_layer2(items: List[Dict]) -> Tuple[bool, str]:
     if not items:
         return False, 'FAILURE'
     
+    from google.cloud import bigquery
+    from google.cloud.bigquery import LoadJobConfig, WriteDisposition
+    
+    client = get_client()
     staging_table = None
-    max_retries = 3
     
-    for attempt in range(max_retries):
-        try:
-            # ステップ1: 一時ステージングテーブル名
-            staging_table = f"{table_id_layer2}__stg_{uuid4().hex[:8]}"
-            logger.debug(f"  ステージングテーブル: {staging_table}")
-            
-            # ステップ2: スキーマ
-            schema = [
-                bigquery.SchemaField("announcement_id", "STRING", mode="REQUIRED"),
-                bigquery.SchemaField("bond_name", "STRING", mode="REQUIRED"),
-                bigquery.SchemaField("issue_amount", "INT64", mode="REQUIRED"),
-                bigquery.SchemaField("legal_basis", "STRING", mode="NULLABLE"),
-                bigquery.SchemaField("legal_basis_normalized", "STRING", mode="NULLABLE"),
-                bigquery.SchemaField("legal_basis_source", "STRING", mode="NULLABLE"),
-                bigquery.SchemaField("bond_category", "STRING", mode="NULLABLE"),
-                bigquery.SchemaField("mof_category", "STRING", mode="NULLABLE"),
-                bigquery.SchemaField("data_quality_score", "INT64", mode="NULLABLE"),
-                bigquery.SchemaField("is_summary_record", "BOOL", mode="NULLABLE"),
-                bigquery.SchemaField("is_detail_record", "BOOL", mode="NULLABLE"),
-                bigquery.SchemaField("dedupe_key", "STRING", mode="REQUIRED"),
-            ]
-            
-            # テーブル作成（有効期限付き）
-            table = bigquery.Table(staging_table, schema=schema)
-            table.expires = datetime.now(timezone.utc) + timedelta(days=1)
-            client.create_table(table, exists_ok=True)
-            logger.debug(f"  ✓ ステージングテーブル作成完了（有効期限: 1日）")
-            
-            # ステップ3: 型を確定させてからロード
-            def cast_row(r: dict) -> dict:
-                """dictを正しい型に変換"""
-                return {
-                    "announcement_id": str(r["announcement_id"]),
-                    "bond_name": str(r["bond_name"]),
-                    "issue_amount": int(r["issue_amount"]),
-                    "legal_basis": r.get("legal_basis") or r.get("legal_basis_normalized") or None,
-                    "legal_basis_normalized": r.get("legal_basis_normalized") or None,
-                    "legal_basis_source": r.get("legal_basis_source") or None,
-                    "bond_category": r.get("bond_category") or None,
-                    "mof_category": r.get("mof_category") or None,
-                    "data_quality_score": int(r.get("data_quality_score", 0)),
-                    "is_summary_record": bool(r.get("is_summary_record", False)),
-                    "is_detail_record": bool(r.get("is_detail_record", True)),
-                    "dedupe_key": r.get("dedupe_key") or None,
-                }
-            
-            # バリデーション
-            def validate_row(r: dict, idx: int):
-                """行のバリデーション"""
-                assert r["announcement_id"], f"row[{idx}]: announcement_id must be non-empty"
-                assert r["bond_name"], f"row[{idx}]: bond_name must be non-empty"
-                assert isinstance(r["issue_amount"], int), f"row[{idx}]: issue_amount must be int"
-                assert r["issue_amount"] > 0, f"row[{idx}]: issue_amount must be positive"
-                assert r["dedupe_key"], f"row[{idx}]: dedupe_key must be non-empty"
-            
-            # 変換とバリデーション
-            rows = []
-            for i, item in enumerate(items):
-                row = cast_row(item)
-                validate_row(row, i)
-                rows.append(row)
-            
-            logger.debug(f"  ✓ 行の変換・バリデーション完了: {len(rows)}件")
-            
-            # load_table_from_jsonでロード
-            load_cfg = LoadJobConfig(
-                schema=schema,
-                write_disposition=WriteDisposition.WRITE_TRUNCATE
-            )
-            load_job = client.load_table_from_json(rows, staging_table, job_config=load_cfg, location=LOCATION)
-            load_job.result()
-            
-            logger.debug(f"  ✓ ステージングテーブルへのロード完了")
-            
-            # ステップ4: MERGE実行
-            merge_sql = f"""
-            MERGE `{table_id_layer2}` T
-            USING `{staging_table}` S
-            ON T.dedupe_key = S.dedupe_key
-            WHEN NOT MATCHED THEN
-              INSERT ROW
-            """
-            
-            merge_job = client.query(merge_sql, location=LOCATION)
-            result = merge_job.result()
-            
-            # ステップ5: dmlStatsから挿入件数を取得（並行実行対応）
-            ins_count = int(merge_job._properties
-                           .get('statistics', {})
-                           .get('query', {})
-                           .get('dmlStats', {})
-                           .get('insertedRowCount', 0))
-            
-            # フォールバック: dmlStatsが取得できない場合（将来変更対応）
-            if not ins_count and getattr(merge_job, 'num_dml_affected_rows', None):
-                # MERGEでは厳密には affected=insert+update+delete だが 0/非0 の判定に使える
-                ins_count = merge_job.num_dml_affected_rows or 0
-                logger.debug(f"  ℹ dmlStatsフォールバック使用: {ins_count}件")
-            
-            logger.debug(f"  ✓ MERGE完了: {len(items)}件（staging経由）")
-            
-            # ステップ6: 挿入件数に応じてステータスを決定
-            if ins_count == 0:
-                logger.info(f"  ℹ 全て重複: {len(items)}件")
-                return True, 'NOOP_DUPLICATES'
-            else:
-                logger.debug(f"  ✓ 新規挿入: {ins_count}件")
-                return True, 'SUCCESS'
-            
-        except Exception as e:
-            if attempt < max_retries - 1:
-                logger.warning(f"  ⚠ MERGE失敗（試行{attempt+1}回目）: {e}")
-                exponential_backoff_sleep(attempt)  # v7_fixed7: 指数バックオフ
-                continue
-            else:
-                logger.exception(f"  ✗ MERGE最終失敗（{max_retries}回試行）")
-                return False, 'FAILURE'
-            
-        finally:
-            # ステップ7: ステージングテーブルの掃除
-            if staging_table:
-                try:
-                    client.delete_table(staging_table, not_found_ok=True)
-                    logger.debug(f"  ✓ ステージングテーブル削除完了")
-                except Exception as e:
-                    logger.warning(f"  ⚠ ステージングテーブル削除エラー: {e}")
+    try:
+        # ステップ1: 一時ステージングテーブル名
+        staging_table = f"{table_id_layer2}__stg_{uuid4().hex[:8]}"
+        logger.debug(f"  ステージングテーブル: {staging_table}")
+        
+        # ステップ2: スキーマ
+        schema = [
+            bigquery.SchemaField("announcement_id", "STRING", mode="REQUIRED"),
+            bigquery.SchemaField("bond_name", "STRING", mode="REQUIRED"),
+            bigquery.SchemaField("issue_amount", "INT64", mode="REQUIRED"),
+            bigquery.SchemaField("legal_basis", "STRING", mode="NULLABLE"),
+            bigquery.SchemaField("legal_basis_normalized", "STRING", mode="NULLABLE"),
+            bigquery.SchemaField("legal_basis_source", "STRING", mode="NULLABLE"),
+            bigquery.SchemaField("bond_category", "STRING", mode="NULLABLE"),
+            bigquery.SchemaField("mof_category", "STRING", mode="NULLABLE"),
+            bigquery.SchemaField("data_quality_score", "INT64", mode="NULLABLE"),
+            bigquery.SchemaField("is_summary_record", "BOOL", mode="NULLABLE"),
+            bigquery.SchemaField("is_detail_record", "BOOL", mode="NULLABLE"),
+            bigquery.SchemaField("dedupe_key", "STRING", mode="REQUIRED"),
+            bigquery.SchemaField("parse_provenance", "STRING", mode="NULLABLE"),
+            bigquery.SchemaField(CANONICAL_COLUMN, "STRING", mode="NULLABLE"),
+        ] + run_schema_fields()
+        
+        # テーブル作成（有効期限付き）
+        table = bigquery.Table(staging_table, schema=schema)
+        table.expires = datetime.now(timezone.utc) + timedelta(days=1)
+        client.create_table(table, exists_ok=True)
+        logger.debug(f"  ✓ ステージングテーブル作成完了（有効期限: 1日）")
+        
+        # ステップ3: 型を確定させてからロード
+        def cast_row(r: dict) -> dict:
+            """dictを正しい型に変換"""
+            return {
+                "announcement_id": str(r["announcement_id"]),
+                "bond_name": str(r["bond_name"]),
+                "issue_amount": int(r["issue_amount"]),
+                "legal_basis": r.get("legal_basis") or r.get("legal_basis_normalized") or None,
+                "legal_basis_normalized": r.get("legal_basis_normalized") or None,
+                "legal_basis_source": r.get("legal_basis_source") or None,
+                "bond_category": r.get("bond_category") or None,
+                "mof_category": r.get("mof_category") or None,
+                "data_quality_score": int(r.get("data_quality_score", 0)),
+                "is_summary_record": bool(r.get("is_summary_record", False)),
+                "is_detail_record": bool(r.get("is_detail_record", True)),
+                "dedupe_key": r.get("dedupe_key") or None,
+                "parse_provenance": item_provenance(r),
+                CANONICAL_COLUMN: r.get(CANONICAL_COLUMN) or None,
+            }
+        
+        # バリデーション
+        def validate_row(r: dict, idx: int):
+            """行のバリデーション"""
+            assert r["announcement_id"], f"row[{idx}]: announcement_id must be non-empty"
+            assert r["bond_name"], f"row[{idx}]: bond_name must be non-empty"
+            assert isinstance(r["issue_amount"], int), f"row[{idx}]: issue_amount must be int"
+            assert r["issue_amount"] > 0, f"row[{idx}]: issue_amount must be positive"
+            assert r["dedupe_key"], f"row[{idx}]: dedupe_key must be non-empty"
+        
+        # 変換とバリデーション
+        rows = []
+        for i, item in enumerate(items):
+            row = cast_row(item)
+            validate_row(row, i)
+            rows.append(row)
+        rows = tag_rows(rows)  # run_id・ingested_at を付与
+        
+        logger.debug(f"  ✓ 行の変換・バリデーション完了: {len(rows)}件")
+        
+        # load_table_from_jsonでロード
+        load_cfg = LoadJobConfig(
+            schema=schema,
+            write_disposition=WriteDisposition.WRITE_TRUNCATE
+        )
+        load_job = client.load_table_from_json(rows, staging_table, job_config=load_cfg, location=LOCATION)
+        load_job.result()
+        
+        logger.debug(f"  ✓ ステージングテーブルへのロード完了")
+        
+        # ステップ4: MERGE実行
+        columns = [field.name for field in schema]
+        if replace_announcement is not None:
+            # --replace: 既存行の削除・集計の差し引き・投入・集計への加算を1つのトランザクションで
+            job_config = bigquery.QueryJobConfig(query_parameters=[
+                bigquery.ScalarQueryParameter("announcement_id", "STRING", replace_announcement)])
+            client.query(replace_rows_sql(staging_table, columns, layer2_columns(client)),
+                         job_config=job_config, location=LOCATION).result()
+            logger.debug(f"  ✓ 既存行を置き換え（--replace）: {len(items)}件")
+            return True, 'SUCCESS'
+        
+        # ステップ5: MERGE と集計への差分加算を1つのトランザクションで（失敗すればどちらも適用しない）
+        merge_job = client.query(merge_rows_transaction_sql(staging_table, columns), location=LOCATION)
+        ins_count = int(list(merge_job.result())[0].inserted_row_count or 0)
+        logger.debug(f"  ✓ MERGE完了: {len(items)}件（staging経由）")
+        
+        # ステップ6: 挿入件数に応じてステータスを決定
+        if ins_count == 0:
+            logger.info(f"  ℹ 全て重複: {len(items)}件")
+            return True, 'NOOP_DUPLICATES'
+        else:
+            logger.debug(f"  ✓ 新規挿入: {ins_count}件")
+            return True, 'SUCCESS'
+        
+    except Exception:
+        # 再試行は QuotaAwareClient の RetryPolicy が行う（ここで重ねて再試行しない）
+        logger.exception("  ✗ MERGE失敗")
+        return False, 'FAILURE'
     
-    return False, 'FAILURE'
+    finally:
+        # ステップ7: ステージングテーブルの掃除
+        if staging_table:
+            try:
+                client.delete_table(staging_table, not_found_ok=True)
+                logger.debug(f"  ✓ ステージングテーブル削除完了")
+            except Exception as e:
+                logger.warning(f"  ⚠ ステージングテーブル削除エラー: {e}")
 
 # ===========================
-# メイン処理
+# 1ファイルの処理
 # ===========================
-logger.info("")
-logger.info("=" * 80)
-logger.info("処理開始")
-logger.info("=" * 80)
-logger.info("")
-
-# 処理カウンター
-success_count = 0
-noop_count = 0
-failure_count = 0
-skip_count = 0
-total_records = 0
-total_amount = 0
-
-for i, file_path in enumerate(test_files, 1):
+def init_parse_worker(min_amount: int, verbose: bool) -> None:
+    """パース用ワーカー（子プロセス）に CLI の設定を反映"""
+    global MIN_AMOUNT
+    MIN_AMOUNT = min_amount
+    logging.basicConfig(level=logging.DEBUG if verbose else logging.WARNING,
+                        format='%(asctime)s [%(levelname)s] %(message)s')
+
+def parse_text(raw_text: str, announcement_id: str) -> Tuple[str, float, List[Dict]]:
+    """正規化・パターン識別・簡易パース（ワーカーで時間予算つきで実行する単位）"""
+    normalized_text = normalize_text(raw_text)
+    pattern, confidence = identify_pattern_simple(normalized_text)
+    items = simple_parse(normalized_text, announcement_id)
+    return pattern, confidence, items
+
+def item_key(item: Dict) -> Tuple[int, str, int]:
+    """抽出結果の要約 (文書内の位置, パターン名, 金額)。bond_name の末尾が位置"""
+    _, pattern_name, start = item['bond_name'].rsplit('_', 2)
+    return int(start), pattern_name, item['issue_amount']
+
+def parse_near_duplicate(raw_text: str, announcement_id: str, canonical_raw: str,
+                         canonical_items: List[List]) -> Tuple[str, float, List[Dict], Optional[int]]:
+    """
+    ほぼ同一の告示を、正本との差分箇所だけパース
+    
+    変わった行の前後の窓を simple_parse し、変わった行に掛かる抽出のうち
+    正本に同じ位置・パターン・金額の抽出がないものだけを返す（正本と同じ抽出は正本の行に紐づける）。
+    
+    Returns:
+        (pattern, confidence, items, removed)
+        removed: 正本にあって差分箇所で消えた抽出の要約 [(位置, パターン名, 金額), ...]（位置は正本のもの）。
+                 差分が大きい・政府短期証券の判定が変わった場合は全文をパースして None
+    """
+    text = normalize_text(raw_text)
+    canonical_text = normalize_text(canonical_raw)
+    diff = TextDiff(canonical_text, text)
+    is_tb = bool(PATTERN_TB.search(text))
+    if diff.changed_ratio() > NEAR_DUP_MAX_CHANGE or is_tb != bool(PATTERN_TB.search(canonical_text)):
+        pattern, confidence, items = parse_text(raw_text, announcement_id)
+        return pattern, confidence, items, None
+    
+    pattern, confidence = identify_pattern_simple(text)
+    known = {(diff.map_position(start), pattern_name, amount): (start, pattern_name, amount)
+             for start, pattern_name, amount in canonical_items}
+    regions = diff.regions(NEAR_DUP_CONTEXT)
+    
+    def touches_change(position: Optional[int]) -> bool:
+        return position is None or any(
+            region.core_start - NEAR_DUP_REACH <= position < region.core_end for region in regions)
+    
+    items, found = [], set()
+    for region in regions:
+        window = text[region.start:region.end]
+        for item in simple_parse(window, announcement_id, offset=region.start, is_tb=is_tb):
+            key = item_key(item)
+            found.add(key)
+            if touches_change(key[0]) and key not in known:
+                items.append(item)
+    removed = [original for key, original in known.items() if touches_change(key[0]) and key not in found]
+    return pattern, confidence, items, sorted(removed)
+
+def start_watchdog(args: argparse.Namespace) -> None:
+    """パース用ワーカーと隔離リストを準備（--profile 時は同じプロセスでパースする）"""
+    global WATCHDOG, QUARANTINE
+    QUARANTINE = QuarantineLog(args.quarantine_file)
+    if args.no_watchdog or args.profile:
+        logger.info("時間予算: なし（同じプロセスでパース）")
+        return
+    WATCHDOG = GuardedWorker(parse_text, file_budget=args.file_budget, pattern_budget=args.pattern_budget,
+                             initializer=init_parse_worker, initargs=(MIN_AMOUNT, args.verbose))
+    logger.info(f"時間予算: 1ファイル {args.file_budget:g}秒 / 1パターン {args.pattern_budget:g}秒"
+                f"（隔離リスト: {args.quarantine_file}）")
+
+def stop_watchdog() -> None:
+    global WATCHDOG
+    if WATCHDOG is not None:
+        WATCHDOG.close()
+        WATCHDOG = None
+
+def start_near_duplicates(args: argparse.Namespace) -> None:
+    """文書マニフェストを開く（--near-duplicates 時）"""
+    global NEAR_DUPLICATES, NEAR_DUP_THRESHOLD
+    if not args.near_duplicates:
+        return
+    NEAR_DUPLICATES = DocumentManifest(args.near_dup_manifest)
+    NEAR_DUP_THRESHOLD = args.near_dup_threshold
+    logger.info(f"ほぼ同一の告示: 類似度 {NEAR_DUP_THRESHOLD:g} 以上を正本に紐づけ"
+                f"（マニフェスト: {args.near_dup_manifest}、登録済み {len(NEAR_DUPLICATES.entries())}件）")
+
+def find_near_duplicate(announcement_id: str, signature: List[int]) -> Optional[Tuple[str, float, str, List[List]]]:
+    """
+    ほぼ同一の正本を探して本文を読む
+    
+    Returns:
+        (正本の id, 類似度, 正本の本文, 正本の抽出結果の要約)。
+        見つからない・正本のファイルが読めない・内容が変わっている場合は None
+    """
+    match = NEAR_DUPLICATES.find_canonical(announcement_id, signature, NEAR_DUP_THRESHOLD)
+    if match is None:
+        return None
+    canonical_id, similarity = match
+    entry = NEAR_DUPLICATES.get(canonical_id)
+    try:
+        with open(entry['path'], 'r', encoding='utf-8') as f:
+            canonical_raw = f.read()
+    except OSError as e:
+        logger.warning(f"  ⚠ 正本を読めないため全文をパース: {canonical_id} ({e})")
+        return None
+    if content_hash(normalize_text(canonical_raw)) != entry['content_hash']:
+        logger.warning(f"  ⚠ 正本の内容が変わっているため全文をパース: {canonical_id}")
+        return None
+    return canonical_id, similarity, canonical_raw, entry['items']
+
+def start_provenance(args: argparse.Namespace) -> None:
+    """依存ルールの記録を開く（ルールの指紋は CLI の設定を反映してから求める）"""
+    global PROVENANCE
+    PROVENANCE = ProvenanceLog(args.provenance_file)
+    rule_set(refresh=True)
+    if REPLACE:
+        logger.info(f"再パース: 既存行を新しい行で置き換え（--replace）")
+
+def skip_quarantined(test_files: List[Path]) -> List[Path]:
+    """隔離済みのファイルを除く"""
+    quarantined = QUARANTINE.names() if QUARANTINE is not None else set()
+    remaining = [path for path in test_files if path.name not in quarantined]
+    if len(remaining) < len(test_files):
+        logger.warning(f"⚠ 隔離済みのため {len(test_files) - len(remaining)}件を飛ばします"
+                       f"（--retry-quarantined で処理）")
+    return remaining
+
+def quarantine_file(file_path: Path, result) -> Tuple[str, int, int]:
+    """時間予算を超えたファイルを隔離リストと parse_log に記録"""
+    logger.warning(f"  ⚠ 時間予算超過のため隔離: {result.reason}（{result.seconds:.1f}秒）"
+                   f" パターン: {result.pattern or '不明'}")
+    if QUARANTINE is not None:
+        QUARANTINE.add(file_path, result, runner='v7_fixed7', run_id=current_run().run_id)
+    log_parse_result(file_path.stem, file_path.name, 'QUARANTINED',
+                     error_message=f"{result.error} pattern={result.pattern}")
+    return 'QUARANTINED', 0, 0
+
+def process_file(file_path: Path) -> Tuple[str, int, int]:
+    """
+    1ファイルをパースしてLayer2へMERGE
+    
+    Returns:
+        (status, records, total_amount)
+        status: 'SUCCESS', 'NOOP_DUPLICATES', 'NEAR_DUPLICATE', 'FAILURE', 'QUARANTINED'
+    """
     announcement_id = file_path.stem
     file_name = file_path.name
-    
-    logger.info(f"[{i}/{len(test_files)}] {announcement_id}")
+    near = None
     
     try:
         # ファイル読み込み
-        with open(file_path, 'r', encoding='utf-8') as f:
-            raw_text = f.read()
+        with profile_stage('read'):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                raw_text = f.read()
         
         logger.info(f"  ✓ ファイル読み込み: {len(raw_text)}文字")
         
-        # NFKC正規化
-        normalized_text = normalize_text(raw_text)
-        logger.debug(f"  ✓ NFKC正規化完了")
+        # ほぼ同一の告示（再掲・訂正）は正本との差分箇所だけをパース
+        # （--replace では既存行をすべて置き換えるため全文をパースする）
+        if NEAR_DUPLICATES is not None:
+            with profile_stage('near_duplicate'):
+                normalized_text = normalize_text(raw_text)
+                signature = minhash_signature(normalized_text)
+                digest = content_hash(normalized_text)
+                if not REPLACE:
+                    near = find_near_duplicate(announcement_id, signature)
+        if near is not None:
+            func, call_args = parse_near_duplicate, (raw_text, announcement_id, near[2], near[3])
+        else:
+            func, call_args = parse_text, (raw_text, announcement_id)
         
-        # パターン識別
-        pattern, confidence = identify_pattern_simple(normalized_text)
+        # NFKC正規化・パターン識別・簡易パース（ワーカーで時間予算つき）
+        with profile_stage('parse'):
+            if WATCHDOG is not None:
+                result = WATCHDOG.call(*call_args, func=func)
+                if result.status == STATUS_TIMEOUT:
+                    return quarantine_file(file_path, result)
+                if result.status == STATUS_ERROR:
+                    raise RuntimeError(result.error)
+                parsed = result.value
+            else:
+                parsed = func(*call_args)
+        pattern, confidence, items = parsed[:3]
         logger.info(f"  ✓ パターン: {pattern} (信頼度: {confidence:.2f})")
         
-        # 簡易パース
-        items = simple_parse(normalized_text, announcement_id)
+        if near is not None and parsed[3] is not None:
+            return record_near_duplicate(file_path, near, pattern, items, parsed[3], signature, digest)
         
         if not items:
+            # --replace でも既存行は消さない（置き換える行が無い）
             logger.warning(f"  ⚠ データ抽出失敗")
-            log_parse_result(announcement_id, file_name, 'FAILURE', 
-                           error_message='No data extracted',
-                           pattern_detected=pattern)
-            failure_count += 1
-            continue
+            with profile_stage('parse_log'):
+                log_parse_result(announcement_id, file_name, 'FAILURE', 
+                               error_message='No data extracted',
+                               pattern_detected=pattern)
+            record_provenance(file_path, pattern, items)
+            return 'FAILURE', 0, 0
         
         logger.info(f"  ✓ データ抽出: {len(items)}件")
         
@@ -785,105 +1216,379 @@ for i, file_path in enumerate(test_files, 1):
         batch_total = sum(item['issue_amount'] for item in items)
         logger.info(f"  ✓ 合計金額: {batch_total / 100000000:.2f}億円")
         
-        # Layer2へMERGE
-        success, status = merge_to_layer2(items)
+        # Layer2へMERGE（--replace: 以前のルールで書き込んだ行を同じトランザクションで置き換える）
+        with profile_stage('merge'):
+            success, status = merge_to_layer2(items, announcement_id if REPLACE else None)
         
         if success:
             if status == 'SUCCESS':
                 logger.info(f"  ✓ 成功: Layer2へMERGE完了")
-                success_count += 1
-                total_records += len(items)
-                total_amount += batch_total
             elif status == 'NOOP_DUPLICATES':
                 logger.info(f"  ✓ 重複: 全て既存データ")
-                noop_count += 1
             
-            log_parse_result(announcement_id, file_name, status,
-                           records_extracted=len(items),
-                           total_amount=batch_total,
-                           pattern_detected=pattern)
-        else:
-            logger.error(f"  ✗ MERGE失敗")
+            with profile_stage('parse_log'):
+                log_parse_result(announcement_id, file_name, status,
+                               records_extracted=len(items),
+                               total_amount=batch_total,
+                               pattern_detected=pattern)
+            if NEAR_DUPLICATES is not None:
+                NEAR_DUPLICATES.add(announcement_id, file_path, digest, signature,
+                                    items=[item_key(item) for item in items], run_id=current_run().run_id)
+            record_provenance(file_path, pattern, items)
+            return status, len(items), batch_total
+        
+        logger.error(f"  ✗ MERGE失敗")
+        with profile_stage('parse_log'):
             log_parse_result(announcement_id, file_name, 'FAILURE',
                            error_message='MERGE failed',
                            records_extracted=len(items),
                            total_amount=batch_total,
                            pattern_detected=pattern)
-            failure_count += 1
+        return 'FAILURE', len(items), batch_total
         
     except Exception as e:
         logger.exception(f"  ✗ 処理エラー")
         log_parse_result(announcement_id, file_name, 'FAILURE', error_message=str(e))
-        failure_count += 1
+        return 'FAILURE', 0, 0
+
+def record_near_duplicate(file_path: Path, near: Tuple[str, float, str, List[List]], pattern: str,
+                          items: List[Dict], removed: List[Tuple[int, str, int]], signature: List[int],
+                          digest: str) -> Tuple[str, int, int]:
+    """
+    ほぼ同一の告示を正本に紐づけ、差分箇所の抽出だけを Layer2 へ MERGE
+    
+    差分箇所の行には canonical_announcement_id（正本）を付け、正本の行のうち訂正で消えた抽出には
+    superseded_by（この告示）を付けて集計から差し引く。
+    """
+    canonical_id, similarity = near[0], near[1]
+    note = (f"near_duplicate_of={canonical_id} similarity={similarity:.3f} "
+            f"changed_records={len(items)} removed_records={len(removed)}")
+    logger.info(f"  ✓ ほぼ同一: {canonical_id}（類似度 {similarity:.3f}）"
+                f"差分の抽出 {len(items)}件・消えた抽出 {len(removed)}件")
+    
+    items = [dict(item, **{CANONICAL_COLUMN: canonical_id}) for item in items]
+    batch_total = sum(item['issue_amount'] for item in items)
+    success = True
+    with profile_stage('merge'):
+        if items:
+            success, _ = merge_to_layer2(items)
+        if success and removed:
+            success = supersede_canonical_rows(file_path.stem, canonical_id, removed)
+    if not success:
+        logger.error(f"  ✗ MERGE失敗")
+        with profile_stage('parse_log'):
+            log_parse_result(file_path.stem, file_path.name, 'FAILURE', error_message=f'MERGE failed {note}',
+                             records_extracted=len(items), total_amount=batch_total, pattern_detected=pattern)
+        return 'FAILURE', len(items), batch_total
+    
+    with profile_stage('parse_log'):
+        log_parse_result(file_path.stem, file_path.name, 'NEAR_DUPLICATE', error_message=note,
+                         records_extracted=len(items), total_amount=batch_total, pattern_detected=pattern)
+    NEAR_DUPLICATES.add(file_path.stem, file_path, digest, signature, canonical=canonical_id,
+                        similarity=similarity, items=[item_key(item) for item in items],
+                        removed=[list(key) for key in removed], run_id=current_run().run_id)
+    record_provenance(file_path, pattern, items, canonical=canonical_id)
+    return 'NEAR_DUPLICATE', len(items), batch_total
+
+def record_provenance(file_path: Path, pattern: str, items: List[Dict], **extra) -> None:
+    """パースした結果が依存したルールを記録（投入に失敗したファイルは記録せず、次の選定でも対象に残す）"""
+    if PROVENANCE is None:
+        return
+    PROVENANCE.add(file_path, rule_set(), parse_dependencies(pattern, items), pattern=pattern,
+                   rows=len(items), run_id=current_run().run_id, **extra)
+
+def replace_rows_sql(staging_table: str, columns: List[str], existing_columns: List[str]) -> str:
+    """
+    --replace: 告示（@announcement_id）の既存行をステージングテーブルの行で置き換えるトランザクション
+    
+    既存行を issuance_summary から差し引いて削除し、新しい行を MERGE して集計に加算する。
+    途中で失敗した場合は既存行も集計もそのまま残る（シャードのステージングテーブルでは集計を更新しない）。
+    
+    Args:
+        columns: ステージングテーブルの列
+        existing_columns: Layer2 テーブルの列
+    """
+    run_id = current_run().run_id
+    existing = f"(SELECT * FROM `{table_id_layer2}` WHERE announcement_id = @announcement_id)"
+    update_summary = LAYER2_TABLE == 'bond_issuances'
+    statements = ["BEGIN TRANSACTION;"]
+    if update_summary:
+        negated = negated_summary_sql(existing, existing_columns)
+        statements.append(merge_delta_sql(table_id_summary, negated, run_id, f"{run_id}:{staging_table}:replaced") + ";")
+    statements.append(f"DELETE FROM `{table_id_layer2}` WHERE announcement_id = @announcement_id;")
+    statements.append(merge_rows_sql(staging_table, columns).strip() + ";")
+    if update_summary:
+        inserted = summary_select_sql(inserted_rows_sql(staging_table), columns)
+        statements.append(merge_delta_sql(table_id_summary, inserted, run_id, f"{run_id}:{staging_table}") + ";")
+    statements.append("COMMIT TRANSACTION;")
+    return "\n\n".join(statements)
+
+def superseded_keys(removed: List[Tuple[int, str, int]]) -> List[str]:
+    """消えた抽出 (位置, パターン名, 金額) を Layer2 の行と照合するキー（bond_name 末尾のパターン名_位置 + 金額）"""
+    return [f"{pattern_name}_{start}_{amount}" for start, pattern_name, amount in removed]
+
+def supersede_rows_sql(announcement_id: str, existing_columns: List[str]) -> str:
+    """
+    正本（@canonical_id）の行のうち訂正で消えた抽出（@superseded_keys）に superseded_by を付けるトランザクション
+    
+    付けた行は issuance_summary から差し引く（再構築・summarize_rows も superseded_by の付いた行を数えない）。
+    既に付いている行は対象外のため、再実行しても二重に差し引かない。
+    """
+    run_id = current_run().run_id
+    target = (f"announcement_id = @canonical_id AND {SUPERSEDED_COLUMN} IS NULL "
+              f"AND CONCAT(REGEXP_EXTRACT(bond_name, r'_([^_]*_[0-9]+)$'), '_', CAST(issue_amount AS STRING)) "
+              f"IN UNNEST(@superseded_keys)")
+    statements = ["BEGIN TRANSACTION;"]
+    if LAYER2_TABLE == 'bond_issuances':
+        negated = negated_summary_sql(f"(SELECT * FROM `{table_id_layer2}` WHERE {target})", existing_columns)
+        statements.append(merge_delta_sql(table_id_summary, negated, run_id,
+                                          f"{run_id}:{announcement_id}:superseded") + ";")
+    statements.append(f"UPDATE `{table_id_layer2}` SET {SUPERSEDED_COLUMN} = @announcement_id WHERE {target};")
+    statements.append("COMMIT TRANSACTION;")
+    return "\n\n".join(statements)
+
+def supersede_canonical_rows(announcement_id: str, canonical_id: str, removed: List[Tuple[int, str, int]]) -> bool:
+    """正本の行のうち訂正で消えた抽出に superseded_by を付ける（失敗時は False）"""
+    from google.cloud import bigquery
+    
+    client = get_client()
+    job_config = bigquery.QueryJobConfig(query_parameters=[
+        bigquery.ScalarQueryParameter("announcement_id", "STRING", announcement_id),
+        bigquery.ScalarQueryParameter("canonical_id", "STRING", canonical_id),
+        bigquery.ArrayQueryParameter("superseded_keys", "STRING", superseded_keys(removed)),
+    ])
+    try:
+        client.query(supersede_rows_sql(announcement_id, layer2_columns(client)),
+                     job_config=job_config, location=LOCATION).result()
+        logger.debug(f"  ✓ 正本の行を置き換え済みとして記録: {canonical_id} {len(removed)}件")
+        return True
+    except Exception as e:
+        logger.error(f"  ✗ 正本の行の置き換え記録に失敗: {canonical_id} ({e})")
+        return False
+
+_LAYER2_COLUMNS = None
+
+def layer2_columns(client) -> List[str]:
+    """Layer2 テーブルの列（既存行を集計から差し引くときに使う）"""
+    global _LAYER2_COLUMNS
+    if _LAYER2_COLUMNS is None:
+        _LAYER2_COLUMNS = [field.name for field in client.get_table(table_id_layer2).schema]
+    return _LAYER2_COLUMNS
+
+# ===========================
+# バッチ処理
+# ===========================
+def run_batch(test_files: List[Path]) -> Dict[str, int]:
+    """ファイルを順に処理して件数を集計"""
+    logger.info("")
+    logger.info("=" * 80)
+    logger.info("処理開始")
+    logger.info("=" * 80)
+    logger.info("")
+    
+    # 処理カウンター
+    counts = {
+        'success': 0,
+        'noop': 0,
+        'near_duplicate': 0,
+        'failure': 0,
+        'skip': 0,
+        'total_records': 0,
+        'total_amount': 0,
+    }
+    
+    for i, file_path in enumerate(test_files, 1):
+        logger.info(f"[{i}/{len(test_files)}] {file_path.stem}")
+        
+        with profile_file(file_path.name):
+            status, records, batch_total = process_file(file_path)
+        if status == 'SUCCESS':
+            counts['success'] += 1
+            counts['total_records'] += records
+            counts['total_amount'] += batch_total
+        elif status == 'NOOP_DUPLICATES':
+            counts['noop'] += 1
+        elif status == 'NEAR_DUPLICATE':
+            counts['near_duplicate'] += 1
+            counts['total_records'] += records
+            counts['total_amount'] += batch_total
+        elif status == 'QUARANTINED':
+            counts['skip'] += 1
+        else:
+            counts['failure'] += 1
+        
+        if PROGRESS_FILE:
+            write_progress(PROGRESS_FILE, done=i, total=len(test_files), run_id=current_run().run_id,
+                           **counts)
+    
+    return counts
 
 # ===========================
 # 結果サマリー
 # ===========================
-logger.info("")
-logger.info("=" * 80)
-logger.info("処理結果")
-logger.info("=" * 80)
-logger.info(f"総ファイル数: {len(test_files)}件")
-logger.info(f"成功: {success_count}件")
-logger.info(f"重複: {noop_count}件")
-logger.info(f"失敗: {failure_count}件")
-logger.info(f"スキップ: {skip_count}件")
-if len(test_files) > 0:
-    logger.info(f"成功率: {(success_count + noop_count) / len(test_files) * 100:.1f}%")
-logger.info(f"総レコード数: {total_records}件")
-logger.info(f"総発行額: {total_amount / 1000000000000:.2f}兆円")
-logger.info("=" * 80)
+def log_summary(counts: Dict[str, int], total_files: int) -> None:
+    """処理結果をログ出力"""
+    logger.info("")
+    logger.info("=" * 80)
+    logger.info("処理結果")
+    logger.info("=" * 80)
+    logger.info(f"総ファイル数: {total_files}件")
+    logger.info(f"成功: {counts['success']}件")
+    logger.info(f"重複: {counts['noop']}件")
+    if counts['near_duplicate']:
+        logger.info(f"ほぼ同一（正本に紐づけ）: {counts['near_duplicate']}件")
+    logger.info(f"失敗: {counts['failure']}件")
+    logger.info(f"スキップ: {counts['skip']}件")
+    if total_files > 0:
+        done = counts['success'] + counts['noop'] + counts['near_duplicate']
+        logger.info(f"成功率: {done / total_files * 100:.1f}%")
+    logger.info(f"総レコード数: {counts['total_records']}件")
+    logger.info(f"総発行額: {counts['total_amount'] / 1000000000000:.2f}兆円")
+    logger.info("=" * 80)
 
 # ===========================
 # Layer2確認（重複チェック付き + カテゴリ直接表示）
 # ===========================
-try:
-    count_query = f"SELECT COUNT(*) as cnt FROM `{table_id_layer2}`"
-    result = list(client.query(count_query, location=LOCATION).result())[0]
-    logger.info(f"\nLayer2 総レコード数: {result.cnt}件")
+def verify_layer2() -> None:
+    """
+    今回の run で書き込んだ行の件数・重複・金額上位を確認
+    
+    テーブル全体ではなく run_id と ingested_at（パーティション列）で絞り込むため、
+    コストは履歴の量ではなく今回の取り込み量に比例する。
+    重複チェックは今回の dedupe_key に限って既存行も含めて数える
+    （dedupe_key はクラスタリング列の先頭）。
+    3つのクエリは互いに独立しているため、まとめて投入して並行実行する
+    """
+    from google.cloud import bigquery
+    
+    client = get_client()
+    run = current_run()
+    where, params = run_scope(run)
+    job_config = bigquery.QueryJobConfig(query_parameters=params)
     
-    # 重複チェック
+    count_query = f"SELECT COUNT(*) as cnt FROM `{table_id_layer2}` WHERE {where}"
+    
+    # 重複チェック（今回の run の dedupe_key のみ）
     dup_query = f"""
     SELECT 
         dedupe_key,
         COUNT(*) as cnt,
         STRING_AGG(announcement_id, ', ') as announcement_ids
     FROM `{table_id_layer2}`
+    WHERE dedupe_key IN (
+        SELECT dedupe_key FROM `{table_id_layer2}` WHERE {where}
+    )
     GROUP BY dedupe_key
     HAVING cnt > 1
     """
-    dup_results = list(client.query(dup_query, location=LOCATION).result())
     
-    if dup_results:
-        logger.warning(f"\n⚠ 重複検出: {len(dup_results)}件")
-        for row in dup_results[:5]:
-            logger.warning(f"  dedupe_key: {row.dedupe_key[:16]}... × {row.cnt}回 ({row.announcement_ids})")
-    else:
-        logger.info("\n✓ 重複なし")
-    
-    if result.cnt > 0:
-        # カテゴリ直接表示（v7_fixed7版: CASEを削除）
-        sample_query = f"""
-        SELECT 
-            announcement_id, 
-            bond_name, 
-            issue_amount, 
-            bond_category AS bond_category_display,
-            LEFT(dedupe_key, 16) as dedupe_key_prefix
-        FROM `{table_id_layer2}`
-        ORDER BY issue_amount DESC
-        LIMIT 5
-        """
-        logger.info("\nサンプルレコード（金額上位5件）:")
-        results = client.query(sample_query, location=LOCATION).result()
-        for row in results:
-            logger.info(f"  {row.announcement_id}: {row.issue_amount:,}円 ({row.issue_amount/100000000:.2f}億円) [{row.bond_category_display}]")
-            logger.debug(f"    dedupe_key: {row.dedupe_key_prefix}...")
-except Exception as e:
-    logger.exception(f"検証エラー")
-
-logger.info("")
-logger.info("=" * 80)
-logger.info("処理完了")
-logger.info("=" * 80)
-logger.info(f"詳細ログ: {args.log_file}")
+    # カテゴリ直接表示（v7_fixed7版: CASEを削除）
+    sample_query = f"""
+    SELECT 
+        announcement_id, 
+        bond_name, 
+        issue_amount, 
+        bond_category AS bond_category_display,
+        LEFT(dedupe_key, 16) as dedupe_key_prefix
+    FROM `{table_id_layer2}`
+    WHERE {where}
+    ORDER BY issue_amount DESC
+    LIMIT 5
+    """
+    
+    try:
+        with BigQueryJobManager(client) as jobs:  # クォータ制御・再試行つきのクライアントで並行実行
+            count_job = jobs.submit_query(count_query, job_config=job_config, location=LOCATION, label='count')
+            dup_job = jobs.submit_query(dup_query, job_config=job_config, location=LOCATION, label='duplicates')
+            sample_job = jobs.submit_query(sample_query, job_config=job_config, location=LOCATION, label='sample')
+        
+        for handle in (count_job, dup_job, sample_job):
+            if handle.error is not None:
+                raise handle.error
+        
+        result = list(count_job.result)[0]
+        logger.info(f"\nLayer2 今回の取り込み件数（run_id={run.run_id}）: {result.cnt}件")
+        
+        dup_results = list(dup_job.result)
+        if dup_results:
+            logger.warning(f"\n⚠ 重複検出: {len(dup_results)}件")
+            for row in dup_results[:5]:
+                logger.warning(f"  dedupe_key: {row.dedupe_key[:16]}... × {row.cnt}回 ({row.announcement_ids})")
+        else:
+            logger.info("\n✓ 重複なし")
+        
+        if result.cnt > 0:
+            logger.info("\nサンプルレコード（金額上位5件）:")
+            for row in sample_job.result:
+                logger.info(f"  {row.announcement_id}: {row.issue_amount:,}円 ({row.issue_amount/100000000:.2f}億円) [{row.bond_category_display}]")
+                logger.debug(f"    dedupe_key: {row.dedupe_key_prefix}...")
+    except Exception as e:
+        logger.exception(f"検証エラー")
+
+# ===========================
+# メイン処理
+# ===========================
+def main(argv: Optional[List[str]] = None) -> int:
+    """メイン実行（引数解析・ログ設定・BigQuery準備・バッチ処理）"""
+    args = parse_args(argv)
+    setup_logging(args.log_file, args.verbose)
+    configure(args)
+    log_settings(args.limit)
+    if args.profile:
+        start_profiling(args.profile_dir, label='v7_fixed7')
+    try:
+        start_watchdog(args)
+        start_near_duplicates(args)
+        start_provenance(args)
+        code = run_main(args)
+    finally:
+        stop_watchdog()
+        finish_profiling(printer=logger.info)
+    return code
+
+
+def run_main(args: argparse.Namespace) -> int:
+    """BigQuery準備・バッチ処理・確認（--profile 時は各段階を記録）"""
+    # BigQueryクライアント
+    try:
+        with profile_stage('setup'):
+            get_client()
+        logger.info("✓ BigQueryクライアント初期化完了")
+    except Exception as e:
+        logger.exception(f"✗ BigQueryクライアント初期化エラー")
+        return 1
+    
+    with profile_stage('setup'):
+        ensure_dataset()
+        if args.files_from:
+            test_files = read_file_list(args.files_from, args.limit)
+        else:
+            test_files = select_files(DATA_DIR, args.limit)
+        if not args.retry_quarantined:
+            test_files = skip_quarantined(test_files)
+        ensure_bond_issuances_table()
+        ensure_dedupe_key_column()
+        ensure_parse_log_table()
+        ensure_run_id_columns()
+        ensure_provenance_column()
+        ensure_near_duplicate_columns()
+        ensure_issuance_summary_table()
+    
+    counts = run_batch(test_files)
+    log_summary(counts, len(test_files))
+    with profile_stage('verify'):
+        verify_layer2()
+    
+    logger.info("")
+    logger.info("=" * 80)
+    logger.info("処理完了")
+    logger.info("=" * 80)
+    logger.info(f"詳細ログ: {args.log_file}")
+    logger.info(f"実行ID: {current_run().run_id}")
+    logger.info(f"取り消す場合: python scripts/02_data_correction/rollback_run.py "
+                f"--run-id {current_run().run_id} --dataset {DATASET_ID}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
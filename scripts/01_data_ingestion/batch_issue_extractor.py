@@ -4,6 +4,7 @@ Day 4：残り24件の告示を処理
 """
 
 import sys
+import argparse
 import logging
 from pathlib import Path
 from typing import List, Dict
@@ -14,6 +15,7 @@ project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
 from parsers.issue_extractor import IssueExtractor
+from parsers.parse_cache import disable_parse_cache
 
 # ロギング設定
 logging.basicConfig(
@@ -106,11 +108,8 @@ def process_notices(data_dir: str) -> Dict:
         
         # 銘柄抽出
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                notice_text = f.read()
-            
-            extractor = IssueExtractor(notice_text)
-            issues = extractor.extract_issues()
+            # パース結果キャッシュ経由（--no-cache で無効化）
+            issues = IssueExtractor.extract_from_file(filepath)
             
             if issues:
                 print(f"✅ 抽出成功：{len(issues)}銘柄")
@@ -223,6 +222,13 @@ def save_results(results: Dict, output_file: str = "extraction_results.json"):
 
 def main():
     """メイン実行"""
+    parser = argparse.ArgumentParser(description='一括銘柄抽出')
+    parser.add_argument('--no-cache', action='store_true', help='パース結果キャッシュを使わずに再パース')
+    args = parser.parse_args()
+    
+    if args.no_cache:
+        disable_parse_cache()
+    
     # データディレクトリ
     data_dir = r"G:\マイドライブ\JGBデータ"
     
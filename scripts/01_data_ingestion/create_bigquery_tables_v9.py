@@ -98,6 +98,7 @@ bond_issuances_schema = [
     # メタデータ
     bigquery.SchemaField("created_at", "TIMESTAMP", description="レコード作成日時"),
     bigquery.SchemaField("updated_at", "TIMESTAMP", description="レコード更新日時"),
+    bigquery.SchemaField("run_id", "STRING", description="取り込み実行ID（run 単位の検証・ロールバック用）"),
 ]
 
 table_id_layer2 = f"{PROJECT_ID}.{DATASET_ID}.bond_issuances"
@@ -4,6 +4,7 @@
 使用方法:
     python scripts/load_issuance_data.py --limit 10
     python scripts/load_issuance_data.py  # 全ファイル処理
+    python scripts/load_issuance_data.py --limit 100 --profile  # 段階ごとのプロファイル（logs/profile/）
 """
 
 import os
@@ -17,11 +18,15 @@ import pandas as pd
 import re
 
 # プロジェクトルートをパスに追加
-project_root = Path(__file__).parent.parent
+project_root = Path(__file__).resolve().parents[2]
 sys.path.insert(0, str(project_root))
 
 from parsers.kanpo_parser import KanpoParser
 from parsers.table_parser import TableParser
+from parsers.law_index import get_law_index, parse_article_number, parse_paragraph_number
+from parsers.bond_master_resolver import get_bond_master_resolver
+from database.bigquery_quota import QuotaAwareClient, RetryPolicy
+from database.profiling import profile_file, profile_stage, profiling
 
 # 設定
 PROJECT_ID = "jgb2023"
@@ -36,10 +41,14 @@ class IssuanceDataLoader:
     def __init__(self, project_id: str, dataset_id: str, service_account_key: str):
         """初期化"""
         os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = service_account_key
-        self.client = bigquery.Client(project=project_id)
+        self.client = QuotaAwareClient(
+            bigquery.Client(project=project_id),
+            retry=RetryPolicy(max_attempts=5, base_delay=3, max_delay=48, on_retry=self._print_retry)
+        )
         self.dataset_id = dataset_id
         self.kanpo_parser = KanpoParser()
         self.table_parser = TableParser()
+        self.bond_resolver = get_bond_master_resolver()   # アップローダーと同じ bond_id の体系
         
         self.stats = {
             'files_processed': 0,
@@ -237,7 +246,7 @@ class IssuanceDataLoader:
             data = {
                 'issuance_id': issuance_id,
                 'announcement_id': announcement_id,
-                'bond_master_id': self._get_bond_master_id(issuance),
+                'bond_master_id': self._get_bond_master_id(issuance, issuance_date_str, maturity_date_str),
                 'issuance_date': issuance_date_str,
                 'maturity_date': maturity_date_str,
                 'interest_rate': getattr(issuance, 'interest_rate', None),
@@ -260,7 +269,7 @@ class IssuanceDataLoader:
             if not legal_basis:
                 continue
             
-            law_id, article_id = self._parse_legal_basis(legal_basis)
+            law_id, article_id = self._parse_legal_basis(legal_basis, issuance_dict.get('issuance_date'))
             
             if law_id and article_id:
                 result.append({
@@ -297,43 +306,36 @@ class IssuanceDataLoader:
         
         print(f"  📊 {table_name}: {len(df)} 件を投入中...")
         
-        # 強化されたリトライロジック（5回、最大48秒待機）
-        max_retries = 5
-        base_wait_time = 3
+        job_config = bigquery.LoadJobConfig(
+            write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+            schema_update_options=[bigquery.SchemaUpdateOption.ALLOW_FIELD_ADDITION]
+        )
         
-        for attempt in range(max_retries):
-            try:
-                job_config = bigquery.LoadJobConfig(
-                    write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
-                    schema_update_options=[bigquery.SchemaUpdateOption.ALLOW_FIELD_ADDITION]
-                )
-                
-                job = self.client.load_table_from_dataframe(df, table_id, job_config=job_config)
-                job.result()
-                
-                print(f"  ✅ {table_name}: 投入成功")
-                return len(data)
-                
-            except Exception as e:
-                error_msg = str(e)
-                
-                if '503' in error_msg or 'Service Unavailable' in error_msg or 'timeout' in error_msg.lower():
-                    if attempt < max_retries - 1:
-                        wait_time = base_wait_time * (2 ** attempt)
-                        print(f"  ⚠️ 一時的なエラー (試行 {attempt+1}/{max_retries})")
-                        print(f"  ⏳ {wait_time}秒待機してリトライします...")
-                        import time
-                        time.sleep(wait_time)
-                        continue
-                    else:
-                        print(f"  ❌ {table_name}: 最大リトライ回数に達しました")
-                        raise
-                else:
-                    print(f"  ❌ {table_name}: 投入失敗 - {error_msg[:200]}")
-                    raise
+        # 一時的なエラーは QuotaAwareClient が再試行する（5回、最大48秒待機）
+        try:
+            self.client.load_table_from_dataframe(df, table_id, job_config=job_config)
+        except Exception as e:
+            print(f"  ❌ {table_name}: 投入失敗 - {str(e)[:200]}")
+            raise
+        
+        print(f"  ✅ {table_name}: 投入成功")
+        return len(data)
+    
+    def _print_retry(self, attempt: int, error: Exception, wait_time: float):
+        print(f"  ⚠️ 一時的なエラー (試行 {attempt}/{self.client.retry.max_attempts}): {str(error)[:100]}")
+        print(f"  ⏳ {wait_time:.1f}秒待機してリトライします...")
     
-    def process_files(self, files: List[Path]):
-        """ファイルを一括処理"""
+    def process_files(self, files: List[Path], profile: bool = False, profile_dir: Optional[str] = None):
+        """
+        ファイルを一括処理
+
+        profile=True で段階（parse / prepare / flush）ごとの cProfile と
+        遅いファイル・正規表現の順位を logs/profile/（または profile_dir）に書き出す
+        """
+        with profiling(profile, profile_dir, label='load_issuance_data'):
+            self._process_files(files)
+
+    def _process_files(self, files: List[Path]):
         print("\n" + "="*60)
         print("📦 発行データ投入開始")
         print("="*60)
@@ -348,18 +350,21 @@ class IssuanceDataLoader:
             print(f"\n--- ファイル {idx}/{len(files)} ---")
             
             try:
-                parsed_data = self.parse_kanpo_file(file_path)
+                with profile_file(file_path.name), profile_stage('parse'):
+                    parsed_data = self.parse_kanpo_file(file_path)
                 if not parsed_data:
                     self.stats['files_failed'] += 1
                     continue
                 
-                announcement = self.prepare_announcement_data(parsed_data)
+                with profile_stage('prepare'):
+                    announcement = self.prepare_announcement_data(parsed_data)
                 announcement_id = announcement['announcement_id']
                 
                 print(f"  告示ID: {announcement_id}")
                 
-                issuances = self.prepare_issuance_data(announcement_id, parsed_data['issuances'])
-                legal_basis = self.prepare_legal_basis_data(issuances, parsed_data['issuances'])
+                with profile_stage('prepare'):
+                    issuances = self.prepare_issuance_data(announcement_id, parsed_data['issuances'])
+                    legal_basis = self.prepare_legal_basis_data(issuances, parsed_data['issuances'])
                 
                 announcements_buffer.append(announcement)
                 issuances_buffer.extend(issuances)
@@ -369,7 +374,8 @@ class IssuanceDataLoader:
                 
                 if len(announcements_buffer) >= BATCH_SIZE:
                     print(f"\n🔄 バッチ投入実行 ({len(announcements_buffer)} 告示)")
-                    self._flush_buffers(announcements_buffer, issuances_buffer, legal_basis_buffer)
+                    with profile_stage('flush'):
+                        self._flush_buffers(announcements_buffer, issuances_buffer, legal_basis_buffer)
                     announcements_buffer = []
                     issuances_buffer = []
                     legal_basis_buffer = []
@@ -382,7 +388,8 @@ class IssuanceDataLoader:
         
         if announcements_buffer:
             print(f"\n🔄 最終バッチ投入 ({len(announcements_buffer)} 告示)")
-            self._flush_buffers(announcements_buffer, issuances_buffer, legal_basis_buffer)
+            with profile_stage('flush'):
+                self._flush_buffers(announcements_buffer, issuances_buffer, legal_basis_buffer)
         
         self._print_summary()
     
@@ -429,19 +436,17 @@ class IssuanceDataLoader:
         
         return f"ANN_{kanpo_date}_{announcement_num}"
     
-    def _get_bond_master_id(self, issuance) -> Optional[str]:
-        """銘柄マスタIDを取得"""
+    def _get_bond_master_id(self, issuance, issuance_date: Optional[str] = None,
+                            maturity_date: Optional[str] = None) -> Optional[str]:
+        """銘柄マスタIDを取得（債券種類に年限が無い場合は償還日数から判定、決定できなければ None）"""
         bond_type = getattr(issuance, 'bond_type', '')
-        type_mapping = {
-            '利付国債': 'BOND_001',
-            '物価連動国債': 'BOND_003',
-            'GX債券': 'BOND_013',
-            '国庫短期証券': 'BOND_014'
-        }
-        return type_mapping.get(bond_type, 'BOND_001')
+        maturity_days = None
+        if issuance_date and maturity_date:
+            maturity_days = (datetime.fromisoformat(maturity_date) - datetime.fromisoformat(issuance_date)).days
+        return self.bond_resolver.resolve(bond_type, maturity_days)
     
-    def _parse_legal_basis(self, legal_basis: str) -> tuple:
-        """法令根拠を解析（複数法令の連結に対応）"""
+    def _parse_legal_basis(self, legal_basis: str, as_of: Optional[str] = None) -> tuple:
+        """法令根拠を解析（複数法令の連結に対応、as_of は発行日。その時点で有効な条項を引く）"""
         if not legal_basis or legal_basis == "不明":
             return (None, None)
         
@@ -450,51 +455,29 @@ class IssuanceDataLoader:
         # Day 3では簡易版として両方を同等に扱う
         legal_parts = re.split(r'(?:及び|並びに)', legal_basis)
         
-        # 各パートを試行（特別会計に関する法律を優先）
+        law_index = get_law_index()
+        
+        # 各パートを試行（先頭のパートを優先）
         for part in legal_parts:
             part = part.strip()
             
             # 条項番号を抽出（第XX条、第XX条のXX、第XX条第X項）
-            article_match = re.search(r'第(\d+)条(?:の(\d+))?', part)
+            article_match = re.search(r'第(\d+条(?:の\d+)?)(?:第(\d+)項)?', part)
             if not article_match:
                 continue
             
-            article_num = article_match.group(1)
-            subsection = article_match.group(2)
-            
-            # 1. 財政法 + 第4条 → LAW_ZAISEI + ART_ZAISEI_4_1
-            if '財政法' in part and article_num == '4':
-                return ('LAW_ZAISEI', 'ART_ZAISEI_4_1')
-            
-            # 2-4. 特別会計に関する法律 + 第46条/第47条/第62条
-            if '特別会計に関する法律' in part:
-                if article_num == '46':
-                    return ('LAW_TOKUBETSU', 'ART_TOKUBETSU_46_1')
-                elif article_num == '47':
-                    return ('LAW_TOKUBETSU', 'ART_TOKUBETSU_47_1')
-                elif article_num == '62':
-                    return ('LAW_TOKUBETSU', 'ART_TOKUBETSU_62_1')
-            
-            # 5. 財政運営に必要な財源の確保を図るための公債の発行の特例に関する法律 + 第2条/第3条
-            if '財政運営に必要な財源の確保を図るための公債の発行の特例に関する法律' in part:
-                if article_num == '2':
-                    return ('LAW_TOKUREIKOUSAI_H24', 'ART_TOKUREIKOUSAI_H24_2_1')
-                elif article_num == '3':
-                    # 第3条の場合、新しいarticle_idが必要だが、マスタに存在しないため
-                    # 第2条として扱う（または None を返す）
-                    return ('LAW_TOKUREIKOUSAI_H24', 'ART_TOKUREIKOUSAI_H24_2_1')
-            
-            # 6. 脱炭素成長型経済構造への円滑な移行の推進に関する法律 + 第7条
-            if '脱炭素成長型経済構造への円滑な移行の推進に関する法律' in part and article_num == '7':
-                return ('LAW_GX', 'ART_GX_7_1')
+            # 条項の直前の法令名（法令番号）を特定
+            law_name = law_index.find_law_name(part[:article_match.start()])
+            if not law_name:
+                continue
             
-            # 7. 情報処理の促進に関する法律 + 第69条
-            if '情報処理の促進に関する法律' in part and article_num == '69':
-                return ('LAW_JOHO', 'ART_JOHO_69_1')
+            article = parse_article_number(article_match.group(1))
+            paragraph = parse_paragraph_number(article_match.group(2)) or 1
             
-            # 8. 子ども・子育て支援法 + 第71条の26
-            if '子ども' in part and '子育て支援法' in part and article_num == '71' and subsection == '26':
-                return ('LAW_KODOMO', 'ART_KODOMO_71_26_1')
+            # (法令名, 条, 項) → 同じ条 → 同じ法令（分類が一意の場合）の順に参照
+            entry, _ = law_index.resolve(law_name, article, paragraph, as_of=as_of)
+            if entry and entry.article_id:
+                return (entry.law_id, entry.article_id)
         
         return (None, None)
 
@@ -504,6 +487,9 @@ def main():
     parser = argparse.ArgumentParser(description='発行データをBigQueryに投入')
     parser.add_argument('--limit', type=int, default=None, help='処理するファイル数の上限')
     parser.add_argument('--data-dir', type=str, default=DATA_DIR, help='データディレクトリのパス')
+    parser.add_argument('--profile', action='store_true',
+                        help='段階ごとの cProfile・collapsed stack・遅いファイル/正規表現の順位を書き出す')
+    parser.add_argument('--profile-dir', type=str, default=None, help='プロファイルの出力先（既定: logs/profile/）')
     
     args = parser.parse_args()
     
@@ -525,7 +511,7 @@ def main():
             print("❌ 処理対象のファイルがありません")
             return
         
-        loader.process_files(files)
+        loader.process_files(files, profile=args.profile, profile_dir=args.profile_dir)
         print("\n✅ 処理が完了しました！")
         
     except Exception as e:
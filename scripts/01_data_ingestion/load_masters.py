@@ -9,20 +9,28 @@
     - データ型を自動変換（BOOLEAN, DATE, INTEGER, NUMERIC）
     - タイムスタンプ（created_at, updated_at）を自動追加
     - 投入後にデータ検証を実行
+    - 各テーブルのロードは並行して実行し、ロードが終わったテーブルから順に検証する
 """
 
 from google.cloud import bigquery
 from pathlib import Path
+import sys
 import pandas as pd
 from datetime import datetime
 import numpy as np
 
+# プロジェクトルートをパスに追加（database パッケージ用）
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from database.job_manager import BigQueryJobManager
+
 # ==================== 設定 ====================
 
 credentials_path = r"C:\Users\sonke\secrets\jgb2023-f8c9b849ae2d.json"
 project_id = "jgb2023"
 dataset_id = "20251019"
 masters_dir = Path("data/masters")
+max_concurrent_jobs = 4  # 同時に実行するBigQueryジョブ数
 
 # ==================== 関数定義 ====================
 
@@ -100,93 +108,116 @@ def convert_data_types(df, table_name):
     return df
 
 
-def load_master_table(client, table_name, csv_file):
+def prepare_master_table(table_name, csv_file):
     """
-    単一のマスタテーブルをBigQueryに投入
+    マスタCSVを読み込み、BigQueryのスキーマに合わせたDataFrameを作成
     
     Args:
-        client: BigQueryクライアント
         table_name: テーブル名
         csv_file: CSVファイルのパス
         
     Returns:
-        (成功/失敗, エラーメッセージ)
+        変換後のDataFrame
     """
-    print(f"\n📦 {table_name} を投入中...")
+    print(f"\n📦 {table_name} を準備中...")
     print(f"  📄 ファイル: {csv_file}")
     
-    try:
-        # CSVを読み込み
-        df = pd.read_csv(csv_file)
-        print(f"  ✅ CSV読み込み成功: {len(df)}行")
-        print(f"  📊 カラム: {list(df.columns)}")
-        
-        # データ型を変換
-        df = convert_data_types(df, table_name)
-        
-        # BigQueryテーブル参照
-        table_ref = f"{project_id}.{dataset_id}.{table_name}"
-        
-        # データを投入
-        print(f"  🚀 BigQueryに投入中...")
-        job_config = bigquery.LoadJobConfig(
-            write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,  # 既存データを上書き
-            autodetect=False,  # 自動検出を無効化（スキーマは既に定義済み）
-        )
-        
-        job = client.load_table_from_dataframe(df, table_ref, job_config=job_config)
-        job.result()  # 完了を待つ
-        
-        print(f"  ✅ 投入成功: {len(df)}行")
-        return True, None
+    # CSVを読み込み
+    df = pd.read_csv(csv_file)
+    print(f"  ✅ CSV読み込み成功: {len(df)}行")
+    print(f"  📊 カラム: {list(df.columns)}")
+    
+    # データ型を変換
+    return convert_data_types(df, table_name)
+
+
+def submit_master_load(jobs, table_name, df, on_loaded=None):
+    """
+    単一のマスタテーブルのロードジョブを投入（完了は待たない）
+    
+    Args:
+        jobs: BigQueryJobManager
+        table_name: テーブル名
+        df: 投入するDataFrame
+        on_loaded: ロード成功時のコールバック（引数はテーブル名）
         
-    except Exception as e:
-        print(f"  ❌ 投入エラー: {e}")
-        return False, str(e)
+    Returns:
+        JobHandle
+    """
+    table_ref = f"{project_id}.{dataset_id}.{table_name}"
+    job_config = bigquery.LoadJobConfig(
+        write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,  # 既存データを上書き
+        autodetect=False,  # 自動検出を無効化（スキーマは既に定義済み）
+    )
+    
+    def done(handle):
+        print(f"  ✅ {table_name} 投入成功: {len(df)}行（{handle.elapsed:.1f}秒）")
+        if on_loaded:
+            on_loaded(table_name)
+    
+    def failed(handle):
+        print(f"  ❌ {table_name} 投入エラー: {handle.error}")
+    
+    print(f"  🚀 {table_name} をBigQueryに投入中...")
+    return jobs.submit_load_dataframe(
+        df, table_ref, job_config=job_config,
+        label=f"load:{table_name}", on_done=done, on_error=failed
+    )
 
 
-def verify_data(client, table_name):
+def submit_verification(jobs, table_name):
     """
-    投入したデータを検証
+    投入したデータの検証（行数・サンプル）をまとめて投入
+    
+    行数はテーブルのメタデータ、サンプルは tabledata.list で取得する
+    （どちらもクエリを実行しないため、テーブル全体を走査せず課金もされない）
     
     Args:
-        client: BigQueryクライアント
+        jobs: BigQueryJobManager
         table_name: テーブル名
+        
+    Returns:
+        (テーブル情報のJobHandle, サンプルのJobHandle)
     """
     table_ref = f"{project_id}.{dataset_id}.{table_name}"
+    client = jobs.client
     
+    return (
+        jobs.submit_call(lambda: client.get_table(table_ref), label=f"count:{table_name}"),
+        # サンプルデータ（0行の場合もスキーマのカラムは取得できる）
+        jobs.submit_call(lambda: client.list_rows(table_ref, max_results=3).to_dataframe(),
+                         label=f"sample:{table_name}"),
+    )
+
+
+def print_verification(table_name, count_handle, sample_handle):
+    """
+    検証結果を表示
+    
+    Args:
+        table_name: テーブル名
+        count_handle: テーブル情報のJobHandle
+        sample_handle: サンプルのJobHandle
+    """
     try:
-        # 行数をカウント
-        query = f"""
-        SELECT COUNT(*) as row_count
-        FROM `{table_ref}`
-        """
+        for handle in (count_handle, sample_handle):
+            if handle.error is not None:
+                raise handle.error
         
-        result = client.query(query).to_dataframe()
-        row_count = result['row_count'].iloc[0]
+        row_count = count_handle.result.num_rows
+        sample_df = sample_handle.result
         
         print(f"📊 {table_name}:")
         print(f"  行数: {row_count}")
-        
-        # サンプルデータを表示
+        print(f"  カラム数: {len(sample_df.columns)}")
         if row_count > 0:
-            sample_query = f"""
-            SELECT *
-            FROM `{table_ref}`
-            LIMIT 3
-            """
-            sample_df = client.query(sample_query).to_dataframe()
-            print(f"  カラム数: {len(sample_df.columns)}")
             print(f"  サンプルデータ(最初の3行):")
             print(sample_df.to_string(index=False))
         else:
-            # スキーマ情報だけ表示
-            table = client.get_table(table_ref)
-            print(f"  カラム数: {len(table.schema)}")
             print(f"  サンプルデータ: なし")
     
     except Exception as e:
-        print(f"  ⚠️  検証エラー: {e}")
+        print(f"  ⚠️  {table_name} 検証エラー: {e}")
 
 
 # ==================== メイン処理 ====================
@@ -215,31 +246,44 @@ def main():
         "bonds_master"
     ]
     
-    # 投入処理
+    # 投入処理（ロードは並行実行し、終わったテーブルから検証クエリを投入）
     print("\n" + "="*60)
     print("📦 マスタデータ投入開始")
+    print(f"   同時実行ジョブ数: {max_concurrent_jobs}")
     print("="*60)
     
-    success_count = 0
     failed_tables = []
+    verifications = {}
     
-    for table_name in master_tables:
-        csv_file = masters_dir / f"{table_name}.csv"
-        
-        # CSVファイルの存在確認
-        if not csv_file.exists():
-            print(f"\n⚠️  {table_name}: CSVファイルが見つかりません")
-            print(f"    {csv_file}")
-            failed_tables.append((table_name, "CSVファイルが見つかりません"))
-            continue
-        
-        # テーブルを投入
-        success, error = load_master_table(client, table_name, csv_file)
+    with BigQueryJobManager(client, max_in_flight=max_concurrent_jobs) as jobs:
+        def verify_after_load(table_name):
+            verifications[table_name] = submit_verification(jobs, table_name)
         
-        if success:
-            success_count += 1
-        else:
-            failed_tables.append((table_name, error))
+        load_handles = {}
+        for table_name in master_tables:
+            csv_file = masters_dir / f"{table_name}.csv"
+            
+            # CSVファイルの存在確認
+            if not csv_file.exists():
+                print(f"\n⚠️  {table_name}: CSVファイルが見つかりません")
+                print(f"    {csv_file}")
+                failed_tables.append((table_name, "CSVファイルが見つかりません"))
+                continue
+            
+            try:
+                df = prepare_master_table(table_name, csv_file)
+            except Exception as e:
+                print(f"  ❌ 準備エラー: {e}")
+                failed_tables.append((table_name, str(e)))
+                continue
+            
+            # ロードジョブを投入（完了を待たずに次のテーブルへ）
+            load_handles[table_name] = submit_master_load(jobs, table_name, df, verify_after_load)
+    
+    success_count = sum(1 for handle in load_handles.values() if handle.ok)
+    for table_name, handle in load_handles.items():
+        if not handle.ok:
+            failed_tables.append((table_name, str(handle.error)))
     
     # 投入完了
     print("\n" + "="*60)
@@ -247,13 +291,14 @@ def main():
     print(f"  成功: {success_count} / {len(master_tables)}")
     print("="*60)
     
-    # データ検証
+    # データ検証（結果はテーブル順に表示）
     print("\n" + "="*60)
     print("🔍 データ検証")
     print("="*60)
     
     for table_name in master_tables:
-        verify_data(client, table_name)
+        if table_name in verifications:
+            print_verification(table_name, *verifications[table_name])
     
     # 結果サマリー
     print("\n" + "="*60)
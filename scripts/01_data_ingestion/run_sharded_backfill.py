@@ -0,0 +1,243 @@
+"""
+年度シャードによる一括取り込み（バックフィル）
+
+複数年度の官報テキストを年度ごと（ファイルの多い年度は月ごと）のシャードに分け、
+batch_direct_processing_v7_fixed7.py をシャードごとの別プロセスで並列に実行する。
+
+- シャードごとの作業ディレクトリ（logs/shards/<dataset>/<shard>/）に
+  ファイル一覧・ログ・進捗・マニフェストを置く
+- 各シャードはステージングテーブル bond_issuances__shard_<shard> に取り込む
+- 取り込みが終わったシャードから順に、1つのトランザクションで bond_issuances へ MERGE し
+  issuance_summary に差分を加算する（シャードごとに1回のコミット）
+- 実行中は全体の進捗と残り時間（ETA）を定期的に表示する
+- 中断後に同じコマンドを再実行すると、コミット済みのシャードは飛ばし、
+  失敗・未完了のシャードを同じ run_id でやり直す
+
+使用方法:
+    python scripts/01_data_ingestion/run_sharded_backfill.py --data-root "G:/マイドライブ/JGBデータ" --plan-only
+    python scripts/01_data_ingestion/run_sharded_backfill.py --data-root "G:/マイドライブ/JGBデータ" --parallel 4
+    python scripts/01_data_ingestion/run_sharded_backfill.py --data-root ... --shards fy2010 fy2011
+"""
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+# プロジェクトルートとこのディレクトリをパスに追加
+SCRIPT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from database.ingestion_run import new_run_id
+from database.sharding import (
+    DEFAULT_MAX_FILES_PER_SHARD,
+    STATUS_COMMITTED,
+    STATUS_FAILED,
+    STATUS_PARSED,
+    STATUS_RUNNING,
+    ShardWorkspace,
+    format_duration,
+    plan_shards,
+    progress_line,
+    shard_commit_sql,
+    staging_table_id,
+)
+
+RUNNER = SCRIPT_DIR / 'batch_direct_processing_v7_fixed7.py'
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+PROJECT_ID = os.getenv('BQ_PROJECT', 'jgb2023')
+DATASET_ID = os.getenv('BQ_DATASET', '20251031')
+LOCATION = os.getenv('BQ_LOCATION', 'asia-northeast1')
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='年度シャードによる一括取り込み')
+    parser.add_argument('--data-root', nargs='+', required=True, help='官報テキストのルート（配下の .txt を再帰的に探す）')
+    parser.add_argument('--project', default=PROJECT_ID)
+    parser.add_argument('--dataset', default=DATASET_ID)
+    parser.add_argument('--location', default=LOCATION)
+    parser.add_argument('--credentials', default=os.getenv('GOOGLE_APPLICATION_CREDENTIALS'))
+    parser.add_argument('--parallel', type=int, default=4, help='同時に実行するシャード数')
+    parser.add_argument('--max-files-per-shard', type=int, default=DEFAULT_MAX_FILES_PER_SHARD,
+                        help='これを超える年度は月ごとに分ける')
+    parser.add_argument('--shards', nargs='+', help='実行するシャード（例: fy2010 fy2023_m05）')
+    parser.add_argument('--workdir', default=None, help='作業ディレクトリ（既定: logs/shards/<dataset>）')
+    parser.add_argument('--min-amount', type=int, default=None, help='最小金額（円）。取り込みスクリプトに渡す')
+    parser.add_argument('--interval', type=float, default=10.0, help='進捗表示の間隔（秒）')
+    parser.add_argument('--plan-only', action='store_true', help='シャードの計画だけを表示')
+    return parser.parse_args(argv)
+
+
+def collect_files(roots: List[str]) -> List[Path]:
+    files = []
+    for root in roots:
+        root_path = Path(root)
+        if not root_path.exists():
+            print(f"⚠️  見つかりません: {root}")
+            continue
+        files.extend(root_path.rglob('*.txt'))
+    return sorted(set(files))
+
+
+def print_plan(workspaces: List[ShardWorkspace]) -> None:
+    print(f"{'シャード':<14} {'年度':>6} {'ファイル':>8}  状態")
+    print("-" * 50)
+    for ws in workspaces:
+        year = ws.shard.fiscal_year or '-'
+        print(f"{ws.shard.shard_id:<14} {year:>6} {len(ws.shard.files):>8,}  {ws.status}")
+    print("-" * 50)
+    print(f"{'合計':<14} {'':>6} {sum(len(ws.shard.files) for ws in workspaces):>8,}  {len(workspaces)}シャード")
+
+
+def prepare_target_tables(args) -> None:
+    """本テーブル（bond_issuances・parse_log・issuance_summary）を準備"""
+    import batch_direct_processing_v7_fixed7 as runner
+
+    runner_argv = ['--project', args.project, '--dataset', args.dataset, '--location', args.location]
+    if args.credentials:
+        runner_argv += ['--credentials', args.credentials]
+    runner.configure(runner.parse_args(runner_argv))
+    runner.ensure_dataset()
+    runner.ensure_bond_issuances_table()
+    runner.ensure_dedupe_key_column()
+    runner.ensure_parse_log_table()
+    runner.ensure_run_id_columns()
+    runner.ensure_provenance_column()
+    runner.ensure_near_duplicate_columns()
+    runner.ensure_issuance_summary_table()
+
+
+def start_shard(ws: ShardWorkspace, args) -> subprocess.Popen:
+    """シャードの取り込みプロセスを起動"""
+    run_id = ws.manifest.get('run_id') or new_run_id()
+    ws.write_files()
+    if ws.progress_path.exists():
+        ws.progress_path.unlink()   # やり直しは先頭から（既に投入した行は MERGE で重複しない）
+    command = [
+        sys.executable, str(RUNNER),
+        '--project', args.project, '--dataset', args.dataset, '--location', args.location,
+        '--files-from', str(ws.files_path), '--limit', '0',
+        '--layer2-table', staging_table_id('bond_issuances', ws.shard),
+        '--progress-file', str(ws.progress_path),
+        '--log-file', str(ws.log_path),
+        '--run-id', run_id,
+    ]
+    if args.credentials:
+        command += ['--credentials', args.credentials]
+    if args.min_amount is not None:
+        command += ['--min-amount', str(args.min_amount)]
+
+    console = open(ws.console_path, 'a', encoding='utf-8')
+    process = subprocess.Popen(command, stdout=console, stderr=subprocess.STDOUT, cwd=str(PROJECT_ROOT))
+    process.console = console
+    ws.update(status=STATUS_RUNNING, run_id=run_id, pid=process.pid,
+              attempts=ws.manifest.get('attempts', 0) + 1,
+              started_at=datetime.now(timezone.utc).isoformat(), error=None)
+    return process
+
+
+def commit_shard(client, ws: ShardWorkspace, args) -> None:
+    """シャードのステージングテーブルを本テーブルへ反映（1トランザクション）"""
+    target = f"{args.project}.{args.dataset}.bond_issuances"
+    staging = staging_table_id(target, ws.shard)
+    summary = f"{args.project}.{args.dataset}.issuance_summary"
+    try:
+        columns = [field.name for field in client.get_table(staging).schema]
+    except Exception as e:
+        if type(e).__name__ != 'NotFound':
+            raise
+        ws.update(status=STATUS_COMMITTED, committed_at=datetime.now(timezone.utc).isoformat(),
+                  note='ステージングテーブルなし（抽出0件）')
+        return
+
+    start = time.time()
+    client.query(shard_commit_sql(target, staging, summary, columns, ws.manifest['run_id']),
+                 location=args.location).result()
+    client.delete_table(staging, not_found_ok=True)
+    ws.update(status=STATUS_COMMITTED, committed_at=datetime.now(timezone.utc).isoformat(),
+              commit_seconds=round(time.time() - start, 1), counts=ws.progress())
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    workdir = Path(args.workdir) if args.workdir else PROJECT_ROOT / 'logs' / 'shards' / args.dataset
+
+    files = collect_files(args.data_root)
+    shards = plan_shards(files, args.max_files_per_shard)
+    if args.shards:
+        shards = [shard for shard in shards if shard.shard_id in args.shards]
+    workspaces = [ShardWorkspace(workdir, shard) for shard in shards]
+
+    print("=" * 70)
+    print(f"📚 年度シャード取り込み: {args.project}.{args.dataset}")
+    print(f"   作業ディレクトリ: {workdir}")
+    print("=" * 70)
+    print_plan(workspaces)
+    if args.plan_only or not workspaces:
+        return 0
+
+    from database.bigquery_client import get_bigquery_client, set_credentials
+    set_credentials(args.credentials)
+    client = get_bigquery_client(args.project, location=args.location, quota_aware=True)
+    prepare_target_tables(args)
+
+    queue = [ws for ws in workspaces if ws.status != STATUS_COMMITTED]
+    running: Dict[str, subprocess.Popen] = {}
+    # ETA は今回取り込むファイルの処理速度から求める
+    baseline = sum(len(ws.shard.files) for ws in workspaces if ws.status in (STATUS_PARSED, STATUS_COMMITTED))
+    start = time.time()
+    last_report = 0.0
+
+    # 前回の実行で取り込みまで終わっているシャードは先にコミット
+    for ws in [ws for ws in queue if ws.status == STATUS_PARSED]:
+        commit_shard(client, ws, args)
+        queue.remove(ws)
+
+    while queue or running:
+        while queue and len(running) < args.parallel:
+            ws = queue.pop(0)
+            running[ws.shard.shard_id] = start_shard(ws, args)
+            print(f"▶ {ws.shard.shard_id} 開始（{len(ws.shard.files)}ファイル, run_id={ws.manifest['run_id']}）")
+
+        time.sleep(1)
+        for shard_id, process in list(running.items()):
+            if process.poll() is None:
+                continue
+            process.console.close()
+            del running[shard_id]
+            ws = next(w for w in workspaces if w.shard.shard_id == shard_id)
+            if process.returncode != 0:
+                ws.update(status=STATUS_FAILED, error=f"exit code {process.returncode}（{ws.console_path}）")
+                print(f"❌ {shard_id} 失敗: 終了コード {process.returncode}")
+                continue
+            ws.update(status=STATUS_PARSED, parsed_at=datetime.now(timezone.utc).isoformat())
+            try:
+                commit_shard(client, ws, args)
+                print(f"✅ {shard_id} コミット完了")
+            except Exception as e:
+                ws.update(status=STATUS_FAILED, error=f"コミット失敗: {e}")
+                print(f"❌ {shard_id} コミット失敗: {e}")
+
+        if time.time() - last_report >= args.interval:
+            print(progress_line(workspaces, time.time() - start, baseline))
+            last_report = time.time()
+
+    print(progress_line(workspaces, time.time() - start, baseline))
+    print("\n" + "=" * 70)
+    print_plan(workspaces)
+    failed = [ws for ws in workspaces if ws.status == STATUS_FAILED]
+    print(f"所要時間: {format_duration(time.time() - start)}")
+    if failed:
+        print(f"❌ 失敗: {', '.join(ws.shard.shard_id for ws in failed)}（同じコマンドで再実行できます）")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -45,8 +45,19 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import Dict, Any, Optional, List, Tuple
 import os
+import sys
 from google.cloud import bigquery
 
+# プロジェクトルートをパスに追加（parsers パッケージ用）
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from parsers.law_index import get_law_index, MATCH_EXACT, MATCH_ARTICLE
+from parsers.parse_cache import cached_parse_file
+from database.bigquery_quota import QuotaAwareClient
+from database.ingestion_run import current_run, ensure_run_columns, tag_rows
+from database.profiling import profile_file, profile_stage, profiling
+from database.storage_write_sink import default_sink, write_rows
+
 
 # =============================================================================
 # 正規化基盤
@@ -219,80 +230,22 @@ def extract_metadata_from_filename(filename: str) -> Dict[str, Optional[str]]:
 # 法令情報の包括的抽出
 # =============================================================================
 
-BOND_TYPE_MAPPING = {
-    '財政法第4条第1項': {
-        'category': '建設国債',
-        'mof_category': '4条国債',
-        'description': '公共事業費、出資金及び貸付金の財源'
-    },
-    '財政法第4条第5項': {
-        'category': '借換債',
-        'mof_category': '借換債',
-        'description': '国債の償還のための起債'
-    },
-    '特別会計に関する法律第47条第1項': {
-        'category': '前倒債',
-        'mof_category': '財投債',
-        'description': '財政投融資特別会計の前倒債'
-    },
-    '特別会計に関する法律第46条第1項': {
-        'category': '財投債',
-        'mof_category': '財投債',
-        'description': '財政投融資特別会計の国債'
-    },
-    '東日本大震災からの復興のための施策を実施するために必要な財源の確保に関する特別措置法第7条': {
-        'category': '復興債',
-        'mof_category': '復興債',
-        'description': '東日本大震災復興財源'
-    },
-    '財政法第5条': {
-        'category': '特例国債（赤字国債）',
-        'mof_category': '特例国債',
-        'description': '特例法による公債（歳入補填）'
-    },
-    # 政府短期証券（FB）
-    '財政法第7条第1項': {
-        'category': '政府短期証券（財務省証券）',
-        'mof_category': '政府短期証券',
-        'description': '財務省証券'
-    },
-    '財政融資資金法第9条第1項': {
-        'category': '政府短期証券（財政融資資金証券）',
-        'mof_category': '政府短期証券',
-        'description': '財政融資資金証券'
-    },
-    '特別会計に関する法律第83条第1項': {
-        'category': '政府短期証券（外国為替資金証券）',
-        'mof_category': '政府短期証券',
-        'description': '外国為替資金証券'
-    },
-    '特別会計に関する法律第94条第2項': {
-        'category': '政府短期証券（石油証券）',
-        'mof_category': '政府短期証券',
-        'description': '石油証券'
-    },
-    '特別会計に関する法律第94条第4項': {
-        'category': '政府短期証券（原子力損害賠償支援証券）',
-        'mof_category': '政府短期証券',
-        'description': '原子力損害賠償支援証券'
-    },
-    '特別会計に関する法律第95条第1項': {
-        'category': '政府短期証券（石油証券・原子力損害賠償支援証券）',
-        'mof_category': '政府短期証券',
-        'description': '石油証券・原子力損害賠償支援証券'
-    },
-    '特別会計に関する法律第136条第1項': {
-        'category': '政府短期証券（食糧証券）',
-        'mof_category': '政府短期証券',
-        'description': '食糧証券'
-    },
-    '特別会計に関する法律第137条第1項': {
-        'category': '政府短期証券（食糧証券）',
-        'mof_category': '政府短期証券',
-        'description': '食糧証券'
-    },
+# 法令 → 国債種別の対応は parsers/law_index.py（laws_master / law_articles_master）に集約
+
+# 照合レベル → 分類の確度
+LAW_MATCH_CONFIDENCE = {
+    MATCH_EXACT: 'high',
+    MATCH_ARTICLE: 'medium',
 }
 
+FUKKO_LAW_NAME = '東日本大震災からの復興のための施策を実施するために必要な財源の確保に関する特別措置法'
+
+# 法令キー（法令名第X条第Y項）の解析
+LAW_KEY_RE = re.compile(
+    r'(財政法|財政融資資金法|特別会計に関する法律|' + FUKKO_LAW_NAME + r')'
+    r'第(\d+)条(?:第(\d+)項)?'
+)
+
 
 def extract_law_reference(text: str) -> Optional[str]:
     """テキストから法令参照を抽出"""
@@ -335,106 +288,49 @@ def infer_law_from_bond_name(bond_name: str) -> Optional[str]:
     return None
 
 
+def split_law_key(law_key: str) -> Optional[Tuple[str, int, Optional[int]]]:
+    """法令参照を (法令名, 条, 項) に分解（項の省略は第1項、復興財源確保法は条のみ）"""
+    match = LAW_KEY_RE.search(law_key)
+    if not match:
+        return None
+    
+    law_name = match.group(1)
+    article = int(match.group(2))
+    if law_name == FUKKO_LAW_NAME:
+        return (law_name, article, None)
+    paragraph = int(match.group(3)) if match.group(3) else 1
+    return (law_name, article, paragraph)
+
+
 def normalize_law_key(law_ref: str) -> str:
     """法令参照を標準形式に正規化"""
     law_ref = normalize_text(law_ref)
+    law_ref = law_ref.replace('復興財源確保法', FUKKO_LAW_NAME)
     
-    if '復興財源確保法' in law_ref:
-        law_ref = law_ref.replace(
-            '復興財源確保法',
-            '東日本大震災からの復興のための施策を実施するために必要な財源の確保に関する特別措置法'
-        )
-    
-    # 財政法
-    match = re.search(r'財政法第(\d+)条(?:第(\d+)項)?', law_ref)
-    if match:
-        article = match.group(1)
-        paragraph = match.group(2) if match.group(2) else '1'
-        return f'財政法第{article}条第{paragraph}項'
-    
-    # 財政融資資金法
-    match = re.search(r'財政融資資金法第(\d+)条(?:第(\d+)項)?', law_ref)
-    if match:
-        article = match.group(1)
-        paragraph = match.group(2) if match.group(2) else '1'
-        return f'財政融資資金法第{article}条第{paragraph}項'
-    
-    # 特別会計に関する法律
-    match = re.search(r'特別会計に関する法律第(\d+)条(?:第(\d+)項)?', law_ref)
-    if match:
-        article = match.group(1)
-        paragraph = match.group(2) if match.group(2) else '1'
-        return f'特別会計に関する法律第{article}条第{paragraph}項'
-    
-    # 復興財源確保法
-    match = re.search(r'東日本大震災からの復興のための施策を実施するために必要な財源の確保に関する特別措置法第(\d+)条', law_ref)
-    if match:
-        article = match.group(1)
-        return f'東日本大震災からの復興のための施策を実施するために必要な財源の確保に関する特別措置法第{article}条'
+    parts = split_law_key(law_ref)
+    if not parts:
+        return law_ref
     
-    return law_ref
+    law_name, article, paragraph = parts
+    if paragraph is None:
+        return f'{law_name}第{article}条'
+    return f'{law_name}第{article}条第{paragraph}項'
 
 
-def classify_bond_type(law_key: str) -> Dict[str, str]:
-    """法令キーから国債種別を分類"""
-    if law_key in BOND_TYPE_MAPPING:
-        result = BOND_TYPE_MAPPING[law_key].copy()
-        result['confidence'] = 'high'
-        return result
-    
-    if '財政法第4条' in law_key:
-        if '第5項' in law_key:
-            result = BOND_TYPE_MAPPING['財政法第4条第5項'].copy()
-            result['confidence'] = 'medium'
-            return result
-        else:
-            result = BOND_TYPE_MAPPING['財政法第4条第1項'].copy()
-            result['confidence'] = 'medium'
-            return result
-    
-    if '財政法第7条' in law_key:
-        result = BOND_TYPE_MAPPING['財政法第7条第1項'].copy()
-        result['confidence'] = 'medium'
-        return result
-    
-    if '財政融資資金法' in law_key:
-        result = BOND_TYPE_MAPPING['財政融資資金法第9条第1項'].copy()
-        result['confidence'] = 'medium'
-        return result
-    
-    if '特別会計に関する法律' in law_key:
-        if '第47条' in law_key:
-            result = BOND_TYPE_MAPPING['特別会計に関する法律第47条第1項'].copy()
-            result['confidence'] = 'medium'
-            return result
-        elif '第46条' in law_key:
-            result = BOND_TYPE_MAPPING['特別会計に関する法律第46条第1項'].copy()
-            result['confidence'] = 'medium'
-            return result
-        elif '第83条' in law_key:
-            result = BOND_TYPE_MAPPING['特別会計に関する法律第83条第1項'].copy()
-            result['confidence'] = 'medium'
-            return result
-        elif '第94条' in law_key:
-            if '第4項' in law_key:
-                result = BOND_TYPE_MAPPING['特別会計に関する法律第94条第4項'].copy()
-            else:
-                result = BOND_TYPE_MAPPING['特別会計に関する法律第94条第2項'].copy()
-            result['confidence'] = 'medium'
-            return result
-        elif '第95条' in law_key:
-            result = BOND_TYPE_MAPPING['特別会計に関する法律第95条第1項'].copy()
-            result['confidence'] = 'medium'
-            return result
-        elif '第136条' in law_key or '第137条' in law_key:
-            result = BOND_TYPE_MAPPING['特別会計に関する法律第136条第1項'].copy()
-            result['confidence'] = 'medium'
-            return result
-    
-    if '復興' in law_key:
-        result = BOND_TYPE_MAPPING['東日本大震災からの復興のための施策を実施するために必要な財源の確保に関する特別措置法第7条'].copy()
-        result['confidence'] = 'low'
-        return result
+def classify_bond_type(law_key: str, as_of: Optional[str] = None) -> Dict[str, str]:
+    """法令キーから国債種別を分類（法令インデックスを参照、as_of 時点で有効な条項のみ）"""
+    parts = split_law_key(law_key)
+    if parts:
+        entry, match_level = get_law_index().resolve(*parts, as_of=as_of)
+        if entry and entry.mof_category:
+            return {
+                'category': entry.category,
+                'mof_category': entry.mof_category,
+                'description': entry.description,
+                'law_id': entry.law_id,
+                'article_id': entry.article_id,
+                'confidence': LAW_MATCH_CONFIDENCE.get(match_level, 'low'),
+            }
     
     return {
         'category': '不明',
@@ -444,8 +340,9 @@ def classify_bond_type(law_key: str) -> Dict[str, str]:
     }
 
 
-def extract_comprehensive_law_info(by_law: str, full_text: str, bond_name: str) -> Dict[str, Any]:
-    """法令情報を包括的に抽出"""
+def extract_comprehensive_law_info(by_law: str, full_text: str, bond_name: str,
+                                   as_of: Optional[str] = None) -> Dict[str, Any]:
+    """法令情報を包括的に抽出（as_of は告示日。改正前後の条項を告示時点で引き分ける）"""
     law_reference = None
     source = 'none'
     quality_score = 0
@@ -477,7 +374,7 @@ def extract_comprehensive_law_info(by_law: str, full_text: str, bond_name: str)
     
     if law_reference:
         law_key = normalize_law_key(law_reference)
-        bond_type = classify_bond_type(law_key)
+        bond_type = classify_bond_type(law_key, as_of=as_of)
         
         if bond_type['confidence'] == 'high':
             quality_score = min(100, quality_score + 10)
@@ -840,14 +737,26 @@ class FBParser:
 class UniversalAnnouncementParser:
     """統合告示パーサー（修正3対応）"""
     
-    def __init__(self, project_id: str, dataset_id: str, credentials_path: Optional[str] = None):
-        """コンストラクタ"""
+    # パース結果キャッシュのバージョン（抽出ロジックを変えたら上げる）
+    PARSER_VERSION = 'v9_final_rev4'
+    
+    def __init__(self, project_id: str, dataset_id: str, credentials_path: Optional[str] = None,
+                 sink: Optional[str] = None):
+        """
+        コンストラクタ
+        
+        Args:
+            sink: Layer2への書き込み方式（insert_all / committed / pending、省略時は JGB_WRITE_SINK）
+        """
         if credentials_path:
             os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = credentials_path
         
-        self.client = bigquery.Client(project=project_id)
+        # DML・insertAll はクォータ制御と再試行を通す（update_layer1_status の UPDATE など）
+        self.client = QuotaAwareClient(bigquery.Client(project=project_id))
         self.project_id = project_id
         self.dataset_id = dataset_id
+        self.sink = sink or default_sink()
+        self._run_columns_ready = set()
     
     def identify_pattern(self, text: str) -> str:
         """告示パターンの識別"""
@@ -871,12 +780,25 @@ class UniversalAnnouncementParser:
         修正3の改善点:
         - extract_comprehensive_law_infoにnormalized_textを渡す
         - legal_basisが未設定の場合、legal_basis_normalizedを代入
-        """
-        with open(file_path, 'r', encoding='utf-8') as f:
-            full_text = f.read()
         
+        パース結果はキャッシュ経由で取得する。結果は本文のほか by_law と
+        法令分類インデックスにも依存するため、両者をキーに含める。
+        """
+        by_law = raw_record.get('by_law', '')
+        issuances, pattern = cached_parse_file(
+            Path(file_path),
+            'UniversalAnnouncementParser',
+            self.PARSER_VERSION,
+            lambda data: self._parse_announcement_text(data.decode('utf-8'), raw_record),
+            variant=(by_law, get_law_index().version)
+        )
+        return issuances, pattern
+    
+    def _parse_announcement_text(self, full_text: str, raw_record: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], str]:
+        """告示本文から発行情報を抽出"""
         normalized_text = normalize_text(full_text)
         pattern = self.identify_pattern(normalized_text)
+        announcement_date = raw_record.get('announcement_date')
         
         issuances = []
         
@@ -889,7 +811,8 @@ class UniversalAnnouncementParser:
                 law_info = extract_comprehensive_law_info(
                     by_law=raw_record.get('by_law', ''),
                     full_text=normalized_text,
-                    bond_name=entry.get('bond_name', '')
+                    bond_name=entry.get('bond_name', ''),
+                    as_of=announcement_date
                 )
                 
                 issuance = {
@@ -917,7 +840,8 @@ class UniversalAnnouncementParser:
                 law_info = extract_comprehensive_law_info(
                     by_law=raw_record.get('by_law', ''),
                     full_text=normalized_text,
-                    bond_name=entry.get('bond_name', '')
+                    bond_name=entry.get('bond_name', ''),
+                    as_of=announcement_date
                 )
                 
                 issuance = {
@@ -947,7 +871,8 @@ class UniversalAnnouncementParser:
                 law_info = extract_comprehensive_law_info(
                     by_law=raw_record.get('by_law', ''),
                     full_text=normalized_text,
-                    bond_name=entry.get('bond_name', '')
+                    bond_name=entry.get('bond_name', ''),
+                    as_of=announcement_date
                 )
                 
                 issuance = {
@@ -975,7 +900,8 @@ class UniversalAnnouncementParser:
                 law_info = extract_comprehensive_law_info(
                     by_law=raw_record.get('by_law', ''),
                     full_text=normalized_text,
-                    bond_name=entry.get('bond_name', '')
+                    bond_name=entry.get('bond_name', ''),
+                    as_of=announcement_date
                 )
                 
                 issuance = {
@@ -1038,7 +964,15 @@ class UniversalAnnouncementParser:
                 }
                 rows_to_insert.append(row)
             
-            errors = self.client.insert_rows_json(table_id, rows_to_insert)
+            # run_id と取り込み日時（created_at はパーティション列）を付与
+            if table_id not in self._run_columns_ready:
+                ensure_run_columns(self.client, table_id, timestamp_column=None)
+                self._run_columns_ready.add(table_id)
+            rows_to_insert = tag_rows(rows_to_insert, current_run(), timestamp_column='created_at')
+            
+            # Storage Write API（committed / pending）ならストリーミングバッファに残らず、
+            # 再実行時の DELETE がブロックされない
+            errors = write_rows(self.client, table_id, rows_to_insert, sink=self.sink)
             if errors:
                 error_msg = json.dumps(errors, ensure_ascii=False)[:1000]
                 return False, error_msg
@@ -1050,7 +984,12 @@ class UniversalAnnouncementParser:
     
     def update_layer1_status(self, announcement_id: str, pattern: str, 
                             parsed: bool, error_msg: Optional[str] = None) -> bool:
-        """Layer1ステータス更新"""
+        """
+        Layer1ステータス更新
+        
+        同一テーブルへの UPDATE は同時実行数の上限を守り、一時的なエラーは再試行する
+        （QuotaAwareClient 経由）
+        """
         table_id = f"{self.project_id}.{self.dataset_id}.raw_announcements"
         
         parsed_at = datetime.now(timezone.utc).isoformat()
@@ -1102,19 +1041,23 @@ class UniversalAnnouncementParser:
         announcement_id = raw_record['announcement_id']
         
         try:
-            issuances, pattern = self.parse_announcement(file_path, raw_record)
-            layer2_success, error_msg = self.insert_to_bigquery_layer2(announcement_id, issuances)
+            with profile_stage('parse'):
+                issuances, pattern = self.parse_announcement(file_path, raw_record)
+            with profile_stage('insert'):
+                layer2_success, error_msg = self.insert_to_bigquery_layer2(announcement_id, issuances)
             
             if layer2_success:
-                self.update_layer1_status(announcement_id, pattern, True)
+                with profile_stage('layer1_update'):
+                    self.update_layer1_status(announcement_id, pattern, True)
                 return True
             else:
-                self.update_layer1_status(
-                    announcement_id, 
-                    pattern, 
-                    False, 
-                    f"Layer2投入失敗: {error_msg}"
-                )
+                with profile_stage('layer1_update'):
+                    self.update_layer1_status(
+                        announcement_id, 
+                        pattern, 
+                        False, 
+                        f"Layer2投入失敗: {error_msg}"
+                    )
                 return False
         
         except Exception as e:
@@ -1122,8 +1065,14 @@ class UniversalAnnouncementParser:
             self.update_layer1_status(announcement_id, "ERROR", False, error_msg)
             return False
     
-    def batch_process(self, file_list: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, int]:
-        """バッチ処理"""
+    def batch_process(self, file_list: List[Tuple[str, Dict[str, Any]]], profile: bool = False,
+                      profile_dir: Optional[str] = None) -> Dict[str, int]:
+        """
+        バッチ処理
+        
+        profile=True で段階（parse / insert / layer1_update）ごとの cProfile と
+        遅いファイル・正規表現の順位を logs/profile/（または profile_dir）に書き出す
+        """
         if not file_list:
             return {'total': 0, 'success': 0, 'failure': 0}
         
@@ -1131,17 +1080,20 @@ class UniversalAnnouncementParser:
         success_count = 0
         failure_count = 0
         
-        for i, (file_path, raw_record) in enumerate(file_list, 1):
-            print(f"処理中 [{i}/{total}]: {raw_record['announcement_id']}")
-            
-            if self.process_single_file(file_path, raw_record):
-                success_count += 1
-            else:
-                failure_count += 1
-            
-            if total > 0:
-                progress = (i / total) * 100
-                print(f"  進捗: {progress:.1f}% (成功: {success_count}, 失敗: {failure_count})")
+        with profiling(profile, profile_dir, label='v9_final_rev4'):
+            for i, (file_path, raw_record) in enumerate(file_list, 1):
+                print(f"処理中 [{i}/{total}]: {raw_record['announcement_id']}")
+                
+                with profile_file(Path(file_path).name):
+                    ok = self.process_single_file(file_path, raw_record)
+                if ok:
+                    success_count += 1
+                else:
+                    failure_count += 1
+                
+                if total > 0:
+                    progress = (i / total) * 100
+                    print(f"  進捗: {progress:.1f}% (成功: {success_count}, 失敗: {failure_count})")
         
         return {
             'total': total,
@@ -3,12 +3,28 @@
 BOND_001 → 正しいbond_master_idに更新
 
 Day 4完了用スクリプト（特殊債券対応）
+
+処理方式:
+1. BOND_001の告示を取得
+2. 告示ファイルを並列に解析し、新しいbond_master_idをローカルで算出
+3. 修正内容を1つのステージングテーブルにロードし、1回のMERGEで反映
+   （告示ごとのUPDATEはDMLジョブ数の上限に当たるため使わない）
+
+使用方法:
+    python scripts/02_data_correction/fix_bond_master_ids.py --dry-run   # 差分と推定スキャン量のみ表示
+    python scripts/02_data_correction/fix_bond_master_ids.py --workers 8
 """
 
+import os
 import sys
+import argparse
 import logging
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from uuid import uuid4
 from google.cloud import bigquery
 from google.oauth2 import service_account
 
@@ -16,44 +32,25 @@ from google.oauth2 import service_account
 logging.basicConfig(level=logging.WARNING)
 
 # パスの設定
-project_root = Path(__file__).parent
+project_root = Path(__file__).resolve().parents[2]
 sys.path.insert(0, str(project_root))
 
 from parsers.issue_extractor import IssueExtractor
 from parsers.table_parser import TableParser
+from parsers.bond_master_resolver import get_bond_master_resolver
+from parsers.parse_cache import disable_parse_cache
+from database.bigquery_quota import QuotaAwareClient
+from database.storage_write_sink import SINK_CHOICES, default_sink, write_rows
 
 # 設定
 PROJECT_ID = "jgb2023"
 DATASET_ID = "20251019"
 BOND_MASTER_TABLE = "bonds_master"
+ISSUANCES_TABLE = "bond_issuances"
+OLD_BOND_MASTER_ID = "BOND_001"
 DATA_DIR = Path(r"G:\マイドライブ\JGBデータ")
 
-# 債券種類とbond_master_idのマッピング（全角・半角両対応 + 特殊債券対応）
-BOND_TYPE_TO_MASTER_ID = {
-    # 通常の利付国債
-    '２年': 'BOND_KENSETSU_2Y',
-    '2年': 'BOND_KENSETSU_2Y',
-    '５年': 'BOND_KENSETSU_5Y',
-    '5年': 'BOND_KENSETSU_5Y',
-    '10年': 'BOND_KENSETSU_10Y',
-    '20年': 'BOND_KENSETSU_20Y',
-    '30年': 'BOND_KENSETSU_30Y',
-    '40年': 'BOND_KENSETSU_40Y',
-    # 個人向け国債
-    '固定・３年': 'BOND_KOJIN_FIXED_3Y',
-    '固定・3年': 'BOND_KOJIN_FIXED_3Y',
-    '固定・５年': 'BOND_KOJIN_FIXED_5Y',
-    '固定・5年': 'BOND_KOJIN_FIXED_5Y',
-    '変動・10年': 'BOND_KOJIN_VARIABLE_10Y',
-    # 国庫短期証券
-    '短期': 'BOND_TANKI',
-    '短期証券': 'BOND_TANKI',
-    '短期年': 'BOND_TANKI',  # 抽出ミス対応（念のため）
-    # 物価連動債
-    '物価連動・10年': 'BOND_BUKKA_10Y',
-}
-
-# bonds_masterに追加する特殊債券マスター
+# bonds_masterに追加する特殊債券マスター（bond_id は parsers.bond_master_resolver.DEFAULT_BOND_ROWS と同じ体系）
 SPECIAL_BOND_MASTERS = {
     'BOND_KOJIN_FIXED_3Y': {
         'bond_id': 'BOND_KOJIN_FIXED_3Y',
@@ -94,17 +91,56 @@ SPECIAL_BOND_MASTERS = {
         'description': '個人向け国債・変動金利10年物',
         'is_active': True
     },
-    'BOND_TANKI': {
-        'bond_id': 'BOND_TANKI',
-        'bond_name': '国庫短期証券',
+    'BOND_TANKI_6M': {
+        'bond_id': 'BOND_TANKI_6M',
+        'bond_name': '国庫短期証券（6ヶ月）',
         'bond_type': '短期国債',
-        'maturity_years': 0.25,
+        'maturity_years': 0.5,
         'maturity_type': '短期',
         'issue_method': '割引発行',
         'interest_type': '割引',
         'interest_payment': 'なし',
         'min_denomination': 50000,
-        'description': '国庫短期証券（割引短期国債）',
+        'description': '国庫短期証券（割引短期国債）・6ヶ月物以下',
+        'is_active': True
+    },
+    'BOND_TANKI_1Y': {
+        'bond_id': 'BOND_TANKI_1Y',
+        'bond_name': '国庫短期証券（1年）',
+        'bond_type': '短期国債',
+        'maturity_years': 1.0,
+        'maturity_type': '短期',
+        'issue_method': '割引発行',
+        'interest_type': '割引',
+        'interest_payment': 'なし',
+        'min_denomination': 50000,
+        'description': '国庫短期証券（割引短期国債）・1年物',
+        'is_active': True
+    },
+    'BOND_GX_5Y': {
+        'bond_id': 'BOND_GX_5Y',
+        'bond_name': 'クライメート・トランジション利付国債（5年）',
+        'bond_type': 'クライメート・トランジション利付国債',
+        'maturity_years': 5.0,
+        'maturity_type': '5年',
+        'issue_method': '入札',
+        'interest_type': '固定利付',
+        'interest_payment': '年2回',
+        'min_denomination': 50000,
+        'description': 'GX経済移行債・5年物',
+        'is_active': True
+    },
+    'BOND_GX_10Y': {
+        'bond_id': 'BOND_GX_10Y',
+        'bond_name': 'クライメート・トランジション利付国債（10年）',
+        'bond_type': 'クライメート・トランジション利付国債',
+        'maturity_years': 10.0,
+        'maturity_type': '10年',
+        'issue_method': '入札',
+        'interest_type': '固定利付',
+        'interest_payment': '年2回',
+        'min_denomination': 50000,
+        'description': 'GX経済移行債・10年物',
         'is_active': True
     },
     'BOND_BUKKA_10Y': {
@@ -123,6 +159,10 @@ SPECIAL_BOND_MASTERS = {
 }
 
 
+# 債券種類 → bond_master_id（アップローダー・ローダーと同じリゾルバ）
+BOND_RESOLVER = get_bond_master_resolver()
+
+
 def get_bond_001_files(client: bigquery.Client):
     """BOND_001を使用している告示のファイル名を取得"""
     query = f"""
@@ -132,7 +172,7 @@ def get_bond_001_files(client: bigquery.Client):
     FROM `{PROJECT_ID}.{DATASET_ID}.announcements` a
     INNER JOIN `{PROJECT_ID}.{DATASET_ID}.bond_issuances` bi
         ON a.announcement_id = bi.announcement_id
-    WHERE bi.bond_master_id = 'BOND_001'
+    WHERE bi.bond_master_id = '{OLD_BOND_MASTER_ID}'
     ORDER BY a.announcement_id
     """
     
@@ -147,8 +187,13 @@ def get_bond_001_files(client: bigquery.Client):
     return files
 
 
-def ensure_special_bonds_in_master(client: bigquery.Client):
-    """bonds_masterに特殊債券が存在することを確認し、なければ追加"""
+def ensure_special_bonds_in_master(client: bigquery.Client, dry_run: bool = False, sink: Optional[str] = None):
+    """
+    bonds_masterに特殊債券が存在することを確認し、なければ追加（dry_runでは表示のみ）
+    
+    Args:
+        sink: 書き込み方式（insert_all / committed / pending、省略時は JGB_WRITE_SINK）
+    """
     print("\n📋 bonds_masterに特殊債券を確認中...")
     
     # 既存のbond_idを取得
@@ -176,6 +221,10 @@ def ensure_special_bonds_in_master(client: bigquery.Client):
         for bond in missing_bonds:
             print(f"  - {bond['bond_name']}")
         
+        if dry_run:
+            print("  （dry-run: 追加は行いません）")
+            return
+        
         # タイムスタンプを追加
         rows = []
         for bond in missing_bonds:
@@ -185,7 +234,7 @@ def ensure_special_bonds_in_master(client: bigquery.Client):
             rows.append(bond_copy)
         
         table_ref = f"{PROJECT_ID}.{DATASET_ID}.{BOND_MASTER_TABLE}"
-        errors = client.insert_rows_json(table_ref, rows)
+        errors = write_rows(client, table_ref, rows, sink=sink)
         
         if errors:
             print(f"❌ bonds_master投入エラー:")
@@ -201,12 +250,8 @@ def ensure_special_bonds_in_master(client: bigquery.Client):
 def extract_bond_type_from_file(filepath: str) -> str:
     """ファイルから債券種類を抽出"""
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            notice_text = f.read()
-        
-        # まず別表形式（複数銘柄）で試行
-        extractor = IssueExtractor(notice_text)
-        issues = extractor.extract_issues()
+        # まず別表形式（複数銘柄）で試行（パース結果キャッシュ経由）
+        issues = IssueExtractor.extract_from_file(Path(filepath))
         
         if issues and len(issues) > 0:
             # 最初の銘柄の種類を返す
@@ -214,6 +259,9 @@ def extract_bond_type_from_file(filepath: str) -> str:
         
         # 別表がない場合、単一銘柄として試行
         print(f"  ℹ️ 別表なし。単一銘柄モードで試行...")
+        with open(filepath, 'r', encoding='utf-8') as f:
+            notice_text = f.read()
+        
         table_parser = TableParser()
         bond_issuance = table_parser.extract_bond_info_from_single(notice_text)
         
@@ -237,30 +285,175 @@ def extract_bond_type_from_file(filepath: str) -> str:
         return None
 
 
-def update_bond_master_id(client: bigquery.Client, announcement_id: str, new_bond_master_id: str):
-    """bond_master_idを更新"""
-    query = f"""
-    UPDATE `{PROJECT_ID}.{DATASET_ID}.bond_issuances`
-    SET 
-        bond_master_id = @new_bond_master_id,
+def resolve_source_path(source_file: str) -> Path:
+    """ファイル名（YYYYMMDD_...）から年度ディレクトリ内のパスを構築"""
+    issue_date = source_file[:8]  # YYYYMMDD
+    year = int(issue_date[:4])
+    month = int(issue_date[4:6])
+    
+    fiscal_year = year if month >= 4 else year - 1
+    return DATA_DIR / str(fiscal_year) / source_file
+
+
+def compute_correction(file_info: Dict) -> Dict:
+    """
+    1告示分の新しいbond_master_idを算出（ProcessPoolExecutorのワーカー）
+    
+    Returns:
+        {announcement_id, source_file, bond_type, new_bond_master_id, error}
+    """
+    result = {
+        'announcement_id': file_info['announcement_id'],
+        'source_file': file_info['source_file'],
+        'bond_type': None,
+        'new_bond_master_id': None,
+        'error': None,
+    }
+    
+    filepath = resolve_source_path(file_info['source_file'])
+    if not filepath.exists():
+        result['error'] = 'ファイル未発見'
+        return result
+    
+    bond_type = extract_bond_type_from_file(str(filepath))
+    if not bond_type:
+        result['error'] = '抽出失敗'
+        return result
+    result['bond_type'] = bond_type
+    
+    bond_master_id = BOND_RESOLVER.resolve(bond_type)
+    if not bond_master_id:
+        result['error'] = f'未知の種類: {bond_type}'
+        return result
+    
+    result['new_bond_master_id'] = bond_master_id
+    return result
+
+
+def compute_corrections(files: List[Dict], workers: int) -> List[Dict]:
+    """全告示の新しいbond_master_idを並列に算出（入力と同じ順序で返す）"""
+    if workers <= 1:
+        return [compute_correction(file_info) for file_info in files]
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(compute_correction, files, chunksize=max(1, len(files) // (workers * 4))))
+
+
+def build_merge_sql(source: str) -> str:
+    """修正内容（announcement_id, bond_master_id）をbond_issuancesに反映するMERGE文"""
+    return f"""
+    MERGE `{PROJECT_ID}.{DATASET_ID}.{ISSUANCES_TABLE}` T
+    USING {source} S
+    ON T.announcement_id = S.announcement_id
+    WHEN MATCHED AND T.bond_master_id != S.bond_master_id THEN
+      UPDATE SET
+        bond_master_id = S.bond_master_id,
         updated_at = CURRENT_TIMESTAMP()
-    WHERE announcement_id = @announcement_id
     """
+
+
+def estimate_merge_bytes(client: bigquery.Client, corrections: List[Dict]) -> Optional[int]:
+    """
+    MERGEの推定スキャン量（dry run）
     
+    ステージングテーブルは dry-run では作成しないため、同じ内容を配列パラメータで渡して見積もる
+    """
+    source = "(SELECT c.announcement_id, c.bond_master_id FROM UNNEST(@corrections) AS c)"
     job_config = bigquery.QueryJobConfig(
+        dry_run=True,
+        use_query_cache=False,
         query_parameters=[
-            bigquery.ScalarQueryParameter("new_bond_master_id", "STRING", new_bond_master_id),
-            bigquery.ScalarQueryParameter("announcement_id", "STRING", announcement_id)
+            bigquery.ArrayQueryParameter(
+                "corrections", "STRUCT",
+                [
+                    bigquery.StructQueryParameter(
+                        None,
+                        bigquery.ScalarQueryParameter("announcement_id", "STRING", c['announcement_id']),
+                        bigquery.ScalarQueryParameter("bond_master_id", "STRING", c['new_bond_master_id']),
+                    )
+                    for c in corrections
+                ]
+            )
         ]
     )
+    try:
+        job = client.query(build_merge_sql(source), job_config=job_config)
+        return job.total_bytes_processed
+    except Exception as e:
+        print(f"⚠️ 推定スキャン量の取得に失敗: {e}")
+        return None
+
+
+def apply_corrections(client: bigquery.Client, corrections: List[Dict]) -> int:
+    """
+    修正内容を1つのステージングテーブルにロードし、1回のMERGEで反映
+    
+    Returns:
+        更新された行数
+    """
+    staging_table = f"{PROJECT_ID}.{DATASET_ID}.{ISSUANCES_TABLE}__bmfix_{uuid4().hex[:8]}"
+    schema = [
+        bigquery.SchemaField("announcement_id", "STRING", mode="REQUIRED"),
+        bigquery.SchemaField("bond_master_id", "STRING", mode="REQUIRED"),
+    ]
+    
+    try:
+        # ステージングテーブル作成（有効期限付き）
+        table = bigquery.Table(staging_table, schema=schema)
+        table.expires = datetime.now(timezone.utc) + timedelta(days=1)
+        client.create_table(table, exists_ok=True)
+        
+        rows = [
+            {'announcement_id': c['announcement_id'], 'bond_master_id': c['new_bond_master_id']}
+            for c in corrections
+        ]
+        load_cfg = bigquery.LoadJobConfig(
+            schema=schema,
+            write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE
+        )
+        client.load_table_from_json(rows, staging_table, job_config=load_cfg).result()
+        print(f"✅ ステージングテーブルにロード: {len(rows)}件")
+        
+        merge_job = client.query(build_merge_sql(f"`{staging_table}`"))
+        merge_job.result()
+        return merge_job.num_dml_affected_rows or 0
+    
+    finally:
+        try:
+            client.delete_table(staging_table, not_found_ok=True)
+        except Exception as e:
+            print(f"⚠️ ステージングテーブル削除エラー: {e}")
+
+
+def print_correction_diff(corrections: List[Dict]):
+    """修正差分（告示ごと・修正後ID別件数）を表示"""
+    print("\n【修正差分】")
+    for c in corrections:
+        print(f"  {c['announcement_id']}: {OLD_BOND_MASTER_ID} → {c['new_bond_master_id']}  ({c['bond_type']})")
     
-    client.query(query, job_config=job_config).result()
+    print("\n【修正後ID別件数】")
+    for bond_master_id, count in sorted(Counter(c['new_bond_master_id'] for c in corrections).items()):
+        print(f"  {bond_master_id}: {count}件")
 
 
 def main():
     """メイン実行"""
+    parser = argparse.ArgumentParser(description='BOND_001のbond_master_idを一括修正')
+    parser.add_argument('--dry-run', action='store_true', help='修正差分と推定スキャン量を表示して終了')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='ファイル解析の並列プロセス数')
+    parser.add_argument('--yes', action='store_true', help='確認プロンプトを省略')
+    parser.add_argument('--no-cache', action='store_true', help='パース結果キャッシュを使わずに再パース')
+    parser.add_argument('--sink', choices=SINK_CHOICES, default=default_sink(),
+                        help='bonds_masterへの書き込み方式（insert_all / committed / pending）')
+    args = parser.parse_args()
+    
+    if args.no_cache:
+        disable_parse_cache()
+    
     print("=" * 70)
     print("🔧 BOND_001修正スクリプト（特殊債券対応）")
+    if args.dry_run:
+        print("   ※ dry-run モード（BigQueryは更新しません）")
     print("=" * 70)
     
     # BigQueryクライアント初期化
@@ -274,9 +467,11 @@ def main():
         client = bigquery.Client(credentials=credentials, project=PROJECT_ID)
     else:
         client = bigquery.Client(project=PROJECT_ID)
+    # クォータ制御・再試行と、クエリごとのスキャン量の記録（終了時にレポート表示）
+    client = QuotaAwareClient(client)
     
     # BOND_001を使用しているファイルを取得
-    print("\n📋 BOND_001を使用している告示を取得中...")
+    print(f"\n📋 {OLD_BOND_MASTER_ID}を使用している告示を取得中...")
     files = get_bond_001_files(client)
     print(f"✅ {len(files)}件の告示を特定しました")
     
@@ -284,97 +479,61 @@ def main():
         print("修正対象がありません")
         return 0
     
-    # bonds_masterに特殊債券を追加
-    ensure_special_bonds_in_master(client)
-    
-    # 確認
-    print(f"\n⚠️ {len(files)}件のbond_master_idを更新します")
-    response = input("続行しますか？ (yes/no): ")
-    if response.lower() != 'yes':
-        print("キャンセルしました")
-        return 0
+    # 新しいbond_master_idをローカルで並列算出
+    print(f"\n🚀 告示ファイルを解析中（{args.workers}プロセス）...")
+    results = compute_corrections(files, args.workers)
+    corrections = [r for r in results if r['new_bond_master_id']]
+    failed_files = [r for r in results if not r['new_bond_master_id']]
+    print(f"✅ 算出完了: 修正対象 {len(corrections)}件 / 失敗 {len(failed_files)}件")
     
-    # 各ファイルを処理
-    print("\n" + "=" * 70)
-    print("🚀 処理開始")
-    print("=" * 70)
+    # bonds_masterに特殊債券を追加
+    ensure_special_bonds_in_master(client, dry_run=args.dry_run, sink=args.sink)
     
-    success_count = 0
-    failed_count = 0
-    failed_files = []
+    if corrections:
+        print_correction_diff(corrections)
+        estimated_bytes = estimate_merge_bytes(client, corrections)
+        if estimated_bytes is not None:
+            print(f"\n💰 MERGE推定スキャン量: {estimated_bytes:,} bytes ({estimated_bytes / 1024**2:.2f} MB)")
     
-    for i, file_info in enumerate(files, 1):
-        announcement_id = file_info['announcement_id']
-        source_file = file_info['source_file']
-        
-        print(f"\n[{i}/{len(files)}] {source_file}")
-        print(f"  announcement_id: {announcement_id}")
+    updated_count = 0
+    if args.dry_run:
+        print("\nℹ️ dry-run のため更新は行いません")
+    elif corrections:
+        # 確認
+        print(f"\n⚠️ {len(corrections)}件の告示のbond_master_idを1回のMERGEで更新します")
+        if not args.yes:
+            response = input("続行しますか？ (yes/no): ")
+            if response.lower() != 'yes':
+                print("キャンセルしました")
+                return 0
         
-        # ファイルパスを構築（年度ベース）
-        issue_date = source_file[:8]  # YYYYMMDD
-        year = int(issue_date[:4])
-        month = int(issue_date[4:6])
-        
-        if month >= 4:
-            fiscal_year = year
-        else:
-            fiscal_year = year - 1
-        
-        filepath = DATA_DIR / str(fiscal_year) / source_file
-        
-        if not filepath.exists():
-            print(f"  ❌ ファイルが見つかりません: {filepath}")
-            failed_count += 1
-            failed_files.append({'file': source_file, 'reason': 'ファイル未発見'})
-            continue
-        
-        # 債券種類を抽出
-        bond_type = extract_bond_type_from_file(str(filepath))
-        
-        if not bond_type:
-            print(f"  ⚠️ 債券種類を抽出できませんでした")
-            failed_count += 1
-            failed_files.append({'file': source_file, 'reason': '抽出失敗'})
-            continue
-        
-        # bond_master_idを取得
-        bond_master_id = BOND_TYPE_TO_MASTER_ID.get(bond_type)
-        
-        if not bond_master_id:
-            print(f"  ⚠️ 未知の債券種類: {bond_type}")
-            failed_count += 1
-            failed_files.append({'file': source_file, 'reason': f'未知の種類: {bond_type}'})
-            continue
-        
-        print(f"  債券種類: {bond_type} → {bond_master_id}")
-        
-        # BigQueryを更新
         try:
-            update_bond_master_id(client, announcement_id, bond_master_id)
-            print(f"  ✅ 更新成功")
-            success_count += 1
+            updated_count = apply_corrections(client, corrections)
+            print(f"✅ MERGE完了: {updated_count}行を更新")
         except Exception as e:
-            print(f"  ❌ 更新エラー: {e}")
-            failed_count += 1
-            failed_files.append({'file': source_file, 'reason': f'DB更新エラー: {e}'})
+            print(f"❌ MERGEエラー: {e}")
+            failed_files.extend(
+                dict(c, error=f'DB更新エラー: {e}') for c in corrections
+            )
+            corrections = []
     
     # 結果サマリー
     print("\n" + "=" * 70)
     print("📊 処理結果")
     print("=" * 70)
     print(f"総件数: {len(files)}")
-    print(f"✅ 成功: {success_count}")
-    print(f"❌ 失敗: {failed_count}")
+    print(f"✅ 修正対象: {len(corrections)}（更新行数: {updated_count}）")
+    print(f"❌ 失敗: {len(failed_files)}")
     
     # 失敗したファイルの詳細
     if failed_files:
         print(f"\n【失敗したファイル】")
         for item in failed_files:
-            print(f"  - {item['file']}")
-            print(f"    理由: {item['reason']}")
+            print(f"  - {item['source_file']}")
+            print(f"    理由: {item['error']}")
     
     # 最終確認
-    if success_count > 0:
+    if updated_count > 0:
         print("\n" + "=" * 70)
         print("🔍 更新後の確認")
         print("=" * 70)
@@ -383,7 +542,7 @@ def main():
         SELECT 
             bm.bond_name,
             COUNT(*) as count
-        FROM `{PROJECT_ID}.{DATASET_ID}.bond_issuances` bi
+        FROM `{PROJECT_ID}.{DATASET_ID}.{ISSUANCES_TABLE}` bi
         LEFT JOIN `{PROJECT_ID}.{DATASET_ID}.{BOND_MASTER_TABLE}` bm
             ON bi.bond_master_id = bm.bond_id
         GROUP BY bm.bond_name
@@ -396,18 +555,19 @@ def main():
             bond_name = row.bond_name or "不明"
             print(f"  {bond_name}: {row.count}件")
     
-    if failed_count == 0:
-        print("\n🎉 すべての修正が完了しました！")
-        print("=" * 70)
-        print("Day 4 完了 🎊")
-        print("=" * 70)
+    if not failed_files:
+        if not args.dry_run:
+            print("\n🎉 すべての修正が完了しました！")
+            print("=" * 70)
+            print("Day 4 完了 🎊")
+            print("=" * 70)
         return 0
     else:
-        print(f"\n⚠️ {failed_count}件の修正に失敗しました")
+        print(f"\n⚠️ {len(failed_files)}件の修正に失敗しました")
         print("失敗したファイルを確認して、個別に対応してください")
         return 1
 
 
 if __name__ == '__main__':
     exit_code = main()
-    sys.exit(exit_code)
\ No newline at end of file
+    sys.exit(exit_code)
@@ -0,0 +1,124 @@
+"""
+取り込み実行（run）単位のロールバック
+
+指定した run_id で書き込まれた行を、テーブルごとに DELETE 文1つで取り消す。
+bond_issuances は同じトランザクションで issuance_summary からも差し引き、
+この run の告示が付けた superseded_by を外す（集計がロールバック後の行と一致したまま残る）。
+run_id は batch_direct_processing_v7_fixed7.py の開始・終了時のログに出力される。
+
+parse_log は insertAll（ストリーミング挿入）で書くため、実行後しばらく（最大90分程度）は
+DELETE できない。既定では対象にせず、--tables で指定した場合は他のテーブルより先に削除を試み、
+ストリーミングバッファのエラーなら他のテーブルも削除せずに終了する（途中までのロールバックを残さない）。
+
+使用方法:
+    python scripts/02_data_correction/rollback_run.py --run-id 20251031T091500Z-3f9a2c1b --dry-run
+    python scripts/02_data_correction/rollback_run.py --run-id 20251031T091500Z-3f9a2c1b --yes
+    python scripts/02_data_correction/rollback_run.py --run-id 20251031T091500Z-3f9a2c1b --tables parse_log bond_issuances
+"""
+
+import os
+import sys
+import argparse
+from pathlib import Path
+
+# パスの設定
+project_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(project_root))
+
+from database.bigquery_client import get_bigquery_client, set_credentials
+from database.ingestion_run import INGESTED_AT_COLUMN, is_streaming_buffer_error, rollback_run, run_started_at
+from database.issuance_summary import SUMMARY_TABLE
+
+# 設定
+PROJECT_ID = os.getenv('BQ_PROJECT', 'jgb2023')
+DATASET_ID = os.getenv('BQ_DATASET', '20251031')
+LOCATION = os.getenv('BQ_LOCATION', 'asia-northeast1')
+
+# テーブル → 取り込み日時の列（None は run_id のみで絞り込む）
+ROLLBACK_TABLES = {
+    'bond_issuances': INGESTED_AT_COLUMN,
+    'parse_log': None,
+}
+DEFAULT_TABLES = ['bond_issuances']
+# テーブル → 一緒に戻す集計テーブル
+SUMMARY_TABLES = {
+    'bond_issuances': SUMMARY_TABLE,
+}
+# insertAll で書くテーブル（ストリーミングバッファにある間は DELETE できないため先に削除する）
+STREAMING_TABLES = {'parse_log'}
+
+
+def rollback_order(tables):
+    """ストリーミング挿入のテーブルを先に（失敗しても他のテーブルはまだ削除していない）"""
+    return sorted(tables, key=lambda table: table not in STREAMING_TABLES)
+
+
+def main(argv=None) -> int:
+    """メイン実行"""
+    parser = argparse.ArgumentParser(description='取り込み実行（run）単位のロールバック')
+    parser.add_argument('--run-id', required=True, help='取り消す取り込み実行ID')
+    parser.add_argument('--project', default=PROJECT_ID)
+    parser.add_argument('--dataset', default=DATASET_ID)
+    parser.add_argument('--location', default=LOCATION)
+    parser.add_argument('--credentials', default=os.getenv('GOOGLE_APPLICATION_CREDENTIALS'))
+    parser.add_argument('--tables', nargs='+', default=DEFAULT_TABLES,
+                        help='対象テーブル（既定: bond_issuances。parse_log は実行後90分程度は削除できない）')
+    parser.add_argument('--dry-run', action='store_true', help='削除対象の件数を表示して終了')
+    parser.add_argument('--yes', action='store_true', help='確認プロンプトを省略')
+    args = parser.parse_args(argv)
+
+    print("=" * 70)
+    print(f"↩️  run ロールバック: {args.run_id}")
+    started_at = run_started_at(args.run_id)
+    if started_at:
+        print(f"   開始時刻: {started_at.isoformat()}（これ以降のパーティションのみ走査）")
+    if args.dry_run:
+        print("   ※ dry-run モード（BigQueryは更新しません）")
+    print("=" * 70)
+
+    set_credentials(args.credentials)
+    client = get_bigquery_client(args.project, location=args.location, quota_aware=True)
+
+    tables = rollback_order(args.tables)
+    counts = {}
+    for table in tables:
+        table_id = f"{args.project}.{args.dataset}.{table}"
+        counts[table] = rollback_run(client, table_id, args.run_id,
+                                     timestamp_column=ROLLBACK_TABLES.get(table, INGESTED_AT_COLUMN),
+                                     dry_run=True, location=args.location)
+        print(f"  {table}: {counts[table]:,}件")
+
+    if args.dry_run or not any(counts.values()):
+        return 0
+
+    if not args.yes:
+        answer = input("\n上記の行を削除しますか？ (yes/no): ")
+        if answer.strip().lower() != 'yes':
+            print("中止しました")
+            return 1
+
+    for table in tables:
+        if not counts[table]:
+            continue
+        table_id = f"{args.project}.{args.dataset}.{table}"
+        summary_table = SUMMARY_TABLES.get(table)
+        try:
+            deleted = rollback_run(client, table_id, args.run_id,
+                                   timestamp_column=ROLLBACK_TABLES.get(table, INGESTED_AT_COLUMN),
+                                   location=args.location,
+                                   summary_table_id=f"{args.project}.{args.dataset}.{summary_table}" if summary_table else None)
+        except Exception as e:
+            if not is_streaming_buffer_error(e):
+                raise
+            remaining = [t for t in tables if t != table and counts[t]]
+            print(f"  ❌ {table}: ストリーミングバッファにある行は削除できません（実行後90分程度）")
+            if remaining:
+                print(f"     {', '.join(remaining)} も削除していません。時間をおいて再実行してください")
+            return 1
+        print(f"  ✅ {table}: {deleted:,}件を削除")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
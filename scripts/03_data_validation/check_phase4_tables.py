@@ -1,39 +1,67 @@
 """
 Phase 4: テーブル作成確認
+
+各テーブルのスキーマ取得は並行して実行し、結果はテーブル一覧の順に表示する。
 """
 from google.cloud import bigquery
 import os
+import sys
+from pathlib import Path
+
+# プロジェクトルートをパスに追加（database パッケージ用）
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 
-os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = r'C:\Users\sonke\secrets\jgb2023-f8c9b849ae2d.json'
+from database.job_manager import BigQueryJobManager
 
 PROJECT_ID = "jgb2023"
 DATASET_ID = "20251027"
+MAX_CONCURRENT_REQUESTS = 8
+
+
+def main():
+    os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = r'C:\Users\sonke\secrets\jgb2023-f8c9b849ae2d.json'
+
+    client = bigquery.Client(project=PROJECT_ID)
+
+    print(f"📊 データセット {DATASET_ID} のテーブル一覧")
+    print("=" * 60)
+
+    tables = client.list_tables(f"{PROJECT_ID}.{DATASET_ID}")
+
+    table_list = []
+    for table in tables:
+        table_list.append(table.table_id)
+        print(f"✅ {table.table_id}")
+
+    print("=" * 60)
+    print(f"合計: {len(table_list)} テーブル")
+    print()
+
+    # 各テーブルのスキーマ取得をまとめて投入
+    with BigQueryJobManager(client, max_in_flight=MAX_CONCURRENT_REQUESTS) as jobs:
+        handles = [
+            jobs.submit_call(
+                lambda table_ref=f"{PROJECT_ID}.{DATASET_ID}.{table_id}": client.get_table(table_ref),
+                label=table_id
+            )
+            for table_id in table_list
+        ]
+
+    # 各テーブルのスキーマ確認
+    for handle in handles:
+        print(f"\n📋 {handle.label} のスキーマ:")
+        print("-" * 60)
+
+        if handle.error is not None:
+            print(f"  ❌ 取得エラー: {handle.error}")
+            continue
+
+        table = handle.result
+        for field in table.schema:
+            print(f"  {field.name:<30} {field.field_type:<15} {field.mode}")
+
+        print(f"  合計: {len(table.schema)} フィールド")
+
 
-client = bigquery.Client(project=PROJECT_ID)
-
-print(f"📊 データセット {DATASET_ID} のテーブル一覧")
-print("=" * 60)
-
-tables = client.list_tables(f"{PROJECT_ID}.{DATASET_ID}")
-
-table_list = []
-for table in tables:
-    table_list.append(table.table_id)
-    print(f"✅ {table.table_id}")
-
-print("=" * 60)
-print(f"合計: {len(table_list)} テーブル")
-print()
-
-# 各テーブルのスキーマ確認
-for table_id in table_list:
-    print(f"\n📋 {table_id} のスキーマ:")
-    print("-" * 60)
-    
-    table_ref = f"{PROJECT_ID}.{DATASET_ID}.{table_id}"
-    table = client.get_table(table_ref)
-    
-    for field in table.schema:
-        print(f"  {field.name:<30} {field.field_type:<15} {field.mode}")
-    
-    print(f"  合計: {len(table.schema)} フィールド")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+発行集計テーブル（issuance_summary）の照合と再構築
+
+issuance_summary は取り込みのたびに差分で更新される。本スクリプトは基データ（bond_issuances）から
+集計し直した結果と突き合わせ、食い違うキーを表示する。--apply を付けると基データから作り直す。
+
+使用方法:
+    python scripts/03_data_validation/reconcile_issuance_summary.py --dataset 20251031
+    python scripts/03_data_validation/reconcile_issuance_summary.py --dataset 20251031 --apply
+"""
+
+import os
+import sys
+import argparse
+from pathlib import Path
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from database.bigquery_client import get_bigquery_client, set_credentials
+from database.issuance_summary import SUMMARY_TABLE, rebuild_summary_sql, reconcile_diff_sql
+
+PROJECT_ID = os.getenv('BQ_PROJECT', 'jgb2023')
+DATASET_ID = os.getenv('BQ_DATASET', '20251031')
+LOCATION = os.getenv('BQ_LOCATION', 'asia-northeast1')
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='issuance_summary の照合・再構築')
+    parser.add_argument('--project', default=PROJECT_ID)
+    parser.add_argument('--dataset', default=DATASET_ID)
+    parser.add_argument('--location', default=LOCATION)
+    parser.add_argument('--credentials', default=os.getenv('GOOGLE_APPLICATION_CREDENTIALS'))
+    parser.add_argument('--source-table', default='bond_issuances', help='基データのテーブル')
+    parser.add_argument('--apply', action='store_true', help='基データから issuance_summary を作り直す')
+    parser.add_argument('--show', type=int, default=20, help='表示する食い違いの件数')
+    args = parser.parse_args(argv)
+
+    set_credentials(args.credentials)
+    client = get_bigquery_client(args.project, location=args.location, quota_aware=True)
+
+    summary_table_id = f"{args.project}.{args.dataset}.{SUMMARY_TABLE}"
+    source_table_id = f"{args.project}.{args.dataset}.{args.source_table}"
+    columns = [field.name for field in client.get_table(source_table_id).schema]
+
+    print("=" * 70)
+    print(f"📊 issuance_summary 照合: {summary_table_id}")
+    print(f"   基データ: {source_table_id}")
+    print("=" * 70)
+
+    if args.apply:
+        client.query(rebuild_summary_sql(summary_table_id, source_table_id, columns)).result()
+        table = client.get_table(summary_table_id)
+        print(f"✅ 再構築完了: {table.num_rows:,}キー")
+        return 0
+
+    try:
+        client.get_table(summary_table_id)
+    except Exception:
+        print("⚠️  issuance_summary がありません（--apply で作成してください）")
+        return 1
+
+    diffs = list(client.query(reconcile_diff_sql(summary_table_id, source_table_id, columns)).result())
+    if not diffs:
+        print("✅ 食い違いはありません")
+        return 0
+
+    print(f"❌ 食い違い: {len(diffs)}キー")
+    for row in diffs[:args.show]:
+        print(f"  {row.fiscal_year}年度 {row.category or '-'} / {row.sub_category or '-'} / "
+              f"{row.mof_category or '-'} / {row.bond_master_id or '-'}: "
+              f"件数 {row.summary_count} → {row.actual_count}, "
+              f"金額 {row.summary_amount:,} → {row.actual_amount:,}")
+    print("\n💡 --apply で基データから作り直せます")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
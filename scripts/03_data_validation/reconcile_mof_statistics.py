@@ -0,0 +1,125 @@
+"""
+財務省統計との照合
+
+財務省の国債発行統計 CSV と bond_issuances を (年度, 月, 区分, 年限) で突き合わせ、
+許容差を超えた食い違いを表示する。食い違いごとに、こちら側の金額を構成する
+announcement_id を表示する（どの告示を見直せばよいか分かる）。
+
+発行データは BigQuery（tabledata.list、クエリ課金なし）またはローカルの Parquet エクスポート
+（scripts/04_utilities/export_parquet_snapshot.py）から読む。
+
+使用方法:
+    python scripts/03_data_validation/reconcile_mof_statistics.py --mof data/mof/2023.csv --dataset 20251031
+    python scripts/03_data_validation/reconcile_mof_statistics.py --mof data/mof/2023.csv --parquet --fiscal-year 2023
+    python scripts/03_data_validation/reconcile_mof_statistics.py --mof data/mof/2023.csv --parquet \\
+        --abs-tolerance 100000000 --rel-tolerance 0.001 --output output/mof_diff_2023.csv
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from database.mof_reconciliation import (
+    STATUS_MATCH,
+    UNIT_MULTIPLIERS,
+    join_keys,
+    load_category_aliases,
+    load_mof_csv,
+    prepare_issuances,
+    reconcile,
+    summarize,
+)
+
+PROJECT_ID = os.getenv('BQ_PROJECT', 'jgb2023')
+DATASET_ID = os.getenv('BQ_DATASET', '20251031')
+LOCATION = os.getenv('BQ_LOCATION', 'asia-northeast1')
+
+
+def load_issuances(args):
+    """発行データを DataFrame で読む"""
+    if args.parquet:
+        from database.parquet_export import read_local_table
+        years = args.fiscal_year or None
+        return read_local_table(args.dataset, 'bond_issuances', fiscal_years=years).to_pandas()
+
+    from database.bigquery_client import get_bigquery_client, set_credentials
+    set_credentials(args.credentials)
+    client = get_bigquery_client(args.project, location=args.location)
+    return client.list_rows(f"{args.project}.{args.dataset}.bond_issuances").to_dataframe()
+
+
+def format_amount(value: float) -> str:
+    return f"{value / 1e12:,.4f}兆円"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='財務省統計との照合')
+    parser.add_argument('--mof', required=True, help='財務省統計の CSV')
+    parser.add_argument('--mof-unit', default='億円', choices=list(UNIT_MULTIPLIERS), help='CSV の金額の単位')
+    parser.add_argument('--project', default=PROJECT_ID)
+    parser.add_argument('--dataset', default=DATASET_ID)
+    parser.add_argument('--location', default=LOCATION)
+    parser.add_argument('--credentials', default=os.getenv('GOOGLE_APPLICATION_CREDENTIALS'))
+    parser.add_argument('--parquet', action='store_true', help='ローカルの Parquet エクスポートから読む')
+    parser.add_argument('--fiscal-year', type=int, nargs='+', help='対象年度')
+    parser.add_argument('--abs-tolerance', type=float, default=0.0, help='許容差額（円）')
+    parser.add_argument('--rel-tolerance', type=float, default=0.0, help='許容差の比率（例: 0.001）')
+    parser.add_argument('--category-map', help='区分名の対応表（JSON）')
+    parser.add_argument('--show', type=int, default=20, help='表示する食い違いの件数')
+    parser.add_argument('--output', help='差分表の出力先（CSV）')
+    args = parser.parse_args(argv)
+
+    aliases = load_category_aliases(args.category_map)
+
+    start = time.time()
+    mof = load_mof_csv(Path(args.mof), unit=args.mof_unit, category_aliases=aliases)
+    issuances = prepare_issuances(load_issuances(args), category_aliases=aliases)
+    loaded = time.time()
+    report = reconcile(issuances, mof, args.abs_tolerance, args.rel_tolerance, args.fiscal_year)
+    elapsed = time.time() - loaded
+
+    keys = join_keys(mof)
+    print("=" * 70)
+    print(f"📊 財務省統計との照合（キー: {', '.join(keys)}）")
+    print(f"   財務省: {len(mof):,}キー / 発行データ: {len(issuances):,}行")
+    print(f"   読み込み {loaded - start:.2f}秒 / 照合 {elapsed:.3f}秒")
+    print("=" * 70)
+
+    for status, totals in summarize(report).items():
+        print(f"  {status:<13} {int(totals['keys']):>5}キー  "
+              f"こちら {format_amount(totals['our_amount'])} / 財務省 {format_amount(totals['mof_amount'])}")
+
+    diffs = report[report['status'] != STATUS_MATCH]
+    print(f"\n合計: こちら {format_amount(report['our_amount'].sum())} / "
+          f"財務省 {format_amount(report['mof_amount'].sum())} / "
+          f"差 {format_amount(report['diff'].sum())}")
+
+    if len(diffs):
+        print(f"\n❌ 食い違い（上位{min(args.show, len(diffs))}件）:")
+        for row in diffs.head(args.show).itertuples(index=False):
+            label = ' / '.join(str(getattr(row, key)) for key in keys)
+            print(f"  [{row.status}] {label}: こちら {format_amount(row.our_amount)} "
+                  f"財務省 {format_amount(row.mof_amount)} 差 {format_amount(row.diff)}")
+            if row.announcement_ids:
+                shown = ', '.join(row.announcement_ids[:5])
+                more = f" 他{len(row.announcement_ids) - 5}件" if len(row.announcement_ids) > 5 else ''
+                print(f"      告示: {shown}{more}")
+    else:
+        print("\n✅ すべて許容差内で一致しました")
+
+    if args.output:
+        out = report.assign(announcement_ids=report['announcement_ids'].str.join(' '))
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        out.to_csv(args.output, index=False, encoding='utf-8-sig')
+        print(f"\n💾 差分表: {args.output}")
+
+    return 1 if len(diffs) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
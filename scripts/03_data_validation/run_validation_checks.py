@@ -0,0 +1,159 @@
+"""
+発行データの一括検証
+
+database/validation.py に宣言されたチェック（総額と明細の一致、配分額の合計、
+償還日と発行日の前後、最小金額）を bond_issuances 全体に対して実行し、
+違反を validation_results テーブルに、チェックごとの結果を validation_status テーブルに記録する。
+
+結果は検証の実行ID（run_id）で絞り込める（違反の無い実行も validation_status に残る）:
+    SELECT check_name, status, violations FROM `jgb2023.20251031.validation_status`
+    WHERE run_id = '...'
+
+使用方法:
+    python scripts/03_data_validation/run_validation_checks.py --dataset 20251031
+    python scripts/03_data_validation/run_validation_checks.py --dataset 20251031 --source-run-id 20251031T010203Z-ab12cd34
+    python scripts/03_data_validation/run_validation_checks.py --dataset 20251031 --parquet --no-write
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from database.ingestion_run import INGESTED_AT_COLUMN, RUN_ID_COLUMN, IngestionRun, run_scope, run_started_at, start_run
+from database.validation import (
+    CHECKS,
+    MIN_AMOUNT,
+    RESULTS_TABLE,
+    STATUS_FAILED,
+    STATUS_SKIPPED,
+    STATUS_TABLE,
+    run_checks,
+    write_results,
+    write_statuses,
+)
+
+PROJECT_ID = os.getenv('BQ_PROJECT', 'jgb2023')
+DATASET_ID = os.getenv('BQ_DATASET', '20251031')
+LOCATION = os.getenv('BQ_LOCATION', 'asia-northeast1')
+
+
+ISSUANCES_TABLE = 'bond_issuances'
+
+
+def source_run_sql(project: str, dataset: str, table: str, where: str) -> str:
+    """
+    --source-run-id の行だけを読む SELECT（表全体をダウンロードしない）
+
+    run_id 列の無い表（issuance_legal_basis）は、その run の発行IDで絞る。
+
+    Args:
+        where: run の行に絞る条件（run_scope）
+    """
+    issuances_id = f"{project}.{dataset}.{ISSUANCES_TABLE}"
+    if table == ISSUANCES_TABLE:
+        return f"SELECT * FROM `{issuances_id}` WHERE {where}"
+    return (f"SELECT * FROM `{project}.{dataset}.{table}` "
+            f"WHERE issuance_id IN (SELECT issuance_id FROM `{issuances_id}` WHERE {where})")
+
+
+def load_frames(args, client):
+    """
+    検証対象を DataFrame で読む
+
+    BigQuery は tabledata.list（課金なし）で読む。--source-run-id 指定時は run_id で絞った
+    クエリにし、取り込み日時のパーティションも run 開始時刻以降だけを読む。
+    """
+    job_config = where = None
+    if args.source_run_id and not args.parquet:
+        from google.cloud import bigquery
+        started_at = run_started_at(args.source_run_id)
+        where, params = run_scope(IngestionRun(args.source_run_id, started_at),
+                                  INGESTED_AT_COLUMN if started_at else None)
+        job_config = bigquery.QueryJobConfig(query_parameters=params)
+
+    frames = {}
+    for name, table in (('issuances', ISSUANCES_TABLE), ('legal_basis', 'issuance_legal_basis')):
+        try:
+            if args.parquet:
+                from database.parquet_export import read_local_table
+                frames[name] = read_local_table(args.dataset, table).to_pandas()
+            elif where:
+                sql = source_run_sql(args.project, args.dataset, table, where)
+                frames[name] = client.query(sql, job_config=job_config).to_dataframe()
+            else:
+                frames[name] = client.list_rows(f"{args.project}.{args.dataset}.{table}").to_dataframe()
+        except Exception as e:
+            print(f"  ⚠️  {table} を読めませんでした: {e}")
+
+    if args.source_run_id and args.parquet:
+        for name, frame in list(frames.items()):
+            if RUN_ID_COLUMN in frame.columns:
+                frames[name] = frame[frame[RUN_ID_COLUMN] == args.source_run_id]
+    return frames
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='発行データの一括検証')
+    parser.add_argument('--project', default=PROJECT_ID)
+    parser.add_argument('--dataset', default=DATASET_ID)
+    parser.add_argument('--location', default=LOCATION)
+    parser.add_argument('--credentials', default=os.getenv('GOOGLE_APPLICATION_CREDENTIALS'))
+    parser.add_argument('--parquet', action='store_true', help='ローカルの Parquet エクスポートから読む')
+    parser.add_argument('--source-run-id', help='この取り込み実行IDの行だけを検証')
+    parser.add_argument('--checks', nargs='+', choices=[check.name for check in CHECKS], help='実行するチェック')
+    parser.add_argument('--min-amount', type=int, default=MIN_AMOUNT, help='最小金額（円）')
+    parser.add_argument('--no-write', action='store_true', help='結果テーブルに書き込まない')
+    parser.add_argument('--show', type=int, default=5, help='チェックごとに表示する違反の件数')
+    args = parser.parse_args(argv)
+
+    run = start_run()
+    client = None
+    if not (args.parquet and args.no_write):
+        from database.bigquery_client import get_bigquery_client, set_credentials
+        set_credentials(args.credentials)
+        client = get_bigquery_client(args.project, location=args.location, quota_aware=True)
+
+    print("=" * 70)
+    print(f"🔎 一括検証: {args.project}.{args.dataset}（実行ID {run.run_id}）")
+    print("=" * 70)
+
+    start = time.time()
+    frames = load_frames(args, client)
+    if 'issuances' not in frames:
+        print("❌ bond_issuances を読めないため中止します")
+        return 1
+    loaded = time.time()
+
+    checks = [check for check in CHECKS if not args.checks or check.name in args.checks]
+    report, statuses = run_checks(frames, run.run_id, checks, source_run_id=args.source_run_id,
+                                  min_amount=args.min_amount)
+    print(f"対象: {len(frames['issuances']):,}行（読み込み {loaded - start:.1f}秒 / 検証 {time.time() - loaded:.2f}秒）\n")
+
+    for status in statuses:
+        icon = {STATUS_FAILED: '❌', STATUS_SKIPPED: '⏭️ '}.get(status['status'], '✅')
+        print(f"{icon} {status['check_name']}: {status['violations']:,}件 — {status['detail']}")
+        if status['status'] == STATUS_FAILED:
+            sample = report[report['check_name'] == status['check_name']].head(args.show)
+            for row in sample.itertuples(index=False):
+                print(f"     {row.announcement_id or '-'} {row.issuance_id or ''} "
+                      f"期待 {row.expected} / 実際 {row.actual}")
+
+    if not args.no_write:
+        table_id = f"{args.project}.{args.dataset}.{RESULTS_TABLE}"
+        written = write_results(client, table_id, report)
+        print(f"\n💾 {table_id} に {written:,}件を記録（run_id = '{run.run_id}'）")
+        status_table_id = f"{args.project}.{args.dataset}.{STATUS_TABLE}"
+        written = write_statuses(client, status_table_id, statuses)
+        print(f"💾 {status_table_id} に {written:,}チェックの結果を記録")
+
+    failed = [s for s in statuses if s['status'] == STATUS_FAILED]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
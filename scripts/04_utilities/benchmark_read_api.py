@@ -0,0 +1,163 @@
+"""
+読み取り API のベンチマーク（リクエスト/秒・p50/p95/p99 レイテンシ）
+
+API サーバーを同じプロセス内で空きポートに起動し、複数スレッドから代表的な
+問い合わせ（回号指定・法令別合計・告示本文・ページング）を一定時間送り続ける。
+--snapshot を省略した場合は合成データのスナップショットを一時ディレクトリに作る。
+
+使用方法:
+    python scripts/04_utilities/benchmark_read_api.py
+    python scripts/04_utilities/benchmark_read_api.py --snapshot cache/api/snapshot.sqlite3 --duration 20
+    python scripts/04_utilities/benchmark_read_api.py --no-cache     # キャッシュ無しと比較
+"""
+
+import sys
+import time
+import random
+import argparse
+import tempfile
+import threading
+import http.client
+from pathlib import Path
+from typing import List
+from urllib.parse import quote
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from api.cache import TTLCache
+from api.server import ReadAPI, make_server
+from api.snapshot import SnapshotReader, write_snapshot
+
+LAWS = ['財政法第4条第1項', '特例公債法', '財投債法', '特別会計法第46条第1項', '復興財源確保法']
+
+
+def build_synthetic_snapshot(path: Path, announcements: int = 2000) -> str:
+    """合成データのスナップショットを作成（告示1件あたり発行3件）"""
+    rng = random.Random(0)
+    issuance_rows, announcement_rows = [], []
+    for i in range(announcements):
+        year = 2015 + i % 10
+        announcement_id = f"{year}{(i % 12) + 1:02d}{(i % 28) + 1:02d}_{i:05d}"
+        announcement_rows.append({
+            'announcement_id': announcement_id,
+            'kanpo_date': f"{year}-{(i % 12) + 1:02d}-{(i % 28) + 1:02d}",
+            'title': f"国債の発行等に関する告示 {i}",
+            'full_text': '　'.join(LAWS) * 20,
+        })
+        for j in range(3):
+            issuance_rows.append({
+                'issuance_id': f"{announcement_id}_{j}",
+                'announcement_id': announcement_id,
+                'bond_master_id': f"B{i % 200:03d}",
+                'series_number': f"第{i % 400 + 1}回",
+                'issuance_date': f"{year}-{(i % 12) + 1:02d}-{(i % 28) + 1:02d}",
+                'issue_amount': rng.randint(1, 500) * 100_000_000,
+                'legal_basis': LAWS[(i + j) % len(LAWS)],
+                'category': ['建設国債', '特例国債', '財投債', '借換債'][j % 4],
+            })
+    return write_snapshot(path, {'issuances': issuance_rows, 'announcements': announcement_rows},
+                          source='synthetic')
+
+
+def request_paths(reader: SnapshotReader, count: int = 200) -> List[str]:
+    """実データから問い合わせの組み合わせを作る"""
+    rng = random.Random(1)
+    series = [r['series_number'] for r in reader.query(
+        "SELECT DISTINCT series_number FROM issuances WHERE series_number IS NOT NULL LIMIT 200")]
+    ids = [r['announcement_id'] for r in reader.query("SELECT announcement_id FROM announcements LIMIT 200")]
+    years = [r['fiscal_year'] for r in reader.query("SELECT DISTINCT fiscal_year FROM issuances")]
+    paths = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.4 and series:
+            paths.append(f"/issuances?series={quote(rng.choice(series))}")
+        elif kind < 0.6 and years:
+            paths.append(f"/aggregates/by-law?fiscal_year={rng.choice(years)}")
+        elif kind < 0.8 and ids:
+            paths.append(f"/announcements/{quote(rng.choice(ids))}")
+        else:
+            paths.append(f"/issuances?page={rng.randint(1, 20)}&per_page=100")
+    return paths
+
+
+def run_client(port: int, paths: List[str], deadline: float, latencies: List[float],
+               errors: List[int], seed: int):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    while time.perf_counter() < deadline:
+        path = rng.choice(paths)
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 500:
+                errors.append(response.status)
+        except Exception:
+            errors.append(0)
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * p), len(ordered) - 1)]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='読み取りAPIのベンチマーク')
+    parser.add_argument('--snapshot', help='スナップショット（省略時は合成データ）')
+    parser.add_argument('--duration', type=float, default=10.0, help='計測時間（秒）')
+    parser.add_argument('--clients', type=int, default=8, help='同時接続数')
+    parser.add_argument('--no-cache', action='store_true', help='レスポンスキャッシュを無効にする')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_path = Path(args.snapshot) if args.snapshot else Path(tmp) / 'snapshot.sqlite3'
+        if not args.snapshot:
+            print("🧪 合成データのスナップショットを作成中...")
+            build_synthetic_snapshot(snapshot_path)
+
+        cache = TTLCache(maxsize=0 if args.no_cache else 4096)
+        api = ReadAPI(SnapshotReader(snapshot_path), cache)
+        server = make_server(api, port=0)
+        port = server.server_address[1]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        paths = request_paths(api.snapshot)
+        latencies: List[float] = []
+        errors: List[int] = []
+        print(f"🚀 {args.clients}接続 × {args.duration:.0f}秒 "
+              f"（キャッシュ{'無効' if args.no_cache else '有効'}, スナップショット {api.snapshot.version}）")
+
+        start = time.perf_counter()
+        deadline = start + args.duration
+        workers = [threading.Thread(target=run_client,
+                                    args=(port, paths, deadline, latencies, errors, seed))
+                   for seed in range(args.clients)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+        server.shutdown()
+        server.server_close()
+
+    print("=" * 60)
+    print(f"リクエスト数: {len(latencies):,}（エラー {len(errors)}）")
+    print(f"スループット: {len(latencies) / elapsed:,.0f} req/s")
+    print(f"レイテンシ:   p50 {percentile(latencies, 0.50) * 1000:.2f}ms / "
+          f"p95 {percentile(latencies, 0.95) * 1000:.2f}ms / "
+          f"p99 {percentile(latencies, 0.99) * 1000:.2f}ms")
+    print(f"キャッシュ:   ヒット率 {cache.hit_rate:.1%}（{len(cache)}件）")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""
+読み取り API 用のスナップショットを BigQuery から作成
+
+bond_issuances / announcements / issuance_summary を tabledata.list で読み出し
+（クエリ課金なし）、SQLite ファイルに書き出す。API サーバーは起動したままで構わない
+（ファイルの置き換えを検知して次のリクエストから新しいスナップショットを返す）。
+
+使用方法:
+    python scripts/04_utilities/build_api_snapshot.py --dataset 20251025
+    python scripts/04_utilities/build_api_snapshot.py --dataset 20251025 --output cache/api/snapshot.sqlite3
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from api.snapshot import DEFAULT_SNAPSHOT_PATH, SnapshotReader, export_from_bigquery
+from database.bigquery_client import get_bigquery_client, set_credentials
+
+PROJECT_ID = os.getenv('BQ_PROJECT', 'jgb2023')
+DATASET_ID = os.getenv('BQ_DATASET', '20251025')
+LOCATION = os.getenv('BQ_LOCATION', 'asia-northeast1')
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='読み取りAPI用スナップショットの作成')
+    parser.add_argument('--project', default=PROJECT_ID)
+    parser.add_argument('--dataset', default=DATASET_ID)
+    parser.add_argument('--location', default=LOCATION)
+    parser.add_argument('--credentials', default=os.getenv('GOOGLE_APPLICATION_CREDENTIALS'))
+    parser.add_argument('--output', default=str(DEFAULT_SNAPSHOT_PATH), help='出力先')
+    args = parser.parse_args(argv)
+
+    set_credentials(args.credentials)
+    client = get_bigquery_client(args.project, location=args.location, quota_aware=True)
+
+    print(f"📦 スナップショット作成: {args.project}.{args.dataset} → {args.output}")
+    start = time.time()
+    version = export_from_bigquery(client, args.project, args.dataset, Path(args.output))
+
+    reader = SnapshotReader(Path(args.output))
+    for table in ('issuances', 'announcements', 'summary'):
+        print(f"  {table}: {reader.scalar(f'SELECT COUNT(*) FROM {table}'):,}行")
+    print(f"✅ バージョン {version}（{time.time() - start:.1f}秒）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,9 +6,16 @@ BigQueryのクォータと設定を確認するスクリプト
 """
 
 import os
+import sys
+from pathlib import Path
 from google.cloud import bigquery
 from google.api_core import exceptions
 
+# プロジェクトルートをパスに追加
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from database.bigquery_quota import DEFAULT_QUOTAS, KIND_BUCKET, get_rate_limiter
+
 # 設定
 PROJECT_ID = "jgb2023"
 DATASET_ID = "20251019"
@@ -172,6 +179,29 @@ def check_bigquery_config():
     print("     https://console.cloud.google.com/billing")
     print("  3. BigQuery API が有効になっているか確認")
     print("     https://console.cloud.google.com/apis/library/bigquery.googleapis.com")
+    
+    print_shared_quota_state()
+
+
+def print_shared_quota_state():
+    """ワーカー間で共有しているクォータ制御の設定と現在の状態を表示"""
+    print("\n【8. 共有クォータ制御（database.bigquery_quota）】")
+    for quota in DEFAULT_QUOTAS.values():
+        if quota.kind == KIND_BUCKET:
+            print(f"  {quota.name}: 容量 {quota.capacity:,.0f} / 補充 {quota.refill_per_second:,.3f} 毎秒")
+        else:
+            print(f"  {quota.name}: 同時実行 {quota.capacity:.0f} 件")
+    
+    limiter = get_rate_limiter()
+    print(f"  状態ファイル: {limiter.state_path}")
+    entries = limiter.snapshot()
+    if not entries:
+        print("  （まだ記録がありません）")
+    for entry in entries:
+        usage = (f"残り {entry['available']:,.1f}" if 'available' in entry
+                 else f"実行中 {entry['in_use']} 件")
+        cooldown = f"、クールダウン残り {entry['cooldown']:.1f}秒" if entry['cooldown'] > 0 else ""
+        print(f"  - {entry['quota']}[{entry['key'] or '*'}]: {usage}{cooldown}")
 
 
 if __name__ == "__main__":
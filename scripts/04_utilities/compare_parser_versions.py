@@ -0,0 +1,151 @@
+"""
+パーサーの各版を同じコーパスで比較（A/B 差分・速度）
+
+指定した版（universal_announcement_parser の v5〜v9_final_rev4、simple_parse）を
+版ごとの別プロセスで並列に実行し、
+
+- 基準の版に対するファイルごとの抽出行の差分（diff.jsonl）
+- 版ごとの処理速度・レイテンシ（throughput.csv）
+
+を出力ディレクトリに書き出して、概要を表示する。
+
+使用方法:
+    python scripts/04_utilities/compare_parser_versions.py --data-dir "G:/マイドライブ/JGBデータ/2023"
+    python scripts/04_utilities/compare_parser_versions.py --data-dir ... --versions v7_simple v9_final_rev3 v9_final_rev4
+    python scripts/04_utilities/compare_parser_versions.py --files-from logs/shards/20251031/fy2023/files.txt --baseline v7_simple
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+# プロジェクトルートをパスに追加
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from parsers.version_compare import (
+    DIFF_DIFFERENT,
+    DIFF_ERROR,
+    DIFF_IDENTICAL,
+    DIFF_SAME_AMOUNTS,
+    PARSER_VERSIONS,
+    diff_matrix,
+    diff_versions,
+    run_version,
+    throughput_table,
+)
+
+DATA_DIR = os.getenv('DATA_DIR', r'G:\マイドライブ\JGBデータ\2023')
+DEFAULT_BASELINE = 'v9_final_rev4'
+
+THROUGHPUT_COLUMNS = ['version', 'files', 'errors', 'rows', 'files_per_sec', 'mean_ms',
+                      'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', 'import_ms', 'error']
+
+
+def collect_files(args) -> list:
+    if args.files_from:
+        with open(args.files_from, 'r', encoding='utf-8') as f:
+            files = [line.strip() for line in f if line.strip()]
+    else:
+        files = [str(path) for path in sorted(Path(args.data_dir).glob('*.txt'))]
+    return files[:args.limit] if args.limit else files
+
+
+def print_throughput(table) -> None:
+    print(f"{'版':<16} {'ファイル':>8} {'エラー':>6} {'行':>7} {'件/秒':>8} "
+          f"{'p50ms':>8} {'p95ms':>8} {'p99ms':>8} {'最大ms':>8} {'import':>8}")
+    print("-" * 100)
+    for row in sorted(table, key=lambda r: -r['files_per_sec']):
+        if row['error']:
+            print(f"{row['version']:<16} ❌ {row['error']}")
+            continue
+        print(f"{row['version']:<16} {row['files']:>8,} {row['errors']:>6,} {row['rows']:>7,} "
+              f"{row['files_per_sec']:>8.1f} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} "
+              f"{row['p99_ms']:>8.2f} {row['max_ms']:>8.1f} {row['import_ms']:>8.0f}")
+
+
+def print_diff(records, baseline: str, show: int) -> None:
+    matrix = diff_matrix(records)
+    print(f"\n基準: {baseline}")
+    print(f"{'版':<16} {'一致':>6} {'金額のみ一致':>12} {'相違':>6} {'エラー':>6}")
+    print("-" * 55)
+    for version, counts in matrix.items():
+        print(f"{version:<16} {counts[DIFF_IDENTICAL]:>6,} {counts[DIFF_SAME_AMOUNTS]:>12,} "
+              f"{counts[DIFF_DIFFERENT]:>6,} {counts[DIFF_ERROR]:>6,}")
+
+    for version in matrix:
+        different = [r for r in records if r['version'] == version and r['status'] == DIFF_DIFFERENT]
+        for record in different[:show]:
+            print(f"\n  [{version}] {record['file']}（基準 {record['baseline_rows']}行 / {record['version_rows']}行）")
+            for row in record['only_baseline'][:3]:
+                print(f"     - {row}")
+            for row in record['only_version'][:3]:
+                print(f"     + {row}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='パーサーの各版を同じコーパスで比較')
+    parser.add_argument('--data-dir', default=DATA_DIR, help='官報テキストのディレクトリ')
+    parser.add_argument('--files-from', default=None, help='比較するファイルの一覧（1行1パス）')
+    parser.add_argument('--limit', type=int, default=0, help='ファイル数の上限（0=全件）')
+    parser.add_argument('--versions', nargs='+', choices=list(PARSER_VERSIONS), default=list(PARSER_VERSIONS),
+                        help='比較する版（省略時は全部）')
+    parser.add_argument('--baseline', choices=list(PARSER_VERSIONS), default=DEFAULT_BASELINE, help='差分の基準にする版')
+    parser.add_argument('--parallel', type=int, default=os.cpu_count() or 1, help='同時に実行する版の数')
+    parser.add_argument('--output-dir', default=None, help='出力先（既定: logs/parser_compare/<日時>）')
+    parser.add_argument('--show', type=int, default=3, help='版ごとに表示する相違ファイルの件数')
+    args = parser.parse_args(argv)
+
+    versions = list(dict.fromkeys(args.versions + [args.baseline]))
+    files = collect_files(args)
+    if not files:
+        print("❌ 比較するファイルがありません")
+        return 1
+    output_dir = Path(args.output_dir or PROJECT_ROOT / 'logs' / 'parser_compare' / datetime.now().strftime('%Y%m%d_%H%M%S'))
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    print("=" * 70)
+    print(f"🔬 パーサー比較: {len(versions)}版 × {len(files):,}ファイル（並列 {args.parallel}）")
+    print(f"   出力先: {output_dir}")
+    print("=" * 70)
+
+    start = time.time()
+    outcomes = {}
+    with ProcessPoolExecutor(max_workers=min(args.parallel, len(versions))) as pool:
+        futures = {pool.submit(run_version, name, files): name for name in versions}
+        for future in as_completed(futures):
+            outcome = future.result()
+            outcomes[outcome['version']] = outcome
+            status = f"❌ {outcome['error']}" if outcome['error'] else f"✓ {len(outcome['files']):,}ファイル"
+            print(f"  {outcome['version']:<16} {status}（{time.time() - start:.1f}秒）")
+    outcomes = {name: outcomes[name] for name in versions}
+
+    table = throughput_table(outcomes)
+    with open(output_dir / 'throughput.csv', 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=THROUGHPUT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(table)
+    print()
+    print_throughput(table)
+
+    if outcomes[args.baseline]['error']:
+        print(f"\n❌ 基準の版 {args.baseline} を実行できないため差分は出しません")
+        return 1
+    records = diff_versions(outcomes, args.baseline)
+    with open(output_dir / 'diff.jsonl', 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    print_diff(records, args.baseline, args.show)
+
+    print(f"\n💾 {output_dir / 'throughput.csv'}, {output_dir / 'diff.jsonl'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,9 +3,11 @@
 
 使用方法:
     python scripts/debug_data_inspection.py
+    python scripts/debug_data_inspection.py --no-cache   # パース結果キャッシュを使わずに再パース
 """
 
 import sys
+import argparse
 from pathlib import Path
 from datetime import datetime
 import pandas as pd
@@ -16,6 +18,7 @@ sys.path.insert(0, str(project_root))
 
 from parsers.kanpo_parser import KanpoParser
 from parsers.table_parser import TableParser
+from parsers.parse_cache import disable_parse_cache
 import re
 
 DATA_DIR = r"G:\マイドライブ\JGBデータ\2023"
@@ -116,7 +119,7 @@ def inspect_data():
     
     print(f"\n📄 ファイル: {file_path.name}\n")
     
-    # 解析
+    # 解析（パース結果キャッシュ経由、--no-cache で無効化）
     result = kanpo_parser.parse_file(str(file_path))
     announcement_info = result.get('announcement_info', {})
     
@@ -183,4 +186,11 @@ def inspect_data():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='投入予定データの内容を確認')
+    parser.add_argument('--no-cache', action='store_true', help='パース結果キャッシュを使わずに再パース')
+    args = parser.parse_args()
+    
+    if args.no_cache:
+        disable_parse_cache()
+    
     inspect_data()
\ No newline at end of file
@@ -11,6 +11,11 @@ from google.cloud import bigquery
 from google.oauth2 import service_account
 from datetime import datetime
 
+# プロジェクトルートをパスに追加（database パッケージ用）
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from database.bigquery_quota import QuotaAwareClient
+
 # ==================== 設定 ====================
 PROJECT_ID = "jgb2023"
 DATASET_ID = "20251019"
@@ -68,11 +73,12 @@ class TableCreator:
                 scopes=["https://www.googleapis.com/auth/bigquery"]
             )
             
-            self.client = bigquery.Client(
+            # クエリのスキャン量・所要時間は終了時にレポート表示（database.query_accounting）
+            self.client = QuotaAwareClient(bigquery.Client(
                 credentials=credentials,
                 project=self.project_id,
                 location=LOCATION
-            )
+            ))
             
             print(f"✅ 接続成功: {self.project_id}")
             return True
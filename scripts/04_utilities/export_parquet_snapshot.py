@@ -0,0 +1,78 @@
+"""
+BigQuery データセットを年度パーティションの Parquet に書き出す
+
+告示・発行・発行根拠・マスタを Storage Read API で並列に読み、
+cache/parquet/<dataset>/<table>/fiscal_year=YYYY/ に保存する。
+2回目以降は前回からの差分（updated_at / run_id）だけを読む。
+
+使用方法:
+    python scripts/04_utilities/export_parquet_snapshot.py --dataset 20251031
+    python scripts/04_utilities/export_parquet_snapshot.py --dataset 20251031 --full
+    python scripts/04_utilities/export_parquet_snapshot.py --dataset 20251031 --tables bond_issuances announcements
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from database.bigquery_client import get_bigquery_client, set_credentials
+from database.parquet_export import (
+    DEFAULT_EXPORT_ROOT,
+    DEFAULT_MAX_STREAMS,
+    EXPORT_TABLES,
+    export_dataset,
+)
+
+PROJECT_ID = os.getenv('BQ_PROJECT', 'jgb2023')
+DATASET_ID = os.getenv('BQ_DATASET', '20251031')
+LOCATION = os.getenv('BQ_LOCATION', 'asia-northeast1')
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='年度パーティションの Parquet エクスポート')
+    parser.add_argument('--project', default=PROJECT_ID)
+    parser.add_argument('--dataset', default=DATASET_ID)
+    parser.add_argument('--location', default=LOCATION)
+    parser.add_argument('--credentials', default=os.getenv('GOOGLE_APPLICATION_CREDENTIALS'))
+    parser.add_argument('--output', default=str(DEFAULT_EXPORT_ROOT), help='出力先のルート')
+    parser.add_argument('--tables', nargs='+', choices=[spec.name for spec in EXPORT_TABLES],
+                        help='対象テーブル（省略時は全部）')
+    parser.add_argument('--streams', type=int, default=DEFAULT_MAX_STREAMS, help='テーブルごとの並列ストリーム数')
+    parser.add_argument('--full', action='store_true', help='差分ではなく全件を読み直す')
+    args = parser.parse_args(argv)
+
+    set_credentials(args.credentials)
+    client = get_bigquery_client(args.project, location=args.location)
+
+    print("=" * 70)
+    print(f"📦 Parquet エクスポート: {args.project}.{args.dataset}")
+    print(f"   出力先: {Path(args.output) / args.dataset}")
+    print("=" * 70)
+
+    start = time.time()
+    results = export_dataset(client, args.project, args.dataset, Path(args.output),
+                             tables=args.tables, full=args.full, max_streams=args.streams)
+
+    failed = 0
+    for name, result in results.items():
+        if 'error' in result:
+            failed += 1
+            print(f"  ❌ {name}: {result['error']}")
+            continue
+        mode = '差分' if result['incremental'] else '全件'
+        years = ', '.join(str(year) for year in result['partitions'] if year is not None) or '-'
+        print(f"  ✅ {name}: {result['rows']:,}行（{mode}） 年度: {years}")
+        if result['watermark']:
+            print(f"       ウォーターマーク: {result['watermark']}")
+
+    print(f"\n完了: {time.time() - start:.1f}秒（失敗 {failed}テーブル）")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+モジュールの import 時間を計測し、予算内に収まっているか確認するスクリプト
+
+バッチ処理・アップローダーのパース関数は、ベンチマークやワーカープロセスから
+import して使う。import 時に BigQuery への接続や google-cloud-bigquery の読み込みが
+走ると起動のたびに数秒かかるため、import 時間に予算を設けて監視する。
+
+各モジュールは新しいプロセスで import し（他の import のキャッシュの影響を受けないように）、
+数回計測した最小値を予算と比較する。あわせて、import だけで重いモジュール
+（google.cloud.bigquery 等）が読み込まれていないかも確認する。
+
+使用方法:
+    python scripts/04_utilities/measure_import_time.py
+    python scripts/04_utilities/measure_import_time.py --repeat 5
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+# (モジュールのあるディレクトリ, モジュール名, 予算（秒）)
+IMPORT_BUDGETS = [
+    ('scripts/01_data_ingestion', 'batch_direct_processing_v7_fixed7', 0.5),
+    ('.', 'upload_issues_to_20251024', 1.0),
+    ('.', 'upload_issues_to_20251025', 1.0),
+    ('.', 'integrated_uploader_20251024', 1.0),
+]
+
+# import 時に読み込まれてはいけないモジュール
+HEAVY_MODULES = ('google.cloud.bigquery',)
+
+_MEASURE_CODE = """
+import json, sys, time
+sys.path.insert(0, {module_dir!r})
+sys.path.insert(1, {project_root!r})
+start = time.perf_counter()
+try:
+    __import__({module_name!r})
+    error = None
+except BaseException as e:
+    error = f"{{type(e).__name__}}: {{e}}"
+seconds = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{'seconds': seconds, 'heavy_modules': heavy, 'error': error}}))
+"""
+
+
+def measure_import(module_dir: str, module_name: str, repeat: int = 3) -> Dict:
+    """
+    新しいプロセスでモジュールを import し、所要時間を計測
+
+    Returns:
+        {'seconds': 最小所要時間, 'heavy_modules': 読み込まれた重いモジュール, 'error': import エラー}
+    """
+    code = _MEASURE_CODE.format(
+        module_dir=str(PROJECT_ROOT / module_dir),
+        project_root=str(PROJECT_ROOT),
+        module_name=module_name,
+        heavy=HEAVY_MODULES,
+    )
+
+    best = None
+    for _ in range(max(1, repeat)):
+        completed = subprocess.run(
+            [sys.executable, '-c', code],
+            capture_output=True, text=True, cwd=str(PROJECT_ROOT)
+        )
+        lines = completed.stdout.strip().splitlines()
+        if completed.returncode != 0 or not lines:
+            return {'seconds': None, 'heavy_modules': [], 'error': completed.stderr.strip()[-500:]}
+        result = json.loads(lines[-1])
+        if result['error']:
+            return result
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+    return best
+
+
+def check_budgets(repeat: int = 3, budgets: Optional[List] = None) -> List[Dict]:
+    """予算表のすべてのモジュールを計測"""
+    results = []
+    for module_dir, module_name, budget in budgets or IMPORT_BUDGETS:
+        measured = measure_import(module_dir, module_name, repeat)
+        within = (measured['error'] is None
+                  and not measured['heavy_modules']
+                  and measured['seconds'] <= budget)
+        results.append({'module': module_name, 'budget': budget, 'ok': within, **measured})
+    return results
+
+
+def main() -> int:
+    """メイン実行"""
+    parser = argparse.ArgumentParser(description='import 時間の予算チェック')
+    parser.add_argument('--repeat', type=int, default=3, help='計測回数（最小値を採用）')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("⏱  import 時間の予算チェック")
+    print("=" * 70)
+
+    results = check_budgets(args.repeat)
+    for r in results:
+        mark = "✅" if r['ok'] else "❌"
+        if r['error']:
+            print(f"{mark} {r['module']}: import エラー")
+            print(f"     {r['error'].splitlines()[-1] if r['error'] else ''}")
+            continue
+        print(f"{mark} {r['module']}: {r['seconds'] * 1000:.1f}ms（予算 {r['budget'] * 1000:.0f}ms）")
+        if r['heavy_modules']:
+            print(f"     import 時に読み込まれたモジュール: {', '.join(r['heavy_modules'])}")
+
+    failed = [r for r in results if not r['ok']]
+    print()
+    print(f"予算超過・エラー: {len(failed)}/{len(results)}件")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
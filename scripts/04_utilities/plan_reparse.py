@@ -0,0 +1,97 @@
+"""
+ルール変更の影響を受けるファイルだけを選んで再パースの一覧を作る
+
+batch_direct_processing_v7_fixed7.py は処理したファイルごとに、抽出・分類が依存したルールと
+その時点の全ルールの指紋を logs/provenance/v7_fixed7.jsonl に記録している。
+AMOUNT_PATTERNS や判定パターンを変えたあとにこのスクリプトを実行すると、
+
+- 変わったルールで行を出した・分類が決まったファイル（depends）
+- 変わったルールの新しい正規表現が一致するファイル（matches。新しく抽出される可能性がある）
+- それらを正本とするほぼ同一の告示（canonical）
+
+だけを一覧に書き出す。--reset で全件を再実行する代わりに、一覧を --files-from に渡して
+--replace で再実行する（既存行の削除・集計の差し引き・投入を1つのトランザクションで行う）。
+
+使用方法:
+    python scripts/04_utilities/plan_reparse.py
+    python scripts/04_utilities/plan_reparse.py --rules "AMOUNT_PATTERNS/発行額" --output logs/provenance/reparse.txt
+    python scripts/01_data_ingestion/batch_direct_processing_v7_fixed7.py \\
+        --files-from logs/provenance/reparse.txt --limit 0 --replace
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+# プロジェクトルートをパスに追加
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / 'scripts' / '01_data_ingestion'))
+
+from parsers.rule_provenance import ProvenanceLog, default_provenance_path, plan_reparse, reason_counts
+
+RUNNER = PROJECT_ROOT / 'scripts' / '01_data_ingestion' / 'batch_direct_processing_v7_fixed7.py'
+DEFAULT_OUTPUT = PROJECT_ROOT / 'logs' / 'provenance' / 'reparse.txt'
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='ルール変更の影響を受けるファイルだけを再パースの対象に選ぶ')
+    parser.add_argument('--provenance-file', default=str(default_provenance_path('v7_fixed7')),
+                        help='ファイルごとの依存ルールの記録（JSONL）')
+    parser.add_argument('--rules', nargs='+', default=None,
+                        help='変わったとみなすルール（省略時は記録時点の指紋と比べて求める）')
+    parser.add_argument('--min-amount', type=int, default=None,
+                        help='再実行時に指定する --min-amount（既定値以外で取り込んでいる場合）')
+    parser.add_argument('--no-scan', action='store_true',
+                        help='依存していなかったファイルに新しい正規表現が一致するかを調べない')
+    parser.add_argument('--output', default=str(DEFAULT_OUTPUT), help='再パースするファイルの一覧（1行1パス）')
+    parser.add_argument('--list-rules', action='store_true', help='現在のルールと指紋を表示して終了')
+    args = parser.parse_args(argv)
+
+    import batch_direct_processing_v7_fixed7 as runner
+
+    if args.min_amount is not None:
+        runner.MIN_AMOUNT = args.min_amount
+    rules = runner.rule_set(refresh=True)
+
+    if args.list_rules:
+        for rule_id, value in rules.fingerprints.items():
+            print(f"{value}  {rule_id}")
+        return 0
+
+    unknown = sorted(set(args.rules or []) - set(rules.fingerprints))
+    if unknown:
+        print(f"❌ 不明なルール: {', '.join(unknown)}（--list-rules で一覧を表示）")
+        return 2
+
+    entries = ProvenanceLog(args.provenance_file).entries()
+    print("=" * 70)
+    print(f"🧭 再パース対象の選定: 記録 {len(entries):,}件（{args.provenance_file}）")
+    if args.rules:
+        print(f"   指定したルール: {', '.join(args.rules)}")
+    print("=" * 70)
+
+    plan = plan_reparse(entries, rules, rules=args.rules, scan=not args.no_scan)
+    if not plan:
+        print("\n✅ 再パースが必要なファイルはありません")
+        return 0
+
+    print(f"\n{'理由':<50} {'ファイル数':>10}")
+    print("-" * 62)
+    for reason, count in reason_counts(plan).items():
+        print(f"{reason:<50} {count:>10,}")
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        for entry in plan.values():
+            f.write(entry['path'] + '\n')
+
+    print(f"\n💾 {output}（{len(plan):,} / {len(entries):,}ファイル）")
+    min_amount = f" --min-amount {args.min_amount}" if args.min_amount is not None else ''
+    print(f"再実行: python {RUNNER.relative_to(PROJECT_ROOT)} --files-from {output} --limit 0 --replace{min_amount}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+ゴールデン出力（期待出力・基準時間）の確認と更新
+
+tests/golden/fixtures/*.txt を各段階のパーサーに通し、
+- 期待出力（tests/golden/expected/）との差分
+- 段階ごとの処理時間（中央値）と基準（tests/golden/budgets.json）の比較
+を表示する。--write を付けると現在の出力・時間で期待出力と基準を更新する。
+
+出力の変更が意図どおりであることを差分で確かめてから --write すること。
+基準時間はふだん使う開発機で記録する（遅い環境では JGB_GOLDEN_TIMING=off でテストの時間比較を止める）。
+
+使用方法:
+    python scripts/04_utilities/update_golden_outputs.py
+    python scripts/04_utilities/update_golden_outputs.py --write
+    python scripts/04_utilities/update_golden_outputs.py --write --budgets-only --repeat 15
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from parsers.golden_harness import (
+    STAGES,
+    calibrate,
+    compare_outputs,
+    compare_timings,
+    load_budgets,
+    load_expected,
+    load_fixtures,
+    run_outputs,
+    time_stages,
+    write_budgets,
+    write_expected,
+)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='ゴールデン出力の確認と更新')
+    parser.add_argument('--write', action='store_true', help='期待出力と基準時間を現在の値で更新')
+    parser.add_argument('--budgets-only', action='store_true', help='基準時間だけを更新（期待出力は変えない）')
+    parser.add_argument('--repeat', type=int, default=None, help='時間の計測回数（省略時は budgets.json の値）')
+    parser.add_argument('--stages', nargs='+', choices=[st.name for st in STAGES], help='対象の段階')
+    args = parser.parse_args(argv)
+
+    stages = [st for st in STAGES if not args.stages or st.name in args.stages]
+    fixtures = load_fixtures()
+    budgets = load_budgets()
+
+    print("=" * 70)
+    print(f"🏅 ゴールデン出力: {len(fixtures)}フィクスチャ × {len(stages)}段階")
+    print("=" * 70)
+
+    outputs = run_outputs(fixtures, stages)
+    mismatches = compare_outputs(load_expected([f.fixture_id for f in fixtures]), outputs)
+    if mismatches:
+        print(f"\n❌ 出力の相違: {len(mismatches)}件")
+        for fixture_id, stage_name, diff in mismatches:
+            print(f"\n--- {fixture_id} / {stage_name}")
+            print(diff)
+    else:
+        print("\n✅ 出力はすべて期待どおり")
+
+    repeat = args.repeat or budgets.get('repeat')
+    timings = time_stages(fixtures, stages, repeat=repeat, inner=budgets.get('inner'))
+    calibration_ms = calibrate(repeat)
+    regressions = {r['stage']: r for r in compare_timings(budgets, timings, calibration_ms)}
+    scale = calibration_ms / budgets['calibration_ms'] if budgets.get('calibration_ms') else 1.0
+    print(f"\nマシンの速さ: 基準記録時の {1 / scale:.2f} 倍（基準時間を補正して比較）")
+    print(f"{'段階':<20} {'基準ms':>10} {'現在ms':>10} {'比':>6}")
+    print("-" * 50)
+    for name, current_ms in timings.items():
+        baseline = budgets.get('stages', {}).get(name, {}).get('median_ms')
+        if baseline is None:
+            print(f"{name:<20} {'-':>10} {current_ms:>10.3f} {'-':>6}")
+            continue
+        mark = ' ❌' if name in regressions else ''
+        print(f"{name:<20} {baseline * scale:>10.3f} {current_ms:>10.3f} {current_ms / (baseline * scale):>6.2f}{mark}")
+
+    if args.write:
+        if not args.budgets_only:
+            for path in write_expected(outputs):
+                print(f"💾 {path}")
+        # 対象外の段階の基準は今のマシンの速さに換算して残す
+        all_timings = {**{name: b['median_ms'] * scale for name, b in budgets.get('stages', {}).items()}, **timings}
+        print(f"💾 {write_budgets(all_timings, calibration_ms, previous=budgets)}")
+        return 0
+    return 1 if mismatches or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
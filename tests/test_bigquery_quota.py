@@ -0,0 +1,200 @@
+# tests/test_bigquery_quota.py
+"""
+BigQuery クォータ制御・再試行ポリシーのテスト（クライアントはダミー）
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from database.bigquery_quota import (
+    ERROR_FATAL,
+    ERROR_RATE_LIMIT,
+    ERROR_TRANSIENT,
+    KIND_BUCKET,
+    KIND_CONCURRENCY,
+    QUOTA_DML_CONCURRENT,
+    QuotaAwareClient,
+    QuotaClass,
+    RateLimiter,
+    RetryPolicy,
+    classify_error,
+    dml_target_table,
+)
+
+
+class ApiError(Exception):
+    """google.api_core の例外と同じ属性（code, errors）を持つ例外"""
+
+    def __init__(self, message, code=None, reason=None):
+        super().__init__(message)
+        self.code = code
+        self.errors = [{'reason': reason}] if reason else []
+
+
+def test_classify_error():
+    """レート制限・一時的エラー・致命的エラーを区別する"""
+    assert classify_error(ApiError('Exceeded rate limits', 403, 'rateLimitExceeded')) == ERROR_RATE_LIMIT
+    assert classify_error(ApiError('Too many requests', 429)) == ERROR_RATE_LIMIT
+    assert classify_error(ApiError('Service Unavailable', 503)) == ERROR_TRANSIENT
+    assert classify_error(ApiError('Could not serialize access to table due to concurrent update', 400)) == ERROR_TRANSIENT
+    assert classify_error(ApiError('Quota exceeded: load jobs per table', 403, 'quotaExceeded')) == ERROR_FATAL
+    assert classify_error(ApiError('Syntax error', 400, 'invalidQuery')) == ERROR_FATAL
+
+
+def test_token_bucket_is_shared_between_limiters(tmp_path):
+    """同じ状態ファイルを使うリミッター（別ワーカー想定）は1つの予算を分け合う"""
+    quotas = {'loads': QuotaClass('loads', KIND_BUCKET, capacity=2, refill_per_second=1)}
+    worker_a = RateLimiter(tmp_path / 'quota.sqlite3', quotas)
+    worker_b = RateLimiter(tmp_path / 'quota.sqlite3', quotas)
+
+    assert worker_a.try_acquire('loads', 't1') == 0
+    assert worker_b.try_acquire('loads', 't1') == 0
+    wait = worker_a.try_acquire('loads', 't1')
+    assert 0 < wait <= 1.0
+    assert worker_b.try_acquire('loads', 't2') == 0   # テーブルが違えば別予算
+
+
+def test_rate_limit_cooldown_is_shared(tmp_path):
+    """レート制限を受けたワーカーのクールダウンを、他のワーカーも守る"""
+    limiter = RateLimiter(tmp_path / 'quota.sqlite3')
+    other = RateLimiter(tmp_path / 'quota.sqlite3')
+    calls = []
+
+    def flaky():
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise ApiError('rateLimitExceeded', 403, 'rateLimitExceeded')
+        return 'ok'
+
+    policy = RetryPolicy(max_attempts=3, base_delay=0.2, max_delay=0.2, limiter=limiter)
+    assert policy.call(flaky, quota=QUOTA_DML_CONCURRENT, key='t') == 'ok'
+    assert calls[1] - calls[0] >= 0.1
+
+    limiter.penalize(QUOTA_DML_CONCURRENT, 't', 0.3)
+    assert other.cooldown_remaining(QUOTA_DML_CONCURRENT, 't') > 0.2
+
+    fatal = RetryPolicy(max_attempts=3, base_delay=0, limiter=limiter)
+    try:
+        fatal.call(lambda: (_ for _ in ()).throw(ApiError('Syntax error', 400)))
+        assert False, '致命的エラーは再試行せずに送出される'
+    except ApiError:
+        pass
+
+
+class DummyJob:
+    def __init__(self, fn):
+        self.fn = fn
+
+    def result(self):
+        return self.fn()
+
+
+class DummyClient:
+    """同一テーブルへの同時DML数を記録するクライアント"""
+
+    project = 'jgb2023'
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def query(self, sql, job_config=None, **kwargs):
+        def run():
+            with self.lock:
+                self.active += 1
+                self.max_active = max(self.max_active, self.active)
+            time.sleep(0.05)
+            with self.lock:
+                self.active -= 1
+            return []
+        return DummyJob(run)
+
+
+def test_dml_concurrency_per_table(tmp_path):
+    """変更系DMLは対象テーブルごとの同時実行数（2件）を超えない"""
+    assert dml_target_table("\n  UPDATE `jgb2023.ds.raw_announcements` SET parsed = TRUE") == 'jgb2023.ds.raw_announcements'
+    assert dml_target_table("MERGE INTO `p.d.t` T USING s ON FALSE") == 'p.d.t'
+    assert dml_target_table("SELECT COUNT(*) FROM `p.d.t`") is None
+
+    quotas = {
+        QUOTA_DML_CONCURRENT: QuotaClass(QUOTA_DML_CONCURRENT, KIND_CONCURRENCY, 2),
+        'table_metadata_updates': QuotaClass('table_metadata_updates', KIND_BUCKET, 100, 100),
+    }
+    raw = DummyClient()
+    client = QuotaAwareClient(raw, limiter=RateLimiter(tmp_path / 'quota.sqlite3', quotas))
+    threads = [threading.Thread(target=client.query, args=("UPDATE `p.d.t` SET x = 1",)) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert raw.max_active == 2
+    assert client.project == 'jgb2023'   # その他の属性は元のクライアントに委譲
+
+
+class TimeoutJob:
+    """1回目の待ちはタイムアウトし、サーバー側では実行が続いているジョブ"""
+
+    def __init__(self, job_id, fail=False):
+        self.job_id = job_id
+        self.state = 'RUNNING'
+        self.error_result = None
+        self.fail = fail
+        self.waits = 0
+
+    def reload(self):
+        pass
+
+    def result(self):
+        self.waits += 1
+        if self.fail:
+            self.state, self.error_result = 'DONE', {'reason': 'backendError'}
+            raise ApiError('backendError', 500, 'backendError')
+        if self.waits == 1:
+            raise TimeoutError('timed out')
+        self.state = 'DONE'
+        return []
+
+
+def test_dml_timeout_polls_same_job_instead_of_resubmitting(tmp_path):
+    """待ちがタイムアウトしたDMLは同じ job_id を待ち直し、失敗が確定したジョブだけ投入し直す"""
+    class JobClient:
+        def __init__(self, fail_first=False, lost_response=False):
+            self.submitted = []
+            self.jobs = {}
+            self.fail_first = fail_first
+            self.lost_response = lost_response
+
+        def query(self, sql, job_config=None, job_id=None, **kwargs):
+            if job_id in self.jobs:
+                raise ApiError(f'Already Exists: Job {job_id}', 409)
+            self.submitted.append(job_id)
+            self.jobs[job_id] = TimeoutJob(job_id, fail=self.fail_first and len(self.submitted) == 1)
+            if self.lost_response and len(self.submitted) == 1:
+                raise ConnectionError('connection reset')   # ジョブは作られたが応答が届かない
+            return self.jobs[job_id]
+
+        def get_job(self, job_id, **kwargs):
+            return self.jobs[job_id]
+
+    policy = RetryPolicy(max_attempts=4, base_delay=0, max_delay=0)
+    limiter = RateLimiter(tmp_path / 'quota.sqlite3')
+
+    raw = JobClient()
+    job = QuotaAwareClient(raw, limiter=limiter, retry=policy).query("MERGE `p.d.t` T USING s ON FALSE")
+    assert len(raw.submitted) == 1 and job.waits == 2
+
+    raw = JobClient(lost_response=True)
+    QuotaAwareClient(raw, limiter=limiter, retry=policy).query("DELETE FROM `p.d.t` WHERE TRUE", job_id='fix_1')
+    assert raw.submitted == ['fix_1']
+
+    raw = JobClient(fail_first=True)
+    job = QuotaAwareClient(raw, limiter=limiter, retry=policy).query("UPDATE `p.d.t` SET x = 1")
+    assert len(raw.submitted) == 2 and job.job_id == raw.submitted[0] + '_retry1'
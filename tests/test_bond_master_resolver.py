@@ -0,0 +1,93 @@
+# tests/test_bond_master_resolver.py
+"""
+bond_master_id リゾルバのテスト
+"""
+
+import sys
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from parsers.bond_master_resolver import (
+    BondMasterError,
+    BondMasterResolver,
+    DEFAULT_BOND_ROWS,
+    load_bond_master_resolver,
+    maturity_years_from_days,
+)
+
+
+def test_longest_match_first():
+    """「変動・10年」は「10年」より優先して判定される"""
+    resolver = BondMasterResolver(DEFAULT_BOND_ROWS)
+    assert resolver.resolve('個人向け利付国庫債券（変動・10年）') == 'BOND_KOJIN_VARIABLE_10Y'
+    assert resolver.resolve('利付国庫債券（10年）') == 'BOND_KENSETSU_10Y'
+    assert resolver.resolve('固定・３年') == 'BOND_KOJIN_FIXED_3Y'
+    assert resolver.resolve('利付国庫債券（物価連動・10年）') == 'BOND_BUKKA_10Y'
+
+
+def test_climate_and_tanki_rules():
+    """クライメート・トランジションは年限（または償還日数）、短期証券は償還日数で判定"""
+    resolver = BondMasterResolver(DEFAULT_BOND_ROWS)
+    assert resolver.resolve('クライメート・トランジション利付国庫債券（10年）') == 'BOND_GX_10Y'
+    assert resolver.resolve('クライメート・トランジション利付国庫債券', 1826) == 'BOND_GX_5Y'
+    assert resolver.resolve('クライメート・トランジション利付国庫債券') is None
+    assert resolver.resolve('国庫短期証券', 364) == 'BOND_TANKI_1Y'
+    assert resolver.resolve('国庫短期証券', 182) == 'BOND_TANKI_6M'
+    assert resolver.resolve('国庫短期証券', None) == 'BOND_TANKI_6M'
+
+
+def test_years_from_days_near_year_boundaries():
+    """償還日数からの年限は日数の閾値で決める（利払日に揃えた少し早い償還も名目の年限、x.5 年付近でずれない）"""
+    assert maturity_years_from_days(1826) == 5
+    assert maturity_years_from_days(1826 - 80) == 5     # 名目より80日早い償還
+    assert maturity_years_from_days(1826 + 200) == 5    # 5.55年: round では6年になる
+    assert maturity_years_from_days(1826 - 200) == 4
+    assert maturity_years_from_days(3653 - 90) == 10
+    resolver = BondMasterResolver(DEFAULT_BOND_ROWS)
+    assert resolver.resolve('クライメート・トランジション利付国庫債券', 1826 + 200) == 'BOND_GX_5Y'
+    assert resolver.resolve('クライメート・トランジション利付国庫債券', 3653 - 90) == 'BOND_GX_10Y'
+
+
+def test_unique_kind_fallback_and_batch():
+    """年限の無い債券種類は、その種別の行が1つの場合のみ解決する"""
+    resolver = BondMasterResolver([
+        {'bond_id': 'BOND_001', 'bond_name': '利付国債'},
+        {'bond_id': 'BOND_003', 'bond_name': '物価連動国債'},
+        {'bond_id': 'BOND_014', 'bond_name': '国庫短期証券'},
+        {'bond_id': 'BOND_OLD', 'bond_name': '廃止銘柄（固定・3年）', 'is_active': 'false'},
+    ])
+    assert resolver.resolve_many([
+        ('利付国債', None),
+        ('10年', None),
+        ('物価連動国債', None),
+        ('国庫短期証券', 364),
+        ('固定・3年', None),
+        ('', None),
+    ]) == ['BOND_001', 'BOND_001', 'BOND_003', 'BOND_014', None, None]
+
+
+def test_one_id_scheme_and_conflicts_raise(tmp_path):
+    """bonds_master.csv の有無で bond_id の体系は変わらず、食い違う CSV や同じ特徴の行はエラー"""
+    assert load_bond_master_resolver(tmp_path).resolve('利付国庫債券（10年）') == 'BOND_KENSETSU_10Y'
+
+    header = 'bond_id,bond_name,maturity_years\n'
+    rows = ''.join(f"{row['bond_id']},{row['bond_name']},{row['maturity_years']}\n" for row in DEFAULT_BOND_ROWS)
+    (tmp_path / 'bonds_master.csv').write_text(header + rows, encoding='utf-8')
+    assert load_bond_master_resolver(tmp_path).resolve('固定・3年') == 'BOND_KOJIN_FIXED_3Y'
+
+    (tmp_path / 'bonds_master.csv').write_text(header + rows.replace('BOND_KENSETSU_10Y', 'BOND_010Y'),
+                                                encoding='utf-8')
+    try:
+        load_bond_master_resolver(tmp_path)
+        assert False, '既定と異なる bond_id の体系はエラー'
+    except BondMasterError as e:
+        assert 'BOND_KENSETSU_10Y → BOND_010Y' in str(e)
+
+    try:
+        BondMasterResolver(DEFAULT_BOND_ROWS + [{'bond_id': 'BOND_001', 'bond_name': '利付国債（10年）'}])
+        assert False, '同じ特徴を持つ行はエラー'
+    except BondMasterError as e:
+        assert 'BOND_KENSETSU_10Y' in str(e) and 'BOND_001' in str(e)
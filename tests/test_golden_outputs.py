@@ -0,0 +1,65 @@
+# tests/test_golden_outputs.py
+"""
+ゴールデン出力の回帰テスト（tests/golden/ のフィクスチャ・期待出力・基準時間）
+
+出力の変更が意図どおりなら scripts/04_utilities/update_golden_outputs.py --write で更新する。
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from parsers.golden_harness import (
+    STAGES,
+    calibrate,
+    compare_outputs,
+    compare_timings,
+    load_budgets,
+    load_expected,
+    load_fixtures,
+    run_outputs,
+    time_stages,
+    timing_enabled,
+)
+
+
+def test_parser_outputs_match_golden():
+    """全フィクスチャ・全段階の出力が期待出力と一致する"""
+    fixtures = load_fixtures()
+    assert fixtures, 'tests/golden/fixtures にフィクスチャがありません'
+    mismatches = compare_outputs(load_expected([f.fixture_id for f in fixtures]), run_outputs(fixtures))
+    assert not mismatches, '\n\n'.join(f"{fixture} / {stage}\n{diff}" for fixture, stage, diff in mismatches)
+
+
+def test_stage_times_within_budget():
+    """段階ごとの処理時間の中央値が基準（マシンの速さで補正）を大きく超えない"""
+    if not timing_enabled():
+        pytest.skip('JGB_GOLDEN_TIMING=off')
+    budgets = load_budgets()
+    assert set(budgets['stages']) == {st.name for st in STAGES}, 'budgets.json を更新してください'
+    regressions = compare_timings(budgets, time_stages(load_fixtures(), repeat=budgets['repeat'],
+                                                       inner=budgets['inner']),
+                                  calibrate(budgets['repeat']))
+    assert not regressions, '\n'.join(
+        f"{r['stage']}: {r['baseline_ms']:.3f}ms → {r['current_ms']:.3f}ms（{r['ratio']:.2f}倍）" for r in regressions)
+
+
+def test_harness_reports_output_and_time_regressions():
+    """出力の変化・期待出力の欠落・補正後の時間の悪化を検出する"""
+    expected = {'a': {'stage1': {'amount': 1}}, 'b': None}
+    actual = {'a': {'stage1': {'amount': 2}}, 'b': {'stage1': None}}
+    mismatches = compare_outputs(expected, actual)
+    assert [(fixture, stage) for fixture, stage, _ in mismatches] == [('a', 'stage1'), ('b', '*')]
+    assert '-  "amount": 1' in mismatches[0][2] and '+  "amount": 2' in mismatches[0][2]
+
+    budgets = {'tolerance': 0.5, 'min_regression_ms': 0.1, 'calibration_ms': 10.0,
+               'stages': {'fast': {'median_ms': 1.0}, 'tiny': {'median_ms': 0.01}}}
+    timings = {'fast': 2.0, 'tiny': 0.05, 'new': 9.0}
+    assert [r['stage'] for r in compare_timings(budgets, timings, calibration_ms=10.0)] == ['fast']
+    # 半分の速さのマシンなら基準も2倍にして比べる
+    assert compare_timings(budgets, timings, calibration_ms=20.0) == []
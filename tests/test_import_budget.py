@@ -0,0 +1,52 @@
+# tests/test_import_budget.py
+"""
+バッチ処理・アップローダーの import 安全性のテスト
+
+import 時間は実行環境で大きくぶれるため、予算との比較は
+scripts/04_utilities/measure_import_time.py で行い、ここでは確認しない。
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / 'scripts' / '04_utilities'))
+
+from measure_import_time import IMPORT_BUDGETS, measure_import
+
+# 新しいプロセスで simple_parse を使い、BigQuery を読み込んでいないか確認する
+_SIMPLE_PARSE_CODE = """
+import json, sys
+sys.path.insert(0, {module_dir!r})
+import batch_direct_processing_v7_fixed7 as v7
+text = v7.normalize_text('（４）発行額　額面金額で　２，５００，０００，０００円')
+items = v7.simple_parse(text, '20230403_test')
+print(json.dumps({{
+    'amounts': [item['issue_amount'] for item in items],
+    'source': items[0]['legal_basis_source'] if items else None,
+    'bigquery_loaded': 'google.cloud.bigquery' in sys.modules,
+}}))
+"""
+
+
+def test_batch_direct_processing_import_is_light():
+    """v7_fixed7 は import だけでは BigQuery を読み込まない"""
+    module_dir, module_name, _ = IMPORT_BUDGETS[0]
+    result = measure_import(module_dir, module_name, repeat=1)
+    assert result['error'] is None
+    assert result['heavy_modules'] == []
+
+
+def test_simple_parse_importable_without_network():
+    """simple_parse は import してそのまま使え、BigQuery を読み込まない（他のテストの影響を受けないよう別プロセス）"""
+    code = _SIMPLE_PARSE_CODE.format(module_dir=str(project_root / 'scripts' / '01_data_ingestion'))
+    completed = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=str(project_root))
+    assert completed.returncode == 0, completed.stderr[-500:]
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    assert result['amounts'] == [2500000000]
+    assert result['source'] == 'simple_parse_v7_fixed7_項番付き発行額'
+    assert result['bigquery_loaded'] is False
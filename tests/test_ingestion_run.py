@@ -0,0 +1,95 @@
+# tests/test_ingestion_run.py
+"""
+取り込み実行（run）の識別のテスト
+"""
+
+import os
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from database import ingestion_run
+from database.ingestion_run import (
+    RUN_ID_ENV,
+    current_run,
+    new_run_id,
+    rollback_run_sql,
+    run_started_at,
+    start_run,
+    tag_rows,
+)
+
+
+def test_run_id_encodes_start_time():
+    """run_id から開始時刻（秒単位）を復元でき、形式が違えば None"""
+    now = datetime(2025, 10, 31, 9, 15, 0, 123456, tzinfo=timezone.utc)
+    run_id = new_run_id(now)
+    assert run_id.startswith('20251031T091500Z-')
+    assert run_started_at(run_id) == now.replace(microsecond=0)
+    assert run_started_at('manual-rerun') is None
+
+
+def test_run_is_shared_with_child_processes(monkeypatch):
+    """start_run は環境変数に run_id を書き、未開始のプロセスはそれを引き継ぐ"""
+    monkeypatch.setattr(ingestion_run, '_CURRENT_RUN', None)
+    monkeypatch.delenv(RUN_ID_ENV, raising=False)
+
+    parent = start_run()
+    assert os.environ[RUN_ID_ENV] == parent.run_id
+
+    # 子プロセス相当: モジュールの状態は空で、環境変数だけがある
+    monkeypatch.setattr(ingestion_run, '_CURRENT_RUN', None)
+    child = current_run()
+    assert child.run_id == parent.run_id
+    assert child.started_at == parent.started_at
+
+
+def test_tag_rows_does_not_modify_input():
+    """tag_rows は新しい行を返し、指定した列に取り込み日時を入れる"""
+    run = ingestion_run.IngestionRun('20251031T091500Z-abc', datetime(2025, 10, 31, tzinfo=timezone.utc))
+    rows = [{'announcement_id': 'A1', 'issue_amount': 100}]
+    at = datetime(2025, 10, 31, 9, 30, tzinfo=timezone.utc)
+
+    tagged = tag_rows(rows, run, timestamp_column='created_at', ingested_at=at)
+    assert rows == [{'announcement_id': 'A1', 'issue_amount': 100}]
+    assert tagged == [{'announcement_id': 'A1', 'issue_amount': 100,
+                       'run_id': '20251031T091500Z-abc', 'created_at': at.isoformat()}]
+
+
+def test_rollback_tries_streaming_tables_first():
+    """parse_log は既定の対象外。指定した場合はストリーミング挿入のテーブルを先に削除する"""
+    sys.path.insert(0, str(project_root / 'scripts' / '02_data_correction'))
+    import rollback_run
+    from database.ingestion_run import is_streaming_buffer_error
+
+    assert rollback_run.DEFAULT_TABLES == ['bond_issuances']
+    assert rollback_run.rollback_order(['bond_issuances', 'parse_log']) == ['parse_log', 'bond_issuances']
+    assert is_streaming_buffer_error(Exception(
+        'UPDATE or DELETE statement over table p.d.parse_log would affect rows in the streaming buffer'))
+    assert not is_streaming_buffer_error(Exception('Syntax error'))
+
+
+def test_rollback_sql_restores_summary_and_superseded_marks():
+    """ロールバックは集計の差し引き・superseded_by の解除・適用済み記録の削除・行の削除を1つのトランザクションで行う"""
+    where = 'run_id = @run_id AND ingested_at >= @run_started_at'
+    columns = ['announcement_id', 'issue_amount', 'bond_category', 'is_summary_record', 'superseded_by', 'run_id']
+    sql = rollback_run_sql('p.d.bond_issuances', where, 'r1', 'p.d.issuance_summary', columns)
+
+    assert sql.startswith('DECLARE deleted_row_count') and sql.rstrip().endswith('SELECT deleted_row_count;')
+    begin = sql.index('BEGIN TRANSACTION;')
+    negate = sql.index("delta_id = 'r1:rollback'")
+    restore = sql.index("delta_id = 'r1:rollback:restored'")
+    unmark = sql.index('UPDATE `p.d.bond_issuances` SET superseded_by = NULL')
+    applied = sql.index('DELETE FROM `p.d.issuance_summary_applied` WHERE run_id = @run_id;')
+    delete = sql.index(f"DELETE FROM `p.d.bond_issuances` WHERE {where};")
+    assert begin < negate < restore < unmark < applied < delete < sql.index('COMMIT TRANSACTION;')
+    assert '-issuance_count AS issuance_count' in sql
+    # 戻す行は置き換えた側の run の行を除き、superseded_by を外した状態で集計する
+    assert f"AND NOT ({where})" in sql and 'REPLACE (CAST(NULL AS STRING) AS superseded_by)' in sql
+
+    # superseded_by 列の無いテーブルでは解除しない
+    assert 'superseded_by' not in rollback_run_sql('p.d.t', where, 'r1', 'p.d.s', ['issue_amount'])
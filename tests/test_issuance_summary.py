@@ -0,0 +1,92 @@
+# tests/test_issuance_summary.py
+"""
+発行集計（issuance_summary）の集計規則・SQL生成のテスト
+"""
+
+import sys
+from datetime import date
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / 'scripts' / '01_data_ingestion'))
+
+from database.issuance_summary import (
+    delta_rows,
+    fiscal_year,
+    merge_delta_sql,
+    merge_delta_transaction_sql,
+    row_fiscal_year,
+    summarize_rows,
+    summary_select_sql,
+    totals_by,
+)
+
+
+def test_fiscal_year_starts_in_april():
+    """年度は4月始まり。発行日が無ければ告示IDの日付、どちらも無ければ 0"""
+    assert fiscal_year(date(2024, 3, 31)) == 2023
+    assert fiscal_year(date(2024, 4, 1)) == 2024
+    assert row_fiscal_year({'issuance_date': '2024-02-15', 'announcement_id': '20230501_x'}) == 2023
+    assert row_fiscal_year({'issuance_date': None, 'announcement_id': '20230501_x'}) == 2023
+    assert row_fiscal_year({'announcement_id': 'manual'}) == 0
+
+
+def test_summarize_rows_keys_and_exclusions():
+    """キーは優先順で取り、総額レコードは数えない"""
+    rows = [
+        {'announcement_id': '20230410_a', 'legal_basis_category': '建設国債', 'bond_master_id': 'B10',
+         'issue_amount': 300},
+        {'announcement_id': '20230410_a', 'category': '建設国債', 'bond_master_id': 'B10', 'issue_amount': 200},
+        {'announcement_id': '20230410_a', 'bond_category': '建設国債', 'mof_category': '4条国債',
+         'issue_amount': 999, 'is_summary_record': True},
+        {'announcement_id': '20240105_b', 'bond_category': '借換債', 'mof_category': '借換債',
+         'issue_amount': 50},
+    ]
+    summary = summarize_rows(rows)
+    assert summary == {
+        (2023, '建設国債', '', '', 'B10'): {'issuance_count': 2, 'total_amount': 500},
+        (2023, '借換債', '', '借換債', ''): {'issuance_count': 1, 'total_amount': 50},
+    }
+    assert totals_by(summary, 'fiscal_year') == {2023: {'issuance_count': 3, 'total_amount': 550}}
+    assert delta_rows(summary)[0]['category'] == '借換債'   # キー順に並ぶ
+
+
+def test_sql_uses_only_existing_columns():
+    """基データに無い列は参照せず、差分は一致キーに加算する（適用済みの差分は二度加算しない）"""
+    layer2 = summary_select_sql('`p.d.bond_issuances`',
+                                ['announcement_id', 'bond_category', 'mof_category', 'issue_amount',
+                                 'is_summary_record'])
+    assert 'B.bond_category' in layer2 and 'B.mof_category' in layer2
+    assert 'B.issuance_date' not in layer2 and 'B.sub_category' not in layer2
+    assert 'IFNULL(B.is_summary_record, FALSE) = FALSE' in layer2
+
+    merge = merge_delta_sql('p.d.issuance_summary', 'SELECT * FROM `p.d.delta`', run_id='r1')
+    assert 'issuance_count = T.issuance_count + S.issuance_count' in merge
+    assert merge.count('T.fiscal_year = S.fiscal_year') == 1
+    assert "last_run_id = 'r1'" in merge
+
+    guarded = merge_delta_sql('p.d.issuance_summary', 'SELECT * FROM `p.d.delta`', run_id='r1', delta_id='r1:f1')
+    assert "IF NOT EXISTS (SELECT 1 FROM `p.d.issuance_summary_applied` WHERE delta_id = 'r1:f1') THEN" in guarded
+    assert guarded.index('MERGE') < guarded.index("INSERT INTO `p.d.issuance_summary_applied`") < guarded.index('END IF')
+    assert merge.split("delta_id = '")[1][:3] == 'r1:'   # 省略時も実行IDを含む識別子を付ける
+    script = merge_delta_transaction_sql('p.d.issuance_summary', 'SELECT * FROM `p.d.delta`', 'r1', 'r1:f1')
+    assert script.strip().startswith('BEGIN TRANSACTION;') and script.strip().endswith('COMMIT TRANSACTION;')
+
+
+def test_v7_merge_and_summary_delta_share_one_transaction(monkeypatch):
+    """v7 の MERGE と集計への差分加算は1つのトランザクションで行い、挿入件数を最後に返す"""
+    import batch_direct_processing_v7_fixed7 as v7
+
+    staging = 'p.d.bond_issuances__stg_1'
+    sql = v7.merge_rows_transaction_sql(staging, ['announcement_id', 'issue_amount', 'dedupe_key', 'run_id', 'ingested_at'])
+    assert sql.startswith('DECLARE inserted_row_count')
+    begin, merge = sql.index('BEGIN TRANSACTION;'), sql.index(f"MERGE `{v7.table_id_layer2}`")
+    count, delta = sql.index('SET inserted_row_count = @@row_count;'), sql.index(f"MERGE `{v7.table_id_summary}`")
+    assert begin < merge < count < delta < sql.index('COMMIT TRANSACTION;')
+    assert sql.rstrip().endswith('SELECT inserted_row_count;')
+
+    # シャードのステージングテーブルへの投入では集計を更新しない
+    monkeypatch.setattr(v7, 'LAYER2_TABLE', 'bond_issuances__shard_fy2023')
+    assert 'issuance_summary' not in v7.merge_rows_transaction_sql(staging, ['announcement_id', 'issue_amount'])
@@ -0,0 +1,101 @@
+# tests/test_job_manager.py
+"""
+BigQuery ジョブ並行実行マネージャのテスト（ジョブはダミー）
+"""
+
+import sys
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from database.bigquery_quota import QuotaAwareClient, RateLimiter, RetryPolicy
+from database.job_manager import BigQueryJobManager
+
+
+class DummyJob:
+    """done() が指定回数の確認後に True になるジョブ"""
+
+    def __init__(self, value, polls=2, error=None):
+        self.value = value
+        self.polls = polls
+        self.error = error
+
+    def done(self):
+        self.polls -= 1
+        return self.polls <= 0
+
+    def result(self):
+        if self.error:
+            raise self.error
+        return self.value
+
+
+def test_in_flight_cap_and_order():
+    """同時実行数は上限を超えず、結果は投入順に返る"""
+    jobs = BigQueryJobManager(max_in_flight=2, poll_interval=0)
+    handles = [jobs.submit(lambda i=i: DummyJob(i, polls=i % 3 + 1), label=f"q{i}") for i in range(6)]
+    assert sum(1 for h in handles if h.started_at is not None) == 2
+
+    done = jobs.wait_all()
+    assert [h.result for h in done] == list(range(6))
+    assert jobs.max_observed_in_flight == 2
+    assert all(h.ok for h in done)
+
+
+def test_callbacks_and_errors_do_not_stop_others():
+    """失敗したジョブは on_error に渡され、他のジョブは完了する"""
+    finished, failed = [], []
+    jobs = BigQueryJobManager(max_in_flight=3, poll_interval=0)
+    jobs.submit(lambda: DummyJob('a'), label='a', on_done=lambda h: finished.append(h.label))
+    jobs.submit(lambda: DummyJob(None, error=RuntimeError('quota')), label='b',
+                on_error=lambda h: failed.append(str(h.error)))
+
+    def broken_start():
+        raise ValueError('syntax error')
+    jobs.submit(broken_start, label='c', on_error=lambda h: failed.append(str(h.error)))
+
+    jobs.wait_all()
+    assert finished == ['a']
+    assert sorted(failed) == ['quota', 'syntax error']
+    assert [h.label for h in jobs.failed] == ['b', 'c']
+
+
+def test_callback_can_submit_follow_up_jobs():
+    """コールバックから投入した後続ジョブ（ロード→検証）も wait_all で待つ"""
+    order = []
+    with BigQueryJobManager(max_in_flight=2, poll_interval=0) as jobs:
+        def verify(handle):
+            order.append(handle.label)
+            jobs.submit(lambda: DummyJob(handle.result * 10), label=f"verify:{handle.label}",
+                        on_done=lambda h: order.append(h.result))
+
+        for i in (1, 2):
+            jobs.submit(lambda i=i: DummyJob(i), label=f"load{i}", on_done=verify)
+
+        jobs.submit_call(lambda: 'schema', label='get_table')
+
+    assert sorted(order, key=str) == [10, 20, 'load1', 'load2']
+    assert jobs.handles[2].result == 'schema'
+    assert len(jobs.handles) == 5 and all(h.ok for h in jobs.handles)
+
+
+def test_quota_aware_client_runs_queries_through_the_wrapper(tmp_path):
+    """QuotaAwareClient を渡すと、クォータ制御・再試行つきの query をスレッドで並行実行する"""
+    class RawClient:
+        def __init__(self):
+            self.job_ids = []
+
+        def query(self, sql, job_config=None, job_id=None, **kwargs):
+            self.job_ids.append(job_id)
+            return DummyJob(sql, polls=0)
+
+    raw = RawClient()
+    client = QuotaAwareClient(raw, limiter=RateLimiter(tmp_path / 'quota.sqlite3'),
+                              retry=RetryPolicy(max_attempts=2, base_delay=0, max_delay=0))
+    with BigQueryJobManager(client, poll_interval=0) as jobs:
+        handles = [jobs.submit_query(f"SELECT {i}", label=f"q{i}") for i in range(3)]
+
+    assert [h.result for h in handles] == ['SELECT 0', 'SELECT 1', 'SELECT 2']
+    assert len(raw.job_ids) == 3 and all(raw.job_ids)   # job_id を固定して投入（ラッパー経由）
@@ -0,0 +1,109 @@
+# tests/test_law_index.py
+"""
+法令分類インデックスのテスト
+"""
+
+import sys
+from datetime import date
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from parsers import law_index
+from parsers.law_index import (
+    LawIndex,
+    MATCH_ARTICLE,
+    MATCH_EXACT,
+    MATCH_LAW,
+    get_law_index,
+    parse_article_number,
+)
+
+
+def test_lookup_default_rows():
+    """既定行から law_id / article_id / category / mof_category を引く"""
+    index = LawIndex.from_defaults()
+    entry = index.lookup('財政法', 4, 1)
+    assert (entry.law_id, entry.article_id) == ('LAW_ZAISEI', 'ART_ZAISEI_4_1')
+    assert (entry.category, entry.mof_category) == ('建設国債', '4条国債')
+
+    # 法令番号でも引ける
+    assert index.lookup('平成19年法律第23号', 46, 1).article_id == 'ART_TOKUBETSU_46_1'
+    assert index.lookup('子ども・子育て支援法', parse_article_number('第71条の26'), 1).law_id == 'LAW_KODOMO'
+
+
+def test_resolve_fallback_levels():
+    """完全一致 → 同じ条 → 分類が一意な法令の順に参照"""
+    index = LawIndex.from_defaults()
+    assert index.resolve('財政法', 4, 5)[1] == MATCH_EXACT
+
+    entry, level = index.resolve('特別会計に関する法律', 94, 3)
+    assert level == MATCH_ARTICLE and entry.article_id == 'ART_TOKUBETSU_94_2'
+
+    entry, level = index.resolve('財政融資資金法', 3, 1)
+    assert level == MATCH_LAW and entry.mof_category == '政府短期証券'
+
+    # 分類が混在する法令はフォールバックしない
+    assert index.resolve('特別会計に関する法律', 100, 1) == (None, None)
+
+
+def test_effective_window_and_master_classification():
+    """有効期間の判定と、マスタ行に無い分類の既定行からの補完"""
+    laws = [
+        {'law_id': 'LAW_TOKUREIKOUSAI_R4', 'law_name': '特例公債法',
+         'effective_from': '2022-04-01', 'effective_to': '2023-03-31'},
+        {'law_id': 'LAW_TOKUREIKOUSAI_R5', 'law_name': '特例公債法',
+         'effective_from': '2023-04-01', 'effective_to': ''},
+        {'law_id': 'LAW_ZAISEI', 'law_name': '財政法', 'is_active': 'true'},
+    ]
+    articles = [
+        {'article_id': 'ART_R4', 'law_id': 'LAW_TOKUREIKOUSAI_R4', 'article_number': '第2条', 'paragraph_number': '第1項'},
+        {'article_id': 'ART_R5', 'law_id': 'LAW_TOKUREIKOUSAI_R5', 'article_number': '第2条', 'paragraph_number': '第1項'},
+        {'article_id': 'ART_ZAISEI_4_1', 'law_id': 'LAW_ZAISEI', 'article_number': '第4条', 'paragraph_number': '第1項'},
+    ]
+    index = LawIndex(laws, articles)
+
+    assert index.lookup('特例公債法', 2, 1, as_of=date(2022, 10, 1)).article_id == 'ART_R4'
+    assert index.lookup('特例公債法', 2, 1, as_of='2023-10-01').article_id == 'ART_R5'
+    assert index.lookup('特例公債法', 2, 1, as_of='2021-10-01') is None
+    assert index.lookup('財政法', 4, 1).mof_category == '4条国債'
+
+
+def test_snapshot_roundtrip(tmp_path):
+    """スナップショットはバージョン付きで保存され、同じ内容で復元される"""
+    index = LawIndex.from_defaults()
+    path = index.save_snapshot(tmp_path)
+    assert index.version in path.name
+
+    restored = LawIndex.load_snapshot(path)
+    assert restored.version == index.version
+    assert len(restored) == len(index)
+    assert restored.lookup('財政法', 7, 1).mof_category == '政府短期証券'
+
+
+def test_stale_snapshot_is_rebuilt_from_master_csv(tmp_path, monkeypatch):
+    """マスタCSVがスナップショット作成後に更新されていれば、CSVから作り直して保存し直す"""
+    masters, snapshots = tmp_path / 'masters', tmp_path / 'snapshots'
+    masters.mkdir()
+    (masters / 'laws_master.csv').write_text('law_id,law_name\nLAW_ZAISEI,財政法\n', encoding='utf-8')
+    articles = 'article_id,law_id,article_number,paragraph_number\n'
+    (masters / 'law_articles_master.csv').write_text(
+        articles + 'ART_ZAISEI_4_1,LAW_ZAISEI,第4条,第1項\n', encoding='utf-8')
+
+    # 共有インスタンスはテスト後に元へ戻す
+    monkeypatch.setattr(law_index, '_LAW_INDEX', None)
+    LawIndex.from_master_csv(masters).save_snapshot(snapshots, masters)
+    assert get_law_index(reload=True, snapshot_dir=snapshots, masters_dir=masters).source == 'snapshot:csv'
+
+    (masters / 'law_articles_master.csv').write_text(
+        articles + 'ART_ZAISEI_4_1,LAW_ZAISEI,第4条,第1項\nART_ZAISEI_7_1,LAW_ZAISEI,第7条,第1項\n',
+        encoding='utf-8')
+    rebuilt = get_law_index(reload=True, snapshot_dir=snapshots, masters_dir=masters)
+    assert rebuilt.source == 'csv'
+    assert rebuilt.lookup('財政法', 7, 1).article_id == 'ART_ZAISEI_7_1'
+
+    # 作り直したスナップショットは次回そのまま使われる
+    again = get_law_index(reload=True, snapshot_dir=snapshots, masters_dir=masters)
+    assert again.source == 'snapshot:csv' and again.version == rebuilt.version
@@ -0,0 +1,72 @@
+# tests/test_law_name_automaton.py
+"""
+法律名オートマトン（Aho–Corasick）のテスト
+"""
+
+import sys
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from parsers.law_name_automaton import LawNameAutomaton, load_law_aliases
+from parsers.legal_basis_extractor_v3 import LegalArticleParser, extract_legal_bases_structured
+
+
+def test_find_all_leftmost_longest():
+    """重なった法律名は左端優先・最長一致で1つに絞る"""
+    automaton = LawNameAutomaton(['財政法', '財政融資資金法', '特別会計に関する法律'])
+    text = '財政融資資金法及び特別会計に関する法律並びに財政法'
+    hits = automaton.find_all(text)
+    assert [h.alias for h in hits] == ['財政融資資金法', '特別会計に関する法律', '財政法']
+    assert all(text[h.start:h.end] == h.alias for h in hits)
+
+
+def test_segment_by_sorted_positions():
+    """出現位置の順に、次の法律名の直前までをセクションとする"""
+    automaton = LawNameAutomaton({'特別会計に関する法律': '特会法', '財政法': '財政法'})
+    sections = automaton.segment('特別会計に関する法律第46条第1項及び財政法第4条第1項')
+    assert sections == [
+        ('特会法', '特別会計に関する法律第46条第1項及び'),
+        ('財政法', '財政法第4条第1項'),
+    ]
+
+
+def test_parse_articles_multiple_laws():
+    """複数法律の条項をそれぞれの法律に紐付ける"""
+    text = """
+    発行の根拠法律及びその条項
+    財政法第４条第１項及び特別会計に関する法律（平成19年法律第23号）第46条第１項
+    """
+    articles = LegalArticleParser().parse_articles(text)
+    assert articles == [('財政法', 4, 1), ('特別会計に関する法律', 46, 1)]
+    assert [r['basis'] for r in extract_legal_bases_structured(text)] == ['4条債', '借換債']
+
+
+def test_load_law_aliases_from_master(tmp_path):
+    """laws_master.csv から法令名・法令番号を読み込む（無効な法令は除外）"""
+    (tmp_path / 'laws_master.csv').write_text(
+        'law_id,law_name,law_number,is_active\n'
+        'LAW_ZAISEI,財政法,昭和22年法律第34号,true\n'
+        'LAW_OLD,廃止法,,false\n',
+        encoding='utf-8'
+    )
+    aliases = load_law_aliases(tmp_path)
+    assert aliases['財政法'] == '財政法'
+    assert aliases['昭和２２年法律第３４号'] == '財政法'
+    assert '廃止法' not in aliases
+
+    parser = LegalArticleParser.from_laws_master(tmp_path)
+    text = "発行の根拠法律及びその条項\n昭和22年法律第34号第4条第1項"
+    assert parser.parse_articles(text) == [('財政法', 4, 1)]
+
+
+def test_v1_parser_matches_full_width_law_numbers():
+    """v1 は法令番号の全角・半角の違いを NFKC で吸収して法律を選ぶ"""
+    from parsers.legal_basis_extractor import LegalArticleParser as LegalArticleParserV1
+
+    parser = LegalArticleParserV1()
+    for law_number in ('令和5年法律第32号', '令和５年法律第32号', '令和５年法律第３２号'):
+        text = f"発行の根拠法律及びその条項１　{law_number}第７条第１項"
+        assert parser.parse_articles(text) == [('GX推進法', 7, 1)]
@@ -0,0 +1,64 @@
+# tests/test_law_reference_tokenizer.py
+"""
+発行根拠法令トークナイザのテスト
+"""
+
+import sys
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from parsers.law_reference_tokenizer import (
+    tokenize_law_references,
+    extract_legal_bases_tokenized,
+    is_seifu_tanki_reference,
+    TOKUBETSU_KAIKEI,
+)
+
+
+def test_multiple_laws_in_one_sentence():
+    """並びに・及びで連結された複数の法律を個別に分類"""
+    text = (
+        "財政運営に必要な財源の確保を図るための公債の発行の特例に関する法律"
+        "（平成24年法律第101号）第３条第１項並びに"
+        "脱炭素成長型経済構造への円滑な移行の推進に関する法律（令和５年法律第32号）第７条第１項及び"
+        "特別会計に関する法律（平成19年法律第23号）第46条第１項"
+    )
+    bases = [lb['basis'] for lb in extract_legal_bases_tokenized(text)]
+    assert bases == ['年金特例債', 'GX経済移行債', '借換債']
+
+
+def test_same_law_second_article_and_kanji_numbers():
+    """「及び第X条」は直前の法律を引き継ぎ、漢数字も正規化する"""
+    text = "特別会計に関する法律第四十七条第一項及び第六十二条第一項"
+    refs = list(tokenize_law_references(text))
+    assert [(r.article, r.paragraph) for r in refs] == [(47, 1), (62, 1)]
+    assert all(r.law == TOKUBETSU_KAIKEI for r in refs)
+
+
+def test_sentence_boundary_resets_law():
+    """「。」をまたいで法律名と条項を紐付けない"""
+    text = "特別会計に関する法律による。第46条第1項"
+    assert list(tokenize_law_references(text)) == []
+
+
+def test_seifu_tanki_reference():
+    """政府短期証券の根拠条項を判定"""
+    refs = list(tokenize_law_references("財政法第7条第1項"))
+    assert len(refs) == 1
+    assert is_seifu_tanki_reference(refs[0])
+
+
+def test_mixed_bases_follow_legacy_priority():
+    """複数根拠の告示では出現順ではなく旧LEGAL_BASIS_PATTERNSの優先順で代表根拠を選ぶ"""
+    from upload_issues_to_20251025 import extract_legal_bases
+
+    text = (
+        "特別会計に関する法律（平成19年法律第23号）第46条第１項、"
+        "財政法（昭和22年法律第34号）第４条第１項及び"
+        "特別会計に関する法律（平成19年法律第23号）第62条第１項"
+    )
+    assert [lb['basis'] for lb in extract_legal_bases_tokenized(text)] == ['借換債', '4条債', '財投債']
+    assert [lb['basis'] for lb in extract_legal_bases(text)] == ['財投債', '4条債', '借換債']
@@ -0,0 +1,135 @@
+# tests/test_mof_reconciliation.py
+"""
+財務省統計との照合（区分・年限の正規化、許容差、ドリルダウン）のテスト
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+pd = pytest.importorskip('pandas')
+
+from database.mof_reconciliation import (
+    STATUS_MATCH,
+    STATUS_MISMATCH,
+    STATUS_MISSING_MOF,
+    STATUS_MISSING_OURS,
+    load_mof_csv,
+    maturity_from_dates,
+    maturity_from_label,
+    prepare_issuances,
+    reconcile,
+)
+
+
+def _issuances():
+    return pd.DataFrame([
+        {'announcement_id': 'A1', 'issuance_date': '2024-05-10', 'maturity_date': '2034-05-10',
+         'category': '4条国債', 'issue_amount': 3e11},
+        {'announcement_id': 'A2', 'issuance_date': '2024-05-20', 'maturity_date': '2034-05-20',
+         'mof_category': '建設国債', 'category': '無視される', 'issue_amount': 2e11},
+        {'announcement_id': 'A3', 'issuance_date': '2025-03-05', 'bond_master_id': 'BOND_TANKI_6M',
+         'category': '借換債', 'issue_amount': 1e11},
+        {'announcement_id': 'A3', 'issuance_date': '2025-03-05', 'category': '借換債',
+         'issue_amount': 9e11, 'is_summary_record': True},
+    ])
+
+
+def test_prepare_issuances_normalizes_keys():
+    """年度は4月始まり、区分は別名を寄せ、年限は日付→銘柄マスタの順で決める"""
+    prepared = prepare_issuances(_issuances())
+    assert len(prepared) == 3                          # 総額レコードは除く
+    assert prepared['fiscal_year'].tolist() == [2024, 2024, 2024]
+    assert prepared['month'].tolist() == [5, 5, 3]
+    assert prepared['category'].tolist() == ['建設国債', '建設国債', '借換債']
+    assert prepared['maturity'].tolist() == [10.0, 10.0, 0.5]
+
+    # 訂正の告示で置き換えられた行は数えない（置き換えた側の行と二重計上になる）
+    superseded = _issuances().assign(superseded_by=[None, 'A9', None, None])
+    assert prepare_issuances(superseded)['announcement_id'].tolist() == ['A1', 'A3']
+    assert maturity_from_label(pd.Series(['１０年', '6ヶ月', '3か月', '?'])).tolist()[:3] == [10.0, 0.5, 0.25]
+    # 日付からの年限は銘柄マスタと同じ閾値（5.6年は5年、名目より約80日早い償還は10年）
+    assert maturity_from_dates(pd.Series(['2024-05-10', '2024-06-30']),
+                               pd.Series(['2029-12-20', '2034-04-10'])).tolist() == [5.0, 10.0]
+
+
+def test_master_years_follow_loader_bond_ids():
+    """日付の無い行の年限は、ローダーと同じ体系の bond_id（旧 BOND_001 は銘柄名から解決）で引く"""
+    df = pd.DataFrame([
+        {'announcement_id': 'B1', 'issuance_date': '2024-05-10', 'bond_master_id': 'BOND_KENSETSU_20Y',
+         'bond_type': '利付国庫債券（20年）', 'issue_amount': 1e11},
+        {'announcement_id': 'B2', 'issuance_date': '2024-05-10', 'bond_master_id': 'BOND_001',
+         'bond_type': '利付国庫債券（30年）', 'issue_amount': 1e11},
+        {'announcement_id': 'B3', 'issuance_date': '2024-05-10', 'bond_master_id': 'BOND_001',
+         'bond_type': None, 'issue_amount': 1e11},
+        {'announcement_id': 'B4', 'issuance_date': '2024-05-10', 'bond_master_id': 'BOND_TANKI_1Y',
+         'bond_type': '国庫短期証券', 'issue_amount': 1e11},
+    ])
+    maturity = prepare_issuances(df)['maturity'].tolist()
+    assert maturity[:2] == [20.0, 30.0] and pd.isna(maturity[2]) and maturity[3] == 1.0
+
+
+def test_master_years_look_up_each_bond_id_once(monkeypatch):
+    """銘柄マスタの参照は行ごとではなく、bond_id・銘柄名の種類ごとに1回"""
+    import database.mof_reconciliation as reconciliation
+
+    real = reconciliation.get_bond_master_resolver()
+    calls = []
+
+    class CountingResolver:
+        def maturity_years(self, bond_id):
+            calls.append(('years', bond_id))
+            return real.maturity_years(bond_id)
+
+        def resolve(self, name):
+            calls.append(('resolve', name))
+            return real.resolve(name)
+
+    monkeypatch.setattr(reconciliation, 'get_bond_master_resolver', lambda: CountingResolver())
+    df = pd.DataFrame({'bond_master_id': ['BOND_KENSETSU_20Y'] * 50 + ['BOND_001'] * 50,
+                       'bond_type': ['利付国庫債券（20年）'] * 50 + ['利付国庫債券（30年）'] * 50})
+    years = reconciliation.master_maturity_years(df)
+    assert years.tolist() == [20.0] * 50 + [30.0] * 50
+    assert sorted(calls) == sorted([('years', 'BOND_KENSETSU_20Y'), ('years', 'BOND_001'),
+                                    ('resolve', '利付国庫債券（30年）'),
+                                    ('years', real.resolve('利付国庫債券（30年）'))])
+
+
+def test_reconcile_statuses_and_drilldown(tmp_path):
+    """許容差内は一致、超えれば食い違い、片側だけのキーも拾う"""
+    csv_path = tmp_path / 'mof.csv'
+    csv_path.write_text(
+        '年度,月,区分,年限,発行額\n'
+        '2024,5,建設国債,10年,"5,001"\n'
+        '2024,3,借換債,6ヶ月,2000\n'
+        '2024,6,財投債,5年,100\n',
+        encoding='cp932',
+    )
+    mof = load_mof_csv(csv_path, unit='億円')
+    report = reconcile(prepare_issuances(_issuances()), mof, abs_tolerance=2e8)
+    by_category = report.set_index('category')
+
+    assert by_category.loc['建設国債', 'status'] == STATUS_MATCH       # 差 1億円
+    assert by_category.loc['建設国債', 'announcement_ids'] == ['A1', 'A2']
+    assert by_category.loc['借換債', 'status'] == STATUS_MISMATCH
+    assert by_category.loc['借換債', 'diff'] == 1e11 - 2e11
+    assert by_category.loc['財投債', 'status'] == STATUS_MISSING_OURS
+    assert report.iloc[0]['category'] == '借換債'                      # 差の大きい順
+
+    report = reconcile(prepare_issuances(_issuances()), mof.iloc[:0])
+    assert set(report['status']) == {STATUS_MISSING_MOF}
+
+
+def test_reconcile_at_coarser_grain(tmp_path):
+    """月・年限の無い統計は年度×区分で照合する"""
+    csv_path = tmp_path / 'mof.csv'
+    csv_path.write_text('年度,区分,発行額\n2024,建設国債,0.5\n', encoding='utf-8')
+    report = reconcile(prepare_issuances(_issuances()), load_mof_csv(csv_path, unit='兆円'),
+                       rel_tolerance=0.01)
+    assert 'month' not in report.columns
+    assert report.set_index('category').loc['建設国債', 'status'] == STATUS_MATCH
@@ -0,0 +1,115 @@
+# tests/test_near_duplicate.py
+"""
+ほぼ同一の告示の検出（MinHash + LSH・文書マニフェスト）と差分箇所だけのパースのテスト
+"""
+
+import sys
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / 'scripts' / '01_data_ingestion'))
+
+from parsers.near_duplicate import (
+    DocumentManifest,
+    TextDiff,
+    content_hash,
+    estimated_similarity,
+    minhash_signature,
+)
+
+FIXTURE = project_root / 'tests' / 'golden' / 'fixtures' / '20230601_numbered_list.txt'
+OTHER = project_root / 'tests' / 'golden' / 'fixtures' / '20230710_seifu_tanki.txt'
+
+
+def _notice() -> str:
+    # 前後に記載を足して、差分箇所の窓が文書全体より十分小さくなるようにする
+    body = FIXTURE.read_text(encoding='utf-8')
+    notes = ''.join(f'（注{i}）入札参加者は別に定める要領に従い応募するものとする。\n' for i in range(1, 13))
+    return notes + body + notes
+
+
+def test_signature_and_manifest_link_to_canonical(tmp_path):
+    """再掲はほぼ同一として正本に紐づき、別の告示は紐づかない（紐づけ先は常に正本）"""
+    original = _notice()
+    correction = original.replace('522,100,000,000', '522,200,000,000')
+    other = OTHER.read_text(encoding='utf-8')
+
+    assert minhash_signature(original) == minhash_signature(original)
+    assert estimated_similarity(minhash_signature(original), minhash_signature(correction)) >= 0.9
+    assert estimated_similarity(minhash_signature(original), minhash_signature(other)) < 0.5
+
+    manifest = DocumentManifest(tmp_path / 'manifest.jsonl')
+    manifest.add('20230601_a', FIXTURE, content_hash(original), minhash_signature(original))
+    manifest.add('20230710_b', OTHER, content_hash(other), minhash_signature(other))
+
+    canonical, similarity = manifest.find_canonical('20230602_c', minhash_signature(correction))
+    assert canonical == '20230601_a' and similarity >= 0.9
+    manifest.add('20230602_c', FIXTURE, content_hash(correction), minhash_signature(correction),
+                 canonical=canonical, similarity=similarity)
+    assert manifest.find_canonical('20230601_a', minhash_signature(original)) is None
+
+    reloaded = DocumentManifest(tmp_path / 'manifest.jsonl')
+    assert reloaded.duplicates_of('20230601_a') == ['20230602_c']
+    assert reloaded.find_canonical('20230603_d', minhash_signature(correction))[0] == '20230601_a'
+
+
+def test_text_diff_maps_positions_and_merges_regions():
+    """変わった行の外の位置は新しいテキストに対応し、近い変更は1つの窓にまとめる"""
+    old = 'あいう\n発行額100円\nかきく\nさしす\n'
+    new = '追加行\nあいう\n発行額200円\nかきく\nさしす\n'
+    diff = TextDiff(old, new)
+
+    assert diff.map_position(old.index('かきく')) == new.index('かきく')
+    assert diff.map_position(old.index('発行額')) is None
+    regions = diff.regions(context=2)
+    assert len(regions) == 1
+    assert regions[0].core_start == 0 and regions[0].core_end == new.index('かきく')
+    assert TextDiff(old, old).changed == [] and TextDiff(old, old).changed_ratio() == 0.0
+
+
+def test_incremental_parse_returns_only_changed_records():
+    """訂正で変わった金額だけを全文パースと同じ行として返し、同一の再掲は行を出さない"""
+    import batch_direct_processing_v7_fixed7 as v7
+
+    original = _notice()
+    canonical_items = [v7.item_key(item) for item in v7.simple_parse(v7.normalize_text(original), '20230601_a')]
+    assert len(canonical_items) == 2
+
+    correction = original.replace('522,100,000,000', '522,200,000,000')
+    pattern, _, items, removed = v7.parse_near_duplicate(correction, '20230602_c', original, canonical_items)
+    full = v7.simple_parse(v7.normalize_text(correction), '20230602_c')
+    assert pattern == 'NUMBERED_LIST'
+    assert items == [item for item in full if item['issue_amount'] == 522200000000]
+    assert [key[1:] for key in removed] == [(v7.item_key(full[0])[1], 522100000000)]
+
+    assert v7.parse_near_duplicate(original, '20230602_e', original, canonical_items)[2:] == ([], [])
+
+    # 差分が大きい場合は全文をパース（removed は None）
+    rewritten = OTHER.read_text(encoding='utf-8')
+    _, _, items, removed = v7.parse_near_duplicate(rewritten, '20230710_f', original, canonical_items)
+    assert removed is None
+    assert items == v7.simple_parse(v7.normalize_text(rewritten), '20230710_f')
+
+
+def test_superseded_canonical_rows_are_marked_and_subtracted():
+    """訂正で消えた正本の行には superseded_by を付けて集計から差し引き、再構築でも数えない"""
+    import batch_direct_processing_v7_fixed7 as v7
+    from database.issuance_summary import summarize_rows, summary_select_sql
+
+    original = _notice()
+    items = v7.simple_parse(v7.normalize_text(original), '20230601_a')
+    removed = [v7.item_key(items[0])]
+    _, pattern_name, start = items[0]['bond_name'].rsplit('_', 2)
+    assert v7.superseded_keys(removed) == [f"{pattern_name}_{start}_{items[0]['issue_amount']}"]
+
+    sql = v7.supersede_rows_sql('20230602_c', ['announcement_id', 'bond_name', 'issue_amount', 'superseded_by'])
+    assert sql.startswith('BEGIN TRANSACTION;') and sql.rstrip().endswith('COMMIT TRANSACTION;')
+    assert '-issuance_count AS issuance_count' in sql
+    assert sql.index(f"MERGE `{v7.table_id_summary}`") < sql.index(f"UPDATE `{v7.table_id_layer2}`")
+    assert 'superseded_by IS NULL' in sql and "'20230602_c'" not in sql.split('UPDATE', 1)[1]
+
+    assert 'B.superseded_by IS NULL' in summary_select_sql('t', ['issue_amount', 'superseded_by'])
+    rows = [{'issue_amount': 10, 'superseded_by': '20230602_c'}, {'issue_amount': 20, 'superseded_by': None}]
+    assert [m['total_amount'] for m in summarize_rows(rows).values()] == [20]
@@ -0,0 +1,119 @@
+# tests/test_parquet_export.py
+"""
+Parquet エクスポートの年度判定・差分更新のテスト
+"""
+
+import sys
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from database.parquet_export import (
+    EXPORT_TABLES,
+    ExportManifest,
+    export_table,
+    fiscal_years,
+    latest_indices,
+    max_watermark,
+    read_local_table,
+    row_restriction,
+    stale_keys,
+    watermark_column,
+)
+
+
+def test_fiscal_years():
+    """fiscal_year 列 → 日付列 → 告示ID → 発行IDの年度 の順で決める"""
+    rows = [
+        {'basis_id': 'a', 'fiscal_year': 2022, 'kanpo_date': date(2024, 5, 1)},
+        {'basis_id': 'b', 'issue_date': date(2024, 3, 31)},
+        {'basis_id': 'c', 'announcement_id': '20240401_x'},
+        {'basis_id': 'd', 'issuance_id': 'ISS_1'},
+        {'basis_id': 'e'},
+    ]
+    assert fiscal_years(rows, issuance_years={'ISS_1': 2021}) == [2022, 2023, 2024, 2021, 0]
+
+
+def test_incremental_restriction_and_watermark():
+    """updated_at を優先し、前回値から重なりの幅だけ遡った時点以降の行を読む"""
+    assert watermark_column(['run_id', 'updated_at']) == 'updated_at'
+    assert watermark_column(['issuance_id']) is None
+    assert row_restriction('updated_at', None) == ''
+    assert row_restriction('updated_at', '2025-10-31T00:00:00+00:00') == \
+        "updated_at >= TIMESTAMP '2025-10-30T23:00:00+00:00'"
+    assert row_restriction('updated_at', '2025-10-31T00:00:00+00:00', overlap=timedelta(0)) == \
+        "updated_at >= TIMESTAMP '2025-10-31T00:00:00+00:00'"
+    assert row_restriction('run_id', '20251031T091500Z-3f9a2c1b') == "run_id >= '20251031T081500Z'"
+    assert row_restriction('run_id', "x'y") == "run_id >= 'x\\'y'"
+
+    rows = [{'updated_at': datetime(2025, 11, 1, 9, 0)}, {'updated_at': None},
+            {'updated_at': datetime(2025, 11, 2, tzinfo=timezone.utc)}]
+    assert max_watermark(rows, 'updated_at', '2025-10-31T00:00:00+00:00') == '2025-11-02T00:00:00+00:00'
+    assert max_watermark([], 'updated_at', 'w') == 'w'
+
+
+def test_dedupe_and_moved_keys():
+    """重なって読んだ行は主キーごとに最新を残し、年度が変わった行は元の年度から取り除く"""
+    keys = ['a', 'b', 'a', None, 'b', None]
+    marks = [datetime(2025, 11, 2), datetime(2025, 11, 1), datetime(2025, 11, 1),
+             None, datetime(2025, 11, 1), None]
+    assert latest_indices(keys, marks) == [0, 3, 4, 5]
+    assert latest_indices(keys) == [2, 3, 4, 5]
+
+    existing = {2023: ['a', 'b', None], 2024: ['c'], 2025: ['d']}
+    assert stale_keys(existing, {'a', 'c', 'x'}) == {2023: {'a'}, 2024: {'c'}}
+
+
+class _ArrowSource:
+    """読み出し元の代わり（Arrow のテーブルをそのまま返す）"""
+
+    def __init__(self, table):
+        self.table = table
+        self.restrictions = []
+
+    def columns(self, table_id):
+        return self.table.column_names
+
+    def read(self, table_id, restriction=''):
+        self.restrictions.append(restriction)
+        return self.table
+
+
+def test_export_and_read_back_with_pyarrow(tmp_path):
+    """書き出した年度パーティションを pyarrow で読み戻せる（年度はディレクトリから int64 で復元）"""
+    pa = pytest.importorskip('pyarrow')
+
+    spec = next(spec for spec in EXPORT_TABLES if spec.name == 'bond_issuances')
+    manifest = ExportManifest(tmp_path / 'ds' / '_manifest.json')
+    first = pa.table({
+        'issuance_id': ['a', 'b', 'c'],
+        'issuance_date': [date(2023, 5, 10), date(2024, 3, 29), date(2024, 4, 10)],
+        'fiscal_year': [2023, 2023, 2024],
+        'updated_at': [datetime(2025, 11, 1, tzinfo=timezone.utc)] * 3,
+    })
+    result = export_table(_ArrowSource(first), tmp_path / 'ds', 'p.ds.bond_issuances', spec, manifest)
+    assert result['partitions'] == [2023, 2024]
+
+    table = read_local_table('ds', 'bond_issuances', root=tmp_path)
+    assert table.schema.field('fiscal_year').type == pa.int64()
+    assert sorted(zip(table['issuance_id'].to_pylist(), table['fiscal_year'].to_pylist())) == \
+        [('a', 2023), ('b', 2023), ('c', 2024)]
+
+    # 差分で b が 2024 年度に移っても、読み戻した結果に重複が出ない
+    update = pa.table({
+        'issuance_id': ['b'],
+        'issuance_date': [date(2024, 4, 1)],
+        'fiscal_year': [2024],
+        'updated_at': [datetime(2025, 11, 2, tzinfo=timezone.utc)],
+    })
+    source = _ArrowSource(update)
+    export_table(source, tmp_path / 'ds', 'p.ds.bond_issuances', spec, manifest)
+    assert source.restrictions[0].startswith('updated_at >=')
+    table = read_local_table('ds', 'bond_issuances', fiscal_years=[2024], root=tmp_path)
+    assert sorted(table['issuance_id'].to_pylist()) == ['b', 'c']
+    assert read_local_table('ds', 'bond_issuances', root=tmp_path).num_rows == 3
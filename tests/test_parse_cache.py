@@ -0,0 +1,103 @@
+# tests/test_parse_cache.py
+"""
+パース結果キャッシュのテスト
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from parsers import parse_cache
+from parsers.parse_cache import CACHE_ENV, MAGIC, ParseCache
+
+
+def _counting_parser(calls):
+    def compute():
+        calls.append(1)
+        return {'issues': [1, 2, 3]}
+    return compute
+
+
+def test_hit_miss_and_version_key(tmp_path):
+    """同じ内容・同じバージョンはヒット、バージョンや追加パラメータが変わるとミス"""
+    cache = ParseCache(tmp_path)
+    calls = []
+    data = '令和5年財務省告示第百号'.encode('utf-8')
+
+    assert cache.read_through(data, 'P', '1', _counting_parser(calls)) == {'issues': [1, 2, 3]}
+    assert cache.read_through(data, 'P', '1', _counting_parser(calls)) == {'issues': [1, 2, 3]}
+    assert len(calls) == 1
+    assert cache.stats['hits'] == 1 and cache.stats['misses'] == 1
+
+    cache.read_through(data, 'P', '2', _counting_parser(calls))
+    cache.read_through(data, 'P', '1', _counting_parser(calls), variant=('other.txt',))
+    assert len(calls) == 3
+
+    # None（パース失敗）はキャッシュしない
+    assert cache.read_through(b'x', 'P', '1', lambda: None) is None
+    assert cache.stats['writes'] == 3
+
+
+def test_corrupt_entry_is_discarded(tmp_path):
+    """破損したエントリは削除して再パースする"""
+    cache = ParseCache(tmp_path)
+    data = b'notice'
+    path = cache.entry_path(parse_cache.content_hash(data), 'P', '1')
+    cache.read_through(data, 'P', '1', lambda: [1])
+    assert path.read_bytes().startswith(MAGIC)
+
+    path.write_bytes(MAGIC + b'broken')
+    assert cache.read_through(data, 'P', '1', lambda: [2]) == [2]
+    assert cache.stats['errors'] == 1
+    assert cache.read_through(data, 'P', '1', lambda: [3]) == [2]
+
+
+def test_eviction_keeps_recently_used(tmp_path):
+    """容量上限を超えたら最終アクセスの古いエントリから削除する"""
+    cache = ParseCache(tmp_path, max_bytes=10 ** 9)
+    payload = os.urandom(2000)   # 圧縮の効かない内容
+    for i in range(5):
+        cache.read_through(str(i).encode(), 'P', '1', lambda: payload)
+        path = cache.entry_path(parse_cache.content_hash(str(i).encode()), 'P', '1')
+        os.utime(path, (1000 + i, 1000 + i))
+
+    # 最も古いエントリ（0）を参照すると最新扱いになる
+    assert cache.get(cache.entry_path(parse_cache.content_hash(b'0'), 'P', '1'))[0]
+
+    entry_size = path.stat().st_size
+    removed = cache.evict(entry_size * 2)
+    assert removed == 3
+    remaining = {p.name.split('_')[0] for p in tmp_path.glob('*/*.bin')}
+    assert remaining == {parse_cache.content_hash(b'0'), parse_cache.content_hash(b'4')}
+
+
+def test_disable_via_environment(tmp_path, monkeypatch):
+    """JGB_PARSE_CACHE=off では常にパーサーを実行し、書き込まない"""
+    monkeypatch.setenv(CACHE_ENV, 'off')
+    cache = ParseCache(tmp_path)
+    calls = []
+    cache.read_through(b'a', 'P', '1', _counting_parser(calls))
+    cache.read_through(b'a', 'P', '1', _counting_parser(calls))
+    assert len(calls) == 2
+    assert not list(tmp_path.glob('*/*.bin'))
+
+
+def test_kanpo_parser_reads_through_cache(tmp_path, monkeypatch):
+    """KanpoParser.parse_file は同じ内容のファイルをキャッシュから返す"""
+    from parsers.kanpo_parser import KanpoParser
+
+    monkeypatch.setattr(parse_cache, '_PARSE_CACHE', ParseCache(tmp_path / 'cache'))
+    notice = tmp_path / '20230403_令和5年5月9日付（財務省第百二十一号）.txt'
+    notice.write_text('財務省告示第百二十一号\n別表\n', encoding='utf-8')
+
+    parser = KanpoParser()
+    first = parser.parse_file(notice)
+    second = parser.parse_file(notice)
+    assert first['announcement_number'] == second['announcement_number']
+    assert first['tables'] == second['tables']
+    assert parse_cache.get_parse_cache().stats['hits'] == 1
+    assert parser.stats['files_processed'] == 2
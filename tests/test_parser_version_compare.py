@@ -0,0 +1,95 @@
+# tests/test_parser_version_compare.py
+"""
+パーサーのバージョン間比較（行への変換・差分・速度の集計）のテスト
+"""
+
+import sys
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from parsers.version_compare import (
+    _percentile,
+    DIFF_DIFFERENT,
+    DIFF_ERROR,
+    DIFF_IDENTICAL,
+    DIFF_SAME_AMOUNTS,
+    diff_rows,
+    diff_versions,
+    issuance_rows,
+    legacy_rows,
+    make_row,
+    run_version,
+    throughput_table,
+)
+
+
+def test_outputs_of_each_generation_become_common_rows():
+    """旧形式の項目6（根拠法律別）と v9 系の発行行を同じ形の行にする"""
+    legacy = {'pattern': 'NUMBERED_LIST_MULTI_LAW', 'items': {
+        1: {'title': '名称及び記号', 'value': '...', 'structured_data': {'bond_name': '利付国庫債券(10年)'}},
+        6: {'title': '発行額', 'value': '...', 'structured_data': {
+            'total_amount': 300,
+            'competitive': {'amount': 200, 'by_law': {'財政法第4条第1項': 200}},
+            'noncompetitive1': {'amount': 100, 'by_law': {'財政法第4条第1項': 50, '特別会計に関する法律第46条第1項': 50}},
+        }},
+        '6_1': {'title': '発行額サブ項目', 'value': '...', 'structured_data': {'by_law': {'財政法第4条第1項': 200}}},
+    }}
+    assert legacy_rows(legacy) == [
+        ('利付国庫債券(10年)', 250, '財政法第4条第1項', None),
+        ('利付国庫債券(10年)', 50, '特別会計に関する法律第46条第1項', None),
+    ]
+
+    v9 = [{'bond_name': '利付国庫債券（１０年）', 'issue_amount': 250, 'legal_basis': '財政法第4条',
+           'legal_basis_normalized': '財政法第4条第1項', 'bond_category': '建設国債'}]
+    assert issuance_rows(v9) == [('利付国庫債券(10年)', 250, '財政法第4条第1項', '建設国債')]
+
+
+def test_diff_classifies_files_per_version():
+    """完全一致・金額のみ一致・相違・エラーをファイルごとに分ける"""
+    a, b = make_row('A', 100, 'law', None), make_row('B', 100, 'law', None)
+    assert diff_rows([a], [a])[0] == DIFF_IDENTICAL
+    status, only_base, only_cand = diff_rows([a], [b])
+    assert status == DIFF_SAME_AMOUNTS and only_base == [a] and only_cand == [b]
+    assert diff_rows([a, a], [a])[0] == DIFF_DIFFERENT
+
+    outcomes = {
+        'base': {'error': None, 'import_seconds': 0.1, 'files': {
+            'x/1.txt': {'rows': [a], 'error': None, 'seconds': 0.01},
+            'x/2.txt': {'rows': [a], 'error': None, 'seconds': 0.03}}},
+        'new': {'error': None, 'import_seconds': 0.2, 'files': {
+            'x/1.txt': {'rows': [a], 'error': None, 'seconds': 0.02},
+            'x/2.txt': {'rows': [], 'error': 'ValueError: boom', 'seconds': 0.02}}},
+        'broken': {'error': 'ModuleNotFoundError', 'import_seconds': 0.0, 'files': {}},
+    }
+    records = diff_versions(outcomes, 'base')
+    assert [(r['file'], r['version'], r['status']) for r in records] == [
+        ('1.txt', 'new', DIFF_IDENTICAL), ('2.txt', 'new', DIFF_ERROR)]
+
+    table = {row['version']: row for row in throughput_table(outcomes)}
+    assert table['base']['files'] == 2 and abs(table['base']['files_per_sec'] - 50) < 1e-6
+    assert table['base']['p99_ms'] == 30.0
+    assert table['new']['errors'] == 1
+    assert table['broken']['errors'] == 1 and table['broken']['error']
+
+
+def test_run_version_parses_corpus_with_simple_parse(tmp_path):
+    """simple_parse の版を実行し、ファイルごとの行と時間を返す"""
+    path = tmp_path / '20230601_a.txt'
+    path.write_text('6 発行額 額面金額 2兆6,000億円\n', encoding='utf-8')
+    outcome = run_version('v7_simple', [str(path)])
+    assert outcome['error'] is None
+    record = outcome['files'][str(path)]
+    assert record['error'] is None and record['seconds'] >= 0
+    assert 2_600_000_000_000 in [row[1] for row in record['rows']]
+
+
+def test_percentile_uses_nearest_rank():
+    """p50/p95 は ceil(p/100*n) 番目の値（小さい件数でも1つ上にずれない）"""
+    assert _percentile([10.0, 20.0], 50) == 10.0
+    assert _percentile([float(v) for v in range(1, 11)], 50) == 5.0
+    assert _percentile([1.0, 2.0, 3.0, 4.0], 95) == 4.0
+    assert _percentile([7.0], 95) == 7.0
+    assert _percentile([], 50) == 0.0
@@ -0,0 +1,100 @@
+# tests/test_profiling.py
+"""
+バッチ処理のプロファイル（段階ごとの pstats・collapsed stack・正規表現の計時）のテスト
+"""
+
+import json
+import pstats
+import re
+import sys
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / 'scripts' / '01_data_ingestion'))
+
+from database.profiling import (
+    current_profiler,
+    finish_profiling,
+    profile_file,
+    profile_stage,
+    profiling,
+    start_profiling,
+)
+
+SAMPLE = '（４）発行額　額面金額で　２，５００，０００，０００円\n（５）発行価格　額面金額１００円につき１００円'
+
+
+def _busy(n: int) -> int:
+    return sum(i * i for i in range(n))
+
+
+def test_stage_pstats_and_collapsed_stacks(tmp_path):
+    """段階ごとの .pstats・.collapsed・all.pstats・summary.json を書き出す（入れ子は内側に記録）"""
+    start_profiling(tmp_path, regex=False)
+    with profile_stage('parse'):
+        _busy(20000)
+        with profile_stage('merge'):
+            _busy(20000)
+    summary = finish_profiling(printer=lambda text: None)
+
+    assert current_profiler() is None
+    for name in ('parse.pstats', 'merge.pstats', 'all.pstats', 'parse.collapsed', 'merge.collapsed', 'summary.json'):
+        assert (tmp_path / name).exists(), name
+    assert set(summary['stages']) == {'parse', 'merge'}
+    assert json.loads((tmp_path / 'summary.json').read_text(encoding='utf-8'))['stages'] == summary['stages']
+
+    merge_funcs = {func[2] for func in pstats.Stats(str(tmp_path / 'merge.pstats')).stats}
+    assert any('genexpr' in name for name in merge_funcs)
+    for line in (tmp_path / 'parse.collapsed').read_text(encoding='utf-8').splitlines():
+        stack, micros = line.rsplit(' ', 1)
+        assert stack and int(micros) > 0
+    assert any('_busy' in line for line in (tmp_path / 'parse.collapsed').read_text(encoding='utf-8').splitlines())
+
+
+def test_regex_timing_keeps_output_and_restores_patterns(tmp_path):
+    """正規表現はパターンごとに計時し、パース結果や re.Pattern の判定は変えず、終了後は元に戻す"""
+    import batch_direct_processing_v7_fixed7 as v7
+
+    text = v7.normalize_text(SAMPLE)
+    expected = v7.simple_parse(text, '20230403_test')
+    original_search = re.search
+    original_amounts = list(v7.AMOUNT_PATTERNS)
+    original_table = v7.PATTERN_TABLE
+    original_compile = re.compile
+
+    start_profiling(tmp_path)
+    with profile_stage('parse'):
+        assert v7.simple_parse(text, '20230403_test') == expected
+        v7.identify_pattern_simple(text)
+        # re.compile は差し替えず、差し替えたグローバルも re.Pattern として扱える
+        assert re.compile is original_compile
+        assert v7.PATTERN_TABLE is not original_table and isinstance(v7.PATTERN_TABLE, re.Pattern)
+        assert re.compile(v7.PATTERN_TABLE.pattern, re.IGNORECASE).flags & re.IGNORECASE
+    summary = finish_profiling(printer=lambda text: None)
+
+    assert re.search is original_search
+    assert v7.PATTERN_TABLE is original_table
+    assert all(a[0] is b[0] for a, b in zip(v7.AMOUNT_PATTERNS, original_amounts))
+    patterns = {entry['pattern'] for entry in summary['top_regexes']}
+    assert v7.PATTERN_TABLE.pattern in patterns
+    assert any(entry['calls'] > 0 and entry['seconds'] >= 0 for entry in summary['top_regexes'])
+
+
+def test_top_files_and_disabled_profiling(tmp_path):
+    """ファイルは時間の長い順に並べ、profiling(False) や未開始では何も記録しない"""
+    with profiling(False, tmp_path) as profiler:
+        with profile_file('a.txt'), profile_stage('parse'):
+            _busy(1000)
+    assert profiler is None
+    assert not any(tmp_path.iterdir())
+
+    with profiling(True, tmp_path, printer=lambda text: None):
+        for name, n in (('small.txt', 1000), ('large.txt', 300000), ('medium.txt', 30000)):
+            with profile_file(name), profile_stage('parse'):
+                _busy(n)
+    summary = json.loads((tmp_path / 'summary.json').read_text(encoding='utf-8'))
+    assert [entry['file'] for entry in summary['top_files']][0] == 'large.txt'
+    assert {entry['file'] for entry in summary['top_files']} == {'small.txt', 'medium.txt', 'large.txt'}
+    assert current_profiler() is None
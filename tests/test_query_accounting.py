@@ -0,0 +1,88 @@
+# tests/test_query_accounting.py
+"""
+クエリのコスト記録・レポートのテスト（ジョブはダミー）
+"""
+
+import sys
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from database.bigquery_quota import QuotaAwareClient, RateLimiter
+from database.job_manager import BigQueryJobManager
+from database.query_accounting import ACCOUNTING_ENV, QueryLedger, get_query_ledger, statement_head
+
+
+class DummyQueryJob:
+    """QueryJob と同じ統計属性を持つダミー"""
+
+    job_type = 'query'
+
+    def __init__(self, query, billed, slot_ms=0, cache_hit=False, dry_run=False):
+        self.query = query
+        self.job_id = f"job_{billed}"
+        self.statement_type = 'SELECT'
+        self.total_bytes_processed = billed
+        self.total_bytes_billed = billed
+        self.slot_millis = slot_ms
+        self.cache_hit = cache_hit
+        self.dry_run = dry_run
+
+    def done(self):
+        return True
+
+    def result(self):
+        return []
+
+
+class DummyClient:
+    def __init__(self, billed):
+        self.billed = billed
+
+    def query(self, sql, job_config=None, **kwargs):
+        return DummyQueryJob(sql, self.billed)
+
+
+def test_report_ranks_callers_by_billed_bytes(monkeypatch):
+    """呼び出し元ごとに集計し、課金バイト数の多い順に並べる"""
+    monkeypatch.setenv(ACCOUNTING_ENV, '0')   # 終了時のレポート表示はしない
+    ledger = QueryLedger()
+    ledger.record_job(DummyQueryJob("SELECT 1", 10 * 1024 ** 2, cache_hit=True), 'a.py:small', 0.5)
+    ledger.record_job(DummyQueryJob("\n-- 重複確認\nSELECT dedupe_key FROM t", 3 * 1024 ** 3, 1200), 'b.py:verify', 2.0)
+    ledger.record_job(DummyQueryJob("SELECT 2", 1024 ** 3), 'b.py:verify', 1.0)
+    assert ledger.record_job(DummyQueryJob("SELECT 3", 999, dry_run=True), 'c.py:plan', 0.1) is None
+
+    summary = ledger.summarize()
+    assert [t['caller'] for t in summary] == ['b.py:verify', 'a.py:small']
+    assert summary[0]['queries'] == 2
+    assert summary[0]['bytes_billed'] == 4 * 1024 ** 3
+    assert summary[0]['top_statement'] == 'SELECT dedupe_key FROM t'
+    assert summary[1]['cache_hits'] == 1
+
+    report = ledger.report()
+    assert report.index('b.py:verify') < report.index('a.py:small')
+    assert '4.0GB' in report
+
+
+def test_wrapped_queries_are_attributed_to_calling_function(tmp_path):
+    """QuotaAwareClient と BigQueryJobManager のクエリは、呼び出した関数名で記録される"""
+    ledger = get_query_ledger()
+    ledger.clear()
+    client = QuotaAwareClient(DummyClient(2048), limiter=RateLimiter(tmp_path / 'quota.sqlite3'))
+
+    def verify_layer2():
+        client.query("SELECT COUNT(*) FROM t")
+        with BigQueryJobManager(DummyClient(4096), poll_interval=0) as jobs:
+            jobs.submit_query("SELECT * FROM t", label='sample')
+
+    verify_layer2()
+    assert sorted(r.bytes_billed for r in ledger.records) == [2048, 4096]
+    assert all(r.caller == 'test_query_accounting.py:verify_layer2' for r in ledger.records)
+    ledger.clear()
+
+
+def test_statement_head_skips_comments():
+    assert statement_head("\n  -- comment\n  MERGE `t` T\n USING s") == 'MERGE `t` T'
+    assert statement_head("") == ''
@@ -0,0 +1,117 @@
+# tests/test_read_api.py
+"""
+読み取り API（スナップショット・レスポンスキャッシュ・ETag）のテスト
+"""
+
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from api.cache import TTLCache
+from api.server import ReadAPI
+from api.snapshot import SnapshotReader, write_snapshot
+
+
+def _build(path, amount=100):
+    issuances = [
+        {'issuance_id': f"20240510_a_{i}", 'announcement_id': '20240510_a', 'series_number': f"第{150 + i % 2}回",
+         'issuance_date': '2024-05-10', 'issue_amount': amount, 'legal_basis': '特例公債法'}
+        for i in range(5)
+    ]
+    announcements = [{'announcement_id': '20240510_a', 'title': '告示', 'full_text': '本文'}]
+    return write_snapshot(path, {'issuances': issuances, 'announcements': announcements})
+
+
+def test_ttl_cache_expires_and_evicts():
+    """TTL を過ぎたエントリは返さず、件数上限では最も古く使われたものを追い出す"""
+    now = [0.0]
+    cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1          # a を最近使った扱いにする
+    cache.put('c', 3)
+    assert cache.get('b') is None and cache.get('c') == 3
+    now[0] = 11
+    assert cache.get('a') is None
+    assert cache.hits == 2 and cache.misses == 2
+
+
+def test_series_lookup_pagination_and_cache(tmp_path):
+    """回号の表記ゆれを吸収し、ページングし、2回目はキャッシュから返す"""
+    path = tmp_path / 'snapshot.sqlite3'
+    _build(path)
+    api = ReadAPI(SnapshotReader(path), TTLCache())
+
+    status, headers, body = api.handle('/issuances?series=%EF%BC%91%EF%BC%95%EF%BC%90&per_page=2')
+    data = json.loads(body)
+    assert status == 200 and headers['X-Cache'] == 'MISS'
+    assert data['total'] == 3 and len(data['items']) == 2 and data['next_page'] == 2
+    assert data['items'][0]['fiscal_year'] == 2024
+
+    status, headers, _ = api.handle('/issuances?per_page=2&series=%EF%BC%91%EF%BC%95%EF%BC%90')
+    assert headers['X-Cache'] == 'HIT'
+
+    assert api.handle('/announcements/missing')[0] == 404
+    assert api.handle('/issuances?page=x')[0] == 400
+
+
+def test_etag_changes_with_snapshot_version(tmp_path):
+    """同じスナップショットなら 304、作り直して内容が変われば新しい ETag を返す"""
+    path = tmp_path / 'snapshot.sqlite3'
+    first = _build(path)
+    api = ReadAPI(SnapshotReader(path), TTLCache())
+
+    _, headers, _ = api.handle('/aggregates/by-law')
+    etag = headers['ETag']
+    assert first in etag
+    assert api.handle('/aggregates/by-law', if_none_match=etag)[0] == 304
+
+    second = _build(path, amount=200)
+    assert second != first
+    status, headers, body = api.handle('/aggregates/by-law', if_none_match=etag)
+    assert status == 200 and headers['ETag'] != etag
+    assert json.loads(body)['items'][0]['total_amount'] == 1000
+
+
+def test_health_and_errors_bypass_cache_and_etag(tmp_path):
+    """/health とエラー応答はキャッシュせず、ETag も 304 も返さない"""
+    path = tmp_path / 'snapshot.sqlite3'
+    _build(path)
+    api = ReadAPI(SnapshotReader(path), TTLCache())
+
+    api.handle('/issuances')
+    status, headers, body = api.handle('/health')
+    assert status == 200 and 'ETag' not in headers and headers['X-Cache'] == 'BYPASS'
+    assert json.loads(body)['cache_entries'] == 1
+    assert json.loads(api.handle('/health')[2])['cache_entries'] == 1
+
+    # 200 と同じ作り方の ETag を送っても、エラーの URL には 304 を返さない
+    for target, canonical, expected in (('/announcements/missing', '/announcements/missing?', 404),
+                                        ('/issuances?page=x', '/issuances?page=x', 400)):
+        etag = '"{}-{}"'.format(api.snapshot.version, hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:12])
+        for _ in range(2):
+            status, headers, _ = api.handle(target, if_none_match=etag)
+            assert status == expected and 'ETag' not in headers and headers['X-Cache'] == 'MISS'
+    assert len(api.cache) == 1
+
+
+def test_totals_skip_superseded_rows(tmp_path):
+    """法令別の合計は、訂正の告示で置き換えられた行を数えない"""
+    path = tmp_path / 'snapshot.sqlite3'
+    issuances = [
+        {'issuance_id': 'old', 'announcement_id': '20240510_a', 'issue_amount': 100,
+         'legal_basis': '財政法', 'superseded_by': '20240511_b'},
+        {'issuance_id': 'new', 'announcement_id': '20240511_b', 'issue_amount': 120, 'legal_basis': '財政法'},
+    ]
+    write_snapshot(path, {'issuances': issuances})
+    api = ReadAPI(SnapshotReader(path), TTLCache())
+
+    items = json.loads(api.handle('/aggregates/by-law')[2])['items']
+    assert items == [{'law': '財政法', 'issuance_count': 1, 'total_amount': 120}]
+    listed = json.loads(api.handle('/issuances')[2])['items']
+    assert {row['issuance_id']: row['superseded_by'] for row in listed} == {'old': '20240511_b', 'new': None}
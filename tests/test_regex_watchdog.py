@@ -0,0 +1,88 @@
+# tests/test_regex_watchdog.py
+"""
+正規表現の時間予算（ウォッチドッグ）と隔離リストのテスト
+"""
+
+import re
+import sys
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / 'scripts' / '01_data_ingestion'))
+
+from parsers.regex_watchdog import (
+    REASON_PATTERN_BUDGET,
+    STATUS_ERROR,
+    STATUS_OK,
+    STATUS_TIMEOUT,
+    GuardedWorker,
+    QuarantineLog,
+)
+
+# 末尾が一致しないと指数的にバックトラックする
+BACKTRACKING_PATTERN = re.compile(r'(a+)+$')
+
+
+def backtracking_parse(length: int) -> bool:
+    return bool(BACKTRACKING_PATTERN.search('a' * length + 'b'))
+
+
+def failing_parse(message: str) -> None:
+    raise ValueError(message)
+
+
+def test_pattern_budget_stops_worker_and_names_pattern():
+    """パターンの予算を超えたら止め、原因のパターンを返し、次の呼び出しは新しいワーカーで続ける"""
+    with GuardedWorker(backtracking_parse, file_budget=60, pattern_budget=0.5) as worker:
+        first = worker.call(5)
+        assert first.status == STATUS_OK and first.value is False
+
+        result = worker.call(40)
+        assert result.status == STATUS_TIMEOUT
+        assert result.reason == REASON_PATTERN_BUDGET
+        assert 'BACKTRACKING_PATTERN' in result.pattern and '(a+)+$' in result.pattern
+        assert result.seconds < 30
+
+        assert worker.call(5).status == STATUS_OK
+        assert worker.restarts == 1
+
+
+def test_errors_and_v7_parse_results_pass_through():
+    """例外はエラーとして返し、v7 のパース結果はワーカー経由でも同じ"""
+    import batch_direct_processing_v7_fixed7 as v7
+
+    sample = project_root / 'tests' / 'golden' / 'fixtures'
+    path = sorted(sample.glob('*.txt'))[0]
+    text = path.read_text(encoding='utf-8')
+    with GuardedWorker(v7.parse_text, initializer=v7.init_parse_worker, initargs=(v7.MIN_AMOUNT, False)) as worker:
+        result = worker.call(text, path.stem)
+        assert result.status == STATUS_OK
+        assert result.value == v7.parse_text(text, path.stem)
+        assert result.value[2]
+
+        error = worker.call('broken', func=failing_parse)
+        assert error.status == STATUS_ERROR
+        assert error.error == 'ValueError: broken'
+
+
+def test_quarantine_log_keeps_latest_entry_per_file(tmp_path):
+    """隔離リストはファイル名ごとの最新の記録を返し、壊れた行は読み飛ばす"""
+    from parsers.regex_watchdog import GuardResult
+
+    log = QuarantineLog(tmp_path / 'quarantine' / 'v7.jsonl')
+    assert log.names() == set()
+
+    log.add(Path('/data/20230403_a.txt'), GuardResult(STATUS_TIMEOUT, reason='file_budget', seconds=30.2))
+    log.add(Path('/data/20230403_a.txt'), GuardResult(STATUS_TIMEOUT, reason=REASON_PATTERN_BUDGET,
+                                                      pattern='AMOUNT_PATTERNS[2] 発行額', seconds=10.1),
+            runner='v7_fixed7')
+    with open(log.path, 'a', encoding='utf-8') as f:
+        f.write('{"file": "20230404_b.txt", "reas')
+
+    entries = log.entries()
+    assert list(entries) == ['20230403_a.txt']
+    assert entries['20230403_a.txt']['reason'] == REASON_PATTERN_BUDGET
+    assert entries['20230403_a.txt']['pattern'] == 'AMOUNT_PATTERNS[2] 発行額'
+    assert entries['20230403_a.txt']['runner'] == 'v7_fixed7'
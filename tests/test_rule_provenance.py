@@ -0,0 +1,104 @@
+# tests/test_rule_provenance.py
+"""
+抽出ルールの来歴と、ルール変更時の再パース対象の選定のテスト
+"""
+
+import re
+import sys
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / 'scripts' / '01_data_ingestion'))
+
+from parsers.rule_provenance import ProvenanceLog, plan_reparse, split_provenance
+
+FIXTURES = sorted((project_root / 'tests' / 'golden' / 'fixtures').glob('*.txt'))
+
+
+def _record(v7, log):
+    for path in FIXTURES:
+        pattern, _, items = v7.parse_text(path.read_text(encoding='utf-8'), path.stem)
+        log.add(path, v7.rule_set(), v7.parse_dependencies(pattern, items), pattern=pattern, rows=len(items))
+
+
+def _replace_rule(v7, monkeypatch, pattern_name, regex):
+    patterns = [(re.compile(regex, pattern.flags), mode, name, priority) if name == pattern_name
+                else (pattern, mode, name, priority)
+                for pattern, mode, name, priority in v7.AMOUNT_PATTERNS]
+    monkeypatch.setattr(v7, 'AMOUNT_PATTERNS', patterns)
+    return v7.rule_set(refresh=True)
+
+
+def test_rows_carry_rule_provenance_and_dependencies():
+    """行の来歴はパターン名と指紋を持ち、分類は判定が決まったパターンまでに依存する"""
+    import batch_direct_processing_v7_fixed7 as v7
+
+    text = (project_root / 'tests' / 'golden' / 'fixtures' / '20230601_numbered_list.txt').read_text(encoding='utf-8')
+    pattern, _, items = v7.parse_text(text, '20230601_numbered_list')
+    provenance = split_provenance(v7.item_provenance(items[0]))
+    assert provenance['parser'] == 'simple_parse_v7_fixed7'
+    assert provenance['rule'] == 'AMOUNT_PATTERNS/額面金額（明示）'
+    assert provenance['fingerprint'] == v7.rule_set().fingerprints['AMOUNT_PATTERNS/額面金額（明示）']
+    assert items[0]['legal_basis_source'].endswith(provenance['rule'].split('/', 1)[1])
+
+    depends = v7.parse_dependencies(pattern, items)
+    assert pattern == 'NUMBERED_LIST'
+    assert 'PATTERN_NUMBERED_LIST' in depends and 'PATTERN_TABLE' not in depends
+    assert 'PATTERN_TABLE' in v7.parse_dependencies('UNKNOWN', [])
+    assert not any(rule.startswith('AMOUNT_PATTERNS/') for rule in v7.parse_dependencies('UNKNOWN', []))
+
+
+def test_plan_selects_only_files_affected_by_changed_rules(tmp_path, monkeypatch):
+    """変わったルールで行を出したファイルと、新しい正規表現が一致するファイルだけを選ぶ"""
+    import batch_direct_processing_v7_fixed7 as v7
+
+    log = ProvenanceLog(tmp_path / 'provenance.jsonl')
+    try:
+        _record(v7, log)
+        assert plan_reparse(log.entries(), v7.rule_set(refresh=True)) == {}
+
+        rules = _replace_rule(v7, monkeypatch, '発行額', r'発行額[^0-9]{0,60}([0-9,，]+)\s*(億)?円')
+        plan = plan_reparse(log.entries(), rules)
+        assert sorted(plan) == ['20230414_vertical_5col.txt', '20230710_seifu_tanki.txt']
+        assert plan['20230414_vertical_5col.txt']['reasons'] == ['depends:AMOUNT_PATTERNS/発行額']
+
+        # 依存していなかったルールでも、新しい正規表現が一致するファイルは選ぶ
+        rules = _replace_rule(v7, monkeypatch, '億円表記', r'([0-9,，]+)\s*円')
+        plan = plan_reparse(log.entries(), rules)
+        assert 'matches:AMOUNT_PATTERNS/億円表記' in plan['20230601_numbered_list.txt']['reasons']
+        assert 'matches:AMOUNT_PATTERNS/億円表記' not in str(plan_reparse(log.entries(), rules, scan=False))
+    finally:
+        monkeypatch.undo()
+        v7.rule_set(refresh=True)
+
+
+def test_plan_follows_canonical_links_and_replace_sql(tmp_path, monkeypatch):
+    """正本が対象ならほぼ同一の告示も選び、--replace は既存行の削除と投入を1つのトランザクションで行う"""
+    import batch_direct_processing_v7_fixed7 as v7
+
+    log = ProvenanceLog(tmp_path / 'provenance.jsonl')
+    _record(v7, log)
+    copy = tmp_path / '20230602_copy.txt'
+    copy.write_text(FIXTURES[2].read_text(encoding='utf-8'), encoding='utf-8')
+    log.add(copy, v7.rule_set(), v7.parse_dependencies('NUMBERED_LIST', []), canonical=FIXTURES[2].stem)
+
+    plan = plan_reparse(log.entries(), v7.rule_set(), rules=['AMOUNT_PATTERNS/額面金額（明示）'], scan=False)
+    assert sorted(plan) == ['20230601_numbered_list.txt', '20230602_copy.txt']
+    assert plan['20230602_copy.txt']['reasons'] == ['canonical:20230601_numbered_list']
+
+    staging = 'p.d.bond_issuances__stg_1'
+    sql = v7.replace_rows_sql(staging, ['announcement_id', 'issue_amount', 'dedupe_key', 'run_id', 'ingested_at'],
+                              ['announcement_id', 'issue_amount', 'bond_category', 'is_summary_record'])
+    assert sql.startswith('BEGIN TRANSACTION;') and sql.rstrip().endswith('COMMIT TRANSACTION;')
+    assert '-issuance_count AS issuance_count' in sql
+    # 差し引き → 削除 → 投入 → 加算 を1つのトランザクションで（投入に失敗すれば既存行も集計も残る）
+    subtract = sql.index(f"MERGE `{v7.table_id_summary}`")
+    delete = sql.index(f"DELETE FROM `{v7.table_id_layer2}`")
+    insert = sql.index(f"MERGE `{v7.table_id_layer2}`")
+    assert subtract < delete < insert < sql.rindex(f"MERGE `{v7.table_id_summary}`")
+
+    monkeypatch.setattr(v7, 'LAYER2_TABLE', 'bond_issuances__shard_fy2023')
+    sql = v7.replace_rows_sql(staging, ['announcement_id', 'issue_amount'], ['announcement_id', 'issue_amount'])
+    assert 'issuance_summary' not in sql and 'DELETE FROM' in sql
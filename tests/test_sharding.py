@@ -0,0 +1,68 @@
+# tests/test_sharding.py
+"""
+年度シャードによる一括取り込み（シャード計画・進捗・コミットSQL）のテスト
+"""
+
+import sys
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from database.sharding import (
+    STATUS_COMMITTED,
+    STATUS_RUNNING,
+    ShardWorkspace,
+    estimate_eta,
+    plan_shards,
+    progress_line,
+    shard_commit_sql,
+    staging_table_id,
+    write_progress,
+)
+
+
+def test_plan_shards_by_fiscal_year_and_month():
+    """年度ごとに分け、ファイルの多い年度は4月→3月の順で月ごとに分ける"""
+    files = [Path(f"/data/{name}.txt") for name in (
+        '20100405_a', '20110310_b',                              # 2010年度
+        '20230402_c', '20230510_d', '20240115_e', '20240320_f',  # 2023年度（多い）
+        'readme',
+    )]
+    shards = plan_shards(files, max_files_per_shard=3)
+    assert [s.shard_id for s in shards] == ['fy2010', 'fy2023_m04', 'fy2023_m05', 'fy2023_m01',
+                                           'fy2023_m03', 'unknown']
+    assert shards[0].files == ('/data/20100405_a.txt', '/data/20110310_b.txt')
+    assert shards[-1].fiscal_year == 0
+    assert staging_table_id('p.d.bond_issuances', shards[1]) == 'p.d.bond_issuances__shard_fy2023_m04'
+
+
+def test_workspace_manifest_and_progress(tmp_path):
+    """マニフェストは再読み込みで復元され、進捗から全体の ETA を出す"""
+    shards = plan_shards([Path('20230402_a.txt'), Path('20230403_b.txt'), Path('20240402_c.txt')])
+    first = ShardWorkspace(tmp_path, shards[0])
+    first.update(status=STATUS_RUNNING, run_id='r1')
+    write_progress(first.progress_path, done=1, total=2)
+    second = ShardWorkspace(tmp_path, shards[1])
+    second.update(status=STATUS_COMMITTED, run_id='r2')
+
+    reloaded = ShardWorkspace(tmp_path, shards[0])
+    assert reloaded.status == STATUS_RUNNING and reloaded.manifest['run_id'] == 'r1'
+    assert reloaded.progress()['done'] == 1
+
+    line = progress_line([reloaded, second], elapsed=10, baseline=1)
+    assert 'ファイル 2/3' in line and '完了1 実行中1' in line
+    assert 'ETA 00:00:10' in line
+    assert estimate_eta(0, 10, 5) is None
+
+
+def test_shard_commit_sql_is_single_idempotent_transaction():
+    """集計の加算（本テーブルに無い行だけ）→ MERGE を1つのトランザクションで行う"""
+    sql = shard_commit_sql('p.d.bond_issuances', 'p.d.bond_issuances__shard_fy2023', 'p.d.issuance_summary',
+                           ['announcement_id', 'issue_amount', 'dedupe_key'], 'r1')
+    assert sql.strip().startswith('BEGIN TRANSACTION;')
+    assert sql.strip().endswith('COMMIT TRANSACTION;')
+    assert 'NOT EXISTS' in sql and 'L2.dedupe_key = STG.dedupe_key' in sql
+    assert sql.index('`p.d.issuance_summary`') < sql.index('MERGE `p.d.bond_issuances` T')
+    assert 'INSERT (announcement_id, issue_amount, dedupe_key)' in sql
@@ -0,0 +1,80 @@
+# tests/test_storage_write_sink.py
+"""
+Storage Write API シンクのテスト（フェイクサーバー使用）
+"""
+
+import sys
+from datetime import date
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from database.fake_write_server import FakeWriteServer
+from database.storage_write_sink import (
+    SINK_COMMITTED,
+    SINK_PENDING,
+    StorageWriteSink,
+    to_storage_value,
+    write_rows,
+)
+
+TABLE = 'jgb2023.20251029.bond_issuances'
+
+
+def _rows(n):
+    return [{'announcement_id': 'A1', 'bond_name': f'利付国債{i}', 'issue_amount': 100000000 * (i + 1)}
+            for i in range(n)]
+
+
+def test_committed_mode_batches_with_offsets():
+    """committed は行数ごとにバッチ送信し、オフセットは送信済み行数になる"""
+    server = FakeWriteServer()
+    sink = StorageWriteSink(server, TABLE, mode=SINK_COMMITTED, batch_rows=2)
+    sink.write(_rows(5))
+    assert len(server.rows(TABLE)) == 4          # 2行ずつ送信済み、1行はバッファ
+    assert sink.close() == []
+    assert [c['offset'] for c in server.append_calls] == [0, 2, 4]
+    assert [r['bond_name'] for r in server.rows(TABLE)] == [f'利付国債{i}' for i in range(5)]
+
+
+def test_pending_mode_is_all_or_nothing():
+    """pending はコミットまで不可視で、中止すれば1行も反映されない"""
+    server = FakeWriteServer()
+    with StorageWriteSink(server, TABLE, mode=SINK_PENDING, batch_rows=2) as sink:
+        sink.write(_rows(3))
+        assert server.rows(TABLE) == []
+    assert len(server.rows(TABLE)) == 3
+
+    aborted = FakeWriteServer()
+    try:
+        with StorageWriteSink(aborted, TABLE, mode=SINK_PENDING, batch_rows=2) as sink:
+            sink.write(_rows(3))
+            raise RuntimeError('parse failed')
+    except RuntimeError:
+        pass
+    assert aborted.rows(TABLE) == []
+
+
+def test_lost_ack_is_not_duplicated():
+    """応答が失われた append を再送しても、オフセットにより行は重複しない"""
+    server = FakeWriteServer(drop_ack_on={2}, fail_on={4})
+    errors = write_rows(None, TABLE, _rows(6), sink=SINK_COMMITTED, transport=server,
+                        batch_rows=2, retry_delay=0)
+    assert errors == []
+    # 2回目: 受理後に応答喪失 → 再送は ALREADY_EXISTS、4回目: 一時エラー → 同じオフセットで再送
+    assert [c['offset'] for c in server.append_calls] == [0, 2, 2, 4, 4]
+    assert len(server.rows(TABLE)) == 6
+
+
+def test_storage_value_conversion():
+    """DATE は日数、TIMESTAMP はマイクロ秒、NUMERIC は文字列で送る"""
+    assert to_storage_value('DATE', '1970-01-11') == 10
+    assert to_storage_value('TIMESTAMP', '1970-01-01T00:00:01.5Z') == 1500000
+    # date のみの値は UTC の 0 時
+    assert to_storage_value('TIMESTAMP', date(1970, 1, 2)) == 86400 * 1000000
+    assert to_storage_value('TIMESTAMP', '1970-01-02') == 86400 * 1000000
+    assert to_storage_value('NUMERIC', 0.125) == '0.125'
+    assert to_storage_value('BOOLEAN', 'false') is False
+    assert to_storage_value('INTEGER', None) is None
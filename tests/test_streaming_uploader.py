@@ -0,0 +1,132 @@
+# tests/test_streaming_uploader.py
+"""
+サイズを見て分割するストリーミング投入のテスト（insertAll はテスト内のフェイク、
+Storage Write API は FakeWriteServer を使用）
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from database.fake_write_server import FakeWriteServer
+from database.storage_write_sink import SINK_COMMITTED, SINK_INSERT_ALL
+from database.streaming_uploader import StreamingUploader, row_bytes
+
+TABLE = 'jgb2023.20251025.bond_issuances'
+
+
+class PayloadTooLarge(Exception):
+    code = 413
+
+
+class FakeInsertAllClient:
+    """insert_rows_json の呼び出しを記録し、行ごとのエラー・例外を返す"""
+
+    def __init__(self, reject=None, max_rows=None, max_bytes=None):
+        self.reject = reject or (lambda row, attempt: None)  # 行 → エラー理由（None で受理）
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.calls = []
+        self.rows = []
+        self.attempts = {}
+        self._lock = threading.Lock()
+
+    def insert_rows_json(self, table, rows, row_ids=None, **options):
+        with self._lock:
+            self.calls.append({'rows': list(rows), 'row_ids': list(row_ids), 'options': options})
+            if (self.max_rows and len(rows) > self.max_rows) or \
+                    (self.max_bytes and sum(row_bytes(row) for row in rows) > self.max_bytes):
+                raise PayloadTooLarge('Request payload size exceeds the limit')
+            errors = []
+            for index, (row, row_id) in enumerate(zip(rows, row_ids)):
+                attempt = self.attempts[row_id] = self.attempts.get(row_id, 0) + 1
+                reason = self.reject(row, attempt)
+                if reason:
+                    errors.append({'index': index, 'errors': [{'reason': reason, 'message': reason}]})
+            if errors:
+                # insertAll は1行でも不正なら他の行も受理しない（stopped）
+                failed = {error['index'] for error in errors}
+                errors += [{'index': i, 'errors': [{'reason': 'stopped', 'message': ''}]}
+                           for i in range(len(rows)) if i not in failed]
+                return sorted(errors, key=lambda e: e['index'])
+            self.rows.extend(rows)
+            return []
+
+
+def _rows(n, note=''):
+    return [{'announcement_id': f'A{i}', 'bond_name': f'利付国債{i}{note}', 'issue_amount': 100000000 * (i + 1)}
+            for i in range(n)]
+
+
+def test_flushes_by_rows_or_bytes_whichever_first():
+    """行数・バイト数のどちらかが上限に達したら1回分として送る"""
+    client = FakeInsertAllClient()
+    with StreamingUploader(client, TABLE, sink=SINK_INSERT_ALL, flush_rows=3, flush_bytes=10 ** 6) as uploader:
+        uploader.add_rows(_rows(7))
+    assert sorted(len(call['rows']) for call in client.calls) == [1, 3, 3]
+    assert uploader.rows_written == 7 and uploader.errors == []
+
+    rows = _rows(6, note='x' * 100)
+    client = FakeInsertAllClient()
+    limit = row_bytes(rows[0]) * 2
+    with StreamingUploader(client, TABLE, sink=SINK_INSERT_ALL, flush_rows=100, flush_bytes=limit,
+                           max_in_flight=2) as uploader:
+        uploader.add_rows(rows)
+    assert [len(call['rows']) for call in client.calls] == [2, 2, 2]
+    assert sorted(r['bond_name'] for r in client.rows) == sorted(r['bond_name'] for r in rows)
+
+
+def test_partial_errors_retry_only_affected_rows():
+    """不正な行は再送せず失敗として記録し、巻き添え・一時的なエラーの行だけを同じ insertId で再送"""
+    def reject(row, attempt):
+        if row['announcement_id'] == 'A1':
+            return 'invalid'
+        if row['announcement_id'] == 'A3' and attempt == 2:
+            return 'backendError'
+        return None
+
+    client = FakeInsertAllClient(reject=reject)
+    written = []
+    with StreamingUploader(client, TABLE, sink=SINK_INSERT_ALL, flush_rows=10, retry_delay=0.001,
+                           on_written=written.extend) as uploader:
+        uploader.add_rows(_rows(5))
+
+    assert sorted(r['announcement_id'] for r in client.rows) == ['A0', 'A2', 'A3', 'A4']
+    assert sorted(r['announcement_id'] for r in written) == ['A0', 'A2', 'A3', 'A4']
+    # 2回目は A3 の一時的なエラーの巻き添えで他の行も stopped になり、4行とも再送
+    assert [len(call['rows']) for call in client.calls] == [5, 4, 4]
+    first_ids = dict(zip((r['announcement_id'] for r in client.calls[0]['rows']), client.calls[0]['row_ids']))
+    assert client.calls[2]['row_ids'] == [first_ids[a] for a in ('A0', 'A2', 'A3', 'A4')]
+    assert [f['row']['announcement_id'] for f in uploader.failed_rows] == ['A1']
+    assert uploader.errors == [{'index': 0, 'errors': [{'reason': 'invalid', 'message': 'invalid'}]}]
+
+
+def test_oversized_request_is_split_and_storage_write_is_ordered():
+    """大きすぎるリクエストは半分に分けて送り直し（1行で大きすぎれば失敗）、committed は1本のストリームへ順に送る"""
+    client = FakeInsertAllClient(max_rows=2)
+    with StreamingUploader(client, TABLE, sink=SINK_INSERT_ALL, flush_rows=8) as uploader:
+        uploader.add_rows(_rows(8))
+    assert uploader.rows_written == 8 and uploader.errors == []
+    assert sorted(len(call['rows']) for call in client.calls if len(call['rows']) <= 2) == [2, 2, 2, 2]
+    # 再送はアップローダーだけが行う（クライアント側の再試行は止める）
+    assert all(call['options'] == {'retry': None} for call in client.calls)
+
+    # 1行だけで大きすぎる行は再送せず、すぐに失敗として記録する
+    rows = _rows(3) + _rows(1, note='x' * 1000)
+    client = FakeInsertAllClient(max_bytes=500)
+    with StreamingUploader(client, TABLE, sink=SINK_INSERT_ALL, flush_rows=10, retry_delay=0.001) as uploader:
+        uploader.add_rows(rows)
+    assert sum(1 for call in client.calls if call['rows'] == [rows[-1]]) == 1
+    assert [f['row'] for f in uploader.failed_rows] == [rows[-1]]
+    assert uploader.rows_written == 3 and uploader.retries == 0
+
+    server = FakeWriteServer()
+    with StreamingUploader(None, TABLE, sink=SINK_COMMITTED, flush_rows=3, transport=server) as uploader:
+        uploader.add_rows(_rows(7))
+    assert [r['announcement_id'] for r in server.rows(TABLE)] == [f'A{i}' for i in range(7)]
+    assert [call['offset'] for call in server.append_calls] == [0, 3, 6]
+    assert uploader.rows_written == 7 and uploader.chunks_sent == 3
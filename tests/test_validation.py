@@ -0,0 +1,114 @@
+# tests/test_validation.py
+"""
+一括検証フレームワーク（宣言したチェックの実行・結果の形）のテスト
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+pd = pytest.importorskip('pandas')
+
+from database.validation import (
+    CHECKS,
+    STATUS_FAILED,
+    STATUS_PASSED,
+    STATUS_SKIPPED,
+    era_to_datetime,
+    run_checks,
+)
+
+
+def _issuances():
+    return pd.DataFrame([
+        # 総額 500億円 に対して明細の合計 450億円
+        {'announcement_id': '20230601_a', 'issuance_id': 'S', 'issue_amount': 50_000_000_000,
+         'is_summary_record': True, 'maturity_date_text': '令和15年6月20日'},
+        {'announcement_id': '20230601_a', 'issuance_id': 'D1', 'issue_amount': 30_000_000_000,
+         'is_summary_record': False, 'maturity_date_text': '令和15年6月20日'},
+        {'announcement_id': '20230601_a', 'issuance_id': 'D2', 'issue_amount': 15_000_000_000,
+         'is_summary_record': False, 'maturity_date_text': '令和元年6月20日'},
+        # 総額と明細が一致し、明細の金額が最小金額未満
+        {'announcement_id': '20230701_b', 'issuance_id': 'S2', 'issue_amount': 50_000_000,
+         'is_summary_record': True},
+        {'announcement_id': '20230701_b', 'issuance_id': 'D3', 'issue_amount': 50_000_000,
+         'is_summary_record': False},
+    ])
+
+
+def test_era_to_datetime():
+    """和暦（元年を含む）を日付に変換し、読めない値は NaT"""
+    converted = era_to_datetime(pd.Series(['令和5年6月20日', '平成元年1月8日', '不明', None]))
+    assert converted.dt.strftime('%Y-%m-%d').tolist()[:2] == ['2023-06-20', '1989-01-08']
+    assert converted.isna().tolist()[2:] == [True, True]
+
+
+def test_checks_record_violations_per_announcement():
+    """宣言したチェックごとに違反を1行ずつ記録する"""
+    report, statuses = run_checks({'issuances': _issuances()}, run_id='r1', min_amount=100_000_000)
+    by_check = {s['check_name']: s for s in statuses}
+    assert [s['check_name'] for s in statuses] == [c.name for c in CHECKS]
+
+    assert by_check['summary_matches_details']['status'] == STATUS_FAILED
+    summary = report[report['check_name'] == 'summary_matches_details']
+    assert summary['announcement_id'].tolist() == ['20230601_a']
+    assert summary[['expected', 'actual']].values.tolist() == [['50000000000', '45000000000']]
+
+    assert report[report['check_name'] == 'maturity_after_issue']['issuance_id'].tolist() == ['D2']
+    assert report[report['check_name'] == 'amount_at_least_minimum']['issuance_id'].tolist() == ['D3']
+    assert by_check['legal_basis_allocations_sum_to_total']['status'] == STATUS_SKIPPED
+    assert set(report['run_id']) == {'r1'}
+
+    # 訂正の告示で置き換えられた行は検証しない
+    superseded = _issuances().assign(superseded_by=[None, None, None, None, '20230702_c'])
+    report, _ = run_checks({'issuances': superseded}, run_id='r1', min_amount=100_000_000)
+    assert report[report['check_name'] == 'amount_at_least_minimum'].empty
+
+
+def test_allocation_check_uses_legal_basis_frame():
+    """発行根拠テーブルがあれば配分額の合計を発行額と比べる"""
+    legal_basis = pd.DataFrame([
+        {'issuance_id': 'D1', 'allocation_amount': 20_000_000_000},
+        {'issuance_id': 'D1', 'allocation_amount': 10_000_000_000},
+        {'issuance_id': 'D2', 'allocation_amount': 1},
+    ])
+    check = [c for c in CHECKS if c.name == 'legal_basis_allocations_sum_to_total']
+    report, statuses = run_checks({'issuances': _issuances(), 'legal_basis': legal_basis}, 'r2', check)
+    assert statuses[0]['status'] == STATUS_FAILED
+    assert report['issuance_id'].tolist() == ['D2']
+
+    report, statuses = run_checks({'issuances': _issuances(), 'legal_basis': legal_basis.iloc[:2]}, 'r3', check)
+    assert statuses[0]['status'] == STATUS_PASSED and len(report) == 0
+
+
+def test_statuses_have_one_row_per_check_even_without_violations():
+    """違反が無くても、実行ごと・チェックごとに状態の行を返す（状態テーブルに書く行）"""
+    clean = _issuances()[_issuances()['announcement_id'] == '20230701_b']
+    report, statuses = run_checks({'issuances': clean}, run_id='r4', source_run_id='ingest-1', min_amount=1)
+    assert len(report) == 0
+    assert [(s['check_name'], s['status']) for s in statuses] == [
+        ('summary_matches_details', STATUS_PASSED),
+        ('legal_basis_allocations_sum_to_total', STATUS_SKIPPED),
+        ('maturity_after_issue', STATUS_PASSED),
+        ('amount_at_least_minimum', STATUS_PASSED),
+    ]
+    assert {s['run_id'] for s in statuses} == {'r4'} and {s['source_run_id'] for s in statuses} == {'ingest-1'}
+    assert all(s['severity'] and s['checked_at'] for s in statuses)
+
+
+def test_source_run_is_filtered_in_the_query():
+    """--source-run-id は表全体を読まず、WHERE run_id = @run_id のクエリで読む"""
+    sys.path.insert(0, str(project_root / 'scripts' / '03_data_validation'))
+    from run_validation_checks import source_run_sql
+
+    where = "run_id = @run_id"
+    issuances = source_run_sql('p', 'd', 'bond_issuances', where)
+    assert issuances == "SELECT * FROM `p.d.bond_issuances` WHERE run_id = @run_id"
+    legal_basis = source_run_sql('p', 'd', 'issuance_legal_basis', where)
+    assert "FROM `p.d.issuance_legal_basis`" in legal_basis
+    assert "issuance_id IN (SELECT issuance_id FROM `p.d.bond_issuances` WHERE run_id = @run_id)" in legal_basis
@@ -9,8 +9,14 @@ BigQuery スキーマ更新スクリプト（v9対応）
 """
 
 import os
+import sys
 from google.cloud import bigquery
 
+# プロジェクトルートをパスに追加（database パッケージ用）
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database.bigquery_quota import QuotaAwareClient
+
 # 認証情報の設定
 os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = r'C:\Users\sonke\secrets\jgb2023-f8c9b849ae2d.json'
 
@@ -19,7 +25,8 @@ PROJECT_ID = 'jgb2023'
 DATASET_ID = 'jgb2023_20251029'
 LOCATION = 'asia-northeast1'
 
-client = bigquery.Client(project=PROJECT_ID, location=LOCATION)
+# クエリのスキャン量・所要時間は終了時にレポート表示（database.query_accounting）
+client = QuotaAwareClient(bigquery.Client(project=PROJECT_ID, location=LOCATION))
 
 # テーブルID
 table_id = f"{PROJECT_ID}.{DATASET_ID}.bond_issuances"
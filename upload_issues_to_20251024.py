@@ -9,6 +9,7 @@
 
 import os
 import sys
+import argparse
 import re
 import json
 from datetime import datetime, date, timedelta
@@ -18,7 +19,20 @@ import uuid
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 sys.path.insert(0, project_root)
 
-from google.cloud import bigquery
+from database.bigquery_client import get_bigquery_client
+from database.ingestion_run import current_run
+from database.issuance_summary import SUMMARY_TABLE, apply_summary, merge_summary, summarize_rows, totals_by
+from database.storage_write_sink import SINK_CHOICES, default_sink
+from database.streaming_uploader import (
+    DEFAULT_FLUSH_BYTES, DEFAULT_FLUSH_ROWS, DEFAULT_MAX_IN_FLIGHT, StreamingUploader,
+)
+from parsers.bond_master_resolver import get_bond_master_resolver
+from parsers.law_reference_tokenizer import (
+    tokenize_law_references,
+    classify_law_references,
+    is_seifu_tanki_reference,
+    sort_by_basis_priority,
+)
 
 # パーサーのインポートを試みる
 try:
@@ -29,96 +43,30 @@ except ImportError:
     print("⚠️  警告: parsersモジュールが見つかりません。簡易モードで実行します。")
     HAS_PARSERS = False
 
-# BigQuery設定
-os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = r"C:\Users\sonke\secrets\jgb2023-f8c9b849ae2d.json"
+# BigQuery設定（クライアントは import 時ではなく初回利用時に生成。
+# 認証は ADC。サービスアカウントキーを使う場合は GOOGLE_APPLICATION_CREDENTIALS を設定する）
 PROJECT_ID = 'jgb2023'
 DATASET_ID = '20251024'
 
-client = bigquery.Client(project=PROJECT_ID)
+
+def get_client():
+    """BigQueryクライアントを取得（初回利用時に生成）"""
+    return get_bigquery_client(PROJECT_ID)
+
 
 # データディレクトリ
 DATA_DIR = r"G:\マイドライブ\JGBデータ\2023"
 
-# 発行根拠法令パターン（2023年度用・階層構造版）
-LEGAL_BASIS_PATTERNS = {
-    '4条債': {
-        'category': '4条債',
-        'sub_category': '建設国債',
-        'patterns': [
-            r'財政法.*?第4条第1項',
-            r'財政法.*?第四条第一項'
-        ]
-    },
-    '特例債': {
-        'category': '特例債',
-        'sub_category': '特例公債',
-        'patterns': [
-            r'財政運営に必要な財源の確保を図るための公債の発行の特例に関する法律.*?第2条第1項',
-            r'財政運営に必要な財源の確保を図るための公債の発行の特例に関する法律.*?第二条第一項',
-            r'平成24年法律第101号.*?第2条第1項'
-        ]
-    },
-    'GX経済移行債': {
-        'category': 'GX経済移行債',
-        'sub_category': 'つなぎ公債',
-        'patterns': [
-            r'脱炭素成長型経済構造への円滑な移行の推進に関する法律.*?第7条第1項',
-            r'脱炭素成長型経済構造への円滑な移行の推進に関する法律.*?第七条第一項',
-            r'令和5年法律第32号.*?第7条第1項'
-        ]
-    },
-    '復興債': {
-        'category': '復興債',
-        'sub_category': 'つなぎ公債',
-        'patterns': [
-            r'東日本大震災からの復興のための施策を実施するために必要な財源の確保に関する特別措置法.*?第69条第4項',
-            r'東日本大震災からの復興のための施策を実施するために必要な財源の確保に関する特別措置法.*?第六十九条第四項'
-        ]
-    },
-    '年金特例債': {
-        'category': '年金特例債',
-        'sub_category': 'つなぎ公債',
-        'patterns': [
-            r'財政運営に必要な財源の確保を図るための公債の発行の特例に関する法律.*?第3条第1項',
-            r'財政運営に必要な財源の確保を図るための公債の発行の特例に関する法律.*?第三条第一項',
-            r'平成24年法律第101号.*?第3条第1項'
-        ]
-    },
-    '借換債': {
-        'category': '借換債',
-        'sub_category': '借換債',
-        'patterns': [
-            r'特別会計に関する法律.*?第46条第1項',
-            r'特別会計に関する法律.*?第四十六条第一項'
-        ]
-    },
-    '前倒債': {
-        'category': '借換債',
-        'sub_category': '前倒債',
-        'patterns': [
-            r'特別会計に関する法律.*?第47条第1項',
-            r'特別会計に関する法律.*?第四十七条第一項'
-        ]
-    },
-    '財投債': {
-        'category': '財投債',
-        'sub_category': '財投債',
-        'patterns': [
-            r'特別会計に関する法律.*?第62条第1項',
-            r'特別会計に関する法律.*?第六十二条第一項'
-        ]
-    }
-}
-
-# 政府短期証券のパターン（除外用）
-SEIFU_TANKI_PATTERNS = [
-    r'財政法.*?第7条第1項',
-    r'財政融資資金法.*?第9条第1項',
-    r'特別会計に関する法律.*?第83条',
-    r'特別会計に関する法律.*?第94条',
-    r'特別会計に関する法律.*?第95条',
-    r'特別会計に関する法律.*?第136条',
-    r'特別会計に関する法律.*?第137条'
+# 発行根拠法令の抽出は単一パス・トークナイザで行う
+# （旧LEGAL_BASIS_PATTERNS / SEIFU_TANKI_PATTERNSは parsers/law_reference_tokenizer.py に集約）
+
+# 複数の根拠が併記された告示で代表根拠（legal_basis）を選ぶ優先順（旧LEGAL_BASIS_PATTERNSの定義順）
+LEGAL_BASIS_PRIORITY = ('4条債', '特例債', 'GX経済移行債', '復興債', '年金特例債', '借換債', '前倒債', '財投債')
+
+# 発行根拠の直後に続く金額（額面金額で〜円 / 金額〜円）
+AMOUNT_AFTER_LEGAL_BASIS_PATTERNS = [
+    re.compile(r'[^円]*?額面金額で([\d,]+)円', re.DOTALL),
+    re.compile(r'[^円]*?金額([\d,]+)円', re.DOTALL),
 ]
 
 
@@ -142,42 +90,34 @@ def parse_date_string(date_value):
     return None
 
 
-def extract_legal_bases(text):
-    """発行根拠法令を抽出（複数対応、金額も抽出）"""
-    results = []
+def extract_legal_bases(text, references=None):
+    """発行根拠法令を抽出（複数対応、金額も抽出）
+
+    告示文を1回だけトークン化し、(法律, 条, 項) をARTICLE_TO_LEGAL_BASISで辞書引きする
+    """
+    if references is None:
+        references = list(tokenize_law_references(text))
     
-    for basis_name, config in LEGAL_BASIS_PATTERNS.items():
-        for pattern in config['patterns']:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                full_text = match.group(0)
-                amount = extract_amount_for_legal_basis(text, full_text)
-                
-                results.append({
-                    'basis': basis_name,
-                    'category': config['category'],
-                    'sub_category': config['sub_category'],
-                    'full': full_text,
-                    'amount': amount
-                })
-                break
+    results = []
+    bases = classify_law_references(text, references)
+    for lb in sort_by_basis_priority(bases, LEGAL_BASIS_PRIORITY):
+        results.append({
+            'basis': lb['basis'],
+            'category': lb['category'],
+            'sub_category': lb['sub_category'],
+            'full': lb['full'],
+            'amount': extract_amount_for_legal_basis(text, lb['span'][1])
+        })
     
     return results
 
 
-def extract_amount_for_legal_basis(text, legal_text):
-    """特定の発行根拠に紐づく金額を抽出"""
-    pattern1 = re.escape(legal_text) + r'[^円]*?額面金額で([\d,]+)円'
-    match = re.search(pattern1, text, re.IGNORECASE | re.DOTALL)
-    
-    if match:
-        return int(match.group(1).replace(',', ''))
-    
-    pattern2 = re.escape(legal_text) + r'[^円]*?金額([\d,]+)円'
-    match = re.search(pattern2, text, re.IGNORECASE | re.DOTALL)
-    
-    if match:
-        return int(match.group(1).replace(',', ''))
+def extract_amount_for_legal_basis(text, legal_basis_end):
+    """特定の発行根拠に紐づく金額を抽出（発行根拠の終了位置から照合）"""
+    for pattern in AMOUNT_AFTER_LEGAL_BASIS_PATTERNS:
+        match = pattern.match(text, legal_basis_end)
+        if match:
+            return int(match.group(1).replace(',', ''))
     
     return None
 
@@ -191,11 +131,13 @@ def has_waribiki_tanki(text):
     return '割引短期国債' in text
 
 
-def has_government_short_term_bond(text):
+def has_government_short_term_bond(text, references=None):
     """政府短期証券が含まれているか判定"""
-    has_seifu_pattern = any(re.search(p, text, re.IGNORECASE) for p in SEIFU_TANKI_PATTERNS)
-    has_seifu_word = '政府短期証券' in text
-    return has_seifu_pattern or has_seifu_word
+    if '政府短期証券' in text:
+        return True
+    if references is None:
+        references = tokenize_law_references(text)
+    return any(is_seifu_tanki_reference(ref) for ref in references)
 
 
 def extract_series_number(text):
@@ -223,37 +165,8 @@ def calculate_maturity_period(issuance_date, maturity_date):
 
 
 def determine_bond_master_id(bond_name, maturity_days):
-    """債券名と償還期間から適切なbond_master_idを決定"""
-    if '短期' in bond_name or 'TANKI' in bond_name:
-        if maturity_days and maturity_days >= 270:
-            return 'BOND_TANKI_1Y'
-        else:
-            return 'BOND_TANKI_6M'
-    
-    if 'クライメート' in bond_name or 'トランジション' in bond_name:
-        if '10年' in bond_name:
-            return 'BOND_GX_10Y'
-        elif '5年' in bond_name:
-            return 'BOND_GX_5Y'
-    
-    mapping = {
-        '2年': 'BOND_002Y',
-        '5年': 'BOND_005Y',
-        '10年': 'BOND_010Y',
-        '20年': 'BOND_020Y',
-        '30年': 'BOND_030Y',
-        '40年': 'BOND_040Y',
-        '固定・3年': 'BOND_KOJIN_FIXED_3Y',
-        '固定・5年': 'BOND_KOJIN_FIXED_5Y',
-        '変動・10年': 'BOND_KOJIN_VARIABLE_10Y',
-        '物価連動': 'BOND_BUKKA_10Y'
-    }
-    
-    for key, value in mapping.items():
-        if key in bond_name:
-            return value
-    
-    return None
+    """債券名と償還期間から適切なbond_master_idを決定（bonds_masterから構築したリゾルバで最長一致）"""
+    return get_bond_master_resolver().resolve(bond_name, maturity_days)
 
 
 def get_issuance_attribute(issuance, attr_name):
@@ -329,9 +242,12 @@ def process_announcement_file(file_path):
     file_name = os.path.basename(file_path)
     announcement_id = file_name.replace('.txt', '')
     
+    # 法令参照のトークン化（1回のみ走査し、以降の判定で共有）
+    references = list(tokenize_law_references(content))
+    
     # 割引短期国債と政府短期証券の判定
     has_waribiki = has_waribiki_tanki(content)
-    has_seifu = has_government_short_term_bond(content)
+    has_seifu = has_government_short_term_bond(content, references)
     
     # 政府短期証券のみ（割引短期国債なし）の場合はスキップ
     if has_seifu and not has_waribiki:
@@ -360,7 +276,7 @@ def process_announcement_file(file_path):
         'updated_at': datetime.now().isoformat()
     }
     
-    legal_bases = extract_legal_bases(content)
+    legal_bases = extract_legal_bases(content, references)
     
     if legal_bases:
         # 政府短期証券関連の発行根拠は除外
@@ -444,53 +360,68 @@ def process_announcement_file(file_path):
     }
 
 
-def upload_to_bigquery(data_list):
-    """BigQueryにデータをアップロード"""
-    announcements = [d['announcement'] for d in data_list if d]
-    if announcements:
-        table_ref = f"{PROJECT_ID}.{DATASET_ID}.announcements"
-        errors = client.insert_rows_json(table_ref, announcements)
-        if errors:
-            print(f"❌ announcements投入エラー: {errors}")
-        else:
-            print(f"✅ announcements投入成功: {len(announcements)}件")
-    
-    all_issuances = []
-    for d in data_list:
-        if d and d['issuances']:
-            all_issuances.extend(d['issuances'])
-    
-    if all_issuances:
-        table_ref = f"{PROJECT_ID}.{DATASET_ID}.bond_issuances"
-        errors = client.insert_rows_json(table_ref, all_issuances)
-        if errors:
-            print(f"❌ bond_issuances投入エラー: {errors}")
-        else:
-            print(f"✅ bond_issuances投入成功: {len(all_issuances)}件")
-    
-    return len(all_issuances)
-
-
-def main():
-    """メイン処理"""
-    print("=" * 60)
-    print("データ投入スクリプト（20251024データセット）")
-    print("=" * 60)
-    print()
+def upload_to_bigquery(results, sink=None, flush_rows=DEFAULT_FLUSH_ROWS, flush_bytes=DEFAULT_FLUSH_BYTES,
+                       max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+    """
+    BigQueryにデータをアップロード（結果を受け取りながら分割して送信）
     
-    if not HAS_PARSERS:
-        print("⚠️  警告: parsersモジュールが見つかりません")
-        print("⚠️  プロジェクトルート:", project_root)
-        print("⚠️  発行根拠法令のみを処理します\n")
+    全件を溜めずに、flush_rows 行または flush_bytes バイトごとに送信する。
     
-    files = sorted([f for f in os.listdir(DATA_DIR) if f.endswith('.txt')])
-    print(f"処理対象ファイル数: {len(files)}件\n")
+    Args:
+        results: process_announcement_file の結果（リストでもジェネレーターでもよい）
+        sink: 書き込み方式（insert_all / committed / pending、省略時は JGB_WRITE_SINK）
+        flush_rows / flush_bytes: 1回の送信の行数・バイト数の上限
+        max_in_flight: 同時に送信する回数の上限（insert_all のみ）
     
-    data_list = []
-    skip_count = 0
-    mixed_count = 0
-    error_count = 0
+    Returns:
+        (投入した発行件数, パースした発行データの集計)
+    """
+    options = dict(sink=sink or default_sink(), flush_rows=flush_rows, flush_bytes=flush_bytes,
+                   max_in_flight=max_in_flight)
+    parsed_summary = {}
+    written_summary = {}
+    # with を抜けると残りを送信して完了を待つ（例外時は送信を打ち切り、pending は破棄）
+    with StreamingUploader(get_client(), f"{PROJECT_ID}.{DATASET_ID}.announcements", **options) as announcements, \
+            StreamingUploader(get_client(), f"{PROJECT_ID}.{DATASET_ID}.bond_issuances",
+                              on_written=lambda rows: merge_summary(written_summary, summarize_rows(rows)),
+                              **options) as issuances:
+        for d in results:
+            if not d:
+                continue
+            announcements.add(d['announcement'])
+            if d['issuances']:
+                issuances.add_rows(d['issuances'])
+                merge_summary(parsed_summary, summarize_rows(d['issuances']))
+    
+    errors = announcements.errors
+    if errors:
+        print(f"❌ announcements投入エラー（{len(errors)}件）: {errors[:3]}")
+    if announcements.rows_written:
+        print(f"✅ announcements投入: {announcements.rows_written}件")
+    
+    errors = issuances.errors
+    if errors:
+        print(f"❌ bond_issuances投入エラー（{len(errors)}件）: {errors[:3]}")
+        if issuances.all_or_nothing:
+            written_summary = {}
+    if issuances.rows_written:
+        print(f"✅ bond_issuances投入: {issuances.rows_written}件"
+              f"（{issuances.chunks_sent}回に分割、再送 {issuances.retries}回）")
+    
+    # 発行集計（issuance_summary）に書き込めた分を加算
+    if written_summary:
+        try:
+            summary_table = f"{PROJECT_ID}.{DATASET_ID}.{SUMMARY_TABLE}"
+            keys = apply_summary(get_client(), summary_table, written_summary, current_run().run_id)
+            print(f"✅ issuance_summary更新: {keys}キー")
+        except Exception as e:
+            print(f"⚠️  issuance_summary更新エラー（reconcile_issuance_summary.py で修復）: {e}")
     
+    return issuances.rows_written, parsed_summary
+
+
+def iter_results(files, counts):
+    """ファイルを順に処理して結果を返す（件数は counts に集計）"""
     for i, file_name in enumerate(files, 1):
         file_path = os.path.join(DATA_DIR, file_name)
         print(f"[{i}/{len(files)}] {file_name}")
@@ -498,42 +429,69 @@ def main():
         try:
             result = process_announcement_file(file_path)
             if result:
-                data_list.append(result)
+                counts['success'] += 1
                 if result['issuances']:
                     print(f"  ✅ 発行件数: {len(result['issuances'])}件")
                     # 混在告示のカウント
                     with open(file_path, 'r', encoding='utf-8') as f:
                         content = f.read()
                         if has_waribiki_tanki(content) and has_government_short_term_bond(content):
-                            mixed_count += 1
+                            counts['mixed'] += 1
+                yield result
             else:
-                skip_count += 1
+                counts['skip'] += 1
         except Exception as e:
-            error_count += 1
+            counts['error'] += 1
             print(f"  ❌ エラー: {e}")
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description='告示データのBigQuery投入')
+    parser.add_argument('--sink', choices=SINK_CHOICES, default=default_sink(),
+                        help='書き込み方式（insert_all: ストリーミング挿入 / committed・pending: Storage Write API）')
+    parser.add_argument('--flush-rows', type=int, default=DEFAULT_FLUSH_ROWS, help='1回の送信の行数の上限')
+    parser.add_argument('--flush-bytes', type=int, default=DEFAULT_FLUSH_BYTES, help='1回の送信のバイト数の上限')
+    parser.add_argument('--max-in-flight', type=int, default=DEFAULT_MAX_IN_FLIGHT,
+                        help='同時に送信する回数の上限（insert_all のみ）')
+    args = parser.parse_args()
+    
+    print("=" * 60)
+    print("データ投入スクリプト（20251024データセット）")
+    print("=" * 60)
+    print()
+    
+    if not HAS_PARSERS:
+        print("⚠️  警告: parsersモジュールが見つかりません")
+        print("⚠️  プロジェクトルート:", project_root)
+        print("⚠️  発行根拠法令のみを処理します\n")
+    
+    files = sorted([f for f in os.listdir(DATA_DIR) if f.endswith('.txt')])
+    print(f"処理対象ファイル数: {len(files)}件\n")
+    
+    counts = {'success': 0, 'skip': 0, 'mixed': 0, 'error': 0}
+    
+    # パースしながら投入（一定の行数・バイト数ごとに送信し、全件はメモリに持たない）
+    total_issuances, parsed_summary = upload_to_bigquery(
+        iter_results(files, counts), sink=args.sink, flush_rows=args.flush_rows,
+        flush_bytes=args.flush_bytes, max_in_flight=args.max_in_flight)
     
     print(f"\n=== 処理完了 ===")
-    print(f"成功: {len(data_list)}件")
-    print(f"  うち混在告示: {mixed_count}件（割引短期国債+政府短期証券）")
-    print(f"スキップ: {skip_count}件（政府短期証券のみ）")
-    print(f"エラー: {error_count}件")
-    
-    if data_list:
-        print("\n=== BigQuery投入開始 ===")
-        total_issuances = upload_to_bigquery(data_list)
+    print(f"成功: {counts['success']}件")
+    print(f"  うち混在告示: {counts['mixed']}件（割引短期国債+政府短期証券）")
+    print(f"スキップ: {counts['skip']}件（政府短期証券のみ）")
+    print(f"エラー: {counts['error']}件")
+    
+    if counts['success']:
         print(f"\n総発行件数: {total_issuances}件")
         
         print("\n=== 発行根拠別集計 ===")
-        legal_basis_summary = {}
-        for d in data_list:
-            if d and d['issuances']:
-                for issuance in d['issuances']:
-                    category = issuance.get('legal_basis_category')
-                    if category:
-                        if category not in legal_basis_summary:
-                            legal_basis_summary[category] = {'count': 0, 'amount': 0}
-                        legal_basis_summary[category]['count'] += 1
-                        legal_basis_summary[category]['amount'] += issuance.get('issue_amount', 0) or 0
+        # issuance_summary と同じ規則で集計（総額レコードは除外）
+        legal_basis_summary = {
+            category: {'count': totals['issuance_count'], 'amount': totals['total_amount']}
+            for category, totals in totals_by(parsed_summary, 'category').items()
+            if category
+        }
         
         for category in sorted(legal_basis_summary.keys()):
             data = legal_basis_summary[category]
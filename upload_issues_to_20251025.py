@@ -9,6 +9,7 @@
 
 import os
 import sys
+import argparse
 import re
 from datetime import datetime, date
 import uuid
@@ -17,7 +18,19 @@ import uuid
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 sys.path.insert(0, project_root)
 
-from google.cloud import bigquery
+from database.bigquery_client import get_bigquery_client
+from database.ingestion_run import current_run
+from database.issuance_summary import SUMMARY_TABLE, apply_summary, merge_summary, summarize_rows, totals_by
+from database.storage_write_sink import SINK_CHOICES, default_sink
+from database.streaming_uploader import (
+    DEFAULT_FLUSH_BYTES, DEFAULT_FLUSH_ROWS, DEFAULT_MAX_IN_FLIGHT, StreamingUploader,
+)
+from parsers.bond_master_resolver import get_bond_master_resolver
+from parsers.law_reference_tokenizer import (
+    tokenize_law_references,
+    classify_law_references,
+    sort_by_basis_priority,
+)
 
 # パーサーのインポート
 try:
@@ -27,92 +40,25 @@ except ImportError:
     print("⚠️  警告: parsersモジュールが見つかりません")
     HAS_PARSERS = False
 
-# BigQuery設定
-os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = r"C:\Users\sonke\secrets\jgb2023-f8c9b849ae2d.json"
+# BigQuery設定（クライアントは import 時ではなく初回利用時に生成。
+# 認証は ADC。サービスアカウントキーを使う場合は GOOGLE_APPLICATION_CREDENTIALS を設定する）
 PROJECT_ID = 'jgb2023'
 DATASET_ID = '20251025'
 
-client = bigquery.Client(project=PROJECT_ID)
+
+def get_client():
+    """BigQueryクライアントを取得（初回利用時に生成）"""
+    return get_bigquery_client(PROJECT_ID)
+
 
 # データディレクトリ
 DATA_DIR = r"G:\マイドライブ\JGBデータ\2023"
 
-# 発行根拠法令パターン（2023年度用・優先順位最適化版）
-# ⭐ 重要：より具体的なパターンを先にチェック
-LEGAL_BASIS_PATTERNS = {
-    # 最優先：財投債（第62条を含む）
-    '財投債': {
-        'category': '財投債',
-        'sub_category': '財投債',
-        'patterns': [
-            r'特別会計に関する法律[^条]*第62条第[1１一]項',
-            r'特別会計に関する法律[^条]*第六十二条第[1１一]項'
-        ]
-    },
-    # 優先：特例債
-    '特例債': {
-        'category': '特例債',
-        'sub_category': '特例公債',
-        'patterns': [
-            r'財政運営に必要な財源の確保を図るための公債の発行の特例に関する法律[^条]*第[2２二]条第[1１一]項',
-            r'平成24年法律第101号[^条]*第[2２二]条第[1１一]項'
-        ]
-    },
-    # 年金特例債
-    '年金特例債': {
-        'category': '年金特例債',
-        'sub_category': 'つなぎ公債',
-        'patterns': [
-            r'財政運営に必要な財源の確保を図るための公債の発行の特例に関する法律[^条]*第[3３三]条第[1１一]項',
-            r'平成24年法律第101号[^条]*第[3３三]条第[1１一]項'
-        ]
-    },
-    # 4条債
-    '4条債': {
-        'category': '4条債',
-        'sub_category': '建設国債',
-        'patterns': [
-            r'財政法[^条]*第[4４四]条第[1１一]項',
-            r'財政法[^条]*第四条第[1１一]項'
-        ]
-    },
-    # GX経済移行債
-    'GX経済移行債': {
-        'category': 'GX経済移行債',
-        'sub_category': 'つなぎ公債',
-        'patterns': [
-            r'脱炭素成長型経済構造への円滑な移行の推進に関する法律[^条]*第[7７七]条第[1１一]項',
-            r'令和[5５]年法律第32号[^条]*第[7７七]条第[1１一]項'
-        ]
-    },
-    # 復興債
-    '復興債': {
-        'category': '復興債',
-        'sub_category': 'つなぎ公債',
-        'patterns': [
-            r'東日本大震災からの復興のための施策を実施するために必要な財源の確保に関する特別措置法[^条]*第69条第[4４四]項',
-            r'東日本大震災からの復興のための施策を実施するために必要な財源の確保に関する特別措置法[^条]*第六十九条第[4４四]項'
-        ]
-    },
-    # 前倒債
-    '前倒債': {
-        'category': '借換債',
-        'sub_category': '前倒債',
-        'patterns': [
-            r'特別会計に関する法律[^条]*第47条第[1１一]項',
-            r'特別会計に関する法律[^条]*第四十七条第[1１一]項'
-        ]
-    },
-    # 最後：借換債（最も一般的なため最後にチェック）
-    '借換債': {
-        'category': '借換債',
-        'sub_category': '借換債',
-        'patterns': [
-            r'特別会計に関する法律[^条]*第46条第[1１一]項',
-            r'特別会計に関する法律[^条]*第四十六条第[1１一]項'
-        ]
-    }
-}
+# 発行根拠法令の抽出は単一パス・トークナイザで行う
+# （旧LEGAL_BASIS_PATTERNSは parsers/law_reference_tokenizer.py に集約）
+
+# 複数の根拠が併記された告示で代表根拠（legal_basis）を選ぶ優先順（旧LEGAL_BASIS_PATTERNSの定義順）
+LEGAL_BASIS_PRIORITY = ('財投債', '特例債', '年金特例債', '4条債', 'GX経済移行債', '復興債', '前倒債', '借換債')
 
 
 def parse_date_string(date_value):
@@ -133,28 +79,20 @@ def parse_date_string(date_value):
 
 
 def extract_legal_bases(text):
-    """発行根拠法令を抽出（複数対応・「及び」対応）"""
-    results = []
-    
-    # ⭐ 重要：「及び」で分割される複数の条項を個別にチェック
-    for basis_name, config in LEGAL_BASIS_PATTERNS.items():
-        for pattern in config['patterns']:
-            # re.DOTALL フラグを追加（改行をマッチ）
-            matches = re.finditer(pattern, text, re.IGNORECASE | re.DOTALL)
-            
-            for match in matches:
-                full_text = match.group(0)
-                
-                # 重複チェック（同じ法令根拠を2回追加しない）
-                if not any(r['basis'] == basis_name for r in results):
-                    results.append({
-                        'basis': basis_name,
-                        'category': config['category'],
-                        'sub_category': config['sub_category'],
-                        'full': full_text
-                    })
-    
-    return results
+    """発行根拠法令を抽出（複数対応・「及び」対応）
+
+    告示文を1回だけトークン化し、(法律, 条, 項) をARTICLE_TO_LEGAL_BASISで辞書引きする
+    """
+    bases = classify_law_references(text, tokenize_law_references(text))
+    return [
+        {
+            'basis': lb['basis'],
+            'category': lb['category'],
+            'sub_category': lb['sub_category'],
+            'full': lb['full']
+        }
+        for lb in sort_by_basis_priority(bases, LEGAL_BASIS_PRIORITY)
+    ]
 
 
 def extract_series_number(text):
@@ -182,48 +120,8 @@ def calculate_maturity_period(issuance_date, maturity_date):
 
 
 def determine_bond_master_id(bond_name, maturity_days):
-    """債券名と償還期間から適切なbond_master_idを決定"""
-    # ⭐ 重要：債券名が存在しない場合
-    if not bond_name:
-        return None
-    
-    # ⭐ 修正：債券名を優先（日付がNULLでも対応可能）
-    mapping = {
-        '2年': 'BOND_002Y',
-        '5年': 'BOND_005Y',
-        '10年': 'BOND_010Y',
-        '20年': 'BOND_020Y',
-        '30年': 'BOND_030Y',
-        '40年': 'BOND_040Y',
-        '固定・3年': 'BOND_KOJIN_FIXED_3Y',
-        '固定・5年': 'BOND_KOJIN_FIXED_5Y',
-        '変動・10年': 'BOND_KOJIN_VARIABLE_10Y',
-        '物価連動': 'BOND_BUKKA_10Y'
-    }
-    
-    # 債券名から直接判定（最優先）
-    for key, value in mapping.items():
-        if key in bond_name:
-            return value
-    
-    # クライメート・トランジション債
-    if 'クライメート' in bond_name or 'トランジション' in bond_name:
-        if '10年' in bond_name:
-            return 'BOND_GX_10Y'
-        elif '5年' in bond_name:
-            return 'BOND_GX_5Y'
-    
-    # 短期債（償還期間が必要）
-    if '短期' in bond_name or 'TANKI' in bond_name:
-        if maturity_days and maturity_days >= 270:
-            return 'BOND_TANKI_1Y'
-        elif maturity_days:
-            return 'BOND_TANKI_6M'
-        else:
-            # 日付不明の場合はデフォルトで6ヶ月
-            return 'BOND_TANKI_6M'
-    
-    return None
+    """債券名と償還期間から適切なbond_master_idを決定（bonds_masterから構築したリゾルバで最長一致）"""
+    return get_bond_master_resolver().resolve(bond_name, maturity_days)
 
 
 def get_issuance_attribute(issuance, attr_name):
@@ -354,35 +252,95 @@ def process_announcement_file(file_path):
     }
 
 
-def upload_to_bigquery(data_list):
-    """BigQueryにデータをアップロード"""
-    announcements = [d['announcement'] for d in data_list if d]
-    if announcements:
-        table_ref = f"{PROJECT_ID}.{DATASET_ID}.announcements"
-        errors = client.insert_rows_json(table_ref, announcements)
-        if errors:
-            print(f"❌ announcements投入エラー: {errors}")
-        else:
-            print(f"✅ announcements投入成功: {len(announcements)}件")
+def upload_to_bigquery(results, sink=None, flush_rows=DEFAULT_FLUSH_ROWS, flush_bytes=DEFAULT_FLUSH_BYTES,
+                       max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+    """
+    BigQueryにデータをアップロード（結果を受け取りながら分割して送信）
     
-    all_issuances = []
-    for d in data_list:
-        if d and d['issuances']:
-            all_issuances.extend(d['issuances'])
+    全件を溜めずに、flush_rows 行または flush_bytes バイトごとに送信する。
+    
+    Args:
+        results: process_announcement_file の結果（リストでもジェネレーターでもよい）
+        sink: 書き込み方式（insert_all / committed / pending、省略時は JGB_WRITE_SINK）
+        flush_rows / flush_bytes: 1回の送信の行数・バイト数の上限
+        max_in_flight: 同時に送信する回数の上限（insert_all のみ）
+    
+    Returns:
+        (投入した発行件数, パースした発行データの集計)
+    """
+    options = dict(sink=sink or default_sink(), flush_rows=flush_rows, flush_bytes=flush_bytes,
+                   max_in_flight=max_in_flight)
+    parsed_summary = {}
+    written_summary = {}
+    # with を抜けると残りを送信して完了を待つ（例外時は送信を打ち切り、pending は破棄）
+    with StreamingUploader(get_client(), f"{PROJECT_ID}.{DATASET_ID}.announcements", **options) as announcements, \
+            StreamingUploader(get_client(), f"{PROJECT_ID}.{DATASET_ID}.bond_issuances",
+                              on_written=lambda rows: merge_summary(written_summary, summarize_rows(rows)),
+                              **options) as issuances:
+        for d in results:
+            if not d:
+                continue
+            announcements.add(d['announcement'])
+            if d['issuances']:
+                issuances.add_rows(d['issuances'])
+                merge_summary(parsed_summary, summarize_rows(d['issuances']))
+    
+    errors = announcements.errors
+    if errors:
+        print(f"❌ announcements投入エラー（{len(errors)}件）: {errors[:3]}")
+    if announcements.rows_written:
+        print(f"✅ announcements投入: {announcements.rows_written}件")
+    
+    errors = issuances.errors
+    if errors:
+        print(f"❌ bond_issuances投入エラー（{len(errors)}件）: {errors[:3]}")
+        if issuances.all_or_nothing:
+            written_summary = {}
+    if issuances.rows_written:
+        print(f"✅ bond_issuances投入: {issuances.rows_written}件"
+              f"（{issuances.chunks_sent}回に分割、再送 {issuances.retries}回）")
     
-    if all_issuances:
-        table_ref = f"{PROJECT_ID}.{DATASET_ID}.bond_issuances"
-        errors = client.insert_rows_json(table_ref, all_issuances)
-        if errors:
-            print(f"❌ bond_issuances投入エラー: {errors[:3]}")
-        else:
-            print(f"✅ bond_issuances投入成功: {len(all_issuances)}件")
+    # 発行集計（issuance_summary）に書き込めた分を加算
+    if written_summary:
+        try:
+            summary_table = f"{PROJECT_ID}.{DATASET_ID}.{SUMMARY_TABLE}"
+            keys = apply_summary(get_client(), summary_table, written_summary, current_run().run_id)
+            print(f"✅ issuance_summary更新: {keys}キー")
+        except Exception as e:
+            print(f"⚠️  issuance_summary更新エラー（reconcile_issuance_summary.py で修復）: {e}")
     
-    return len(all_issuances)
+    return issuances.rows_written, parsed_summary
+
+
+def iter_results(files, counts):
+    """ファイルを順に処理して結果を返す（件数は counts に集計）"""
+    for i, file_name in enumerate(files, 1):
+        file_path = os.path.join(DATA_DIR, file_name)
+        print(f"[{i}/{len(files)}] {file_name}")
+        
+        try:
+            result = process_announcement_file(file_path)
+            if result:
+                counts['success'] += 1
+                if result['issuances']:
+                    print(f"  ✅ 発行件数: {len(result['issuances'])}件")
+                yield result
+        except Exception as e:
+            counts['error'] += 1
+            print(f"  ❌ エラー: {e}")
 
 
 def main():
     """メイン処理"""
+    parser = argparse.ArgumentParser(description='告示データのBigQuery投入')
+    parser.add_argument('--sink', choices=SINK_CHOICES, default=default_sink(),
+                        help='書き込み方式（insert_all: ストリーミング挿入 / committed・pending: Storage Write API）')
+    parser.add_argument('--flush-rows', type=int, default=DEFAULT_FLUSH_ROWS, help='1回の送信の行数の上限')
+    parser.add_argument('--flush-bytes', type=int, default=DEFAULT_FLUSH_BYTES, help='1回の送信のバイト数の上限')
+    parser.add_argument('--max-in-flight', type=int, default=DEFAULT_MAX_IN_FLIGHT,
+                        help='同時に送信する回数の上限（insert_all のみ）')
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("データ投入スクリプト（20251025データセット・完全修正版）")
     print("=" * 60)
@@ -395,45 +353,28 @@ def main():
     files = sorted([f for f in os.listdir(DATA_DIR) if f.endswith('.txt')])
     print(f"処理対象ファイル数: {len(files)}件\n")
     
-    data_list = []
-    error_count = 0
+    counts = {'success': 0, 'error': 0}
     
-    for i, file_name in enumerate(files, 1):
-        file_path = os.path.join(DATA_DIR, file_name)
-        print(f"[{i}/{len(files)}] {file_name}")
-        
-        try:
-            result = process_announcement_file(file_path)
-            if result:
-                data_list.append(result)
-                if result['issuances']:
-                    print(f"  ✅ 発行件数: {len(result['issuances'])}件")
-        except Exception as e:
-            error_count += 1
-            print(f"  ❌ エラー: {e}")
+    # パースしながら投入（一定の行数・バイト数ごとに送信し、全件はメモリに持たない）
+    total_issuances, parsed_summary = upload_to_bigquery(
+        iter_results(files, counts), sink=args.sink, flush_rows=args.flush_rows,
+        flush_bytes=args.flush_bytes, max_in_flight=args.max_in_flight)
     
     print(f"\n=== 処理完了 ===")
-    print(f"成功: {len(data_list)}件")
-    print(f"エラー: {error_count}件")
+    print(f"成功: {counts['success']}件")
+    print(f"エラー: {counts['error']}件")
     
-    if data_list:
-        print("\n=== BigQuery投入開始 ===")
-        total_issuances = upload_to_bigquery(data_list)
+    if counts['success']:
         print(f"\n総発行件数: {total_issuances}件")
         
         # 発行根拠別集計
         print("\n=== 発行根拠別集計 ===")
-        legal_basis_summary = {}
-        for d in data_list:
-            if d and d['issuances']:
-                for issuance in d['issuances']:
-                    category = issuance.get('category')
-                    if category:
-                        if category not in legal_basis_summary:
-                            legal_basis_summary[category] = {'count': 0, 'amount': 0}
-                        legal_basis_summary[category]['count'] += 1
-                        amount = issuance.get('issue_amount', 0) or 0
-                        legal_basis_summary[category]['amount'] += amount
+        # issuance_summary と同じ規則で集計（総額レコードは除外）
+        legal_basis_summary = {
+            category: {'count': totals['issuance_count'], 'amount': totals['total_amount']}
+            for category, totals in totals_by(parsed_summary, 'category').items()
+            if category
+        }
         
         for category in sorted(legal_basis_summary.keys()):
             data = legal_basis_summary[category]